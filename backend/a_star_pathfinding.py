@@ -1,6 +1,15 @@
 import heapq
+import math
+import logging
 import networkx as nx
 
+logger = logging.getLogger(__name__)
+
+# Tolerance used to decide if a same-floor move is horizontal/vertical
+CARDINAL_TOLERANCE = 1.5
+# Nodes A* may expand before a search is given up
+MAX_EXPANSIONS = 40000
+
 def heuristic(node1_data, node2_data):
     """
     Calculate the heuristic distance (estimated cost) between two nodes.
@@ -27,7 +36,7 @@ def heuristic(node1_data, node2_data):
 
     except (TypeError, AttributeError, KeyError) as e:
         # Log error if calculation fails due to missing/invalid data
-        print(f"ERROR calculating heuristic: {e}. Node1: {node1_data.get('svg_id', 'N/A')}, Node2: {node2_data.get('svg_id', 'N/A')}")
+        logger.error("Error calculating heuristic: %s. Node1: %s, Node2: %s", e, node1_data.get('svg_id', 'N/A'), node2_data.get('svg_id', 'N/A'))
         return float('inf') # Return infinity to avoid choosing problematic nodes
 
 def reconstruct_path(came_from, current_node):
@@ -48,34 +57,60 @@ def reconstruct_path(came_from, current_node):
     path.reverse() # Reverse the path to get start -> goal order
     return path
 
-def find_node(room_id_input, campus_graph):
+def find_node(room_id_input, campus_graph, room_index=None):
     """
     Finds the graph node ID corresponding to a given room ID/name input.
     Searches node attributes 'type', 'svg_id', and 'name' (case-insensitive).
 
     :param room_id_input: The room ID or name to search for.
     :param campus_graph: The graph representing the campus map. (NetworkX)
-    :return: str or None: The unique node ID if found, otherwise None.
+    :param room_index: Optional RoomIndex of campus_graph, answers in O(1) instead of scanning every node.
+    :return: str or None: The unique node ID if found (the first match in graph order), otherwise None.
     """
 
     if not campus_graph or not room_id_input:
-        print("Warning: find_node called with empty graph or room_id_input.")
+        logger.warning("find_node called with empty graph or room_id_input.")
         return None
 
     target_room_id_upper = room_id_input.strip().upper() # Normalize input for comparison
 
-    # Iterate through all nodes and their data in the graph
-    for node, data in campus_graph.nodes(data=True):
-        # Check common attributes where the room ID might be stored
-        if data.get('type', '').strip().upper() == target_room_id_upper:
-            return node
-        if data.get('svg_id', '').strip().upper() == target_room_id_upper:
+    if room_index is not None:
+        node = room_index.first(target_room_id_upper)
+        if node is not None:
             return node
+    else:
+        # Iterate through all nodes and their data in the graph
+        for node, data in campus_graph.nodes(data=True):
+            # Check common attributes where the room ID might be stored
+            if data.get('type', '').strip().upper() == target_room_id_upper:
+                return node
+            if data.get('svg_id', '').strip().upper() == target_room_id_upper:
+                return node
 
     # If no match found after checking all nodes
-    print(f"Warning: Node corresponding to '{room_id_input}' (normalized: '{target_room_id_upper}') not found in graph.")
+    logger.debug("Node corresponding to '%s' (normalized: '%s') not found in graph.", room_id_input, target_room_id_upper)
     return None
 
+def find_nodes(room_id_input, campus_graph, room_index=None):
+    """
+    Finds every graph node of a room (rooms can be drawn with several rects).
+
+    :param room_id_input: The room ID or name to search for (case-insensitive).
+    :param campus_graph: The graph representing the campus map. (NetworkX)
+    :param room_index: Optional RoomIndex of campus_graph.
+    :return: list: Matching node IDs in graph order, find_node's result first. Empty if none match.
+    """
+
+    if not campus_graph or not room_id_input:
+        return []
+    if room_index is not None:
+        return list(room_index.candidates(room_id_input))
+
+    target_room_id_upper = room_id_input.strip().upper()
+    return [node for node, data in campus_graph.nodes(data=True)
+            if data.get('type', '').strip().upper() == target_room_id_upper
+            or data.get('svg_id', '').strip().upper() == target_room_id_upper]
+
 def get_node_category(node_data):
     """
     Categorizes a node based on its 'type' attribute (typically the SVG ID).
@@ -119,212 +154,172 @@ def get_node_category(node_data):
     # Default category if none of the above match
     return 'other'
 
-def pathfinding_algo(start_node_id, goal_node_id, campus_graph):
+def is_cardinal_move(current_x, current_y, neighbor_x, neighbor_y, changes_floor):
+    """
+    Same-floor moves must be purely horizontal or vertical, floor changes are always allowed.
+
+    :return: bool: True if the move passes the cardinal direction check.
+    """
+
+    if changes_floor:
+        return True
+    # Same-floor nodes without coordinates cannot be checked, so the move is not allowed
+    for coordinate in (current_x, current_y, neighbor_x, neighbor_y):
+        if coordinate is None or math.isnan(coordinate):
+            return False
+    dx = abs(current_x - neighbor_x)
+    dy = abs(current_y - neighbor_y)
+    is_horizontal = dy < CARDINAL_TOLERANCE and dx > CARDINAL_TOLERANCE
+    is_vertical = dx < CARDINAL_TOLERANCE and dy > CARDINAL_TOLERANCE
+    return is_horizontal or is_vertical
+
+def annotate_traversal_rules(campus_graph, node_ids=None):
+    """
+    Precomputes the per-node and per-edge inputs of the A* traversal rules, so searches
+    do not re-derive them for every neighbour they look at:
+    every node gets its get_node_category result as 'category' and every edge a
+    'cardinal' flag (True if the move passes the cardinal direction check).
+    Called by create_campus_graph once the graph is complete.
+
+    :param campus_graph: The NetworkX graph to annotate (modified in place).
+    :param node_ids: Only annotate these nodes and the edges touching them (e.g. a reloaded floor).
+    :return: The same graph.
+    """
+
+    node_ids = campus_graph.nodes() if node_ids is None else node_ids
+    for node_id in node_ids:
+        node_data = campus_graph.nodes[node_id]
+        node_data['category'] = get_node_category(node_data)
+    for node1_id, node2_id, edge_data in campus_graph.edges(node_ids, data=True):
+        node1_data = campus_graph.nodes[node1_id]
+        node2_data = campus_graph.nodes[node2_id]
+        edge_data['cardinal'] = is_cardinal_move(node1_data.get('center_x'), node1_data.get('center_y'),
+                                                 node2_data.get('center_x'), node2_data.get('center_y'),
+                                                 node1_data.get('floor') != node2_data.get('floor'))
+    return campus_graph
+
+def pathfinding_algo(start_node_id, goal_node_id, campus_graph, max_expansions=MAX_EXPANSIONS, stats=None, landmarks=None):
     """
     Finds the shortest path between two nodes in the campus graph using the A* algorithm.
     Costs are based on the 'weight' attribute of the graph edges.
-    Uses Manhattan distance heuristic to prioritize cardinal movement.
+    Uses Manhattan distance heuristic to prioritize cardinal movement, or the admissible
+    landmark (ALT) lower bound when landmarks are given.
+
+    Search state (g scores, predecessors) is only kept for nodes the search reaches. Node categories
+    and cardinal edge flags come from annotate_traversal_rules when the graph has them (they are
+    computed on the fly otherwise). A shorter path to a queued node pushes a new heap entry and the
+    outdated one is skipped when popped. Heap ties break on the node ID.
 
     :param start_node_id: The unique ID of the starting node.
     :param goal_node_id: The unique ID of the goal node.
     :param campus_graph: The NetworkX graph representing the campus map.
+    :param max_expansions: Give up after expanding this many nodes.
+    :param stats: Optional dictionary, receives the number of expanded nodes under 'expanded'.
+    :param landmarks: Optional Landmarks of campus_graph, replaces the Manhattan heuristic.
     :return: list or None: A list of node IDs representing the path from start to goal,
                       or None if no path is found or an error occurs.
     """
 
     # --- Input Validation ---
     if start_node_id not in campus_graph:
-        print(f"ERROR: Start node '{start_node_id}' not found in the graph.")
+        logger.error("Start node '%s' not found in the graph.", start_node_id)
         return None
     if goal_node_id not in campus_graph:
-        print(f"ERROR: Goal node '{goal_node_id}' not found in the graph.")
+        logger.error("Goal node '%s' not found in the graph.", goal_node_id)
         return None
     if start_node_id == goal_node_id:
-        print("Start and goal nodes are the same.")
+        if stats is not None:
+            stats['expanded'] = 0
         return [start_node_id] # Path is just a single node
 
     # Get data for start and goal nodes
-    start_node_data = campus_graph.nodes[start_node_id]
-    goal_node_data = campus_graph.nodes[goal_node_id]
+    nodes = campus_graph.nodes
+    start_node_data = nodes[start_node_id]
+    goal_node_data = nodes[goal_node_id]
 
     # Verify necessary attributes exist for heuristic calculation and logic
     required_attrs = ['floor', 'center_x', 'center_y', 'type']
     for attr in required_attrs:
         if attr not in start_node_data:
-            print(f"ERROR: Start node '{start_node_id}' missing required attribute '{attr}'.")
+            logger.error("Start node '%s' missing required attribute '%s'.", start_node_id, attr)
             return None
         if attr not in goal_node_data:
-            print(f"ERROR: Goal node '{goal_node_id}' missing required attribute '{attr}'.")
+            logger.error("Goal node '%s' missing required attribute '%s'.", goal_node_id, attr)
             return None
 
     # --- A* Initialization ---
-    open_set = [] # Priority queue (min-heap) storing (f_score, node_id)
-    start_h = heuristic(start_node_data, goal_node_data) # Initial heuristic cost (Manhattan)
-    heapq.heappush(open_set, (start_h, start_node_id))
-
-    came_from = {} # Dictionary to reconstruct the path: {node: predecessor}
-
-    # g_score: Cost from start node to current node
-    g_score = {node: float('inf') for node in campus_graph.nodes()}
-    g_score[start_node_id] = 0
-
-    # f_score: Estimated total cost from start to goal through current node (g_score + heuristic)
-    f_score = {node: float('inf') for node in campus_graph.nodes()}
-    f_score[start_node_id] = start_h
-
-    open_set_hash = {start_node_id} # Set for quick checking if a node is in the open_set priority queue
-
-    # Determine if navigation is between different floors
-    start_floor = start_node_data.get('floor')
-    goal_floor = goal_node_data.get('floor')
-    is_cross_floor = (start_floor != goal_floor)
-    print(f"Navigation is {'cross-floor' if is_cross_floor else 'same-floor'}")
-
-    if is_cross_floor:
-        start_category = get_node_category(start_node_data)
-        goal_category = get_node_category(goal_node_data)
-        print(f"DEBUG: Start Node '{start_node_id}' Category: {start_category}")
-        print(f"DEBUG: Goal Node '{goal_node_id}' Category: {goal_category}")
-        print(f"DEBUG: Start Node Neighbors: {list(campus_graph.neighbors(start_node_id))}")
-
-
-    # Explicitly list all known stair and elevator types for use in rules
-    stair_types = [
-        'stairsLIBRARY2', 'stairsLIBRARY1', 'stairsFRONT3', 'stairsFRONT2',
-        'stairsFOOD', 'stairsJKCC8', 'stairsJKCC7', 'stairsJKCC6',
-        'stairsJKCC5', 'stairsJKCC4', 'stairsJKCC3', 'stairsJKCC2',
-        'stairsJKCC', 'stairsFRONT'
-    ]
-    elevator_types = [
-        'elevatorJKCC3', 'elevatorJKCC2', 'elevatorJKCC', 'elevatorLIBRARY',
-        'elevatorMAIN2', 'elevatorMAIN1'
-    ]
-    vertical_transport_types = stair_types + elevator_types
-    # Define categories allowed to precede/succeed vertical transport
-    allowed_vertical_neighbors = ['walkable', 'room']
+    if landmarks is not None:
+        landmark_bound = landmarks.goal_heuristic_by_id(goal_node_id)
+        estimate = lambda node_id, node_data: landmark_bound(node_id)
+    else:
+        estimate = lambda node_id, node_data: heuristic(node_data, goal_node_data)
+
+    # Heap entries are (f_score, node_id, g_score)
+    open_set = [(estimate(start_node_id, start_node_data), start_node_id, 0.0)]
+    g_score = {start_node_id: 0.0}
+    came_from = {}
+    expanded = 0
+    adjacency = campus_graph.adj
+    infinity = float('inf')
 
     # --- A* Main Loop ---
-    node_counter = 0 # Counter to prevent potential infinite loops
-    max_iterations = 40000 # Adjust this limit based on graph size and complexity --- probably too much atm anyway
-
-    print(f"Starting A* from '{start_node_id}' to '{goal_node_id}'")
-
     while open_set:
-        node_counter += 1
-        if node_counter > max_iterations:
-             print(f"ERROR: A* iteration limit exceeded ({max_iterations} nodes). Pathfinding aborted.")
-             return None # Prevent excessive computation
-
-        # Get the node with the lowest f_score from the priority queue
-        current_f, current_node_id = heapq.heappop(open_set)
-        open_set_hash.remove(current_node_id)
-
-        #print(f"Node {node_counter}") # DEBUG
+        _, current_node_id, current_g = heapq.heappop(open_set)
+        if current_g > g_score[current_node_id]:
+            continue # Outdated entry, a shorter path was found after it was pushed
 
         # --- Goal Reached ---
         if current_node_id == goal_node_id:
-            print(f"Goal '{goal_node_id}' reached after exploring {node_counter} nodes!")
+            if stats is not None:
+                stats['expanded'] = expanded
             return reconstruct_path(came_from, current_node_id)
 
-        # If we found a shorter path to this node already, skip processing this one
-        if current_f > f_score[current_node_id]:
-            continue
-
-        # Get data for the current node being processed
-        current_node_data = campus_graph.nodes[current_node_id]
-        current_category = get_node_category(current_node_data)
-        current_floor = current_node_data.get('floor')
-        current_specific_type = current_node_data.get('type', 'N/A') # Get specific type for logging
-
-        # Print current node being processed if debugging deeply
-        #print(f"\nDEBUG: Processing Node: {current_node_id} (Category: {current_category}, Type: {current_specific_type}, Floor: {current_floor})")
+        expanded += 1
+        if expanded > max_expansions:
+            if stats is not None:
+                stats['expanded'] = expanded
+            logger.warning("A* iteration limit exceeded (%d nodes). Pathfinding aborted.", max_expansions)
+            return None
 
+        current_node_data = nodes[current_node_id]
         # --- Explore Neighbors ---
-        for neighbor_node_id in campus_graph.neighbors(current_node_id):
-            neighbor_node_data = campus_graph.nodes[neighbor_node_id]
-            neighbor_category = get_node_category(neighbor_node_data)
-            neighbor_floor = neighbor_node_data.get('floor')
-            neighbor_specific_type = neighbor_node_data.get('type', 'N/A')  # Get specific type for logging
-
-            # --- Cardinal Direction Check ---
-            # Skip neighbors that are diagonal to the current node
-            current_x = current_node_data.get('center_x')
-            current_y = current_node_data.get('center_y')
-            neighbor_x = neighbor_node_data.get('center_x')
-            neighbor_y = neighbor_node_data.get('center_y')
-
-            # Check if coordinates are valid
-            if current_x is None or current_y is None or neighbor_x is None or neighbor_y is None:
-                # This might happen for inter-floor nodes if coords aren't perfectly aligned,
-                # but inter-floor movement is handled by specific rules later anyway.
-                # For same-floor checks, coordinates should exist.
-                if current_floor == neighbor_floor:
-                    print(
-                        f"Warning: Missing coordinates for cardinal direction check between same-floor nodes {current_node_id} and {neighbor_node_id}. Skipping neighbor.")
-                    continue  # Skip same-floor neighbor if coordinates are missing
-
-                # Allow potential cross-floor connection check to proceed even if coords missing/misaligned
-                pass  # Let traversal rules handle cross-floor logic
-
-            else:
-                # Calculate differences only if coordinates are valid
-                dx = abs(current_x - neighbor_x)
-                dy = abs(current_y - neighbor_y)
-
-                # Allow move ONLY if it's purely horizontal (dy is near zero) OR purely vertical (dx is near zero)
-                # Use a small tolerance for floating point comparisons
-                coord_tolerance = 1.5  # Small value to account for potential float inaccuracies -- Adjust as required
-                is_horizontal = dy < coord_tolerance and dx > coord_tolerance
-                is_vertical = dx < coord_tolerance and dy > coord_tolerance
-
-                # This check primarily affects same-floor movement.
-                # Inter-floor movement (stairs/elevators) relies on specific node types matching.
-                if current_floor == neighbor_floor and not (is_horizontal or is_vertical):
-                    # If it's neither purely horizontal nor purely vertical on the same floor, disallow
-                    # print(f"    Skipping diagonal move: {current_node_id} ({current_x:.1f},{current_y:.1f}) to {neighbor_node_id} ({neighbor_x:.1f},{neighbor_y:.1f}) dx={dx:.2f}, dy={dy:.2f}")
-                    continue  # Skip this neighbor as it's a diagonal move on the same floor
-            # --- END Cardinal Direction Check ---
-
-            # --- Traversal Rules ---
-            allow_move = False
+        for neighbor_node_id, edge_data in adjacency[current_node_id].items():
+            neighbor_node_data = nodes[neighbor_node_id]
 
             # --- Rule 1: Cannot move into an Obstacle ---
+            neighbor_category = neighbor_node_data.get('category')
+            if neighbor_category is None:
+                neighbor_category = get_node_category(neighbor_node_data)
             if neighbor_category == 'obstacle':
-                continue  # Skip this neighbor entirely
-
-            # CAN ADD MORE RULES HERE LATER IF NEEDED
-
-            # --- Calculate Cost for Allowed Move ---
-            edge_data = campus_graph.get_edge_data(current_node_id, neighbor_node_id, default={})
-            # Base weight from edge (distance or specific stair/elevator weight)
-            # Default to a high-cost if weight is somehow missing to discourage using the edge
-            base_weight = edge_data.get('weight', float('inf'))
-            if base_weight == float('inf'):
-                print(f"Warning: Edge between {current_node_id} and {neighbor_node_id} has no 'weight' attribute. Assigning high cost.")
-
-            move_distance = base_weight
+                continue
+            # Nodes closed at runtime (see closures.py) cannot be entered either
+            if neighbor_node_data.get('closed'):
+                continue
+
+            # --- Rule 2: Same-floor moves must be horizontal or vertical ---
+            cardinal = edge_data.get('cardinal')
+            if cardinal is None:
+                cardinal = is_cardinal_move(current_node_data.get('center_x'), current_node_data.get('center_y'),
+                                            neighbor_node_data.get('center_x'), neighbor_node_data.get('center_y'),
+                                            current_node_data.get('floor') != neighbor_node_data.get('floor'))
+            if not cardinal:
+                continue
+
+            # Edges without a weight are never used
+            move_distance = edge_data.get('weight', infinity)
+            if move_distance == infinity:
+                continue
 
             # --- Path Improvement Check ---
-            # Calculate the cost to reach the neighbor through the current node
-            tentative_g_score = g_score[current_node_id] + move_distance
-
-            # If this path to the neighbor is shorter than any previously found path
-            # Also check if move_distance is valid (not infinity)
-            if tentative_g_score < g_score[neighbor_node_id] and move_distance != float('inf'):
-                # Update path information
+            tentative_g_score = current_g + move_distance
+            if tentative_g_score < g_score.get(neighbor_node_id, infinity):
                 came_from[neighbor_node_id] = current_node_id
                 g_score[neighbor_node_id] = tentative_g_score
-                # Calculate f_score (g_score + heuristic to goal)
-                h_neighbor = heuristic(neighbor_node_data, goal_node_data)
-                f_score[neighbor_node_id] = tentative_g_score + h_neighbor
-
-                # Add neighbor to the open set (priority queue) if it's not already there
-                if neighbor_node_id not in open_set_hash:
-                    heapq.heappush(open_set, (f_score[neighbor_node_id], neighbor_node_id))
-                    open_set_hash.add(neighbor_node_id)
-                # If it is already in the open set, the heap property will handle the update
-                # implicitly when this lower f_score is eventually processed.
+                f_score = tentative_g_score + estimate(neighbor_node_id, neighbor_node_data)
+                heapq.heappush(open_set, (f_score, neighbor_node_id, tentative_g_score))
 
     # If the loop finishes without reaching the goal
-    print(f"Open set is empty after exploring {node_counter} nodes, goal was not reached. No path found!")
+    if stats is not None:
+        stats['expanded'] = expanded
+    logger.debug("Open set is empty after exploring %d nodes, goal was not reached. No path found!", expanded)
     return None
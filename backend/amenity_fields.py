@@ -0,0 +1,206 @@
+import os
+import os.path
+import sys
+import math
+from array import array
+from csr_graph import CSRGraph, csr_dijkstra
+from graph_artifact import save_precomputed, load_precomputed, load_or_build_precomputed, precompute_main
+
+DEFAULT_AMENITY_FIELDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiled", "amenity_fields.bin")
+AMENITY_FIELDS_FORMAT_VERSION = 1
+# Amenity category -> keywords of the SVG IDs (node 'type') marking it, matching the room_type values of room_info
+AMENITY_KEYWORDS = {
+    'toilet': ('toilet', 'wc'),
+    'elevator': ('elevator', 'lift'),
+    'stairs': ('stairs',),
+}
+
+def amenity_category(node_data):
+    """
+    :param node_data: Dictionary of attributes for the node.
+    :return: str or None: The amenity category of the node (see AMENITY_KEYWORDS), None if it is no amenity.
+    """
+
+    node_type = node_data.get('type', '').lower()
+    if not node_type or node_data.get('category') == 'obstacle':
+        return None
+    for category, keywords in AMENITY_KEYWORDS.items():
+        if any(keyword in node_type for keyword in keywords):
+            return category
+    return None
+
+class AmenityFields:
+    """
+    Distance fields towards the amenities of each category.
+
+    For every node, distances[category][node] is the length of the shortest route to the closest
+    amenity of that category and next_hops[category][node] the next node on that route (-1 at the
+    amenity itself and where none is reachable). Following the next hops walks the route, so
+    answering a query costs time proportional to the route length, with no search.
+    """
+
+    def __init__(self, graph_key, node_ids, distances, next_hops):
+        """
+        :param graph_key: Key of the campus graph the fields were computed on.
+        :param node_ids: Node IDs in graph order (the arrays are indexed by this order).
+        :param distances: Category -> array('d') of distances (math.inf where no amenity is reachable).
+        :param next_hops: Category -> array('i') of next node indices.
+        """
+
+        self.graph_key = graph_key
+        self.node_ids = node_ids
+        self.node_index = {node_id: index for index, node_id in enumerate(node_ids)}
+        self.distances = distances
+        self.next_hops = next_hops
+
+    def categories(self):
+        """ :return: list: Amenity categories with at least one amenity on the map. """
+        return [category for category, distances in self.distances.items() if 0.0 in distances]
+
+    def distance(self, category, node_id):
+        """ :return: float: Distance from the node to the closest amenity of the category (math.inf if none). """
+        return self.distances[category][self.node_index[node_id]]
+
+    def nearest(self, category, node_id):
+        """
+        Walks the route from a node to the closest amenity of a category.
+
+        :param category: Amenity category (see AMENITY_KEYWORDS).
+        :param node_id: Node to start from.
+        :return: tuple or None: (list of node IDs ending at the amenity, distance), None if no amenity is reachable.
+        """
+
+        node = self.node_index[node_id]
+        distance = self.distances[category][node]
+        if distance == math.inf:
+            return None
+        next_hops = self.next_hops[category]
+        path = [node]
+        while next_hops[path[-1]] >= 0:
+            path.append(next_hops[path[-1]])
+        return [self.node_ids[index] for index in path], distance
+
+def build_amenity_fields(campus_graph, csr_graph=None):
+    """
+    Runs one multi-source Dijkstra per amenity category, from all its amenities at once.
+
+    Moves between non-obstacle nodes go both ways with the same weight, so searching outwards from
+    the amenities gives the distance towards them, and the search parent of a node is its next hop.
+    Obstacle nodes are never entered; they get the best of their allowed moves out afterwards.
+
+    :param campus_graph: The NetworkX campus graph (its graph.graph['graph_key'] is stored).
+    :param csr_graph: CSRGraph of campus_graph (built if not given).
+    :return: AmenityFields
+    """
+
+    csr_graph = csr_graph or CSRGraph.from_networkx(campus_graph)
+    node_count = len(csr_graph)
+    offsets, neighbors, weights, edge_allowed = csr_graph.offsets, csr_graph.neighbors, csr_graph.weights, csr_graph.edge_allowed
+    obstacle_code = csr_graph.category_names.index('obstacle') if 'obstacle' in csr_graph.category_names else None
+    obstacles = [node for node in range(node_count) if csr_graph.category_codes[node] == obstacle_code]
+
+    sources = {category: [] for category in AMENITY_KEYWORDS}
+    for node_id, node_data in campus_graph.nodes(data=True):
+        category = amenity_category(node_data)
+        if category is not None:
+            sources[category].append(csr_graph.node_index[node_id])
+
+    distances = {}
+    next_hops = {}
+    for category, category_sources in sources.items():
+        settled, came_from = csr_dijkstra(csr_graph, category_sources)
+        category_distances = array('d', [math.inf]) * node_count
+        category_next_hops = array('i', [-1]) * node_count
+        for node, distance in settled.items():
+            category_distances[node] = distance
+        for node, parent in came_from.items():
+            category_next_hops[node] = parent
+        for node in obstacles:
+            for edge in range(offsets[node], offsets[node + 1]):
+                if edge_allowed[edge]:
+                    distance = weights[edge] + category_distances[neighbors[edge]]
+                    if distance < category_distances[node]:
+                        category_distances[node] = distance
+                        category_next_hops[node] = neighbors[edge]
+        distances[category] = category_distances
+        next_hops[category] = category_next_hops
+
+    return AmenityFields(campus_graph.graph.get('graph_key'), list(csr_graph.node_ids), distances, next_hops)
+
+def search_nearest(csr_graph, amenity_fields, category, start_node_ids):
+    """
+    Finds the closest amenity of a category with a Dijkstra search on the current graph, for when
+    the stored route is no longer usable (e.g. it crosses a closed node).
+
+    :param csr_graph: CSRGraph of the campus graph the fields were computed on.
+    :param amenity_fields: AmenityFields of the graph (tells which nodes are amenities).
+    :param category: Amenity category (see AMENITY_KEYWORDS).
+    :param start_node_ids: Nodes to start from (all at distance 0).
+    :return: tuple or None: (list of node IDs ending at the amenity, distance), None if no amenity is reachable.
+    """
+
+    amenity_distances = amenity_fields.distances[category]
+    settled, came_from = csr_dijkstra(csr_graph, [csr_graph.node_index[node_id] for node_id in start_node_ids])
+    reached = [(distance, node) for node, distance in settled.items() if amenity_distances[node] == 0.0]
+    if not reached:
+        return None
+    distance, node = min(reached)
+    path = [node]
+    while path[-1] in came_from:
+        path.append(came_from[path[-1]])
+    path.reverse()
+    return [csr_graph.node_ids[index] for index in path], distance
+
+def save_amenity_fields(amenity_fields, amenity_fields_path=DEFAULT_AMENITY_FIELDS_PATH):
+    """
+    Writes the amenity fields next to the compiled graph.
+
+    :param amenity_fields: AmenityFields to save.
+    :param amenity_fields_path: Where to write them.
+    :return: str: The amenity fields path.
+    """
+
+    return save_precomputed({
+        'node_ids': amenity_fields.node_ids,
+        'distances': amenity_fields.distances,
+        'next_hops': amenity_fields.next_hops,
+    }, amenity_fields_path, AMENITY_FIELDS_FORMAT_VERSION, amenity_fields.graph_key)
+
+def load_amenity_fields(amenity_fields_path=DEFAULT_AMENITY_FIELDS_PATH, graph_key=None):
+    """
+    Loads saved amenity fields if they were computed on the graph with the given key.
+
+    :param amenity_fields_path: Path of the saved fields.
+    :param graph_key: Key of the current campus graph (graph.graph['graph_key']).
+    :return: AmenityFields or None if missing, unreadable, built from another graph or for other categories.
+    """
+
+    data = load_precomputed(amenity_fields_path, AMENITY_FIELDS_FORMAT_VERSION, graph_key, "amenity fields")
+    if data is None or set(data['distances']) != set(AMENITY_KEYWORDS):
+        return None
+    return AmenityFields(data['graph_key'], data['node_ids'], data['distances'], data['next_hops'])
+
+def _summary(amenity_fields):
+    """ :return: str: Short description of the amenity fields for the log. """
+    return f"amenity fields for {', '.join(amenity_fields.categories()) or 'no amenities'}"
+
+def load_or_build_amenity_fields(campus_graph, csr_graph=None, amenity_fields_path=DEFAULT_AMENITY_FIELDS_PATH):
+    """
+    Returns the saved amenity fields of this graph, computing and saving them if needed.
+
+    :param campus_graph: The NetworkX campus graph.
+    :param csr_graph: CSRGraph of campus_graph (built if not given).
+    :param amenity_fields_path: Where the fields are kept (None never reads or writes a file).
+    :return: AmenityFields
+    """
+
+    return load_or_build_precomputed(campus_graph, amenity_fields_path, load_amenity_fields,
+                                     lambda: build_amenity_fields(campus_graph, csr_graph), save_amenity_fields, _summary)
+
+def main(argv=None):
+    """ Batch job: python -m amenity_fields """
+    return precompute_main(argv, "Precompute nearest-amenity distance fields for the campus graph.", DEFAULT_AMENITY_FIELDS_PATH,
+                           lambda campus_graph, args: build_amenity_fields(campus_graph), save_amenity_fields, _summary)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,16 +1,40 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
 from flask_mysqldb import MySQL
 from flask_cors import CORS
 from datetime import datetime
 import os
+import json
+import gc
+import sqlite3
+import logging
+import threading
+import time
 import networkx as nx
-import traceback
+
+logger = logging.getLogger(__name__)
 
 # Import map parsing and A* functions
 try:
-    from map_parser import create_campus_graph
-    from a_star_pathfinding import find_node, pathfinding_algo
-    from navigation_utils import create_navigation
+    from map_parser import create_campus_graph, FLOOR_FILES
+    from graph_artifact import load_or_build_campus_graph, reload_changed_floors
+    from floor_loader import LazyFloorLoader, start_warm_up
+    from a_star_pathfinding import find_node, find_nodes, pathfinding_algo
+    from csr_graph import CSRGraph, csr_pathfinding_algo, csr_bidirectional_pathfinding_algo
+    from route_table import load_route_table
+    from navigation_utils import create_navigation, segment_path
+    from route_cache import RouteCache
+    from room_index import RoomIndex
+    from mapped_graph import load_or_build_mapped_graph
+    from landmarks import load_or_build_landmarks
+    from portal_graph import load_or_build_portal_graph, hierarchical_pathfinding_algo
+    from contraction_hierarchy import load_or_build_contraction_hierarchy, ch_pathfinding_algo
+    from amenity_fields import load_or_build_amenity_fields, search_nearest
+    from batch_routes import batch_shortest_paths
+    from reachability import reachable_nodes, reachable_rooms, reachable_areas, distance_cutoff
+    from path_simplification import PathSimplifier, format_path_segments
+    from routing_profiles import RoutingProfiles, DEFAULT_PROFILE, profile_version
+    from closures import GraphClosures, nodes_in_area, ROOM_STATUS_SOURCE, CLOSING_ROOM_STATUSES
+    from shared_changes import SharedChanges
 
     # Enable navigation functionality
     FUNCTIONS_LOADED = True
@@ -22,42 +46,361 @@ except ImportError as e:
 
     # Define dummy functions if import fails, so app can still run (partially)
     def create_campus_graph(directory="static", **kwargs): print("Dummy create_campus_graph called."); return None
-    def find_node(room_id, graph): print("Dummy find_node called."); return None
-    def pathfinding_algo(start, goal, graph): print("Dummy pathfinding_algo called."); return None
+    def load_or_build_campus_graph(directory="static", **kwargs): print("Dummy load_or_build_campus_graph called."); return None
+    def reload_changed_floors(campus_graph, directory="static", floors=(), **kwargs): print("Dummy reload_changed_floors called."); return campus_graph, []
+    FLOOR_FILES = []
+    LazyFloorLoader = None
+    def start_warm_up(loader, load_floors): print("Dummy start_warm_up called."); return None
+    def find_node(room_id, graph, room_index=None): print("Dummy find_node called."); return None
+    def find_nodes(room_id, graph, room_index=None): print("Dummy find_nodes called."); return []
+    def pathfinding_algo(start, goal, graph, **kwargs): print("Dummy pathfinding_algo called."); return None
+    def csr_pathfinding_algo(start, goal, graph, **kwargs): print("Dummy csr_pathfinding_algo called."); return None
+    def csr_bidirectional_pathfinding_algo(start, goal, graph, **kwargs): print("Dummy csr_bidirectional_pathfinding_algo called."); return None
+    def load_route_table(table_path=None, graph_key=None): print("Dummy load_route_table called."); return None
     def create_navigation(f_room, t_room): print("Dummy create_navigation called."); return "Navigation unavailable."
+    def segment_path(path_node_ids, graph): print("Dummy segment_path called."); return []
+    RouteCache = None
+    RoomIndex = None
+    def load_or_build_mapped_graph(campus_graph, csr_graph=None, **kwargs): print("Dummy load_or_build_mapped_graph called."); return None
+    def load_or_build_landmarks(campus_graph, csr_graph=None, **kwargs): print("Dummy load_or_build_landmarks called."); return None
+    def load_or_build_portal_graph(campus_graph, csr_graph=None, **kwargs): print("Dummy load_or_build_portal_graph called."); return None
+    def hierarchical_pathfinding_algo(start, goal, csr_graph, portal_graph, **kwargs): print("Dummy hierarchical_pathfinding_algo called."); return None
+    def load_or_build_contraction_hierarchy(campus_graph, csr_graph=None, **kwargs): print("Dummy load_or_build_contraction_hierarchy called."); return None
+    def ch_pathfinding_algo(start, goal, hierarchy, **kwargs): print("Dummy ch_pathfinding_algo called."); return None
+    def load_or_build_amenity_fields(campus_graph, csr_graph=None, **kwargs): print("Dummy load_or_build_amenity_fields called."); return None
+    def search_nearest(csr_graph, amenity_fields, category, start_node_ids): print("Dummy search_nearest called."); return None
+    def batch_shortest_paths(csr_graph, node_pairs): print("Dummy batch_shortest_paths called."); return iter(())
+    def reachable_nodes(csr_graph, start_node_ids, max_distance): print("Dummy reachable_nodes called."); return {}
+    def reachable_rooms(campus_graph, distances, exclude=()): print("Dummy reachable_rooms called."); return []
+    def reachable_areas(campus_graph, distances): print("Dummy reachable_areas called."); return {}
+    def distance_cutoff(max_distance=None, **kwargs): print("Dummy distance_cutoff called."); return 0.0
+    PathSimplifier = None
+    def format_path_segments(path_segments, simplifier=None, **kwargs): print("Dummy format_path_segments called."); return path_segments
+    RoutingProfiles = None
+    DEFAULT_PROFILE = 'default'
+    def profile_version(graph_version, profile): return graph_version
+    GraphClosures = None
+    def nodes_in_area(campus_graph, floor, x, y, width, height): print("Dummy nodes_in_area called."); return []
+    ROOM_STATUS_SOURCE = 'room_status'
+    CLOSING_ROOM_STATUSES = ('Repairing', 'Unavailable')
+    SharedChanges = None
+
+# Directory containing the floor SVG files
+MAP_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+# Which rect of a multi-rect room is used: 'first' (same node the old linear find_node returned)
+# or 'closest' (the start/goal rects closest to each other)
+ROOM_LOOKUP_MODE = 'first'
+# Pathfinding engine used by /api/navigate: 'csr', 'networkx', 'hierarchical' (portal graph for cross-floor routes)
+# or 'ch' (contraction hierarchy, stored with the compiled graph)
+PATHFINDING_ENGINE = 'csr'
+# Values of the optional 'search' field of /api/navigate: 'bidirectional' runs bidirectional A* on the CSR graph
+# (needs landmarks, without them the unidirectional search runs)
+SEARCH_MODES = ('unidirectional', 'bidirectional')
+# Number of processes parsing the floor SVGs on startup (None uses one per CPU)
+GRAPH_BUILD_WORKERS = None
+# Compiled campus graph, reused while the SVG files are unchanged (None always re-parses)
+GRAPH_ARTIFACT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiled", "campus_graph.bin")
+# Memory-mapped copy of the graph the request handlers read, shared by all worker processes (None keeps them on in-memory copies)
+MAPPED_GRAPH_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiled", "campus_graph.map")
+# Drop obstacle nodes and collapse straight corridors when building the graph (floor reloads then rebuild in full)
+GRAPH_COARSENING = False
+# Precomputed room-to-room routes (built with 'python -m route_table', ignored if built from another graph)
+ROUTE_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiled", "route_table.bin")
+# Number of ALT landmarks giving A* an admissible, floor-aware heuristic (0 keeps the Manhattan heuristic)
+LANDMARK_COUNT = 8
+LANDMARKS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiled", "landmarks.bin")
+# Same-floor distances between stairs/elevator portals, used by the 'hierarchical' engine
+PORTAL_GRAPH_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiled", "portal_graph.bin")
+# Distance and next-hop fields towards the closest toilet, elevator and stairs, used by /api/nearest_amenity
+AMENITY_FIELDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiled", "amenity_fields.bin")
+# Least-recently-used cache of /api/navigate results (0 disables it), optionally persisted to a SQLite file
+ROUTE_CACHE_SIZE = 1024
+ROUTE_CACHE_PATH = None
+ROUTE_CACHE = None
+# Largest number of (from, to) pairs accepted by one /api/navigate/batch request
+BATCH_MAX_PAIRS = 1000
+# How routes are returned (each can be overridden per request with 'simplify', 'coords_format' and 'include_node_ids'):
+# simplified by collinear-point removal and line-of-sight string pulling, as 'list', 'delta' or 'polyline' coordinates,
+# with or without the node IDs behind every point
+ROUTE_SIMPLIFY = True
+ROUTE_COORDS_FORMAT = 'list'
+ROUTE_INCLUDE_NODE_IDS = False
+# SVG units per metre, lets /api/reachable take 'metres' and 'seconds' cutoffs (None: only 'max_distance' in map units)
+MAP_UNITS_PER_METRE = None
+# Walking speed in metres per second, for 'seconds' cutoffs
+WALKING_SPEED = 1.4
+# Without a current compiled graph, build it floor by floor instead of parsing every floor before serving: the floor
+# index is scanned on startup, floors are parsed when a route needs them and the rest are loaded in the background,
+# WARM_FLOORS first (GET /api/ready reports the progress)
+LAZY_FLOOR_LOADING = False
+WARM_FLOORS = ('A', 'C')
+FLOOR_LOADER = None
+WARM_UP_THREAD = None
+# Seconds between checks of the floor SVG files for edits (None disables the watcher, POST /api/admin/reload_floors still works)
+FLOOR_WATCH_INTERVAL = None
+# Closures and floor reloads are shared by the workers of a pre-fork server through this SQLite file
+# (see shared_changes.py and create_app), None keeps them in the worker that received them
+SHARED_CHANGES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiled", "shared_changes.db")
+SHARED_CHANGES = None
+# Log level set up by create_app: INFO logs one summary line per route request, DEBUG adds the search and parsing details
+LOG_LEVEL = os.environ.get('CAMPUS_NAV_LOG_LEVEL', 'INFO')
+LOG_FORMAT = '%(asctime)s %(process)d %(levelname)s %(name)s: %(message)s'
+
+class GraphState:
+    """
+    The campus graph and everything derived from it, published as a whole through GRAPH_STATE.
+    Request handlers read GRAPH_STATE once and use that snapshot until they return, so a floor
+    reload swapping in a new state never shows them a half-built graph or a mix of two versions.
+    Attributes are None when the structure is unavailable (or disabled by the settings above).
+    """
 
-# Global variable to store the combined campus graph
-CAMPUS_GRAPH = None
+    def __init__(self, campus_graph=None):
+        self.campus_graph = campus_graph
+        # MappedGraph of the campus graph (MAPPED_GRAPH_PATH), also serving as room_index and csr_graph
+        self.mapped_graph = None
+        # Room name -> node index of the campus graph
+        self.room_index = None
+        # Integer-indexed CSR copy of the campus graph used by the 'csr' engine and all CSR searches
+        self.csr_graph = None
+        # Routing profiles selectable per request ('step_free', 'avoid_stairs', 'fastest', see routing_profiles.py)
+        self.profile_graphs = None
+        # Rooms and areas closed at runtime (/api/closures), applied in place to the graphs above
+        self.closures = None
+        self.landmarks = None
+        self.portal_graph = None
+        # Contraction hierarchy used by the 'ch' engine
+        self.contraction_hierarchy = None
+        self.amenity_fields = None
+        self.path_simplifier = None
+        self.route_table = None
+
+    def is_ready(self):
+        """ :return: bool: True if there is a non-empty campus graph to route on. """
+        return self.campus_graph is not None and self.campus_graph.number_of_nodes() > 0
+
+    def graph_key(self):
+        return self.campus_graph.graph.get('graph_key') if self.campus_graph is not None else None
+
+    def node_graph(self):
+        """ :return: Graph to read node attributes from while answering a request: the mapped graph if there is one. """
+        return self.mapped_graph if self.mapped_graph is not None else self.campus_graph
+
+# Current GraphState, replaced (never modified) when floors are reloaded
+GRAPH_STATE = GraphState()
+# Serialises floor reloads and closure changes, so neither is lost when the other swaps the state
+STATE_LOCK = threading.Lock()
+
+def build_graph_state(campus_graph, previous_state=None):
+    """
+    Builds every structure derived from a campus graph, loading the precomputed ones that match its key.
+
+    :param campus_graph: The NetworkX campus graph.
+    :param previous_state: GraphState being replaced, its closures are carried over.
+    :return: GraphState
+    """
+    state = GraphState(campus_graph)
+    if campus_graph is None or campus_graph.number_of_nodes() == 0:
+        logger.warning("Combined campus graph has 0 nodes. Check parsing.")
+        return state
+
+    logger.info("Total Nodes: %d, Total Edges: %d", campus_graph.number_of_nodes(), campus_graph.number_of_edges())
+    # Graphs still missing floors are short-lived: nothing is read from or written to the precomputed files for them
+    complete = not campus_graph.graph.get('pending_floors')
+    if complete and MAPPED_GRAPH_PATH:
+        state.mapped_graph = load_or_build_mapped_graph(campus_graph, mapped_graph_path=MAPPED_GRAPH_PATH)
+    if state.mapped_graph is not None:
+        state.room_index = state.mapped_graph.room_index
+        state.csr_graph = state.mapped_graph
+    else:
+        state.room_index = RoomIndex(campus_graph)
+        state.csr_graph = CSRGraph.from_networkx(campus_graph)
+    state.profile_graphs = RoutingProfiles(campus_graph, state.csr_graph)
+    state.closures = GraphClosures(campus_graph, state.csr_graph, state.profile_graphs.edge_masks())
+    if LANDMARK_COUNT > 0:
+        state.landmarks = load_or_build_landmarks(campus_graph, state.csr_graph, LANDMARKS_PATH if complete else None, LANDMARK_COUNT)
+    if PATHFINDING_ENGINE == 'hierarchical' and complete:
+        state.portal_graph = load_or_build_portal_graph(campus_graph, state.csr_graph, PORTAL_GRAPH_PATH)
+    if PATHFINDING_ENGINE == 'ch' and complete:
+        state.contraction_hierarchy = load_or_build_contraction_hierarchy(campus_graph, state.csr_graph, GRAPH_ARTIFACT_PATH)
+    state.amenity_fields = load_or_build_amenity_fields(campus_graph, state.csr_graph, AMENITY_FIELDS_PATH if complete else None)
+    # Closures are applied last: the structures above are saved under the plain graph key and must see every room open
+    if previous_state is not None and previous_state.closures is not None:
+        carried_over = state.closures.carry_over(previous_state.closures,
+                                                 lambda room_name: find_nodes(room_name, campus_graph, state.room_index))
+        logger.info("Carried over %d of %d closures.", carried_over, len(previous_state.closures.closures))
+    state.path_simplifier = PathSimplifier(state.node_graph())
+    state.route_table = load_route_table(ROUTE_TABLE_PATH, state.graph_key()) if complete else None
+    if state.route_table is not None:
+        logger.info("Loaded route table for %d rooms.", len(state.route_table.room_names))
+    return state
+
+def publish_graph_state(state):
+    """ Makes a GraphState the current one (a single reference assignment) and drops cached routes of other graphs. """
+    global GRAPH_STATE, ROUTE_CACHE
+    GRAPH_STATE = state
+    if ROUTE_CACHE_SIZE > 0 and state.is_ready():
+        if ROUTE_CACHE is None:
+            ROUTE_CACHE = RouteCache(ROUTE_CACHE_SIZE, ROUTE_CACHE_PATH)
+        ROUTE_CACHE.retain_version(state.graph_key())
 
 def initialize_graphs():
-    """ Parse all SVG maps and create a combined campus graph on startup """
-    global CAMPUS_GRAPH
+    """ Load the compiled campus graph, or parse all SVG maps and create it (floor by floor with LAZY_FLOOR_LOADING), on startup """
+    global FLOOR_LOADER, WARM_UP_THREAD
+    FLOOR_LOADER = None
     if not FUNCTIONS_LOADED:
-        print("Skipping graph initialization due to import errors.")
-        CAMPUS_GRAPH = None
+        logger.error("Skipping graph initialization due to import errors.")
+        publish_graph_state(GraphState())
         return
 
-    print("Initializing combined campus graph...")
+    logger.info("Initializing combined campus graph from %s...", MAP_DIRECTORY)
     try:
-        # Directory containing SVG files
-        base_dir = os.path.dirname(os.path.abspath(__file__)) if '__file__' in locals() else '.'
-        map_directory = os.path.join(base_dir, "static")
-        print(f"Looking for maps in: {map_directory}")
-
-        CAMPUS_GRAPH = create_campus_graph(directory=map_directory)
-
-        if CAMPUS_GRAPH is None or not isinstance(CAMPUS_GRAPH, nx.Graph):
-             print(f"ERROR: create_campus_graph failed to return a valid graph from '{map_directory}'.")
-             CAMPUS_GRAPH = None
-        elif len(CAMPUS_GRAPH.nodes) == 0:
-             print(f"Warning: Combined campus graph has 0 nodes. Check parsing.")
+
+        lazy = LAZY_FLOOR_LOADING and not GRAPH_COARSENING
+        campus_graph = load_or_build_campus_graph(directory=MAP_DIRECTORY, artifact_path=GRAPH_ARTIFACT_PATH,
+                                                  workers=GRAPH_BUILD_WORKERS, coarsen=GRAPH_COARSENING, build=not lazy)
+
+        if campus_graph is None and lazy:
+             FLOOR_LOADER = LazyFloorLoader(MAP_DIRECTORY, GRAPH_ARTIFACT_PATH, WARM_FLOORS).scan()
+             publish_graph_state(GraphState())
+             WARM_UP_THREAD = start_warm_up(FLOOR_LOADER, load_floors)
+             logger.info("Loading floors in the background, %s.", ', '.join(FLOOR_LOADER.warm_up_order()))
+        elif campus_graph is None or not isinstance(campus_graph, nx.Graph):
+             logger.error("load_or_build_campus_graph failed to return a valid graph from '%s'.", MAP_DIRECTORY)
+             publish_graph_state(GraphState())
         else:
-             print(f"Combined campus graph created successfully.")
-             print(f"Total Nodes: {CAMPUS_GRAPH.number_of_nodes()}, Total Edges: {CAMPUS_GRAPH.number_of_edges()}")
+             logger.info("Combined campus graph created successfully.")
+             publish_graph_state(build_graph_state(campus_graph))
     except Exception as e:
-        print(f"ERROR during graph initialization: {e}")
-        traceback.print_exc() # Print detailed traceback for debugging
-        CAMPUS_GRAPH = None
+        logger.exception("Graph initialization failed: %s", e)
+        publish_graph_state(GraphState())
+
+def load_floors(floors):
+    """
+    Adds floors to the graph FLOOR_LOADER is building and publishes the new state.
+
+    :param floors: Floor letters, floors already in the graph are skipped.
+    :return: list: Floor letters loaded.
+    """
+    with STATE_LOCK:
+        state = GRAPH_STATE
+        campus_graph, loaded_floors = FLOOR_LOADER.load_floors(state.campus_graph, floors)
+        if loaded_floors:
+            publish_graph_state(build_graph_state(campus_graph, previous_state=state))
+    return loaded_floors
+
+def state_with_floors(room_names=(), floors=()):
+    """
+    :param room_names: Rooms a request routes from or to.
+    :param floors: Other floors the request needs.
+    :return: GraphState: The current state, once the floors of the rooms (and the floors between them) are loaded.
+    """
+    state, loader = GRAPH_STATE, FLOOR_LOADER
+    if loader is None or state.is_ready() and not state.campus_graph.graph.get('pending_floors'):
+        return state
+    loaded_floors = state.campus_graph.graph.get('loaded_floors', []) if state.campus_graph is not None else []
+    missing_floors = [floor_letter for floor_letter in loader.floors_for_rooms(room_names) + list(floors)
+                      if floor_letter not in loaded_floors]
+    if missing_floors:
+        load_floors(missing_floors)
+        state = GRAPH_STATE
+    return state
+
+def reload_floors(floors=()):
+    """
+    Re-parses the floor SVGs edited since the current graph was built (plus the given floors), rebuilds the
+    derived structures off to the side and then publishes the new state. Requests already running keep the
+    state they started with.
+
+    :param floors: Floor letters to reload even if their file did not change.
+    :return: list: Reloaded floor letters (empty if nothing changed).
+    :raises ValueError: If a floor is unknown or cannot be parsed (the current state is kept).
+    """
+    if FLOOR_LOADER is not None and not FLOOR_LOADER.is_complete():
+        raise ValueError("Floors are still being loaded, reload them once GET /api/ready reports 'complete'.")
+    floors = list(floors)
+    def make_change():
+        reloaded_floors = reload_floors_locked(floors)
+        return reloaded_floors, {'floors': floors} if reloaded_floors else None
+    with STATE_LOCK:
+        return record_change('reload', make_change)
+
+def reload_floors_locked(floors):
+    """ reload_floors with STATE_LOCK held. """
+    global FLOOR_LOADER
+    state = GRAPH_STATE
+    if not state.is_ready() or GRAPH_COARSENING:
+        # Coarsened graphs (or a failed startup) can only be rebuilt in full
+        initialize_graphs()
+        return [floor_letter for floor_letter, _ in FLOOR_FILES]
+    campus_graph, reloaded_floors = reload_changed_floors(state.campus_graph, MAP_DIRECTORY, floors,
+                                                          artifact_path=GRAPH_ARTIFACT_PATH)
+    if reloaded_floors:
+        publish_graph_state(build_graph_state(campus_graph, previous_state=state))
+        FLOOR_LOADER = None # The graph FLOOR_LOADER built was replaced
+    return reloaded_floors
+
+def record_change(kind, make_change):
+    """
+    Makes a closure or floor change with STATE_LOCK held, recording it for the other workers when they share changes.
+
+    :param kind: Kind of change, see apply_shared_change.
+    :param make_change: Function () -> (result, data to record or None).
+    :return: The result of make_change.
+    """
+    if SHARED_CHANGES is None:
+        return make_change()[0]
+    return SHARED_CHANGES.record(kind, make_change, apply_shared_change)
+
+def apply_shared_change(kind, data):
+    """ Applies a change recorded by another worker (called with STATE_LOCK held). """
+    state = GRAPH_STATE
+    if kind == 'reload':
+        reload_floors_locked(data['floors'])
+        return
+    if state.closures is None:
+        return
+    closed, reopened = [], []
+    if kind == 'close':
+        reapplied = state.closures.reapply(data, lambda room_name: find_nodes(room_name, state.campus_graph, state.room_index))
+        closed = reapplied[1] if reapplied is not None else []
+    elif kind == 'reopen':
+        reopened = state.closures.reopen(data['id']) or []
+    elif kind == 'sync_rooms':
+        room_nodes = {room_name: find_nodes(room_name, state.campus_graph, state.room_index) for room_name in data['reasons']}
+        closed, reopened = state.closures.sync_rooms(data['source'], room_nodes, data['reasons'])
+    if ROUTE_CACHE is not None:
+        ROUTE_CACHE.drop_routes_through(closed)
+        if reopened:
+            ROUTE_CACHE.retain_version(route_version(state))
+
+def watch_floor_files(interval):
+    """ Polls the modification times of the floor SVG files and reloads the edited floors. Runs until the process exits. """
+    floor_paths = [os.path.join(MAP_DIRECTORY, floor_filename) for _, floor_filename in FLOOR_FILES]
+    def modification_times():
+        return [os.path.getmtime(path) if os.path.exists(path) else None for path in floor_paths]
+
+    last_seen = modification_times()
+    while True:
+        time.sleep(interval)
+        current = modification_times()
+        if current == last_seen:
+            continue
+        last_seen = current
+        try:
+            reloaded_floors = reload_floors()
+            if reloaded_floors:
+                logger.info("Floor watcher: reloaded floors %s.", ', '.join(reloaded_floors))
+        except Exception as e:
+            logger.exception("Floor watcher could not reload the edited floors: %s", e)
+
+def start_floor_watcher(interval=None):
+    """ :return: threading.Thread or None: The daemon thread running watch_floor_files, None if the interval is None. """
+    interval = FLOOR_WATCH_INTERVAL if interval is None else interval
+    if interval is None:
+        return None
+    watcher = threading.Thread(target=watch_floor_files, args=(interval,), name='floor-watcher', daemon=True)
+    watcher.start()
+    return watcher
 
 app = Flask(__name__)
 
@@ -71,6 +414,13 @@ app.config['MYSQL_DB'] = 'campus_database'
 
 mysql = MySQL(app)
 
+@app.before_request
+def apply_shared_changes():
+    """ Brings this worker up to date with the closures and floor reloads made by the other workers. """
+    if SHARED_CHANGES is not None and SHARED_CHANGES.has_pending():
+        with STATE_LOCK:
+            SHARED_CHANGES.apply_pending(apply_shared_change)
+
 @app.route("/")
 def index():
     cur = mysql.connection.cursor()
@@ -173,187 +523,650 @@ def get_rooms():
 
     return jsonify(rooms)
 
+class RequestTimer:
+    """
+    Times the stages of one request and logs them, with the fields describing the request, as a single
+    INFO line when it ends: "navigate status=200 from=A16 to=B27 ... lookup_ms=0.05 search_ms=3.12 total_ms=4.01".
+    """
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.fields = {}
+        self.stages = {}
+        self.started_at = self.stage_started_at = time.perf_counter()
+
+    def stage(self, name):
+        """ Ends the current stage (started when the previous one ended), repeated stages add up. """
+        now = time.perf_counter()
+        self.stages[name] = self.stages.get(name, 0.0) + (now - self.stage_started_at) * 1000
+        self.stage_started_at = now
+
+    @staticmethod
+    def _field(value):
+        # Room names can contain spaces, quote those (logfmt style)
+        if isinstance(value, str) and (not value or any(character in value for character in ' ="')):
+            return json.dumps(value)
+        return value
+
+    def log(self, status):
+        """ :param status: HTTP status code of the response. """
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        total_ms = (time.perf_counter() - self.started_at) * 1000
+        summary = dict(self.fields, status=status, total_ms=round(total_ms, 2),
+                       **{f"{name}_ms": round(duration, 2) for name, duration in self.stages.items()})
+        parts = [f"{name}={self._field(value)}" for name, value in self.fields.items()]
+        parts += [f"{name}_ms={duration:.2f}" for name, duration in self.stages.items()]
+        parts.append(f"total_ms={total_ms:.2f}")
+        logger.info("%s status=%s %s", self.endpoint, status, ' '.join(parts),
+                    extra={'request_summary': summary})
+
+def find_route_nodes(state, start_room_input, goal_room_input):
+    """ Returns the (start, goal) graph nodes of two rooms following ROOM_LOOKUP_MODE, None for rooms not found. """
+    if state.room_index is not None and ROOM_LOOKUP_MODE == 'closest':
+        return state.room_index.closest_candidates(start_room_input, goal_room_input, state.node_graph())
+    return find_node(start_room_input, state.node_graph(), state.room_index), find_node(goal_room_input, state.node_graph(), state.room_index)
+
+def _request_flag(value, default):
+    """ Reads a boolean request field given as JSON boolean or query string ('1', 'true', 'yes'). """
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+def route_formatter(options, state):
+    """
+    Reads the route format fields of a request ('simplify', 'coords_format', 'include_node_ids'),
+    falling back to the ROUTE_* settings.
+
+    :param options: Request JSON body or query arguments.
+    :param state: GraphState the routes are found on.
+    :return: function: path_segments -> segments ready for the response.
+    :raises ValueError: If the coordinate format is unknown.
+    """
+    simplifier = state.path_simplifier if _request_flag(options.get('simplify'), ROUTE_SIMPLIFY) else None
+    coords_format = options.get('coords_format') or ROUTE_COORDS_FORMAT
+    include_node_ids = _request_flag(options.get('include_node_ids'), ROUTE_INCLUDE_NODE_IDS)
+    format_path_segments([], coords_format=coords_format) # Rejects unknown formats before any work is done
+    return lambda path_segments: format_path_segments(path_segments, simplifier, coords_format, include_node_ids)
+
+def profile_graph(options, state):
+    """
+    Reads the 'profile' field of a request.
+
+    :param options: Request JSON body or query arguments.
+    :param state: GraphState the routes are found on.
+    :return: tuple: (profile name, CSRGraph of the profile or None for the default profile)
+    :raises ValueError: If the profile is unknown.
+    """
+    profile = options.get('profile') or DEFAULT_PROFILE
+    if profile == DEFAULT_PROFILE:
+        return profile, None
+    if state.profile_graphs is None:
+        raise ValueError("Routing profiles are not available.")
+    return profile, state.profile_graphs.graph(profile)
+
+def route_version(state, profile=DEFAULT_PROFILE):
+    """ :return: Route cache version of routes found now with a profile (graph key, closure version and profile). """
+    graph_version = state.graph_key()
+    if state.closures is not None:
+        graph_version = state.closures.route_version(graph_version)
+    return profile_version(graph_version, profile)
+
+def closed_message(state, node_id, room_name):
+    """ :return: str or None: Message for a route to or from a closed room, None if it is open. """
+    closure = state.closures.closure_of(node_id) if state.closures is not None else None
+    if closure is None:
+        return None
+    return f"'{room_name}' is closed" + (f": {closure['reason']}" if closure['reason'] else ".")
+
 @app.route('/api/navigate', methods=['POST'])
 def handle_navigation():
     """ Handles navigation requests, performs A* search, and returns segmented path. """
-    print(f"\n--- Received Navigation Request ---")
+    timer = RequestTimer('navigate')
+    response = navigate(timer)
+    timer.log(response[1])
+    return response
+
+def navigate(timer):
+    """
+    Answers the navigation request being handled.
+
+    :param timer: RequestTimer of the request, receives the stage timings and the outcome.
+    :return: tuple: (JSON response, HTTP status code)
+    """
     response = None
 
     try:
         if not FUNCTIONS_LOADED:
-             print("Error: Core navigation functions failed to load on startup.")
+             logger.error("Core navigation functions failed to load on startup.")
              return jsonify({"status": "error", "message": "Navigation system core functions are unavailable."}), 503
-        if CAMPUS_GRAPH is None or not isinstance(CAMPUS_GRAPH, nx.Graph) or CAMPUS_GRAPH.number_of_nodes() == 0:
-             print("Error: Campus graph is not initialized or is empty.")
-             return jsonify({"status": "error", "message": "Navigation map data is not available or incomplete."}), 503
 
         data = request.get_json()
         if not data:
-            print("Error: Invalid request - Missing JSON body.")
+            logger.debug("Invalid request, missing JSON body.")
             return jsonify({"status": "error", "message": "Invalid request body (missing JSON)."}), 400
 
         start_room_input = data.get('from')
         goal_room_input = data.get('to')
+        timer.fields.update({"from": start_room_input, "to": goal_room_input})
 
         if not start_room_input or not goal_room_input:
-            print(f"Error: Missing 'from' [{start_room_input}] or 'to' [{goal_room_input}] in request.")
+            logger.debug("Missing 'from' [%s] or 'to' [%s] in request.", start_room_input, goal_room_input)
             return jsonify({"status": "error", "message": "Missing 'from' or 'to' room name in request."}), 400
 
-        print(f"Attempting navigation From: '{start_room_input}' To: '{goal_room_input}'")
+        state = state_with_floors([start_room_input, goal_room_input])
+        timer.stage('floors')
+        if not state.is_ready():
+             logger.warning("Campus graph is not initialized or is empty.")
+             return jsonify({"status": "error", "message": "Navigation map data is not available or incomplete."}), 503
+
+        search_mode = data.get('search', 'unidirectional')
+        if search_mode not in SEARCH_MODES:
+            logger.debug("Unknown search mode '%s'.", search_mode)
+            return jsonify({"status": "error", "message": f"Unknown search mode '{search_mode}', use one of {', '.join(SEARCH_MODES)}."}), 400
+        if search_mode == 'bidirectional' and state.landmarks is None:
+            # The Manhattan potentials are not consistent across stairs and elevators, bidirectional A* needs landmarks
+            search_mode = 'unidirectional'
+        try:
+            format_route = route_formatter(data, state)
+            profile, profile_csr = profile_graph(data, state)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        timer.fields["profile"] = profile
+
+        # Answer repeated (or reversed) queries from the route cache
+        graph_version = route_version(state, profile)
+        if ROUTE_CACHE is not None:
+            cached_route = ROUTE_CACHE.get(start_room_input, goal_room_input, graph_version, state.node_graph())
+            timer.stage('cache')
+            if cached_route is not None:
+                timer.fields["outcome"] = "cache_hit"
+                nav_message = f"Please follow the path from {start_room_input} to {goal_room_input}."
+                response = jsonify({
+                    "status": "success", "message": nav_message, "path_segments": format_route(cached_route['path_segments'])
+                }), 200
+                timer.stage('format')
+                return response
 
         # Find Nodes in Graph
-        start_node_id = find_node(start_room_input, CAMPUS_GRAPH)
-        goal_node_id = find_node(goal_room_input, CAMPUS_GRAPH)
+        start_node_id, goal_node_id = find_route_nodes(state, start_room_input, goal_room_input)
+        timer.stage('lookup')
 
         # Validate if nodes were found
-        if start_node_id is None:
-            msg = f"Start location '{start_room_input}' not found as a navigable node in the graph."
-            print(f"Error: {msg}")
-            return jsonify({"status": "error", "message": msg}), 404
-        if goal_node_id is None:
-            msg = f"Goal location '{goal_room_input}' not found as a navigable node in the graph."
-            print(f"Error: {msg}")
+        if start_node_id is None or goal_node_id is None:
+            timer.fields["outcome"] = "not_found"
+            location = 'Start' if start_node_id is None else 'Goal'
+            room_input = start_room_input if start_node_id is None else goal_room_input
+            msg = f"{location} location '{room_input}' not found as a navigable node in the graph."
             return jsonify({"status": "error", "message": msg}), 404
 
-        print(f"Graph nodes identified: Start='{start_node_id}', Goal='{goal_node_id}'")
+        logger.debug("Graph nodes identified: start '%s', goal '%s'.", start_node_id, goal_node_id)
+        msg = closed_message(state, goal_node_id, goal_room_input)
+        if msg is not None:
+            timer.fields["outcome"] = "closed"
+            return jsonify({"status": "error", "message": msg, "path_segments": []}), 404
 
-        # --- Run A* Pathfinding ---
+        # --- Run A* Pathfinding (or read the precomputed route) ---
         path_node_ids = None
-        print("Running A* pathfinding algorithm...")
-        path_node_ids = pathfinding_algo(start_node_id, goal_node_id, CAMPUS_GRAPH)
+        # The table keeps the first node of each room, answer from it only when the lookup found the same nodes
+        # (ROOM_LOOKUP_MODE 'closest' and svg_id matches can pick others)
+        if profile_csr is None and state.route_table is not None \
+                and state.route_table.room_node_id(start_room_input) == start_node_id \
+                and state.route_table.room_node_id(goal_room_input) == goal_node_id:
+            timer.fields["engine"] = "route_table"
+            path_node_ids = state.route_table.route(start_room_input, goal_room_input)
+        elif profile_csr is not None:
+            # Route table, portals and hierarchy only hold default routes; profiles only add costs,
+            # so the landmark bounds of the default graph still hold
+            timer.fields["engine"] = f"csr_{search_mode}"
+            if search_mode == 'bidirectional':
+                path_node_ids = csr_bidirectional_pathfinding_algo(start_node_id, goal_node_id, profile_csr, landmarks=state.landmarks)
+            else:
+                path_node_ids = csr_pathfinding_algo(start_node_id, goal_node_id, profile_csr, landmarks=state.landmarks)
+        elif search_mode == 'bidirectional' and state.csr_graph is not None:
+            timer.fields["engine"] = "csr_bidirectional"
+            path_node_ids = csr_bidirectional_pathfinding_algo(start_node_id, goal_node_id, state.csr_graph, landmarks=state.landmarks)
+        elif PATHFINDING_ENGINE == 'hierarchical' and state.portal_graph is not None:
+            timer.fields["engine"] = PATHFINDING_ENGINE
+            path_node_ids = hierarchical_pathfinding_algo(start_node_id, goal_node_id, state.csr_graph, state.portal_graph,
+                                                          landmarks=state.landmarks)
+        elif PATHFINDING_ENGINE == 'ch' and state.contraction_hierarchy is not None:
+            timer.fields["engine"] = PATHFINDING_ENGINE
+            path_node_ids = ch_pathfinding_algo(start_node_id, goal_node_id, state.contraction_hierarchy)
+        elif PATHFINDING_ENGINE == 'csr' and state.csr_graph is not None:
+            timer.fields["engine"] = PATHFINDING_ENGINE
+            path_node_ids = csr_pathfinding_algo(start_node_id, goal_node_id, state.csr_graph, landmarks=state.landmarks)
+        else:
+            timer.fields["engine"] = PATHFINDING_ENGINE
+            path_node_ids = pathfinding_algo(start_node_id, goal_node_id, state.campus_graph, landmarks=state.landmarks)
+
+        # Precomputed routes stay shortest unless they cross a closure, search the open graph for those
+        if path_node_ids and state.closures is not None and state.csr_graph is not None and state.closures.blocks(path_node_ids):
+            logger.debug("Precomputed route crosses a closed node, searching the open graph.")
+            timer.fields["engine"] += "+csr"
+            path_node_ids = csr_pathfinding_algo(start_node_id, goal_node_id, profile_csr or state.csr_graph, landmarks=state.landmarks)
+        timer.stage('search')
 
         # Process Path or Handle No Path
         if path_node_ids:
-            print(f"A* Path found with {len(path_node_ids)} nodes. Starting segmentation...")
+            timer.fields.update({"outcome": "found", "nodes": len(path_node_ids)})
             # Segmentation Logic
             try:
-                path_segments = [] # Empty list to store path segments
-
-                # Handle the edge case where the path contains only one node (start is the same as goal)
-                if len(path_node_ids) == 1:
-                     node_id = path_node_ids[0]
-                     # Ensure the node exists in the graph before accessing its data
-                     if node_id not in CAMPUS_GRAPH.nodes: raise KeyError(f"Node '{node_id}' not found")
-                     node_data = CAMPUS_GRAPH.nodes[node_id]
-                     # Create a single segment containing just the start/goal node
-                     path_segments.append({
-                        "floor": node_data.get('floor', 'Unknown'),
-                        "coords": [[node_data.get('center_x', 0.0), node_data.get('center_y', 0.0)]],
-                        "node_ids": [node_id], "end_node_type": node_data.get('type', 'Unknown'), "end_node_id": node_id
-                     })
-                # Handle paths with multiple nodes
-                else:
-                    # Get data for the very first node in the path
-                    first_node_id = path_node_ids[0]
-                    if first_node_id not in CAMPUS_GRAPH.nodes: raise KeyError(f"Node '{first_node_id}' not found")
-                    first_node_data = CAMPUS_GRAPH.nodes[first_node_id]
-                    # Determine the starting floor and coordinates
-                    start_floor = first_node_data.get('floor', 'Unknown')
-                    start_coords = [first_node_data.get('center_x', 0.0), first_node_data.get('center_y', 0.0)]
-
-                    # Initialize the first segment dictionary with the starting node's data
-                    # 'end_node_type' and 'end_node_id' will be filled when the segment ends
-                    current_segment = {
-                        "floor": start_floor, "coords": [start_coords], "node_ids": [first_node_id],
-                        "end_node_type": None, "end_node_id": None
-                    }
-                    # Keep track of the floor of the previous node to detect changes
-                    last_floor = start_floor
-
-                    # Iterate through the path nodes, starting from the second node (index 1)
-                    for i in range(1, len(path_node_ids)):
-                        node_id = path_node_ids[i]
-                        # Ensure the current node exists in the graph
-                        if node_id not in CAMPUS_GRAPH.nodes: raise KeyError(f"Node '{node_id}' not found")
-                        node_data = CAMPUS_GRAPH.nodes[node_id]
-                        # Get the floor and coordinates of the current node
-                        current_floor = node_data.get('floor', last_floor)
-                        coords = [node_data.get('center_x', 0.0), node_data.get('center_y', 0.0)]
-
-                        # --- Core Segmentation Logic: Check if the floor has changed ---
-                        if current_floor != last_floor:
-                            # Floor has changed, so the previous segment is complete
-                            if current_segment["coords"]: # Make sure the segment isn't empty
-                                # The node *before* the current one (i-1) is the last node of the previous segment
-                                # This node represents the transition point (e.g., stairs/elevator)
-                                last_node_id_in_segment = path_node_ids[i - 1]
-                                if last_node_id_in_segment not in CAMPUS_GRAPH.nodes: raise KeyError(f"Node '{last_node_id_in_segment}' not found")
-                                last_node_data_in_segment = CAMPUS_GRAPH.nodes[last_node_id_in_segment]
-                                transition_node_type = last_node_data_in_segment.get('type', 'Unknown')
-
-                                # Store the transition node's type and ID in the completed segment
-                                current_segment["end_node_type"] = transition_node_type
-                                current_segment["end_node_id"] = last_node_id_in_segment
-
-                                # Add the completed segment to the list of segments
-                                path_segments.append(current_segment)
-
-                            # Start a new segment for the new floor, beginning with the current node
-                            current_segment = {
-                                "floor": current_floor, "coords": [coords], "node_ids": [node_id],
-                                "end_node_type": None, "end_node_id": None
-                            }
-                        else:
-                            # Floor has not changed, add the current node's data to the ongoing segment
-                            current_segment["coords"].append(coords)
-                            current_segment["node_ids"].append(node_id)
-
-                        # Update last_floor for the next iteration
-                        last_floor = current_floor
-
-                    # After the loop finishes, the 'current_segment' holds the last segment of the path
-                    if current_segment["coords"]:
-                        # The very last node in the original path list is the end of this final segment
-                        last_node_id_in_path = path_node_ids[-1]
-                        if last_node_id_in_path not in CAMPUS_GRAPH.nodes: raise KeyError(f"Node '{last_node_id_in_path}' not found")
-                        last_node_data_in_path = CAMPUS_GRAPH.nodes[last_node_id_in_path]
-                        # Get the type of the final destination node
-                        final_node_type = last_node_data_in_path.get('type', 'Unknown')
-                        # Set the end node details for the final segment
-                        current_segment["end_node_type"] = final_node_type
-                        current_segment["end_node_id"] = last_node_id_in_path
-
-                        # Add the final segment to the list
-                        path_segments.append(current_segment)
-                # End Segmentation
-
-                print(f"Path successfully segmented into {len(path_segments)} segments.")
+                path_segments = segment_path(path_node_ids, state.node_graph())
+                timer.fields["segments"] = len(path_segments)
+                # Cached routes also answer the reversed query, which must not enter a closed start room
+                if ROUTE_CACHE is not None and not (state.closures is not None and state.closures.blocks(path_node_ids[::-1])):
+                    ROUTE_CACHE.put(start_room_input, goal_room_input, graph_version, path_node_ids, path_segments)
+                timer.stage('segment')
                 nav_message = f"Please follow the path from {start_room_input} to {goal_room_input}."
                 response = jsonify({
-                    "status": "success", "message": nav_message, "path_segments": path_segments
+                    "status": "success", "message": nav_message, "path_segments": format_route(path_segments)
                 }), 200
+                timer.stage('format')
 
             except KeyError as e:
-                print(f"CRITICAL ERROR during path segmentation: KeyError - Node {e} not found in graph or missing attribute.")
-                traceback.print_exc()
+                logger.exception("Path segmentation failed, node %s is not in the graph or is missing an attribute.", e)
                 response = jsonify({"status": "error", "message": f"Error processing path data: A required location ({e}) was not found in the map data."}), 500
-            except Exception as e:
-                print(f"CRITICAL ERROR during path segmentation: {e}")
-                traceback.print_exc()
+            except Exception:
+                logger.exception("Path segmentation failed.")
                 response = jsonify({"status": "error", "message": "An internal server error occurred while processing the navigation path."}), 500
 
         else: # path_node_ids is None or empty (No path found)
-            print("No path found between start and goal nodes (A* returned None or empty list).")
             if start_node_id == goal_node_id:
+                 timer.fields["outcome"] = "same_room"
                  msg = f"You are already at '{start_room_input}'."
                  response = jsonify({"status": "success", "message": msg, "path_segments": []}), 200
             else:
+                timer.fields["outcome"] = "no_path"
                 msg = f"Sorry, no navigable path could be found between '{start_room_input}' and '{goal_room_input}'. The locations might be disconnected on the map."
                 response = jsonify({"status": "error","message": msg,"path_segments": []}), 404
 
-    except Exception as e:
-        print(f"CRITICAL UNHANDLED ERROR in handle_navigation: {e}")
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Unhandled error in handle_navigation.")
         response = jsonify({"status": "error", "message": "An unexpected internal server error occurred."}), 500
 
     # Final Return
     # Ensure response is not None before returning
     if response is None:
-        print("!!! LOGIC ERROR: handle_navigation reached end without setting a response !!!")
+        logger.error("handle_navigation reached the end without setting a response.")
         response = jsonify({"status": "error", "message": "Internal server error: Failed to generate response."}), 500
 
     return response
 
+@app.route('/api/navigate/batch', methods=['POST'])
+def handle_batch_navigation():
+    """
+    Routes a list of (from, to) pairs in one request: {"pairs": [{"from": "A16", "to": "B27"}, ...]}
+    (or [["A16", "B27"], ...]). Pairs are grouped by start node and each start gets one Dijkstra search.
+    The response streams one JSON line per pair (application/x-ndjson) as the searches complete,
+    each carrying the pair's "index" in the request. An optional "profile" applies to every pair.
+    """
+    timer = RequestTimer('navigate_batch')
+    response = navigate_batch(timer)
+    if isinstance(response, tuple):
+        timer.log(response[1]) # Streamed responses log their summary once the last route is written
+    return response
+
+def navigate_batch(timer):
+    """
+    Answers the batch navigation request being handled.
+
+    :param timer: RequestTimer of the request, receives the stage timings and route counts.
+    :return: Response streaming the routes, or a (JSON response, HTTP status code) tuple for invalid requests.
+    """
+    if not FUNCTIONS_LOADED:
+        return jsonify({"status": "error", "message": "Navigation map data is not available or incomplete."}), 503
+
+    data = request.get_json(silent=True)
+    pairs = data.get('pairs') if isinstance(data, dict) else None
+    if not isinstance(pairs, list) or not pairs:
+        return jsonify({"status": "error", "message": "Request body needs a non-empty 'pairs' list."}), 400
+    if len(pairs) > BATCH_MAX_PAIRS:
+        return jsonify({"status": "error", "message": f"At most {BATCH_MAX_PAIRS} pairs per request."}), 400
+
+    room_pairs = []
+    for position, pair in enumerate(pairs):
+        if isinstance(pair, dict):
+            start_room_input, goal_room_input = pair.get('from'), pair.get('to')
+        elif isinstance(pair, list) and len(pair) == 2:
+            start_room_input, goal_room_input = pair
+        else:
+            start_room_input = goal_room_input = None
+        if not start_room_input or not goal_room_input:
+            return jsonify({"status": "error", "message": f"Pair {position} needs a 'from' and a 'to' room name."}), 400
+        room_pairs.append((start_room_input, goal_room_input))
+    timer.fields["pairs"] = len(room_pairs)
+    state = state_with_floors([room_name for room_pair in room_pairs for room_name in room_pair])
+    timer.stage('floors')
+    if not state.is_ready() or state.csr_graph is None:
+        return jsonify({"status": "error", "message": "Navigation map data is not available or incomplete."}), 503
+    try:
+        format_route = route_formatter(data, state)
+        profile, profile_csr = profile_graph(data, state)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    timer.fields["profile"] = profile
+
+    # The response is produced after this function returns, keep using the graphs of this request
+    node_graph, route_cache, closures = state.node_graph(), ROUTE_CACHE, state.closures
+    csr_graph = profile_csr if profile_csr is not None else state.csr_graph
+    graph_version = route_version(state, profile)
+
+    def route_line(position, path_segments=None, message=None):
+        start_room_input, goal_room_input = room_pairs[position]
+        result = {"index": position, "from": start_room_input, "to": goal_room_input}
+        if message is None:
+            result.update({"status": "success", "path_segments": format_route(path_segments)})
+        else:
+            result.update({"status": "error", "message": message})
+        return json.dumps(result) + "\n"
+
+    def generate_routes():
+        # Time spent writing lines (between a yield and the next lookup) is the 'write' stage
+        outcomes = dict.fromkeys(("found", "cache_hit", "not_found", "no_path", "error"), 0)
+        try:
+            # Cached routes and unknown rooms are answered first, the rest is searched per start node
+            node_pairs = []
+            pair_positions = []
+            for position, (start_room_input, goal_room_input) in enumerate(room_pairs):
+                if route_cache is not None:
+                    cached_route = route_cache.get(start_room_input, goal_room_input, graph_version, node_graph)
+                    timer.stage('cache')
+                    if cached_route is not None:
+                        outcomes["cache_hit"] += 1
+                        line = route_line(position, cached_route['path_segments'])
+                        timer.stage('format')
+                        yield line
+                        timer.stage('write')
+                        continue
+                start_node_id, goal_node_id = find_route_nodes(state, start_room_input, goal_room_input)
+                timer.stage('lookup')
+                if start_node_id is None or goal_node_id is None:
+                    outcomes["not_found"] += 1
+                    missing_room = start_room_input if start_node_id is None else goal_room_input
+                    yield route_line(position, message=f"Location '{missing_room}' not found as a navigable node in the graph.")
+                    timer.stage('write')
+                    continue
+                node_pairs.append((start_node_id, goal_node_id))
+                pair_positions.append(position)
+
+            for batch_position, path_node_ids in batch_shortest_paths(csr_graph, node_pairs):
+                timer.stage('search')
+                position = pair_positions[batch_position]
+                start_room_input, goal_room_input = room_pairs[position]
+                if not path_node_ids:
+                    outcomes["no_path"] += 1
+                    yield route_line(position, message=f"No path found between {start_room_input} and {goal_room_input}.")
+                    timer.stage('write')
+                    continue
+                try:
+                    path_segments = segment_path(path_node_ids, node_graph)
+                except KeyError as e:
+                    logger.exception("Node ID %s not found in graph during segmentation.", e)
+                    outcomes["error"] += 1
+                    yield route_line(position, message="Internal error: Path node data inconsistent.")
+                    timer.stage('write')
+                    continue
+                if route_cache is not None and not (closures is not None and closures.blocks(path_node_ids[::-1])):
+                    route_cache.put(start_room_input, goal_room_input, graph_version, path_node_ids, path_segments)
+                timer.stage('segment')
+                outcomes["found"] += 1
+                line = route_line(position, path_segments)
+                timer.stage('format')
+                yield line
+                timer.stage('write')
+        finally:
+            timer.fields.update(outcomes)
+            timer.log(200)
+
+    return Response(stream_with_context(generate_routes()), mimetype='application/x-ndjson')
+
+@app.route('/api/reachable', methods=['GET'])
+def get_reachable_rooms():
+    """
+    Lists the rooms reachable from a room within a cutoff ('max_distance' in map units, or 'metres'
+    or 'seconds' once MAP_UNITS_PER_METRE is set), closest first. With outlines=true the reached
+    area of every floor is returned too, as merged rects for the map overlay.
+    """
+    state = state_with_floors([request.args.get('from')])
+    if not FUNCTIONS_LOADED or not state.is_ready() or state.csr_graph is None:
+        return jsonify({"status": "error", "message": "Navigation map data is not available or incomplete."}), 503
+
+    start_room_input = request.args.get('from')
+    if not start_room_input:
+        return jsonify({"status": "error", "message": "Missing 'from' room name in request."}), 400
+    try:
+        cutoff = distance_cutoff(request.args.get('max_distance'), request.args.get('metres'), request.args.get('seconds'),
+                                 MAP_UNITS_PER_METRE, WALKING_SPEED)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    start_node_ids = state.room_index.candidates(start_room_input) if state.room_index is not None else ()
+    if not start_node_ids:
+        start_node_id = find_node(start_room_input, state.node_graph(), state.room_index)
+        start_node_ids = (start_node_id,) if start_node_id is not None else ()
+    if not start_node_ids:
+        return jsonify({"status": "error", "message": f"Start location '{start_room_input}' not found as a navigable node in the graph."}), 404
+
+    distances = reachable_nodes(state.csr_graph, start_node_ids, cutoff)
+    result = {
+        "status": "success",
+        "from": start_room_input,
+        "max_distance": cutoff,
+        "rooms": reachable_rooms(state.node_graph(), distances, exclude=[start_room_input]),
+    }
+    if request.args.get('outlines', '').lower() in ('1', 'true', 'yes'):
+        result["areas"] = reachable_areas(state.node_graph(), distances)
+    return jsonify(result), 200
+
+@app.route('/api/closures', methods=['GET'])
+def get_closures():
+    """ Lists the rooms and areas closed at runtime. """
+    state = GRAPH_STATE
+    if state.closures is None:
+        return jsonify({"status": "error", "message": "Navigation map data is not available or incomplete."}), 503
+    return jsonify({"status": "success", "version": state.closures.version, "closures": state.closures.list()}), 200
+
+def is_area(area):
+    """ :return: bool: True if a request value is a closure area {"floor": "A", "x": 0, "y": 0, "width": 50, "height": 20}. """
+    return isinstance(area, dict) and isinstance(area.get('floor'), str) and all(
+        isinstance(area.get(key), (int, float)) and not isinstance(area.get(key), bool) for key in ('x', 'y', 'width', 'height'))
+
+@app.route('/api/closures', methods=['POST'])
+def create_closure():
+    """
+    Closes rooms and/or areas for routing until the closure is deleted:
+    {"rooms": ["A16"], "areas": [{"floor": "A", "x": 0, "y": 0, "width": 50, "height": 20}], "reason": "Cleaning"}.
+    Only the edges into the closed nodes change, and only cached routes through them are dropped.
+    """
+    if GRAPH_STATE.closures is None:
+        return jsonify({"status": "error", "message": "Navigation map data is not available or incomplete."}), 503
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not (data.get('rooms') or data.get('areas')):
+        return jsonify({"status": "error", "message": "Request body needs a 'rooms' and/or 'areas' list."}), 400
+    rooms, requested_areas = data.get('rooms') or [], data.get('areas') or []
+    if not isinstance(rooms, list) or not all(isinstance(room_name, str) for room_name in rooms):
+        return jsonify({"status": "error", "message": "'rooms' must be a list of room names."}), 400
+    if not isinstance(requested_areas, list) or not all(is_area(area) for area in requested_areas):
+        return jsonify({"status": "error", "message": "'areas' must be a list of objects with a 'floor' and numeric 'x', 'y', 'width' and 'height'."}), 400
+
+    state_with_floors(rooms, [area['floor'] for area in requested_areas])
+    def make_change():
+        # Read under the lock: changes of other workers replayed by record_change may have replaced the state
+        state = GRAPH_STATE
+        node_ids = []
+        for room_name in rooms:
+            room_node_ids = find_nodes(room_name, state.campus_graph, state.room_index)
+            if not room_node_ids:
+                return (jsonify({"status": "error", "message": f"Room '{room_name}' not found in the graph."}), 404), None
+            node_ids.extend(room_node_ids)
+        areas = []
+        for area in requested_areas:
+            area_node_ids = nodes_in_area(state.campus_graph, area['floor'], float(area['x']), float(area['y']),
+                                          float(area['width']), float(area['height']))
+            if not area_node_ids:
+                return (jsonify({"status": "error", "message": f"No walkable space in area {area} on the map."}), 400), None
+            node_ids.extend(area_node_ids)
+            areas.append({"floor": area['floor'], "x": float(area['x']), "y": float(area['y']),
+                          "width": float(area['width']), "height": float(area['height'])})
+
+        closure, newly_closed = state.closures.close(node_ids, data.get('reason') or '', rooms=rooms, areas=areas)
+        dropped = ROUTE_CACHE.drop_routes_through(newly_closed) if ROUTE_CACHE is not None else 0
+        logger.info("Closure %s: closed %d nodes, dropped %d cached routes.", closure['id'], len(newly_closed), dropped)
+        return (jsonify({"status": "success", "closure": closure}), 201), closure
+
+    # A floor reload carries the closures over, hold it off until this one is in place
+    with STATE_LOCK:
+        return record_change('close', make_change)
+
+@app.route('/api/closures/<int:closure_id>', methods=['DELETE'])
+def delete_closure(closure_id):
+    """ Reopens a closure. Reopened nodes can make any route shorter, so cached routes are started over. """
+    def make_change():
+        reopened = GRAPH_STATE.closures.reopen(closure_id)
+        return reopened, {'id': closure_id} if reopened is not None else None
+
+    with STATE_LOCK:
+        if GRAPH_STATE.closures is None:
+            return jsonify({"status": "error", "message": "Navigation map data is not available or incomplete."}), 503
+        reopened = record_change('reopen', make_change)
+        state = GRAPH_STATE
+    if reopened is None:
+        return jsonify({"status": "error", "message": f"No closure {closure_id}."}), 404
+    if reopened and ROUTE_CACHE is not None:
+        ROUTE_CACHE.retain_version(route_version(state))
+    logger.info("Closure %s removed: reopened %d nodes.", closure_id, len(reopened))
+    return jsonify({"status": "success", "reopened": len(reopened), "version": state.closures.version}), 200
+
+@app.route('/api/closures/sync_room_status', methods=['POST'])
+def sync_room_status_closures():
+    """ Closes the rooms whose current class schedule status is 'Repairing' or 'Unavailable', and reopens the others. """
+    if GRAPH_STATE.closures is None:
+        return jsonify({"status": "error", "message": "Navigation map data is not available or incomplete."}), 503
+    try:
+        cur = mysql.connection.cursor()
+        cur.execute("""
+            SELECT DISTINCT r.room_name, cs.status FROM class_schedule_info cs
+            JOIN room_info r ON cs.room_id = r.room_id
+            WHERE cs.status IN (%s, %s) AND cs.start_date_time <= NOW() AND cs.end_date_time > NOW()
+        """, CLOSING_ROOM_STATUSES)
+        rows = cur.fetchall()
+        cur.close()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    reasons = {room_name: status for room_name, status in rows}
+    def make_change():
+        state = GRAPH_STATE
+        room_nodes = {room_name: find_nodes(room_name, state.campus_graph, state.room_index) for room_name in reasons}
+        return (state, room_nodes, state.closures.sync_rooms(ROOM_STATUS_SOURCE, room_nodes, reasons)), \
+               {'source': ROOM_STATUS_SOURCE, 'reasons': reasons}
+
+    with STATE_LOCK:
+        state, room_nodes, (closed, reopened) = record_change('sync_rooms', make_change)
+    if ROUTE_CACHE is not None:
+        ROUTE_CACHE.drop_routes_through(closed)
+        if reopened:
+            ROUTE_CACHE.retain_version(route_version(state))
+    return jsonify({"status": "success", "closed_rooms": sorted(room_name for room_name, node_ids in room_nodes.items() if node_ids),
+                    "closed": len(closed), "reopened": len(reopened)}), 200
+
+@app.route('/api/admin/reload_floors', methods=['POST'])
+def handle_reload_floors():
+    """
+    Reloads the floor SVGs edited since the graph was built, optionally forcing some floors: {"floors": ["C"]}.
+    Routes are served from the old graph until the new one is ready.
+    """
+    if not FUNCTIONS_LOADED:
+        return jsonify({"status": "error", "message": "Navigation system core functions are unavailable."}), 503
+    data = request.get_json(silent=True) or {}
+    floors = data.get('floors') or []
+    if not isinstance(floors, list):
+        return jsonify({"status": "error", "message": "'floors' must be a list of floor letters."}), 400
+    try:
+        reload_start = time.perf_counter()
+        reloaded_floors = reload_floors(floors)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    state = GRAPH_STATE
+    return jsonify({"status": "success", "reloaded_floors": reloaded_floors, "graph_key": state.graph_key(),
+                    "closures": len(state.closures.closures) if state.closures is not None else 0,
+                    "duration_ms": round((time.perf_counter() - reload_start) * 1000, 1)}), 200
+
+@app.route('/api/ready', methods=['GET'])
+def get_readiness():
+    """
+    Readiness probe for the load balancer: 200 once routes can be served for the WARM_FLOORS
+    (for the whole campus without lazy floor loading), 503 before. Reports the floor loading progress.
+    """
+    state = GRAPH_STATE
+    loader = FLOOR_LOADER
+    progress = loader.progress(state.campus_graph) if loader is not None else {"complete": state.is_ready()}
+    ready = state.is_ready() and (loader is None or progress["warm"])
+    return jsonify(dict(progress, status="ready" if ready else "loading")), 200 if ready else 503
+
+@app.route('/api/route_cache/stats', methods=['GET'])
+def get_route_cache_stats():
+    """ Returns the size and hit/miss counters of the navigation route cache. """
+    if ROUTE_CACHE is None:
+        return jsonify({"status": "error", "message": "Route cache is disabled."}), 404
+    return jsonify({"status": "success", "route_cache": ROUTE_CACHE.stats()}), 200
+
+@app.route('/api/nearest_amenity', methods=['GET'])
+def get_nearest_amenity():
+    """ Returns the closest toilet, elevator or stairs from a room and the segmented route to it. """
+    state = state_with_floors([request.args.get('from')])
+    if state.amenity_fields is None or state.campus_graph is None:
+        return jsonify({"status": "error", "message": "Navigation map data is not available or incomplete."}), 503
+
+    start_room_input = request.args.get('from')
+    amenity_type = (request.args.get('type') or '').strip().lower()
+    if not start_room_input or not amenity_type:
+        return jsonify({"status": "error", "message": "Missing 'from' room name or amenity 'type' in request."}), 400
+    try:
+        format_route = route_formatter(request.args, state)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if amenity_type not in state.amenity_fields.distances:
+        return jsonify({"status": "error", "message": f"Unknown amenity type '{amenity_type}', "
+                                                      f"use one of {', '.join(state.amenity_fields.distances)}."}), 400
+    if amenity_type not in state.amenity_fields.categories():
+        return jsonify({"status": "error", "message": f"No {amenity_type} is marked on the campus map."}), 404
+
+    # Rooms drawn as several rects start from the rect closest to an amenity
+    start_node_ids = state.room_index.candidates(start_room_input) if state.room_index is not None else ()
+    if not start_node_ids:
+        start_node_id = find_node(start_room_input, state.node_graph(), state.room_index)
+        start_node_ids = (start_node_id,) if start_node_id is not None else ()
+    if not start_node_ids:
+        return jsonify({"status": "error", "message": f"Start location '{start_room_input}' not found as a navigable node in the graph."}), 404
+
+    start_node_id = min(start_node_ids, key=lambda node_id: state.amenity_fields.distance(amenity_type, node_id))
+    nearest = state.amenity_fields.nearest(amenity_type, start_node_id)
+    if nearest is not None and state.closures is not None and state.closures.blocks(nearest[0]):
+        # The stored route crosses a closure (or ends at a closed amenity), search the open graph instead
+        nearest = search_nearest(state.csr_graph, state.amenity_fields, amenity_type, start_node_ids)
+    if nearest is None:
+        return jsonify({"status": "error", "message": f"No {amenity_type} can be reached from {start_room_input}."}), 404
+
+    path_node_ids, distance = nearest
+    amenity_name = state.node_graph().nodes[path_node_ids[-1]].get('type', path_node_ids[-1])
+    try:
+        path_segments = segment_path(path_node_ids, state.node_graph())
+    except KeyError as e:
+        logger.exception("Node ID %s not found in graph during segmentation.", e)
+        return jsonify({"status": "error", "message": "Internal error: Path node data inconsistent."}), 500
+
+    return jsonify({
+        "status": "success",
+        "message": f"The nearest {amenity_type} from {start_room_input} is {amenity_name}.",
+        "amenity": amenity_name,
+        "distance": distance,
+        "path_segments": format_route(path_segments),
+    }), 200
+
 @app.route('/api/library_room_types', methods=['GET'])
 def get_library_room_types():
     cur = mysql.connection.cursor()
@@ -843,9 +1656,75 @@ def delete_class_schedule(schedule_id):
 
 
 
+def create_app(prefork=False):
+    """
+    Application factory used by the WSGI servers (see wsgi.py), loads or builds the campus graph on the first call.
+
+    With prefork, the graph is completed before returning (lazy floors are loaded now) and the objects
+    built so far are frozen out of the garbage collector, so worker processes forked afterwards
+    (gunicorn --preload) share one copy of the graph memory: the collector would otherwise write to
+    every object it scans and give each worker private copies of those pages. Each worker must then
+    call after_fork, threads are not carried over a fork. Closures and floor reloads are shared by the
+    workers through SHARED_CHANGES_PATH, from the ones made after this call on.
+
+    Logging is set up at LOG_LEVEL unless the server already configured it.
+
+    :param prefork: The app is created in a server master process before the workers are forked.
+    :return: Flask: The app.
+    """
+    logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
+    if GRAPH_STATE.campus_graph is None and FLOOR_LOADER is None:
+        initialize_graphs()
+    if not prefork:
+        start_floor_watcher()
+        return app
+
+    if FLOOR_LOADER is not None:
+        load_floors(FLOOR_LOADER.warm_up_order())
+        if WARM_UP_THREAD is not None:
+            WARM_UP_THREAD.join()
+    global SHARED_CHANGES
+    if SHARED_CHANGES_PATH and SharedChanges is not None:
+        try:
+            SHARED_CHANGES = SharedChanges(SHARED_CHANGES_PATH)
+        except sqlite3.Error as e:
+            logger.warning("Could not open %s (%s), closures and floor reloads stay in the worker that receives them.",
+                           SHARED_CHANGES_PATH, e)
+    gc.collect()
+    gc.freeze()
+    logger.info("Campus graph ready for forking (%d objects frozen).", gc.get_freeze_count())
+    return app
+
+def compact_shared_changes():
+    """
+    Deletes the shared changes of earlier servers from SHARED_CHANGES_PATH, so the file does not grow from one
+    deployment to the next. Called once per server start in the server master (gunicorn.conf.py on_starting).
+    """
+    if not SHARED_CHANGES_PATH or SharedChanges is None:
+        return
+    try:
+        deleted = SharedChanges(SHARED_CHANGES_PATH).compact()
+    except sqlite3.Error as e:
+        logger.warning("Could not compact %s (%s).", SHARED_CHANGES_PATH, e)
+        return
+    logger.info("Deleted %d shared changes of earlier servers from %s.", deleted, SHARED_CHANGES_PATH)
+
+def after_fork():
+    """
+    Sets up a worker forked from a create_app(prefork=True) master: its own route cache and shared changes
+    file connections and floor watcher.
+    """
+    global ROUTE_CACHE
+    if SHARED_CHANGES is not None:
+        SHARED_CHANGES.reopen()
+    if ROUTE_CACHE is not None and ROUTE_CACHE_PATH:
+        # SQLite connections must not be shared between processes, the memory tier starts empty in each worker
+        ROUTE_CACHE = RouteCache(ROUTE_CACHE_SIZE, ROUTE_CACHE_PATH)
+        ROUTE_CACHE.retain_version(GRAPH_STATE.graph_key())
+    start_floor_watcher()
+
 if __name__ == '__main__':
-    initialize_graphs()
-    app.run(debug=True)
+    create_app().run(debug=True)
 
 
 
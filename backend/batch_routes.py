@@ -0,0 +1,40 @@
+from csr_graph import csr_dijkstra
+
+def group_by_source(node_pairs):
+    """
+    :param node_pairs: List of (start node ID, goal node ID) tuples.
+    :return: dict: Start node ID -> list of (position in node_pairs, goal node ID), in first-seen order.
+    """
+
+    groups = {}
+    for position, (start_node_id, goal_node_id) in enumerate(node_pairs):
+        groups.setdefault(start_node_id, []).append((position, goal_node_id))
+    return groups
+
+def batch_shortest_paths(csr_graph, node_pairs):
+    """
+    Shortest paths for many pairs, with one single-source Dijkstra per distinct start node.
+    Each search stops once all goals of its start are settled, and all of them are read
+    from the same search tree.
+
+    :param csr_graph: CSRGraph of the campus graph.
+    :param node_pairs: List of (start node ID, goal node ID) tuples (IDs must be in the graph).
+    :return: generator: (position in node_pairs, list of node IDs or None if the goal cannot be reached),
+             yielded source by source as their searches finish.
+    """
+
+    node_index, node_ids = csr_graph.node_index, csr_graph.node_ids
+    for start_node_id, goals in group_by_source(node_pairs).items():
+        start = node_index[start_node_id]
+        goal_indices = {node_index[goal_node_id] for _, goal_node_id in goals}
+        distances, came_from = csr_dijkstra(csr_graph, [start], targets=goal_indices)
+        for position, goal_node_id in goals:
+            goal = node_index[goal_node_id]
+            if goal not in distances:
+                yield position, None
+                continue
+            path = [goal]
+            while path[-1] != start:
+                path.append(came_from[path[-1]])
+            path.reverse()
+            yield position, [node_ids[index] for index in path]
@@ -0,0 +1,118 @@
+import os
+import math
+import random
+import tempfile
+from functools import lru_cache
+from map_parser import create_campus_graph
+from csr_graph import CSRGraph, csr_dijkstra
+
+MAP_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+@lru_cache(maxsize=None)
+def campus_graph():
+    """
+    Parses the campus maps once per test run; the graph is shared by every test, so tests must not modify it
+    (copy it first).
+
+    :return: networkx.Graph: The campus graph of MAP_DIRECTORY.
+    """
+    return create_campus_graph(directory=MAP_DIRECTORY)
+
+@lru_cache(maxsize=None)
+def campus_csr_graph():
+    """ :return: CSRGraph: CSRGraph of campus_graph(), shared like it. """
+    return CSRGraph.from_networkx(campus_graph())
+
+def add_corridor(graph, prefix, tile_count, floor='A', y=0.0, rects=False):
+    """
+    Adds a west-east corridor of walkable tiles 10 apart, tile i named f"{prefix}{i}" at x = 10 * i,
+    each joined to the previous one with weight 10.
+
+    :param graph: The NetworkX graph to add the tiles to.
+    :param prefix: Node ID prefix of the tiles.
+    :param tile_count: Number of tiles.
+    :param floor: Floor letter of the tiles.
+    :param y: Row of the corridor.
+    :param rects: Give the tiles 10 x 10 rects (x, y, width, height) with their centers in the middle,
+                  otherwise the tile centers are (10 * i, y).
+    :return: list: Node IDs of the tiles, west to east.
+    """
+
+    node_ids = []
+    for column in range(tile_count):
+        node_id = f"{prefix}{column}"
+        if rects:
+            graph.add_node(node_id, x=column * 10.0, y=y, width=10.0, height=10.0,
+                           center_x=column * 10.0 + 5, center_y=y + 5, type='walkable', floor=floor)
+        else:
+            graph.add_node(node_id, center_x=column * 10.0, center_y=y, type='walkable', floor=floor)
+        if node_ids:
+            graph.add_edge(node_ids[-1], node_id, weight=10.0)
+        node_ids.append(node_id)
+    return node_ids
+
+def random_room_pairs(count, seed):
+    """ :return: list: count random (start, goal) pairs of distinct room nodes of the campus graph. """
+    rooms = [node_id for node_id, node_data in campus_graph().nodes(data=True) if node_data['category'] == 'room']
+    rng = random.Random(seed)
+    return [tuple(rng.sample(rooms, 2)) for _ in range(count)]
+
+class CampusRouteChecks:
+    """
+    Checks shared by the tests of the routing engines, mixed into their unittest.TestCase.
+    The campus graph is parsed once for all of them (see campus_graph).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.campus_graph = campus_graph()
+        cls.csr_graph = campus_csr_graph()
+
+    def assert_shortest_routes(self, find_route, node_pairs):
+        """
+        Checks that an engine returns shortest routes made of allowed moves on the campus graph,
+        and None for rooms that are not connected.
+
+        :param find_route: Function (start node ID, goal node ID) -> list of node IDs or None.
+        :param node_pairs: (start node ID, goal node ID) pairs to route.
+        """
+
+        campus_graph, csr_graph = self.campus_graph, self.csr_graph
+        for start_node_id, goal_node_id in node_pairs:
+            with self.subTest(start=start_node_id, goal=goal_node_id):
+                distances, _ = csr_dijkstra(csr_graph, [csr_graph.node_index[start_node_id]])
+                shortest = distances.get(csr_graph.node_index[goal_node_id], math.inf)
+                path = find_route(start_node_id, goal_node_id)
+                if shortest == math.inf:
+                    self.assertIsNone(path)
+                    continue
+                self.assertEqual((path[0], path[-1]), (start_node_id, goal_node_id))
+                for u, v in zip(path, path[1:]):
+                    self.assertTrue(campus_graph[u][v]['cardinal'])
+                    self.assertNotEqual(campus_graph.nodes[v]['category'], 'obstacle')
+                self.assertAlmostEqual(sum(campus_graph[u][v]['weight'] for u, v in zip(path, path[1:])), shortest, places=6)
+
+class SavedDataChecks:
+    """ Checks shared by the tests of the precomputed data files, mixed into their unittest.TestCase. """
+
+    def assert_saved_follows_graph_key(self, built, save, load, read_back):
+        """
+        Checks that precomputed data saved for graph 'key-1' loads back for that graph only.
+
+        :param built: The data, built on a graph with graph_key 'key-1'.
+        :param save: Function (data, path) saving it.
+        :param load: Function (path, graph key) loading it, None for files of other graphs.
+        :param read_back: Function (data) -> comparable value, for comparing the loaded data with the built one.
+        :return: str: Path of the saved file, valid until the end of the test.
+        """
+
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        path = os.path.join(tmpdir.name, "precomputed.bin")
+        save(built, path)
+        loaded = load(path, 'key-1')
+        self.assertIsNotNone(loaded)
+        self.assertEqual(read_back(loaded), read_back(built))
+        self.assertIsNone(load(path, 'key-2'))
+        return path
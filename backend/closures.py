@@ -0,0 +1,235 @@
+import threading
+import time
+
+# Closure source of the rooms closed from their class schedule status
+ROOM_STATUS_SOURCE = 'room_status'
+# Class schedule statuses that close a room while the schedule runs
+CLOSING_ROOM_STATUSES = ('Repairing', 'Unavailable')
+
+def nodes_in_area(campus_graph, floor, x, y, width, height):
+    """
+    :param campus_graph: The NetworkX graph representing the campus map.
+    :param floor: Floor letter of the area.
+    :param x: Left edge of the area (SVG coordinates).
+    :param y: Top edge of the area.
+    :param width: Width of the area.
+    :param height: Height of the area.
+    :return: list: IDs of the non-obstacle nodes whose rect overlaps the area.
+    """
+
+    right, bottom = x + width, y + height
+    node_ids = []
+    for node_id, node_data in campus_graph.nodes(data=True):
+        if node_data.get('floor') != floor or node_data.get('category') == 'obstacle' or node_data.get('width') is None:
+            continue
+        if node_data['x'] < right and x < node_data['x'] + node_data['width'] \
+                and node_data['y'] < bottom and y < node_data['y'] + node_data['height']:
+            node_ids.append(node_id)
+    return node_ids
+
+class GraphClosures:
+    """
+    Nodes closed at runtime (rooms under repair, corridors closed by facilities), applied in place.
+
+    Closing a node clears the move flag of every edge into it, in the CSRGraph and in every other
+    move mask given (e.g. the routing profiles), and marks the NetworkX node 'closed'; reopening
+    restores the saved flags once no closure covers the node anymore. Like obstacles, a closed node
+    can still be left when a route starts in it. Closures only remove moves, so routes avoiding the
+    closed nodes stay shortest and the landmark bounds stay admissible: precomputed routes are reused
+    unless blocks() finds a closed node on them.
+
+    Cached routes through newly closed nodes must be dropped by the caller; reopening a node may make
+    any route shorter, so it bumps version (see route_version).
+    """
+
+    def __init__(self, campus_graph, csr_graph, edge_masks=()):
+        """
+        :param campus_graph: The NetworkX graph representing the campus map.
+        :param csr_graph: CSRGraph of the campus graph.
+        :param edge_masks: Other edge_allowed arrays over the same CSR edges to keep in step.
+        """
+
+        self.campus_graph = campus_graph
+        self.csr_graph = csr_graph
+        self.edge_masks = [csr_graph.edge_allowed]
+        for edge_mask in edge_masks:
+            if all(edge_mask is not known_mask for known_mask in self.edge_masks):
+                self.edge_masks.append(edge_mask)
+        self.closures = {}
+        self.version = 0
+        self._closed_by = {}
+        self._saved_flags = {}
+        self._next_id = 1
+        # Reentrant: sync_rooms closes and reopens while holding it
+        self._lock = threading.RLock()
+
+    def _incoming_edges(self, node):
+        """ :return: list: CSR edge indices of the moves into a node. """
+        offsets, neighbors = self.csr_graph.offsets, self.csr_graph.neighbors
+        edges = []
+        for edge in range(offsets[node], offsets[node + 1]):
+            neighbor = neighbors[edge]
+            for reverse_edge in range(offsets[neighbor], offsets[neighbor + 1]):
+                if neighbors[reverse_edge] == node:
+                    edges.append(reverse_edge)
+        return edges
+
+    def close(self, node_ids, reason='', source='manual', rooms=(), areas=(), closure_id=None, closed_at=None):
+        """
+        :param node_ids: Nodes to close.
+        :param reason: Shown to users routed to a closed room.
+        :param source: Who closed it ('manual' or ROOM_STATUS_SOURCE).
+        :param rooms: Room names the nodes belong to, for listing.
+        :param areas: Areas ({'floor', 'x', 'y', 'width', 'height'}) the nodes were found in.
+        :param closure_id: ID of a closure re-applied from another copy of the graph (default: the next free ID).
+        :param closed_at: Time the re-applied closure was made (default: now).
+        :return: tuple: (closure dictionary, list of node IDs that were open before).
+        :raises ValueError: If no node ID is given or one is not in the graph.
+        """
+
+        node_index = self.csr_graph.node_index
+        unknown = [node_id for node_id in node_ids if node_id not in node_index]
+        if unknown or not node_ids:
+            raise ValueError(f"Unknown node IDs: {', '.join(map(str, unknown))}." if unknown else "Nothing to close.")
+
+        with self._lock:
+            if closure_id is None:
+                closure_id = self._next_id
+            self._next_id = max(self._next_id, closure_id + 1)
+            closure = {'id': closure_id, 'reason': reason, 'source': source, 'rooms': list(rooms),
+                       'areas': [dict(area) for area in areas], 'node_ids': list(dict.fromkeys(node_ids)),
+                       'closed_at': time.time() if closed_at is None else closed_at}
+            newly_closed = []
+            for node_id in closure['node_ids']:
+                node = node_index[node_id]
+                closed_by = self._closed_by.setdefault(node, set())
+                if not closed_by:
+                    edges = self._incoming_edges(node)
+                    self._saved_flags[node] = [(edge_mask, [edge_mask[edge] for edge in edges]) for edge_mask in self.edge_masks]
+                    for edge_mask in self.edge_masks:
+                        for edge in edges:
+                            edge_mask[edge] = 0
+                    self.campus_graph.nodes[node_id]['closed'] = True
+                    newly_closed.append(node_id)
+                closed_by.add(closure['id'])
+            self.closures[closure['id']] = closure
+        return closure, newly_closed
+
+    def reopen(self, closure_id):
+        """
+        :param closure_id: ID returned by close.
+        :return: list or None: Node IDs that are open again (nodes also covered by another closure stay closed),
+                 None if there is no such closure.
+        """
+
+        node_index = self.csr_graph.node_index
+        with self._lock:
+            closure = self.closures.pop(closure_id, None)
+            if closure is None:
+                return None
+            reopened = []
+            for node_id in closure['node_ids']:
+                node = node_index[node_id]
+                closed_by = self._closed_by[node]
+                closed_by.discard(closure_id)
+                if closed_by:
+                    continue
+                del self._closed_by[node]
+                edges = self._incoming_edges(node)
+                for edge_mask, flags in self._saved_flags.pop(node):
+                    for edge, flag in zip(edges, flags):
+                        edge_mask[edge] = flag
+                self.campus_graph.nodes[node_id].pop('closed', None)
+                reopened.append(node_id)
+            if reopened:
+                self.version += 1
+        return reopened
+
+    def carry_over(self, previous, find_room_nodes):
+        """
+        Re-applies the closures of another GraphClosures (of the graph before a floor reload) to this graph.
+        Rooms and areas are looked up again, so closures follow rooms whose rects changed; other nodes are
+        closed again if they still exist. Closure IDs are kept.
+
+        :param previous: GraphClosures to copy the closures from.
+        :param find_room_nodes: Function returning the node IDs of a room name in this graph.
+        :return: int: Number of closures carried over (closures of rooms or nodes that no longer exist are dropped).
+        """
+
+        carried_over = 0
+        for closure in previous.list():
+            if self.reapply(closure, find_room_nodes) is not None:
+                carried_over += 1
+        with self._lock:
+            self._next_id = max(self._next_id, previous._next_id)
+            self.version = previous.version
+        return carried_over
+
+    def reapply(self, closure, find_room_nodes):
+        """
+        Closes the rooms and areas of a closure made on another copy of the graph (before a floor reload,
+        or in another worker process), keeping its ID. Nodes of closures without rooms or areas are closed
+        again if they exist in this graph.
+
+        :param closure: Closure dictionary returned by close or list.
+        :param find_room_nodes: Function returning the node IDs of a room name in this graph.
+        :return: tuple or None: (closure dictionary, list of node IDs that were open before), None if none of its nodes exist.
+        """
+
+        node_ids = [node_id for room_name in closure['rooms'] for node_id in find_room_nodes(room_name)]
+        for area in closure.get('areas', []):
+            node_ids.extend(nodes_in_area(self.campus_graph, area['floor'], area['x'], area['y'],
+                                          area['width'], area['height']))
+        if not closure['rooms'] and not closure.get('areas'):
+            node_ids = [node_id for node_id in closure['node_ids'] if node_id in self.csr_graph.node_index]
+        if not node_ids:
+            return None
+        return self.close(node_ids, closure['reason'], closure['source'], closure['rooms'], closure.get('areas', []),
+                          closure_id=closure['id'], closed_at=closure['closed_at'])
+
+    def sync_rooms(self, source, room_nodes, reasons=None):
+        """
+        Makes the closures of a source match a set of rooms: rooms no longer listed are reopened,
+        new ones are closed, unchanged ones are left alone.
+
+        :param source: Closure source (e.g. ROOM_STATUS_SOURCE).
+        :param room_nodes: Room name -> list of node IDs of the rooms that must be closed.
+        :param reasons: Optional room name -> reason of its closure.
+        :return: tuple: (list of node IDs closed, list of node IDs reopened).
+        """
+
+        closed, reopened = [], []
+        with self._lock:
+            current = {tuple(closure['rooms']): closure_id for closure_id, closure in self.closures.items()
+                       if closure['source'] == source}
+            for rooms, closure_id in current.items():
+                if rooms[0] not in room_nodes:
+                    reopened.extend(self.reopen(closure_id) or [])
+            for room_name, node_ids in room_nodes.items():
+                if (room_name,) not in current and node_ids:
+                    reason = (reasons or {}).get(room_name, '')
+                    closed.extend(self.close(node_ids, reason, source, rooms=[room_name])[1])
+        return closed, reopened
+
+    def is_closed(self, node_id):
+        node = self.csr_graph.node_index.get(node_id)
+        return node is not None and node in self._closed_by
+
+    def closure_of(self, node_id):
+        """ :return: dict or None: One of the closures covering a node. """
+        node = self.csr_graph.node_index.get(node_id)
+        closure_ids = self._closed_by.get(node) if node is not None else None
+        return self.closures.get(min(closure_ids)) if closure_ids else None
+
+    def blocks(self, path_node_ids):
+        """ :return: bool: True if a route enters a closed node (leaving a closed start is allowed). """
+        return bool(self._closed_by) and any(self.is_closed(node_id) for node_id in path_node_ids[1:])
+
+    def route_version(self, graph_version):
+        """ :return: Route cache version of routes found on the graph with the current closures. """
+        return graph_version if self.version == 0 else f"{graph_version}#{self.version}"
+
+    def list(self):
+        """ :return: list: Open closures, oldest first. """
+        with self._lock:
+            return [dict(closure) for closure in self.closures.values()]
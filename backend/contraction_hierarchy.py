@@ -0,0 +1,389 @@
+import sys
+import math
+import time
+import heapq
+import argparse
+import logging
+from array import array
+from csr_graph import CSRGraph
+
+logger = logging.getLogger(__name__)
+
+ATTACHMENT_NAME = 'contraction_hierarchy'
+# Witness searches stop after settling this many nodes (a missed witness only adds a redundant shortcut)
+WITNESS_SETTLE_LIMIT = 60
+
+class ContractionHierarchy:
+    """
+    Contraction hierarchy (CH) over the traversable part of the campus graph.
+
+    Nodes are contracted one by one, least important first. Contracting a node adds a shortcut
+    between two of its neighbours whenever the route through it is the only shortest one, so
+    distances between the remaining nodes never change. A query then only follows edges to more
+    important nodes, searching upwards from both ends, which settles a few hundred nodes at most.
+    Shortcuts remember the node they bypass, so routes unpack back to original node IDs.
+
+    Obstacle nodes cannot be entered and are left out. A search starting inside one begins from
+    its allowed neighbours instead.
+    """
+
+    def __init__(self, graph_key, node_ids, rank, up_offsets, up_targets, up_weights, up_middles, obstacle_links):
+        """
+        :param graph_key: Key of the campus graph the hierarchy was built from.
+        :param node_ids: Node IDs in graph order.
+        :param rank: Contraction order of every node (-1 for obstacles).
+        :param up_offsets: CSR offsets of the upward edges (edges to higher ranked nodes).
+        :param up_targets: Upward edge targets.
+        :param up_weights: Upward edge weights.
+        :param up_middles: Node bypassed by each upward edge (-1 for original edges).
+        :param obstacle_links: Obstacle node index -> list of (neighbor, weight) moves out of it.
+        """
+
+        self.graph_key = graph_key
+        self.node_ids = node_ids
+        self.node_index = {node_id: index for index, node_id in enumerate(node_ids)}
+        self.rank = rank
+        self.up_offsets = up_offsets
+        self.up_targets = up_targets
+        self.up_weights = up_weights
+        self.up_middles = up_middles
+        self.obstacle_links = obstacle_links
+
+    def shortcut_count(self):
+        """ :return: int: Number of upward edges that are shortcuts. """
+        return sum(1 for middle in self.up_middles if middle >= 0)
+
+    def to_attachment(self):
+        """ :return: dict: Plain data stored in the graph artifact. """
+        return {
+            'graph_key': self.graph_key,
+            'node_ids': self.node_ids,
+            'rank': self.rank,
+            'up_offsets': self.up_offsets,
+            'up_targets': self.up_targets,
+            'up_weights': self.up_weights,
+            'up_middles': self.up_middles,
+            'obstacle_links': self.obstacle_links,
+        }
+
+    @classmethod
+    def from_attachment(cls, data):
+        """ :return: ContractionHierarchy: Hierarchy rebuilt from to_attachment data. """
+        return cls(data['graph_key'], data['node_ids'], data['rank'], data['up_offsets'], data['up_targets'],
+                   data['up_weights'], data['up_middles'], data['obstacle_links'])
+
+def _witness_distances(remaining, source, excluded, max_distance):
+    """
+    Limited Dijkstra in the not yet contracted graph, skipping the node being contracted.
+
+    :return: dict: Node -> distance for the nodes settled within the limits.
+    """
+
+    distances = {source: 0.0}
+    settled = {}
+    open_set = [(0.0, source)]
+    while open_set and len(settled) < WITNESS_SETTLE_LIMIT:
+        distance, current = heapq.heappop(open_set)
+        if current in settled:
+            continue
+        if distance > max_distance:
+            break
+        settled[current] = distance
+        for neighbor, weight in remaining[current].items():
+            if neighbor == excluded:
+                continue
+            tentative_distance = distance + weight
+            if tentative_distance < distances.get(neighbor, math.inf):
+                distances[neighbor] = tentative_distance
+                heapq.heappush(open_set, (tentative_distance, neighbor))
+    return settled
+
+def _needed_shortcuts(remaining, node):
+    """
+    Finds the shortcuts contracting a node requires.
+
+    :return: list: (u, w, weight) for every neighbour pair whose only shortest route goes through node.
+    """
+
+    neighbors = list(remaining[node].items())
+    shortcuts = []
+    for position, (u, weight_u) in enumerate(neighbors):
+        if position == len(neighbors) - 1:
+            break
+        targets = neighbors[position + 1:]
+        max_distance = weight_u + max(weight_w for _, weight_w in targets)
+        witnesses = _witness_distances(remaining, u, node, max_distance)
+        for w, weight_w in targets:
+            through_node = weight_u + weight_w
+            if witnesses.get(w, math.inf) > through_node:
+                shortcuts.append((u, w, through_node))
+    return shortcuts
+
+def build_contraction_hierarchy(campus_graph, csr_graph=None):
+    """
+    Orders and contracts the nodes (priority: edge difference plus contracted neighbours,
+    updated lazily) and keeps the upward edges as CSR arrays.
+
+    :param campus_graph: The NetworkX campus graph (its graph.graph['graph_key'] is stored).
+    :param csr_graph: CSRGraph of campus_graph (built if not given).
+    :return: ContractionHierarchy
+    """
+
+    csr_graph = csr_graph or CSRGraph.from_networkx(campus_graph)
+    node_count = len(csr_graph)
+    offsets, neighbors, weights, edge_allowed = csr_graph.offsets, csr_graph.neighbors, csr_graph.weights, csr_graph.edge_allowed
+    obstacle_code = csr_graph.category_names.index('obstacle') if 'obstacle' in csr_graph.category_names else None
+    is_obstacle = [code == obstacle_code for code in csr_graph.category_codes]
+
+    # Undirected graph of the non-obstacle nodes, edge middle -1 means "original edge"
+    remaining = [dict() for _ in range(node_count)]
+    middles = {}
+    obstacle_links = {}
+    for node in range(node_count):
+        for edge in range(offsets[node], offsets[node + 1]):
+            if not edge_allowed[edge]:
+                continue
+            neighbor = neighbors[edge]
+            if is_obstacle[node]:
+                obstacle_links.setdefault(node, []).append((neighbor, weights[edge]))
+            elif weights[edge] < remaining[node].get(neighbor, math.inf):
+                remaining[node][neighbor] = weights[edge]
+                middles[(min(node, neighbor), max(node, neighbor))] = -1
+
+    contracted_neighbors = [0] * node_count
+    def priority(node):
+        return len(_needed_shortcuts(remaining, node)) - len(remaining[node]) + contracted_neighbors[node]
+
+    queue = [(priority(node), node) for node in range(node_count) if not is_obstacle[node]]
+    heapq.heapify(queue)
+    rank = array('i', [-1]) * node_count
+    upward = [None] * node_count
+    next_rank = 0
+    while queue:
+        _, node = heapq.heappop(queue)
+        # Lazy update: re-check the priority, contract only if it is still the smallest
+        current_priority = priority(node)
+        if queue and current_priority > queue[0][0]:
+            heapq.heappush(queue, (current_priority, node))
+            continue
+
+        for u, w, weight in _needed_shortcuts(remaining, node):
+            if weight < remaining[u].get(w, math.inf):
+                remaining[u][w] = weight
+                remaining[w][u] = weight
+                middles[(min(u, w), max(u, w))] = node
+
+        rank[node] = next_rank
+        next_rank += 1
+        upward[node] = [(neighbor, weight, middles[(min(node, neighbor), max(node, neighbor))])
+                        for neighbor, weight in remaining[node].items()]
+        for neighbor in remaining[node]:
+            del remaining[neighbor][node]
+            contracted_neighbors[neighbor] += 1
+        remaining[node] = {}
+
+    up_offsets = array('i', [0])
+    up_targets = array('i')
+    up_weights = array('d')
+    up_middles = array('i')
+    for node in range(node_count):
+        for neighbor, weight, middle in upward[node] or ():
+            up_targets.append(neighbor)
+            up_weights.append(weight)
+            up_middles.append(middle)
+        up_offsets.append(len(up_targets))
+
+    return ContractionHierarchy(campus_graph.graph.get('graph_key'), list(csr_graph.node_ids), rank,
+                                up_offsets, up_targets, up_weights, up_middles, obstacle_links)
+
+def _upward_search(hierarchy, seeds):
+    """
+    Full Dijkstra over the upward edges from the given (node, distance) seeds.
+    The upward graph is small, so searching it to exhaustion is cheap and keeps the query simple.
+
+    :return: tuple: (distances, came_from) dictionaries keyed by node index.
+    """
+
+    up_offsets, up_targets, up_weights = hierarchy.up_offsets, hierarchy.up_targets, hierarchy.up_weights
+    distances = {}
+    came_from = {}
+    open_set = []
+    for node, distance in seeds:
+        if distance < distances.get(node, math.inf):
+            distances[node] = distance
+            open_set.append((distance, node))
+    heapq.heapify(open_set)
+
+    settled = set()
+    while open_set:
+        distance, current = heapq.heappop(open_set)
+        if current in settled:
+            continue
+        settled.add(current)
+        for edge in range(up_offsets[current], up_offsets[current + 1]):
+            neighbor = up_targets[edge]
+            tentative_distance = distance + up_weights[edge]
+            if tentative_distance < distances.get(neighbor, math.inf):
+                distances[neighbor] = tentative_distance
+                came_from[neighbor] = current
+                heapq.heappush(open_set, (tentative_distance, neighbor))
+    return distances, came_from
+
+def _unpack_edge(hierarchy, u, w):
+    """
+    Expands a hierarchy edge into the original nodes it stands for.
+
+    :return: list: Node indices from u to w.
+    """
+
+    up_offsets, up_targets, up_middles, rank = hierarchy.up_offsets, hierarchy.up_targets, hierarchy.up_middles, hierarchy.rank
+    path = [u]
+    stack = [(u, w)]
+    while stack:
+        a, b = stack.pop()
+        lower, higher = (a, b) if rank[a] < rank[b] else (b, a)
+        middle = -1
+        for edge in range(up_offsets[lower], up_offsets[lower + 1]):
+            if up_targets[edge] == higher:
+                middle = up_middles[edge]
+                break
+        if middle < 0:
+            path.append(b)
+        else:
+            # Expand a -> middle first, then middle -> b
+            stack.append((middle, b))
+            stack.append((a, middle))
+    return path
+
+def ch_query(start, goal, hierarchy):
+    """
+    Bidirectional upward search: both ends only climb the hierarchy and the route passes
+    through the meeting node with the smallest total distance.
+
+    :param start: Index of the start node.
+    :param goal: Index of the goal node.
+    :param hierarchy: ContractionHierarchy to search.
+    :return: tuple: (list of node indices or None, number of settled nodes)
+    """
+
+    if start == goal:
+        return [start], 0
+    if hierarchy.rank[goal] < 0:
+        return None, 0 # Obstacles can never be entered
+
+    if hierarchy.rank[start] < 0:
+        start_seeds = hierarchy.obstacle_links.get(start, [])
+    else:
+        start_seeds = [(start, 0.0)]
+    forward_distances, forward_came_from = _upward_search(hierarchy, start_seeds)
+    backward_distances, backward_came_from = _upward_search(hierarchy, [(goal, 0.0)])
+
+    best_distance = math.inf
+    meeting_node = None
+    for node, distance in forward_distances.items():
+        total_distance = distance + backward_distances.get(node, math.inf)
+        if total_distance < best_distance:
+            best_distance = total_distance
+            meeting_node = node
+    settled = len(forward_distances) + len(backward_distances)
+    if meeting_node is None:
+        return None, settled
+
+    # Hierarchy edges start -> meeting node and meeting node -> goal
+    forward_chain = [meeting_node]
+    while forward_chain[-1] in forward_came_from:
+        forward_chain.append(forward_came_from[forward_chain[-1]])
+    forward_chain.reverse()
+    backward_chain = [meeting_node]
+    while backward_chain[-1] in backward_came_from:
+        backward_chain.append(backward_came_from[backward_chain[-1]])
+
+    path = [start]
+    if forward_chain[0] != start:
+        path.append(forward_chain[0]) # Move out of the obstacle start
+    for u, w in zip(forward_chain, forward_chain[1:]):
+        path.extend(_unpack_edge(hierarchy, u, w)[1:])
+    for u, w in zip(backward_chain, backward_chain[1:]):
+        path.extend(_unpack_edge(hierarchy, u, w)[1:])
+    return path, settled
+
+def ch_pathfinding_algo(start_node_id, goal_node_id, hierarchy, stats=None):
+    """
+    Drop-in replacement for pathfinding_algo(start, goal, graph) answering from a contraction hierarchy.
+
+    :param start_node_id: The unique ID of the starting node.
+    :param goal_node_id: The unique ID of the goal node.
+    :param hierarchy: ContractionHierarchy built from the campus graph.
+    :param stats: Optional dictionary, receives the number of settled nodes under 'expanded'.
+    :return: list or None: A list of node IDs representing the path from start to goal,
+                      or None if no path is found.
+    """
+
+    start = hierarchy.node_index.get(start_node_id)
+    goal = hierarchy.node_index.get(goal_node_id)
+    if start is None:
+        logger.error("Start node '%s' not found in the graph.", start_node_id)
+        return None
+    if goal is None:
+        logger.error("Goal node '%s' not found in the graph.", goal_node_id)
+        return None
+
+    path, settled = ch_query(start, goal, hierarchy)
+    if stats is not None:
+        stats['expanded'] = settled
+    if path is None:
+        return None
+    return [hierarchy.node_ids[index] for index in path]
+
+def load_or_build_contraction_hierarchy(campus_graph, csr_graph=None, artifact_path=None):
+    """
+    Returns the hierarchy stored with the graph artifact, building it (and storing it
+    in the artifact) if it is missing or was built from another graph.
+
+    :param campus_graph: The NetworkX campus graph.
+    :param csr_graph: CSRGraph of campus_graph (built if not given).
+    :param artifact_path: Graph artifact holding the hierarchy (None never reads or writes a file).
+    :return: ContractionHierarchy
+    """
+
+    from graph_artifact import read_artifact_attachment, save_artifact_attachment
+
+    graph_key = campus_graph.graph.get('graph_key')
+    if artifact_path and graph_key is not None:
+        data = read_artifact_attachment(artifact_path, graph_key, ATTACHMENT_NAME)
+        if data is not None and data.get('graph_key') == graph_key:
+            return ContractionHierarchy.from_attachment(data)
+
+    build_start = time.perf_counter()
+    hierarchy = build_contraction_hierarchy(campus_graph, csr_graph)
+    logger.info("Built contraction hierarchy with %d shortcuts in %.1f s.", hierarchy.shortcut_count(),
+                time.perf_counter() - build_start)
+    if artifact_path and graph_key is not None:
+        if not save_artifact_attachment(artifact_path, graph_key, ATTACHMENT_NAME, hierarchy.to_attachment()):
+            logger.warning("Could not store the contraction hierarchy in %s.", artifact_path)
+    return hierarchy
+
+def main(argv=None):
+    """ Batch job: python -m contraction_hierarchy [--coarsen] """
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    import os.path
+    from graph_artifact import load_or_build_campus_graph, DEFAULT_ARTIFACT_PATH
+
+    parser = argparse.ArgumentParser(description="Add a contraction hierarchy to the compiled campus graph.")
+    parser.add_argument('--directory', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"),
+                        help="Directory containing the floor SVG files.")
+    parser.add_argument('--artifact', default=DEFAULT_ARTIFACT_PATH, help="Compiled campus graph to extend.")
+    parser.add_argument('--coarsen', action='store_true', help="Use the coarsened campus graph.")
+    args = parser.parse_args(argv)
+
+    campus_graph = load_or_build_campus_graph(directory=args.directory, artifact_path=args.artifact, coarsen=args.coarsen)
+    if campus_graph is None:
+        print("ERROR: Campus graph could not be loaded.")
+        return 1
+    hierarchy = load_or_build_contraction_hierarchy(campus_graph, artifact_path=args.artifact)
+    print(f"Contraction hierarchy: {len(hierarchy.node_ids)} nodes, {len(hierarchy.up_targets)} upward edges "
+          f"({hierarchy.shortcut_count()} shortcuts), stored in {args.artifact}.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,406 @@
+import heapq
+import math
+import logging
+from array import array
+from a_star_pathfinding import get_node_category, is_cardinal_move, MAX_EXPANSIONS
+
+logger = logging.getLogger(__name__)
+
+class CSRGraph:
+    """
+    Frozen, integer-indexed compressed sparse row (CSR) copy of the campus graph.
+
+    The neighbours of node i are neighbors[offsets[i]:offsets[i + 1]], with the matching
+    edge weights in weights and a precomputed "move allowed" flag in edge_allowed
+    (cardinal same-floor move or floor change, into a non-obstacle node, with a finite weight).
+    Per-node coordinates, floor codes and category codes live in parallel arrays.
+    The NetworkX graph it was built from stays the reference for tooling.
+    """
+
+    __slots__ = ('node_ids', 'node_index', 'id_rank', 'offsets', 'neighbors', 'weights', 'edge_allowed',
+                 'center_x', 'center_y', 'floor_codes', 'floor_letters', 'category_codes', 'category_names')
+
+    def __init__(self, node_ids, offsets, neighbors, weights, edge_allowed,
+                 center_x, center_y, floor_codes, floor_letters, category_codes, category_names):
+        self.node_ids = node_ids
+        self.node_index = {node_id: index for index, node_id in enumerate(node_ids)}
+        # Position of each node ID in sorted order, so heap ties break exactly like string node IDs do
+        self.id_rank = array('i', [0] * len(node_ids))
+        for rank, index in enumerate(sorted(range(len(node_ids)), key=node_ids.__getitem__)):
+            self.id_rank[index] = rank
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.weights = weights
+        self.edge_allowed = edge_allowed
+        self.center_x = center_x
+        self.center_y = center_y
+        self.floor_codes = floor_codes
+        self.floor_letters = floor_letters
+        self.category_codes = category_codes
+        self.category_names = category_names
+
+    @classmethod
+    def from_networkx(cls, campus_graph):
+        """
+        Builds the CSR arrays from a NetworkX campus graph, keeping node and neighbour order.
+
+        :param campus_graph: The NetworkX graph representing the campus map.
+        :return: CSRGraph
+        """
+
+        node_ids = list(campus_graph.nodes())
+        node_index = {node_id: index for index, node_id in enumerate(node_ids)}
+
+        center_x = array('d')
+        center_y = array('d')
+        floor_codes = array('B')
+        category_codes = array('B')
+        floor_letters = []
+        category_names = []
+        floor_lookup = {}
+        category_lookup = {}
+        for node_id, node_data in campus_graph.nodes(data=True):
+            # Missing coordinates are stored as NaN
+            center_x.append(node_data.get('center_x') if node_data.get('center_x') is not None else math.nan)
+            center_y.append(node_data.get('center_y') if node_data.get('center_y') is not None else math.nan)
+
+            floor = node_data.get('floor')
+            if floor not in floor_lookup:
+                floor_lookup[floor] = len(floor_letters)
+                floor_letters.append(floor)
+            floor_codes.append(floor_lookup[floor])
+
+            category = node_data.get('category') or get_node_category(node_data)
+            if category not in category_lookup:
+                category_lookup[category] = len(category_names)
+                category_names.append(category)
+            category_codes.append(category_lookup[category])
+
+        obstacle_code = category_lookup.get('obstacle')
+        offsets = array('i', [0])
+        neighbors = array('i')
+        weights = array('d')
+        edge_allowed = array('B')
+        for node_id, adjacency in campus_graph.adjacency():
+            current = node_index[node_id]
+            for neighbor_id, edge_data in adjacency.items():
+                neighbor = node_index[neighbor_id]
+                weight = edge_data.get('weight', math.inf)
+                neighbors.append(neighbor)
+                weights.append(weight)
+                cardinal = edge_data.get('cardinal')
+                if cardinal is None:
+                    cardinal = is_cardinal_move(center_x[current], center_y[current], center_x[neighbor], center_y[neighbor],
+                                                floor_codes[current] != floor_codes[neighbor])
+                allowed = category_codes[neighbor] != obstacle_code and weight != math.inf and cardinal
+                edge_allowed.append(1 if allowed else 0)
+            offsets.append(len(neighbors))
+
+        return cls(node_ids, offsets, neighbors, weights, edge_allowed,
+                   center_x, center_y, floor_codes, floor_letters, category_codes, category_names)
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def __contains__(self, node_id):
+        return node_id in self.node_index
+
+    def number_of_edges(self):
+        """ :return: int: Number of undirected edges. """
+        return len(self.neighbors) // 2
+
+    def with_edge_costs(self, weights=None, edge_allowed=None):
+        """
+        View of the same nodes and edges with other edge weights and/or move flags (e.g. a routing profile).
+        All other arrays are shared with this graph, nothing is copied.
+
+        :param weights: array('d') parallel to neighbors (None keeps this graph's weights).
+        :param edge_allowed: array('B') parallel to neighbors (None keeps this graph's flags).
+        :return: CSRGraph
+        """
+
+        view = object.__new__(CSRGraph)
+        for name in CSRGraph.__slots__:
+            setattr(view, name, getattr(self, name))
+        if weights is not None:
+            view.weights = weights
+        if edge_allowed is not None:
+            view.edge_allowed = edge_allowed
+        return view
+
+def csr_astar(start, goal, csr_graph, max_expansions=MAX_EXPANSIONS, landmarks=None):
+    """
+    A* over the CSR arrays using integer node indices and the Manhattan heuristic
+    (or the landmark lower bound when landmarks are given).
+    Search state is only kept for nodes the search reaches, and a better path to a node
+    already queued pushes a new heap entry (the outdated one is skipped when popped).
+
+    :param start: Index of the start node.
+    :param goal: Index of the goal node.
+    :param csr_graph: CSRGraph to search.
+    :param max_expansions: Give up after expanding this many nodes.
+    :param landmarks: Optional Landmarks computed on this graph.
+    :return: tuple: (list of node indices or None, number of expanded nodes)
+    """
+
+    if start == goal:
+        return [start], 0
+
+    offsets, neighbors, weights, edge_allowed = csr_graph.offsets, csr_graph.neighbors, csr_graph.weights, csr_graph.edge_allowed
+    center_x, center_y, id_rank = csr_graph.center_x, csr_graph.center_y, csr_graph.id_rank
+    goal_x, goal_y = center_x[goal], center_y[goal]
+
+    landmark_bound = landmarks.goal_heuristic(goal) if landmarks is not None else None
+
+    g_score = {start: 0.0}
+    came_from = {}
+    start_h = landmark_bound(start) if landmark_bound else abs(center_x[start] - goal_x) + abs(center_y[start] - goal_y)
+    open_set = [(start_h, id_rank[start], start, 0.0)]
+    expanded = 0
+
+    while open_set:
+        _, _, current, current_g = heapq.heappop(open_set)
+        if current_g > g_score[current]:
+            continue # Outdated entry, a shorter path was found after it was pushed
+        if current == goal:
+            path = [current]
+            while current in came_from:
+                current = came_from[current]
+                path.append(current)
+            path.reverse()
+            return path, expanded
+
+        expanded += 1
+        if expanded > max_expansions:
+            return None, expanded
+
+        for edge in range(offsets[current], offsets[current + 1]):
+            if not edge_allowed[edge]:
+                continue
+            neighbor = neighbors[edge]
+            tentative_g = current_g + weights[edge]
+            if tentative_g < g_score.get(neighbor, math.inf):
+                g_score[neighbor] = tentative_g
+                came_from[neighbor] = current
+                # Same summation order as pathfinding_algo, so f scores (and ties) match it exactly
+                if landmark_bound:
+                    f_score = tentative_g + landmark_bound(neighbor)
+                else:
+                    f_score = tentative_g + (abs(center_x[neighbor] - goal_x) + abs(center_y[neighbor] - goal_y))
+                heapq.heappush(open_set, (f_score, id_rank[neighbor], neighbor, tentative_g))
+
+    return None, expanded
+
+def csr_pathfinding_algo(start_node_id, goal_node_id, csr_graph, stats=None, landmarks=None):
+    """
+    Drop-in replacement for pathfinding_algo that runs on a CSRGraph.
+
+    :param start_node_id: The unique ID of the starting node.
+    :param goal_node_id: The unique ID of the goal node.
+    :param csr_graph: CSRGraph built from the campus graph.
+    :param stats: Optional dictionary, receives the number of expanded nodes under 'expanded'.
+    :param landmarks: Optional Landmarks of the graph, replaces the Manhattan heuristic.
+    :return: list or None: A list of node IDs representing the path from start to goal,
+                      or None if no path is found.
+    """
+
+    start = csr_graph.node_index.get(start_node_id)
+    goal = csr_graph.node_index.get(goal_node_id)
+    if start is None:
+        logger.error("Start node '%s' not found in the graph.", start_node_id)
+        return None
+    if goal is None:
+        logger.error("Goal node '%s' not found in the graph.", goal_node_id)
+        return None
+
+    path, expanded = csr_astar(start, goal, csr_graph, landmarks=landmarks)
+    if stats is not None:
+        stats['expanded'] = expanded
+    if path is None:
+        return None
+    return [csr_graph.node_ids[index] for index in path]
+
+def csr_bidirectional_astar(start, goal, csr_graph, max_expansions=MAX_EXPANSIONS, landmarks=None):
+    """
+    Bidirectional A* over the CSR arrays: a forward search from the start and a reverse search
+    from the goal, with the average potential p(v) = (h_goal(v) - h_start(v)) / 2 (forward)
+    and -p(v) (reverse), where h_goal and h_start are the landmark lower bounds to the goal and
+    the start. The bounds are consistent, so both searches see the same non-negative reduced edge
+    lengths and the search may stop as soon as the two smallest keys add up to the best route found
+    so far. The Manhattan distances are not consistent across stairs and elevators (every floor has
+    its own coordinates) and would break that stopping rule, so landmarks are required.
+
+    The reverse search follows the moves the forward search would make (into non-obstacle nodes,
+    cardinal on the same floor, finite weight) backwards, so both respect the same rules.
+
+    :param start: Index of the start node.
+    :param goal: Index of the goal node.
+    :param csr_graph: CSRGraph to search.
+    :param max_expansions: Give up after expanding this many nodes (both directions together).
+    :param landmarks: Landmarks computed on this graph.
+    :return: tuple: (list of node indices or None, number of expanded nodes)
+    :raises ValueError: If no landmarks are given.
+    """
+
+    if landmarks is None:
+        raise ValueError("Bidirectional A* needs landmarks, the Manhattan estimates can stop it before the shortest route.")
+    if start == goal:
+        return [start], 0
+
+    offsets, neighbors, weights, edge_allowed = csr_graph.offsets, csr_graph.neighbors, csr_graph.weights, csr_graph.edge_allowed
+    id_rank = csr_graph.id_rank
+    obstacle_code = csr_graph.category_names.index('obstacle') if 'obstacle' in csr_graph.category_names else None
+    if csr_graph.category_codes[goal] == obstacle_code:
+        return None, 0 # No move ever enters an obstacle
+
+    goal_bound = landmarks.goal_heuristic(goal)
+    start_bound = landmarks.goal_heuristic(start)
+    potentials = {}
+    def potential(node):
+        value = potentials.get(node)
+        if value is None:
+            value = potentials[node] = (goal_bound(node) - start_bound(node)) / 2.0
+        return value
+
+    # Reverse moves into the start use the start's own edges (the start may be an obstacle)
+    start_exits = {neighbors[edge] for edge in range(offsets[start], offsets[start + 1]) if edge_allowed[edge]}
+
+    forward_g = {start: 0.0}
+    reverse_g = {goal: 0.0}
+    forward_came_from = {}
+    reverse_came_from = {}
+    forward_open = [(potential(start), id_rank[start], start, 0.0)]
+    reverse_open = [(-potential(goal), id_rank[goal], goal, 0.0)]
+    best_distance = math.inf
+    meeting_node = None
+    expanded = 0
+
+    while forward_open and reverse_open:
+        if forward_open[0][0] + reverse_open[0][0] >= best_distance:
+            break # No route through an unexpanded node can be shorter
+
+        forward = forward_open[0][0] <= reverse_open[0][0]
+        if forward:
+            _, _, current, current_g = heapq.heappop(forward_open)
+            if current_g > forward_g[current]:
+                continue # Outdated entry
+        else:
+            _, _, current, current_g = heapq.heappop(reverse_open)
+            if current_g > reverse_g[current]:
+                continue
+
+        expanded += 1
+        if expanded > max_expansions:
+            return None, expanded
+
+        own_g, other_g = (forward_g, reverse_g) if forward else (reverse_g, forward_g)
+        own_came_from = forward_came_from if forward else reverse_came_from
+        own_open = forward_open if forward else reverse_open
+        for edge in range(offsets[current], offsets[current + 1]):
+            neighbor = neighbors[edge]
+            if forward or neighbor != start:
+                if not edge_allowed[edge]:
+                    continue
+            elif current not in start_exits:
+                continue
+            tentative_g = current_g + weights[edge]
+            if tentative_g < own_g.get(neighbor, math.inf):
+                own_g[neighbor] = tentative_g
+                own_came_from[neighbor] = current
+                key = tentative_g + potential(neighbor) if forward else tentative_g - potential(neighbor)
+                heapq.heappush(own_open, (key, id_rank[neighbor], neighbor, tentative_g))
+                if neighbor in other_g and tentative_g + other_g[neighbor] < best_distance:
+                    best_distance = tentative_g + other_g[neighbor]
+                    meeting_node = neighbor
+
+    if meeting_node is None:
+        return None, expanded
+    path = [meeting_node]
+    while path[-1] in forward_came_from:
+        path.append(forward_came_from[path[-1]])
+    path.reverse()
+    while path[-1] in reverse_came_from:
+        path.append(reverse_came_from[path[-1]])
+    return path, expanded
+
+def csr_bidirectional_pathfinding_algo(start_node_id, goal_node_id, csr_graph, stats=None, landmarks=None):
+    """
+    Same as csr_pathfinding_algo, using bidirectional A* (csr_bidirectional_astar).
+
+    :param start_node_id: The unique ID of the starting node.
+    :param goal_node_id: The unique ID of the goal node.
+    :param csr_graph: CSRGraph built from the campus graph.
+    :param stats: Optional dictionary, receives the number of expanded nodes under 'expanded'.
+    :param landmarks: Landmarks of the graph (see csr_bidirectional_astar).
+    :return: list or None: A list of node IDs representing the path from start to goal,
+                      or None if no path is found.
+    :raises ValueError: If no landmarks are given.
+    """
+
+    start = csr_graph.node_index.get(start_node_id)
+    goal = csr_graph.node_index.get(goal_node_id)
+    if start is None:
+        logger.error("Start node '%s' not found in the graph.", start_node_id)
+        return None
+    if goal is None:
+        logger.error("Goal node '%s' not found in the graph.", goal_node_id)
+        return None
+
+    path, expanded = csr_bidirectional_astar(start, goal, csr_graph, landmarks=landmarks)
+    if stats is not None:
+        stats['expanded'] = expanded
+    if path is None:
+        return None
+    return [csr_graph.node_ids[index] for index in path]
+
+def csr_dijkstra(csr_graph, sources, max_distance=math.inf, floor_code=None, targets=None):
+    """
+    Dijkstra over the allowed moves of a CSRGraph, from one or more source nodes.
+
+    :param csr_graph: CSRGraph to search.
+    :param sources: Iterable of source node indices (all start at distance 0).
+    :param max_distance: Stop expanding once the closest open node is further than this.
+    :param floor_code: Only move between nodes with this floor code (None allows floor changes).
+    :param targets: Optional node indices, the search stops once all of them are settled.
+    :return: tuple: (distances, came_from) dictionaries keyed by node index, for every node reached
+             within max_distance. came_from has no entry for the sources.
+    """
+
+    offsets, neighbors, weights, edge_allowed = csr_graph.offsets, csr_graph.neighbors, csr_graph.weights, csr_graph.edge_allowed
+    floor_codes = csr_graph.floor_codes
+    distances = {}
+    came_from = {}
+    open_set = []
+    for source in sources:
+        distances[source] = 0.0
+        open_set.append((0.0, source))
+    heapq.heapify(open_set)
+
+    settled = {}
+    remaining_targets = set(targets) if targets is not None else None
+    while open_set:
+        current_distance, current = heapq.heappop(open_set)
+        if current in settled:
+            continue
+        if current_distance > max_distance:
+            break
+        settled[current] = current_distance
+        if remaining_targets is not None:
+            remaining_targets.discard(current)
+            if not remaining_targets:
+                break
+
+        for edge in range(offsets[current], offsets[current + 1]):
+            if not edge_allowed[edge]:
+                continue
+            neighbor = neighbors[edge]
+            if floor_code is not None and floor_codes[neighbor] != floor_code:
+                continue
+            tentative_distance = current_distance + weights[edge]
+            if tentative_distance < distances.get(neighbor, math.inf):
+                distances[neighbor] = tentative_distance
+                came_from[neighbor] = current
+                heapq.heappush(open_set, (tentative_distance, neighbor))
+
+    # Only report settled nodes, the rest are tentative or beyond max_distance
+    return settled, {node: parent for node, parent in came_from.items() if node in settled}
@@ -0,0 +1,208 @@
+import os
+import threading
+import time
+import networkx as nx
+import logging
+from map_parser import (FLOOR_FILES, DEFAULT_INTER_FLOOR_WEIGHT, CONNECTION_ID_PREFIXES, svg_map_parse, iter_svg_rects,
+                        _svgelements_rects, replace_floor)
+from graph_artifact import DEFAULT_ARTIFACT_PATH, compute_graph_key, save_graph_artifact
+
+logger = logging.getLogger(__name__)
+
+def scan_floor_ids(svg_map_path):
+    """
+    Reads the rect IDs of a floor SVG without building its graph (no adjacency checks).
+
+    :param svg_map_path: Path to the SVG file.
+    :return: list or None: Stripped, non-empty rect IDs in document order, None if the file is missing or unreadable.
+    """
+
+    if not os.path.exists(svg_map_path):
+        return None
+    try:
+        try:
+            svg_rects = list(iter_svg_rects(svg_map_path))
+        except ValueError:
+            svg_rects = list(_svgelements_rects(svg_map_path)) # Content the streaming extractor doesn't handle
+    except Exception as e:
+        logger.warning("Could not scan SVG file %s: %s", svg_map_path, e)
+        return None
+    return [element_id.strip() for element_id, *_ in svg_rects if element_id and element_id.strip()]
+
+class LazyFloorLoader:
+    """
+    Builds the campus graph one floor at a time instead of parsing all floors up front.
+
+    scan() only reads the rect IDs of every floor (a fraction of a full parse), giving the floor
+    index: which floors exist, which floor every room is on and where the stairs and elevators are.
+    Floors are then added with load_floors, when a request needs them or from the warm-up order
+    (warm floors first). Every partial graph only links floors that are next to each other in the
+    complete building, and once all floors are in, the graph is the one create_campus_graph builds
+    (same node and edge order) and gets the real graph key.
+
+    load_floors never modifies a graph it is given, but updates the loader: callers must not run it concurrently.
+    """
+
+    def __init__(self, directory="static", artifact_path=DEFAULT_ARTIFACT_PATH, warm_floors=(),
+                 inter_floor_weight=DEFAULT_INTER_FLOOR_WEIGHT, streaming=True):
+        """
+        :param directory: Directory containing the floor SVG files.
+        :param artifact_path: Where the complete graph is saved once every floor is loaded (None disables saving).
+        :param warm_floors: Floor letters loaded first (the busiest floors).
+        :param inter_floor_weight: Weight used for inter-floor connection edges.
+        :param streaming: Use the streaming rect extractor when parsing floors.
+        """
+
+        self.directory = directory
+        self.artifact_path = artifact_path
+        self.warm_floors = [floor_letter for floor_letter, _ in FLOOR_FILES if floor_letter in warm_floors]
+        self.inter_floor_weight = inter_floor_weight
+        self.streaming = streaming
+        self.floor_order = []
+        self.room_floors = {}
+        self.connection_floors = {}
+        self.graph_key = None
+        self.floor_hashes = None
+        self.loaded_floors = []
+        self.floor_load_ms = {}
+        self.started_at = None
+        self.completed_at = None
+
+    def scan(self):
+        """ Builds the floor index from the rect IDs of every floor file. :return: LazyFloorLoader: self """
+        self.started_at = time.time()
+        scan_start = time.perf_counter()
+        self.graph_key, self.floor_hashes = compute_graph_key(self.directory, self.inter_floor_weight)
+        for floor_letter, floor_filename in FLOOR_FILES:
+            rect_ids = scan_floor_ids(os.path.join(self.directory, floor_filename))
+            if rect_ids is None:
+                logger.warning("Floor %s: %s not found or unreadable, skipping it.", floor_letter, floor_filename)
+                continue
+            self.floor_order.append(floor_letter)
+            for rect_id in rect_ids:
+                floors = self.room_floors.setdefault(rect_id.upper(), [])
+                if floor_letter not in floors:
+                    floors.append(floor_letter)
+                if any(rect_id.lower().startswith(prefix) for prefix in CONNECTION_ID_PREFIXES):
+                    self.connection_floors.setdefault(rect_id, []).append(floor_letter)
+        logger.info("Scanned floor index of %d floors (%d IDs, %d stairs/elevators) in %.1f ms.", len(self.floor_order),
+                    len(self.room_floors), len(self.connection_floors), (time.perf_counter() - scan_start) * 1000)
+        return self
+
+    def is_complete(self):
+        return bool(self.floor_order) and len(self.loaded_floors) == len(self.floor_order)
+
+    def pending_floors(self):
+        return [floor_letter for floor_letter in self.floor_order if floor_letter not in self.loaded_floors]
+
+    def warm_up_order(self):
+        """ :return: list: Floors still to load, warm floors first, then the others from the bottom up. """
+        pending = self.pending_floors()
+        return [floor_letter for floor_letter in self.warm_floors if floor_letter in pending] + \
+               [floor_letter for floor_letter in pending if floor_letter not in self.warm_floors]
+
+    def floors_for_rooms(self, room_names):
+        """
+        Floors a route between rooms can need: the floors of the rooms and every floor between them
+        (stairs and elevators only link adjacent floors).
+
+        :param room_names: Room names (case-insensitive), unknown names are ignored.
+        :return: list: Floor letters, bottom up.
+        """
+
+        positions = [self.floor_order.index(floor_letter) for room_name in room_names if room_name
+                     for floor_letter in self.room_floors.get(room_name.strip().upper(), [])]
+        if not positions:
+            return []
+        return self.floor_order[min(positions):max(positions) + 1]
+
+    def load_floors(self, campus_graph, floors):
+        """
+        Adds floors to a graph built by this loader.
+
+        :param campus_graph: Graph returned by an earlier call (None or an empty graph to start).
+        :param floors: Floor letters to load, already loaded and unknown floors are skipped.
+        :return: tuple: (new campus graph, list of floors loaded); (campus_graph, []) if there was nothing to load.
+        """
+
+        floor_filenames = dict(FLOOR_FILES)
+        floors = [floor_letter for floor_letter in self.floor_order if floor_letter in floors and floor_letter not in self.loaded_floors]
+        if not floors:
+            return campus_graph, []
+
+        new_graph = campus_graph if campus_graph is not None else nx.Graph()
+        loaded = []
+        for floor_letter in floors:
+            load_start = time.perf_counter()
+            floor_graph = svg_map_parse(os.path.join(self.directory, floor_filenames[floor_letter]), floor_letter,
+                                        streaming=self.streaming)
+            if floor_graph is None:
+                # Left out like create_campus_graph leaves out floors that fail to parse
+                logger.error("Floor %s could not be parsed, leaving it out of the campus graph.", floor_letter)
+                self.floor_order.remove(floor_letter)
+                continue
+            new_graph = replace_floor(new_graph, floor_letter, floor_graph, self.inter_floor_weight, floor_order=self.floor_order)
+            self.floor_load_ms[floor_letter] = round((time.perf_counter() - load_start) * 1000, 1)
+            loaded.append(floor_letter)
+        if not loaded:
+            return campus_graph, []
+
+        self.loaded_floors = [floor_letter for floor_letter in self.floor_order
+                              if floor_letter in self.loaded_floors or floor_letter in loaded]
+        logger.info("Loaded floors %s (%d of %d floors in the graph).", ', '.join(loaded), len(self.loaded_floors),
+                    len(self.floor_order))
+        new_graph.graph['loaded_floors'] = list(self.loaded_floors)
+        if self.is_complete():
+            self.completed_at = time.time()
+            new_graph.graph['graph_key'] = self.graph_key
+            new_graph.graph['floor_hashes'] = self.floor_hashes
+            if self.artifact_path is not None:
+                try:
+                    save_graph_artifact(new_graph, self.artifact_path, self.graph_key, self.floor_hashes)
+                except OSError as e:
+                    logger.warning("Could not write graph artifact %s: %s", self.artifact_path, e)
+        else:
+            # Routes and precomputed structures of a partial graph must never be taken for the complete graph's
+            new_graph.graph['graph_key'] = f"{self.graph_key}:{''.join(self.loaded_floors)}"
+            new_graph.graph['pending_floors'] = self.pending_floors()
+        return new_graph, loaded
+
+    def progress(self, campus_graph):
+        """
+        :param campus_graph: Graph built by this loader that is being served (None if none is yet).
+        :return: dict: Loaded and pending floors, per-floor parse times and whether the warm floors are in.
+        """
+        loaded_floors = campus_graph.graph.get('loaded_floors', []) if campus_graph is not None else []
+        return {
+            "complete": bool(self.floor_order) and all(floor_letter in loaded_floors for floor_letter in self.floor_order),
+            "warm": all(floor_letter in loaded_floors for floor_letter in self.warm_floors if floor_letter in self.floor_order),
+            "loaded_floors": list(loaded_floors),
+            "pending_floors": [floor_letter for floor_letter in self.floor_order if floor_letter not in loaded_floors],
+            "warm_floors": list(self.warm_floors),
+            "floor_load_ms": dict(self.floor_load_ms),
+            "elapsed_s": round(((self.completed_at or time.time()) - self.started_at), 2) if self.started_at else None,
+        }
+
+def warm_up(loader, load_floors):
+    """
+    Loads the floors of a LazyFloorLoader one at a time in warm-up order.
+
+    :param loader: Scanned LazyFloorLoader.
+    :param load_floors: Function loading a list of floors with the loader and publishing the new graph.
+    """
+
+    while not loader.is_complete():
+        floors = loader.warm_up_order()
+        if not floors:
+            break
+        try:
+            load_floors(floors[:1])
+        except Exception as e:
+            logger.exception("Warm-up could not load floor %s: %s", floors[0], e)
+            return
+
+def start_warm_up(loader, load_floors):
+    """ :return: threading.Thread: Daemon thread running warm_up. """
+    warm_up_thread = threading.Thread(target=warm_up, args=(loader, load_floors), name='floor-warm-up', daemon=True)
+    warm_up_thread.start()
+    return warm_up_thread
@@ -0,0 +1,510 @@
+import os
+import os.path
+import sys
+import time
+import pickle
+import hashlib
+import argparse
+from array import array
+from collections import deque
+import networkx as nx
+import logging
+from map_parser import create_campus_graph, svg_map_parse, replace_floor, FLOOR_FILES, DEFAULT_INTER_FLOOR_WEIGHT, DEFAULT_ADJACENCY_TOLERANCE
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the artifact layout or the graph building logic changes
+ARTIFACT_FORMAT_VERSION = 3
+DEFAULT_ARTIFACT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiled", "campus_graph.bin")
+
+def compute_graph_key(directory="static", inter_floor_weight=DEFAULT_INTER_FLOOR_WEIGHT,
+                      tolerance=DEFAULT_ADJACENCY_TOLERANCE, coarsen=False):
+    """
+    Computes the content hash identifying a compiled campus graph: the SHA-256 of every
+    floor SVG file plus the parser parameters the graph was built with.
+
+    :param directory: Directory containing the floor SVG files.
+    :param inter_floor_weight: Weight used for inter-floor connection edges.
+    :param tolerance: Adjacency tolerance used when connecting rects.
+    :param coarsen: Whether the graph was coarsened.
+    :return: tuple: (graph_key, floor_hashes) where floor_hashes maps floor letter -> file hash (None if missing).
+    """
+
+    floor_hashes = {}
+    for floor_letter, floor_filename in FLOOR_FILES:
+        svg_file_path = os.path.join(directory, floor_filename)
+        if not os.path.exists(svg_file_path):
+            floor_hashes[floor_letter] = None
+            continue
+        with open(svg_file_path, 'rb') as svg_file:
+            floor_hashes[floor_letter] = hashlib.sha256(svg_file.read()).hexdigest()
+
+    key_hash = hashlib.sha256()
+    key_hash.update(f"format={ARTIFACT_FORMAT_VERSION};weight={inter_floor_weight!r};tolerance={tolerance!r};"
+                    f"coarsen={bool(coarsen)}".encode())
+    for floor_letter, _ in FLOOR_FILES:
+        key_hash.update(f";{floor_letter}={floor_hashes[floor_letter]}".encode())
+    return key_hash.hexdigest(), floor_hashes
+
+def _edges_in_insertion_order(campus_graph, node_index):
+    """
+    Orders the edges so that adding them one by one recreates every node's neighbour order.
+    Each adjacency list is a chain of "added before" constraints, and the chains are merged
+    with a topological sort (the original insertion order is always one valid answer).
+    This keeps A* neighbour iteration, and therefore the chosen paths, identical after loading.
+
+    :param campus_graph: The NetworkX graph being saved.
+    :param node_index: Dictionary mapping node ID -> position in the node list.
+    :return: list: (u, v, data) tuples in a valid insertion order.
+    """
+
+    edge_ids = {}
+    edges = []
+    adjacency_chains = []
+    for node_id, neighbors in campus_graph.adjacency():
+        chain = []
+        for neighbor_id, edge_data in neighbors.items():
+            edge_key = (node_id, neighbor_id) if node_index[node_id] <= node_index[neighbor_id] else (neighbor_id, node_id)
+            if edge_key not in edge_ids:
+                edge_ids[edge_key] = len(edges)
+                edges.append((edge_key[0], edge_key[1], edge_data))
+            chain.append(edge_ids[edge_key])
+        adjacency_chains.append(chain)
+
+    # Kahn's algorithm over the chains: an edge is ready once it heads both of its chains
+    waiting_on = [0] * len(edges)
+    next_in_chain = [[] for _ in edges]
+    for chain in adjacency_chains:
+        for previous_edge, edge in zip(chain, chain[1:]):
+            waiting_on[edge] += 1
+            next_in_chain[previous_edge].append(edge)
+
+    ready = deque(edge for edge in range(len(edges)) if waiting_on[edge] == 0)
+    ordered_edges = []
+    while ready:
+        edge = ready.popleft()
+        ordered_edges.append(edges[edge])
+        for following_edge in next_in_chain[edge]:
+            waiting_on[following_edge] -= 1
+            if waiting_on[following_edge] == 0:
+                ready.append(following_edge)
+    return ordered_edges
+
+def save_graph_artifact(campus_graph, artifact_path=DEFAULT_ARTIFACT_PATH, graph_key=None, floor_hashes=None,
+                        attachments=None):
+    """
+    Serializes the campus graph (nodes, attributes and weighted edges) to a compact binary artifact.
+    Node attributes are stored as value rows against a shared attribute name list and edges as
+    index/weight arrays. The file is written to a temporary path first and then moved into place.
+
+    :param campus_graph: The NetworkX graph to save.
+    :param artifact_path: Where to write the artifact.
+    :param graph_key: Content hash the artifact is valid for (see compute_graph_key).
+    :param floor_hashes: Per-floor SVG hashes, stored for reference.
+    :param attachments: Name -> data precomputed from this graph and stored with it (e.g. a contraction hierarchy).
+    :return: str: The artifact path.
+    """
+
+    node_ids = list(campus_graph.nodes())
+    node_index = {node_id: index for index, node_id in enumerate(node_ids)}
+
+    # Store attribute values as rows against one shared name list (nodes with other keys keep their dict)
+    attribute_names = tuple(campus_graph.nodes[node_ids[0]]) if node_ids else ()
+    node_rows = []
+    for node_id, node_data in campus_graph.nodes(data=True):
+        if tuple(node_data) == attribute_names:
+            node_rows.append(tuple(node_data.values()))
+        else:
+            node_rows.append(dict(node_data))
+
+    edge_sources = array('I')
+    edge_targets = array('I')
+    edge_weights = array('d')
+    edge_cardinal = array('b') # 'cardinal' edge flag: 1, 0, or -1 when the edge has none
+    extra_edge_data = {} # Edge position -> attributes other than 'weight' and 'cardinal'
+    for edge_position, (u, v, edge_data) in enumerate(_edges_in_insertion_order(campus_graph, node_index)):
+        edge_sources.append(node_index[u])
+        edge_targets.append(node_index[v])
+        edge_weights.append(edge_data.get('weight', float('inf')))
+        edge_cardinal.append(int(edge_data['cardinal']) if 'cardinal' in edge_data else -1)
+        if set(edge_data) - {'cardinal'} != {'weight'}:
+            extra_edge_data[edge_position] = dict(edge_data)
+
+    artifact = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'graph_key': graph_key,
+        'floor_hashes': floor_hashes or {},
+        'graph_attributes': dict(campus_graph.graph),
+        'node_ids': node_ids,
+        'attribute_names': attribute_names,
+        'node_rows': node_rows,
+        'edge_sources': edge_sources,
+        'edge_targets': edge_targets,
+        'edge_weights': edge_weights,
+        'edge_cardinal': edge_cardinal,
+        'extra_edge_data': extra_edge_data,
+        'attachments': attachments or {},
+    }
+    return _write_artifact(artifact, artifact_path)
+
+def _write_artifact(artifact, artifact_path):
+    """ Writes an artifact dictionary to a temporary path first and then moves it into place. """
+    os.makedirs(os.path.dirname(os.path.abspath(artifact_path)), exist_ok=True)
+    temporary_path = f"{artifact_path}.tmp{os.getpid()}"
+    with open(temporary_path, 'wb') as artifact_file:
+        pickle.dump(artifact, artifact_file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, artifact_path)
+    return artifact_path
+
+def save_precomputed(data, path, format_version, graph_key):
+    """
+    Writes data precomputed from one campus graph (landmarks, route tables, ...) with its format version and graph key.
+
+    :param data: Dictionary of the fields to store.
+    :param path: Where to write it.
+    :param format_version: Format version of the module writing it.
+    :param graph_key: Key of the campus graph it was computed on.
+    :return: str: The path.
+    """
+
+    return _write_artifact(dict(data, format_version=format_version, graph_key=graph_key), path)
+
+def load_precomputed(path, format_version, graph_key, description):
+    """
+    Reads data written by save_precomputed if it has the format version and graph key expected.
+
+    :param path: Path of the saved data.
+    :param format_version: Current format version of the module reading it.
+    :param graph_key: Key of the current campus graph (graph.graph['graph_key']).
+    :param description: What the data is, for the warnings (e.g. "landmarks").
+    :return: dict or None if missing, unreadable, of an old format or computed on another graph.
+    """
+
+    if graph_key is None or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as data_file:
+            data = pickle.load(data_file)
+    except Exception:
+        logger.warning("Could not read %s %s, ignoring it.", description, path, exc_info=True)
+        return None
+
+    if not isinstance(data, dict) or data.get('format_version') != format_version:
+        logger.info("Ignoring %s %s: old format.", description, path)
+        return None
+    if data.get('graph_key') != graph_key:
+        logger.info("Ignoring %s %s: computed on another campus graph.", description, path)
+        return None
+    return data
+
+def load_or_build_precomputed(campus_graph, path, load, build, save, summary):
+    """
+    Returns the saved data of a campus graph, computing and saving it if needed.
+
+    :param campus_graph: The NetworkX campus graph.
+    :param path: Where the data is kept (None never reads or writes a file).
+    :param load: Function (path, graph_key) -> data or None.
+    :param build: Function () -> data, computing it from campus_graph.
+    :param save: Function (data, path) writing it.
+    :param summary: Function data -> short description for the log (e.g. "8 landmarks").
+    :return: The loaded or computed data.
+    """
+
+    graph_key = campus_graph.graph.get('graph_key')
+    if path:
+        data = load(path, graph_key)
+        if data is not None:
+            return data
+
+    build_start = time.perf_counter()
+    data = build()
+    logger.info("Computed %s in %.2f s.", summary(data), time.perf_counter() - build_start)
+    if path and graph_key is not None:
+        try:
+            save(data, path)
+        except OSError as e:
+            logger.warning("Could not save %s to %s: %s", summary(data), path, e)
+    return data
+
+def precompute_main(argv, description, default_output, build, save, summary, add_arguments=None):
+    """
+    Batch job computing data from the campus graph and saving it (python -m landmarks, python -m route_table, ...).
+
+    :param argv: Command line arguments (None reads sys.argv).
+    :param description: Description shown by --help.
+    :param default_output: Default of --output.
+    :param build: Function (campus_graph, args) -> data.
+    :param save: Function (data, path) writing it.
+    :param summary: Function data -> short description for the output (e.g. "8 landmarks").
+    :param add_arguments: Optional function adding the job's own arguments to the parser.
+    :return: int: Exit status.
+    """
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--directory', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"),
+                        help="Directory containing the floor SVG files.")
+    parser.add_argument('--artifact', default=DEFAULT_ARTIFACT_PATH, help="Compiled campus graph to use.")
+    parser.add_argument('--output', default=default_output, help="Where to write the result.")
+    parser.add_argument('--workers', type=int, default=None, help="Processes used by the job (default: one per CPU).")
+    parser.add_argument('--coarsen', action='store_true', help="Use the coarsened campus graph.")
+    if add_arguments is not None:
+        add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    campus_graph = load_or_build_campus_graph(directory=args.directory, artifact_path=args.artifact,
+                                              workers=args.workers, coarsen=args.coarsen)
+    if campus_graph is None:
+        print("ERROR: Campus graph could not be loaded.")
+        return 1
+
+    build_start = time.perf_counter()
+    data = build(campus_graph, args)
+    save(data, args.output)
+    print(f"Wrote {summary(data)} to {args.output} "
+          f"({os.path.getsize(args.output) / 1024:.0f} KiB, {time.perf_counter() - build_start:.1f} s).")
+    return 0
+
+def read_graph_artifact(artifact_path=DEFAULT_ARTIFACT_PATH, graph_key=None):
+    """
+    Reads the raw artifact dictionary, checking it matches the expected content hash.
+
+    :param artifact_path: Path of the artifact.
+    :param graph_key: Expected content hash (None accepts any artifact).
+    :return: dict or None: The artifact, or None if it is missing, stale or unreadable.
+    """
+
+    if not os.path.exists(artifact_path):
+        return None
+    try:
+        with open(artifact_path, 'rb') as artifact_file:
+            artifact = pickle.load(artifact_file)
+    except Exception:
+        logger.warning("Could not read graph artifact %s, ignoring it.", artifact_path, exc_info=True)
+        return None
+
+    if not isinstance(artifact, dict) or artifact.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        logger.info("Graph artifact %s has an old format, ignoring it.", artifact_path)
+        return None
+    if graph_key is not None and artifact.get('graph_key') != graph_key:
+        logger.info("Graph artifact %s is stale (SVG files or parser parameters changed).", artifact_path)
+        return None
+    return artifact
+
+def read_artifact_attachment(artifact_path, graph_key, name):
+    """
+    Reads data stored with the graph artifact (see save_graph_artifact).
+
+    :param artifact_path: Path of the artifact.
+    :param graph_key: Content hash the artifact must have.
+    :param name: Name of the attachment.
+    :return: The attachment, or None if it or a matching artifact is missing.
+    """
+
+    artifact = read_graph_artifact(artifact_path, graph_key)
+    if artifact is None:
+        return None
+    return artifact.get('attachments', {}).get(name)
+
+def save_artifact_attachment(artifact_path, graph_key, name, data):
+    """
+    Stores data with an existing graph artifact, replacing any attachment of the same name.
+    The attachment is dropped with the artifact when the graph is rebuilt.
+
+    :param artifact_path: Path of the artifact.
+    :param graph_key: Content hash the artifact must have.
+    :param name: Name of the attachment.
+    :param data: Picklable data to store.
+    :return: bool: True if the attachment was written, False if there is no matching artifact or it could not be written.
+    """
+
+    artifact = read_graph_artifact(artifact_path, graph_key)
+    if artifact is None:
+        return False
+    artifact.setdefault('attachments', {})[name] = data
+    try:
+        _write_artifact(artifact, artifact_path)
+    except OSError as e:
+        logger.warning("Could not write graph artifact %s: %s", artifact_path, e)
+        return False
+    return True
+
+def _edge_data(extra_edge_data, edge_position, weight, cardinal):
+    """ :return: dict: Attributes of the edge at edge_position in a loaded artifact. """
+    if edge_position in extra_edge_data:
+        return extra_edge_data[edge_position]
+    return {'weight': weight} if cardinal < 0 else {'weight': weight, 'cardinal': bool(cardinal)}
+
+def graph_from_artifact(artifact):
+    """
+    Rebuilds the NetworkX campus graph from an artifact dictionary.
+
+    :param artifact: Dictionary returned by read_graph_artifact.
+    :return: networkx.Graph: The campus graph, with the original node and neighbour order.
+    """
+
+    node_ids = artifact['node_ids']
+    attribute_names = artifact['attribute_names']
+    extra_edge_data = artifact['extra_edge_data']
+
+    campus_graph = nx.Graph(**artifact['graph_attributes'])
+    campus_graph.add_nodes_from(
+        (node_id, row if isinstance(row, dict) else dict(zip(attribute_names, row)))
+        for node_id, row in zip(node_ids, artifact['node_rows'])
+    )
+    campus_graph.add_edges_from(
+        (node_ids[u], node_ids[v], _edge_data(extra_edge_data, edge_position, weight, cardinal))
+        for edge_position, (u, v, weight, cardinal) in enumerate(zip(artifact['edge_sources'], artifact['edge_targets'],
+                                                                     artifact['edge_weights'], artifact['edge_cardinal']))
+    )
+    return campus_graph
+
+def load_graph_artifact(artifact_path=DEFAULT_ARTIFACT_PATH, graph_key=None):
+    """
+    Loads a compiled campus graph.
+
+    :param artifact_path: Path of the artifact.
+    :param graph_key: Expected content hash (None accepts any artifact).
+    :return: networkx.Graph or None if the artifact is missing, stale or unreadable.
+    """
+
+    artifact = read_graph_artifact(artifact_path, graph_key)
+    if artifact is None:
+        return None
+    return graph_from_artifact(artifact)
+
+def load_or_build_campus_graph(directory="static", artifact_path=DEFAULT_ARTIFACT_PATH,
+                               inter_floor_weight=DEFAULT_INTER_FLOOR_WEIGHT, workers=1, coarsen=False, build=True):
+    """
+    Loads the compiled campus graph if it matches the current SVG files and parser parameters,
+    otherwise builds it with create_campus_graph and refreshes the artifact.
+
+    :param directory: Directory containing the floor SVG files.
+    :param artifact_path: Path of the artifact (None disables the cache).
+    :param inter_floor_weight: Weight used for inter-floor connection edges.
+    :param workers: Number of processes parsing floors on a rebuild.
+    :param coarsen: Build (and cache) the coarsened graph.
+    :param build: Parse the SVG files when there is no current artifact (False returns None instead).
+    :return: networkx.Graph or None if the graph could not be built. The content hash is in graph.graph['graph_key']
+             and the hash of every floor SVG in graph.graph['floor_hashes'].
+    """
+
+    graph_key, floor_hashes = compute_graph_key(directory, inter_floor_weight, coarsen=coarsen)
+    if artifact_path is None:
+        if not build:
+            return None
+        campus_graph = create_campus_graph(directory=directory, inter_floor_weight=inter_floor_weight, workers=workers,
+                                           coarsen=coarsen)
+        if campus_graph is not None:
+            campus_graph.graph['graph_key'] = graph_key
+            campus_graph.graph['floor_hashes'] = floor_hashes
+        return campus_graph
+
+    load_start = time.perf_counter()
+    campus_graph = load_graph_artifact(artifact_path, graph_key)
+    if campus_graph is not None:
+        logger.info("Loaded compiled campus graph from %s in %.1f ms.", artifact_path, (time.perf_counter() - load_start) * 1000)
+        campus_graph.graph['graph_key'] = graph_key
+        campus_graph.graph['floor_hashes'] = floor_hashes
+        return campus_graph
+
+    if not build:
+        return None
+    campus_graph = create_campus_graph(directory=directory, inter_floor_weight=inter_floor_weight, workers=workers,
+                                       coarsen=coarsen)
+    if campus_graph is not None:
+        # Structures precomputed from this graph (e.g. route tables) are tied to its key
+        campus_graph.graph['graph_key'] = graph_key
+        campus_graph.graph['floor_hashes'] = floor_hashes
+        try:
+            save_graph_artifact(campus_graph, artifact_path, graph_key, floor_hashes)
+            logger.info("Saved compiled campus graph to %s.", artifact_path)
+        except OSError as e:
+            logger.warning("Could not write graph artifact %s: %s", artifact_path, e)
+    return campus_graph
+
+def reload_changed_floors(campus_graph, directory="static", floors=(), artifact_path=DEFAULT_ARTIFACT_PATH,
+                          inter_floor_weight=DEFAULT_INTER_FLOOR_WEIGHT, streaming=True):
+    """
+    Re-parses the floor SVGs that changed since campus_graph was built (plus any floors asked for)
+    and builds a new campus graph with only those floors replaced (see replace_floor).
+    Every changed floor is reloaded, so the new graph always matches its graph key.
+    The artifact is refreshed for the new key; campus_graph itself is not modified.
+
+    :param campus_graph: Uncoarsened graph returned by load_or_build_campus_graph.
+    :param directory: Directory containing the floor SVG files.
+    :param floors: Floor letters to reload even if their file did not change.
+    :param artifact_path: Path of the artifact (None disables saving it).
+    :param inter_floor_weight: Weight used for inter-floor connection edges.
+    :param streaming: Use the streaming rect extractor.
+    :return: tuple: (new campus graph, list of reloaded floor letters); (campus_graph, []) if nothing changed.
+    :raises ValueError: If a floor is unknown, the graph does not record its floor hashes, or a floor cannot be parsed.
+    """
+
+    floor_filenames = dict(FLOOR_FILES)
+    unknown_floors = [floor_letter for floor_letter in floors if floor_letter not in floor_filenames]
+    if unknown_floors:
+        raise ValueError(f"Unknown floors: {', '.join(unknown_floors)}.")
+    old_hashes = campus_graph.graph.get('floor_hashes')
+    if old_hashes is None:
+        raise ValueError("The campus graph does not record the floor files it was built from, rebuild it in full.")
+
+    graph_key, floor_hashes = compute_graph_key(directory, inter_floor_weight)
+    reload_floors = [floor_letter for floor_letter, _ in FLOOR_FILES
+                     if floor_letter in floors or floor_hashes[floor_letter] != old_hashes.get(floor_letter)]
+    if not reload_floors:
+        return campus_graph, []
+
+    reload_start = time.perf_counter()
+    new_graph = campus_graph
+    for floor_letter in reload_floors:
+        floor_graph = svg_map_parse(os.path.join(directory, floor_filenames[floor_letter]), floor_letter, streaming=streaming)
+        if floor_graph is None:
+            raise ValueError(f"Floor {floor_letter} could not be parsed, keeping the current graph.")
+        new_graph = replace_floor(new_graph, floor_letter, floor_graph, inter_floor_weight)
+    new_graph.graph['graph_key'] = graph_key
+    new_graph.graph['floor_hashes'] = floor_hashes
+    logger.info("Reloaded floors %s in %.1f ms.", ', '.join(reload_floors), (time.perf_counter() - reload_start) * 1000)
+
+    if artifact_path is not None:
+        try:
+            save_graph_artifact(new_graph, artifact_path, graph_key, floor_hashes)
+        except OSError as e:
+            logger.warning("Could not write graph artifact %s: %s", artifact_path, e)
+    return new_graph, reload_floors
+
+def main(argv=None):
+    """ Offline compile step: python -m graph_artifact [--directory static] [--output path] """
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(description="Compile the campus graph from the floor SVG files.")
+    parser.add_argument('--directory', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"),
+                        help="Directory containing the floor SVG files.")
+    parser.add_argument('--output', default=DEFAULT_ARTIFACT_PATH, help="Where to write the compiled graph.")
+    parser.add_argument('--workers', type=int, default=None, help="Processes used to parse floors (default: one per CPU).")
+    parser.add_argument('--coarsen', action='store_true', help="Compile the coarsened graph (see graph_coarsening).")
+    parser.add_argument('--force', action='store_true', help="Rebuild even if the artifact is up to date.")
+    parser.add_argument('--contract', action='store_true',
+                        help="Also build the contraction hierarchy and store it with the graph.")
+    args = parser.parse_args(argv)
+
+    graph_key, floor_hashes = compute_graph_key(args.directory, coarsen=args.coarsen)
+    if not args.force and read_graph_artifact(args.output, graph_key) is not None:
+        print(f"Compiled campus graph {args.output} is up to date.")
+    else:
+        campus_graph = create_campus_graph(directory=args.directory, workers=args.workers, coarsen=args.coarsen)
+        if campus_graph is None:
+            print("ERROR: Campus graph could not be built.")
+            return 1
+        save_graph_artifact(campus_graph, args.output, graph_key, floor_hashes)
+        print(f"Compiled campus graph written to {args.output} ({os.path.getsize(args.output) / 1024:.0f} KiB).")
+
+    if args.contract:
+        from contraction_hierarchy import load_or_build_contraction_hierarchy
+        campus_graph = load_graph_artifact(args.output, graph_key)
+        campus_graph.graph['graph_key'] = graph_key
+        load_or_build_contraction_hierarchy(campus_graph, artifact_path=args.output)
+        print(f"Compiled campus graph with contraction hierarchy: {os.path.getsize(args.output) / 1024:.0f} KiB.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
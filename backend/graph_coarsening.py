@@ -0,0 +1,93 @@
+import math
+import logging
+from collections import deque
+from a_star_pathfinding import get_node_category, is_cardinal_move
+
+logger = logging.getLogger(__name__)
+
+def _node_center(node_data):
+    """ :return: tuple: (center_x, center_y) with NaN for missing coordinates. """
+    center_x = node_data.get('center_x')
+    center_y = node_data.get('center_y')
+    return (center_x if center_x is not None else math.nan,
+            center_y if center_y is not None else math.nan)
+
+def _is_straight_move(node1_data, node2_data):
+    """ :return: bool: True if pathfinding would allow moving directly between the two nodes. """
+    x1, y1 = _node_center(node1_data)
+    x2, y2 = _node_center(node2_data)
+    return is_cardinal_move(x1, y1, x2, y2, node1_data.get('floor') != node2_data.get('floor'))
+
+def coarsen_graph(campus_graph):
+    """
+    Shrinks the campus graph without changing any room-to-room shortest path length:
+      1. Removes obstacle nodes (pathfinding never enters them) and their edges.
+      2. Removes edges pathfinding never uses (diagonal same-floor moves, missing weights).
+      3. Removes walkable dead ends, which can't lie on a path between two other nodes.
+      4. Collapses straight walkable corridor chains: a walkable node with exactly two neighbours
+         is replaced by one edge between them (weight = sum of both edges) when that edge is itself
+         a straight horizontal/vertical move, so the drawn route and its length stay the same.
+
+    Blocks of walkable tiles are not merged into bigger cells, as that would change
+    the centre-to-centre distances the edge weights are based on.
+
+    :param campus_graph: The NetworkX graph representing the campus map (left unchanged).
+    :return: networkx.Graph: The coarsened copy, with the reduction report in graph.graph['coarsening'].
+    """
+
+    coarse_graph = campus_graph.copy()
+    nodes_before = coarse_graph.number_of_nodes()
+    edges_before = coarse_graph.number_of_edges()
+
+    # 1. Obstacles
+    obstacle_nodes = [node_id for node_id, node_data in coarse_graph.nodes(data=True)
+                      if get_node_category(node_data) == 'obstacle']
+    coarse_graph.remove_nodes_from(obstacle_nodes)
+
+    # 2. Edges that are never traversable
+    unused_edges = [(u, v) for u, v, edge_data in coarse_graph.edges(data=True)
+                    if edge_data.get('weight', math.inf) == math.inf
+                    or not _is_straight_move(coarse_graph.nodes[u], coarse_graph.nodes[v])]
+    coarse_graph.remove_edges_from(unused_edges)
+
+    # 3 + 4. Dead ends and straight chains (repeat until nothing changes)
+    dead_ends_removed = 0
+    chain_nodes_collapsed = 0
+    pending = deque(node_id for node_id, node_data in coarse_graph.nodes(data=True)
+                    if get_node_category(node_data) == 'walkable')
+    while pending:
+        node_id = pending.popleft()
+        if node_id not in coarse_graph:
+            continue
+        neighbors = list(coarse_graph.adj[node_id])
+
+        if len(neighbors) <= 1:
+            coarse_graph.remove_node(node_id)
+            dead_ends_removed += 1
+        elif len(neighbors) == 2:
+            node1, node2 = neighbors
+            if not _is_straight_move(coarse_graph.nodes[node1], coarse_graph.nodes[node2]):
+                continue # Corner, keep the turning point
+            chain_weight = coarse_graph[node1][node_id]['weight'] + coarse_graph[node_id][node2]['weight']
+            if not coarse_graph.has_edge(node1, node2) or coarse_graph[node1][node2]['weight'] > chain_weight:
+                coarse_graph.add_edge(node1, node2, weight=chain_weight)
+            coarse_graph.remove_node(node_id)
+            chain_nodes_collapsed += 1
+        else:
+            continue
+
+        # Neighbours may have become dead ends or chain links themselves
+        pending.extend(neighbor_id for neighbor_id in neighbors
+                       if get_node_category(coarse_graph.nodes[neighbor_id]) == 'walkable')
+
+    report = {
+        'nodes_before': nodes_before, 'nodes_after': coarse_graph.number_of_nodes(),
+        'edges_before': edges_before, 'edges_after': coarse_graph.number_of_edges(),
+        'obstacles_removed': len(obstacle_nodes), 'unused_edges_removed': len(unused_edges),
+        'dead_ends_removed': dead_ends_removed, 'chain_nodes_collapsed': chain_nodes_collapsed,
+    }
+    coarse_graph.graph['coarsening'] = report
+    logger.info("Coarsened graph: %d -> %d nodes, %d -> %d edges (%d obstacles, %d dead ends, %d chain nodes removed).",
+                nodes_before, report['nodes_after'], edges_before, report['edges_after'], len(obstacle_nodes),
+                dead_ends_removed, chain_nodes_collapsed)
+    return coarse_graph
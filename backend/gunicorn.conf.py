@@ -0,0 +1,17 @@
+# gunicorn settings of the backend: gunicorn -c gunicorn.conf.py wsgi:app (see wsgi.py)
+import os
+
+bind = os.environ.get('CAMPUS_NAV_BIND', '0.0.0.0:5000')
+# Searches are CPU bound, one worker per CPU
+workers = int(os.environ.get('CAMPUS_NAV_WORKERS', os.cpu_count() or 1))
+# Load the campus graph in the master before forking, the workers share its memory copy-on-write
+preload_app = True
+
+def on_starting(server):
+    # Runs once per server start, before any worker exists: the changes of earlier servers are never replayed
+    from app import compact_shared_changes
+    compact_shared_changes()
+
+def post_fork(server, worker):
+    from app import after_fork
+    after_fork()
@@ -0,0 +1,198 @@
+import os
+import os.path
+import sys
+import math
+from array import array
+from csr_graph import CSRGraph, csr_dijkstra
+from graph_artifact import save_precomputed, load_precomputed, load_or_build_precomputed, precompute_main
+
+DEFAULT_LANDMARK_COUNT = 8
+DEFAULT_LANDMARKS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiled", "landmarks.bin")
+LANDMARKS_FORMAT_VERSION = 1
+
+class Landmarks:
+    """
+    ALT (A*, landmarks, triangle inequality) preprocessing of the campus graph.
+
+    For every landmark L the shortest traversable distance d(L, v) to every node v is stored.
+    Allowed moves between non-obstacle nodes go both ways with the same weight, so by the triangle
+    inequality |d(L, goal) - d(L, v)| never overestimates d(v, goal). The largest of these bounds over
+    all landmarks is an admissible and consistent heuristic that also accounts for floors: the stored
+    distances already include the walk to the stairs or elevator.
+    """
+
+    def __init__(self, graph_key, node_ids, landmark_nodes, distances):
+        """
+        :param graph_key: Key of the campus graph the landmarks were computed on.
+        :param node_ids: Node IDs in graph order (distance arrays are indexed by this order).
+        :param landmark_nodes: Node index of every landmark.
+        :param distances: One array('d') of distances per landmark (math.inf where unreachable).
+        """
+
+        self.graph_key = graph_key
+        self.node_ids = node_ids
+        self.node_index = {node_id: index for index, node_id in enumerate(node_ids)}
+        self.landmark_nodes = landmark_nodes
+        self.distances = distances
+
+    def __len__(self):
+        return len(self.landmark_nodes)
+
+    def goal_heuristic(self, goal):
+        """
+        Prepares the lower bound function for one search.
+
+        :param goal: Index of the goal node.
+        :return: function: node index -> lower bound of the distance from that node to the goal.
+        """
+
+        infinity = math.inf
+        # Landmarks that cannot reach the goal give no bound
+        tables = [(distances, distances[goal]) for distances in self.distances if distances[goal] != infinity]
+
+        def lower_bound(node):
+            best = 0.0
+            for distances, goal_distance in tables:
+                node_distance = distances[node]
+                if node_distance != infinity:
+                    bound = node_distance - goal_distance
+                    if bound < 0.0:
+                        bound = -bound
+                    if bound > best:
+                        best = bound
+            return best
+
+        return lower_bound
+
+    def goal_heuristic_by_id(self, goal_node_id):
+        """
+        Same as goal_heuristic, for searches working on node IDs (pathfinding_algo).
+
+        :param goal_node_id: ID of the goal node.
+        :return: function: node ID -> lower bound of the distance from that node to the goal.
+        """
+
+        node_index = self.node_index
+        lower_bound = self.goal_heuristic(node_index[goal_node_id])
+        return lambda node_id: lower_bound(node_index[node_id])
+
+def select_landmarks(csr_graph, landmark_count=DEFAULT_LANDMARK_COUNT):
+    """
+    Picks landmarks with the "farthest" strategy: each new landmark is the node furthest
+    (by traversable distance) from every landmark picked so far, which spreads them over the
+    edges of the campus and across floors. The first one is the node furthest from node 0.
+
+    :param csr_graph: CSRGraph of the campus graph.
+    :param landmark_count: Number of landmarks to pick.
+    :return: tuple: (list of landmark node indices, list of their distance arrays)
+    """
+
+    infinity = math.inf
+    node_count = len(csr_graph)
+    landmark_nodes = []
+    landmark_distances = []
+    if node_count == 0 or landmark_count <= 0:
+        return landmark_nodes, landmark_distances
+
+    # Distance of every node to its closest landmark so far
+    closest_landmark = array('d', [infinity]) * node_count
+    seed_distances, _ = csr_dijkstra(csr_graph, [0])
+    candidate = max(seed_distances, key=seed_distances.get)
+
+    while len(landmark_nodes) < landmark_count:
+        settled, _ = csr_dijkstra(csr_graph, [candidate])
+        distances = array('d', [infinity]) * node_count
+        for node, distance in settled.items():
+            distances[node] = distance
+            if distance < closest_landmark[node]:
+                closest_landmark[node] = distance
+        landmark_nodes.append(candidate)
+        landmark_distances.append(distances)
+
+        # Next landmark: the reachable node furthest from every landmark picked so far
+        next_candidate = None
+        for node in range(node_count):
+            distance = closest_landmark[node]
+            if distance != infinity and distance > 0.0 and (next_candidate is None or distance > closest_landmark[next_candidate]):
+                next_candidate = node
+        if next_candidate is None:
+            break
+        candidate = next_candidate
+
+    return landmark_nodes, landmark_distances
+
+def build_landmarks(campus_graph, csr_graph=None, landmark_count=DEFAULT_LANDMARK_COUNT):
+    """
+    Runs the landmark preprocessing stage.
+
+    :param campus_graph: The NetworkX campus graph (its graph.graph['graph_key'] is stored).
+    :param csr_graph: CSRGraph of campus_graph (built if not given).
+    :param landmark_count: Number of landmarks.
+    :return: Landmarks
+    """
+
+    csr_graph = csr_graph or CSRGraph.from_networkx(campus_graph)
+    landmark_nodes, distances = select_landmarks(csr_graph, landmark_count)
+    return Landmarks(campus_graph.graph.get('graph_key'), list(csr_graph.node_ids), landmark_nodes, distances)
+
+def save_landmarks(landmarks, landmarks_path=DEFAULT_LANDMARKS_PATH):
+    """
+    Writes the landmark distances next to the compiled graph.
+
+    :param landmarks: Landmarks to save.
+    :param landmarks_path: Where to write them.
+    :return: str: The landmarks path.
+    """
+
+    return save_precomputed({
+        'node_ids': landmarks.node_ids,
+        'landmark_nodes': landmarks.landmark_nodes,
+        'distances': landmarks.distances,
+    }, landmarks_path, LANDMARKS_FORMAT_VERSION, landmarks.graph_key)
+
+def load_landmarks(landmarks_path=DEFAULT_LANDMARKS_PATH, graph_key=None, landmark_count=None):
+    """
+    Loads saved landmarks if they were computed on the graph with the given key.
+
+    :param landmarks_path: Path of the saved landmarks.
+    :param graph_key: Key of the current campus graph (graph.graph['graph_key']).
+    :param landmark_count: Required number of landmarks (None accepts any).
+    :return: Landmarks or None if missing, unreadable, built from another graph or with another count.
+    """
+
+    data = load_precomputed(landmarks_path, LANDMARKS_FORMAT_VERSION, graph_key, "landmarks")
+    if data is None or landmark_count is not None and len(data['landmark_nodes']) != landmark_count:
+        return None
+    return Landmarks(data['graph_key'], data['node_ids'], data['landmark_nodes'], data['distances'])
+
+def _summary(landmarks):
+    """ :return: str: Short description of the landmarks for the log. """
+    return f"{len(landmarks)} landmarks"
+
+def load_or_build_landmarks(campus_graph, csr_graph=None, landmarks_path=DEFAULT_LANDMARKS_PATH,
+                            landmark_count=DEFAULT_LANDMARK_COUNT):
+    """
+    Returns the saved landmarks of this graph, computing and saving them if needed.
+
+    :param campus_graph: The NetworkX campus graph.
+    :param csr_graph: CSRGraph of campus_graph (built if not given).
+    :param landmarks_path: Where the landmarks are kept (None never reads or writes a file).
+    :param landmark_count: Number of landmarks.
+    :return: Landmarks
+    """
+
+    return load_or_build_precomputed(campus_graph, landmarks_path,
+                                     lambda path, graph_key: load_landmarks(path, graph_key, landmark_count),
+                                     lambda: build_landmarks(campus_graph, csr_graph, landmark_count),
+                                     save_landmarks, _summary)
+
+def main(argv=None):
+    """ Batch job: python -m landmarks [--count N] """
+    def add_arguments(parser):
+        parser.add_argument('--count', type=int, default=DEFAULT_LANDMARK_COUNT, help="Number of landmarks.")
+    return precompute_main(argv, "Precompute ALT landmark distances for the campus graph.", DEFAULT_LANDMARKS_PATH,
+                           lambda campus_graph, args: build_landmarks(campus_graph, landmark_count=args.count),
+                           save_landmarks, _summary, add_arguments)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,18 +3,40 @@ import os.path
 import networkx as nx
 import svgelements
 import math
-import traceback
+import logging
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree import ElementTree
+from graph_coarsening import coarsen_graph
+from a_star_pathfinding import annotate_traversal_rules
+
+logger = logging.getLogger(__name__)
 
 DEFAULT_CONNECTION_TOLERANCE = 100.0
 DEFAULT_INTER_FLOOR_WEIGHT = 2.0
+DEFAULT_ADJACENCY_TOLERANCE = 1.5
+
+# Floor letters and their SVG files, in the order adjacent floors are connected
+FLOOR_FILES = [
+    ('A', 'Floor_A.svg'), ('B', 'Floor_B.svg'), ('C', 'Floor_C.svg'),
+    ('D', 'Floor_D.svg'), ('E', 'Floor_E.svg'), ('F', 'Floor_F.svg'),
+    ('G', 'Floor_G.svg'), ('H', 'Floor_H.svg')
+]
+
+# Stairs and elevator SVG IDs start with these (case-insensitive), matching IDs on adjacent floors are connected
+CONNECTION_ID_PREFIXES = ['stairs', 'elevator']
 
-def svg_map_parse(svg_map_path, floor_letter):
+# SVG containers whose rects are never rendered (svgelements doesn't return them)
+NON_RENDERED_CONTAINERS = {'defs', 'clipPath', 'mask', 'pattern', 'marker', 'symbol'}
+
+def svg_map_parse(svg_map_path, floor_letter, streaming=True):
     """
     Parses an SVG file, extracts rectangular elements, adds them as nodes
     to a graph, and connects adjacent nodes on the same floor.
 
     :param svg_map_path: Path to the SVG file.
     :param floor_letter: The letter representing the floor (e.g., 'A', 'B').
+    :param streaming: Read rects with the streaming extractor, falling back to svgelements when needed.
     :return: networkx.Graph or None if parsing fails.
     """
     graph = nx.Graph()
@@ -22,95 +44,227 @@ def svg_map_parse(svg_map_path, floor_letter):
     rects_list = []
 
     if not os.path.exists(svg_map_path):
-        print(f"Error: SVG file not found: {svg_map_path}")
-        return None
-    try:
-        svg = svgelements.SVG.parse(svg_map_path)
-    except Exception as e:
-        print(f"Error parsing SVG file: {svg_map_path}")
-        print(traceback.format_exc())
+        logger.error("SVG file not found: %s", svg_map_path)
         return None
 
+    svg_rects = None
+    if streaming:
+        try:
+            svg_rects = list(iter_svg_rects(svg_map_path))
+            # Nested transforms are only realised by the full svgelements parse
+            if any(transform is not None for *_, transform in svg_rects):
+                svg_rects = None
+        except ValueError:
+            svg_rects = None # Content the streaming extractor doesn't handle
+        except Exception:
+            logger.exception("Error parsing SVG file: %s", svg_map_path)
+            return None
+
+    if svg_rects is None:
+        try:
+            svg_rects = list(_svgelements_rects(svg_map_path))
+        except Exception:
+            logger.exception("Error parsing SVG file: %s", svg_map_path)
+            return None
+
     element_count = 0
-    print(f"    Reading elements for Floor {floor_letter}...")
-    for element in svg.elements():
-        # Process only rectangle elements
-        if isinstance(element, svgelements.Rect):
-            element_count += 1
-            svg_id = None
-            cost_value = 1.0 # Default cost/weight
-
-            # Extract attributes safely
-            element_x = float(getattr(element, 'x', 0.0))
-            element_y = float(getattr(element, 'y', 0.0))
-            element_width = float(getattr(element, 'width', 0.0))
-            element_height = float(getattr(element, 'height', 0.0))
-
-            # Get the SVG ID - skip element if it has no ID or empty ID
-            if hasattr(element, 'id') and element.id:
-                svg_id = element.id.strip()
-                if not svg_id:
-                    # print(f"Warning: Skipping Rect with empty ID in {svg_map_path}") # Less verbose
-                    continue
-            else:
-                # print(f"Warning: Skipping Rect without ID in {svg_map_path}") # Less verbose
+    logger.debug("Reading elements for Floor %s...", floor_letter)
+    for element_id, element_x, element_y, element_width, element_height, _ in svg_rects:
+        element_count += 1
+        svg_id = None
+        cost_value = 1.0 # Default cost/weight
+
+        # Get the SVG ID - skip element if it has no ID or empty ID
+        if element_id:
+            svg_id = element_id.strip()
+            if not svg_id:
+                # print(f"Warning: Skipping Rect with empty ID in {svg_map_path}") # Less verbose
                 continue
-
-            # Generate unique node ID
-            unique_node_id = f"{floor_letter}_{svg_id}_{element_x:.1f}_{element_y:.1f}_{element_count}"
-            center_x = element_x + element_width / 2
-            center_y = element_y + element_height / 2
-
-            # Node data dictionary
-            node_data = {
-                'x': element_x, 'y': element_y,
-                'width': element_width, 'height': element_height,
-                'center_x': center_x, 'center_y': center_y,
-                'type': svg_id,  # Use original SVG ID as 'type'
-                'cost': cost_value,
-                'svg_id': svg_id,  # Store original svg id explicitly
-                'floor': floor_letter
-            }
-
-            # Add node to the graph
-            if unique_node_id in graph:
-                 print(f"Warning: Duplicate node ID generated: {unique_node_id}. Check SVG elements.")
-            graph.add_node(unique_node_id, **node_data)
-            nodes_dict[unique_node_id] = node_data
-            rects_list.append((unique_node_id, node_data))
-    print(f"    Found {len(rects_list)} rectangle elements for Floor {floor_letter}.")
+        else:
+            # print(f"Warning: Skipping Rect without ID in {svg_map_path}") # Less verbose
+            continue
+
+        # Generate unique node ID
+        unique_node_id = f"{floor_letter}_{svg_id}_{element_x:.1f}_{element_y:.1f}_{element_count}"
+        center_x = element_x + element_width / 2
+        center_y = element_y + element_height / 2
+
+        # Node data dictionary
+        node_data = {
+            'x': element_x, 'y': element_y,
+            'width': element_width, 'height': element_height,
+            'center_x': center_x, 'center_y': center_y,
+            'type': svg_id,  # Use original SVG ID as 'type'
+            'cost': cost_value,
+            'svg_id': svg_id,  # Store original svg id explicitly
+            'floor': floor_letter
+        }
+
+        # Add node to the graph
+        if unique_node_id in graph:
+             logger.warning("Duplicate node ID generated: %s. Check SVG elements.", unique_node_id)
+        graph.add_node(unique_node_id, **node_data)
+        nodes_dict[unique_node_id] = node_data
+        rects_list.append((unique_node_id, node_data))
+    logger.debug("Found %d rectangle elements for Floor %s.", len(rects_list), floor_letter)
 
     # --- Add Edges Between Adjacent Rectangles on the SAME Floor ---
     edge_count = 0
-    print(f"    Checking adjacency for Floor {floor_letter}...")
-    for i in range(len(rects_list)):
-        for j in range(i + 1, len(rects_list)):
-            node_id1, rect1_data = rects_list[i]
-            node_id2, rect2_data = rects_list[j]
-
-            type1_lower = rect1_data.get('type','').lower()
-            type2_lower = rect2_data.get('type','').lower()
-
-            # Don't connect two obstacle nodes
-            if 'obstacle' in type1_lower and 'obstacle' in type2_lower:
-               continue
-
-            # Check adjacency using the helper function
-            if are_adjacent(rect1_data, rect2_data):
-                center_x1, center_y1 = rect1_data['center_x'], rect1_data['center_y']
-                center_x2, center_y2 = rect2_data['center_x'], rect2_data['center_y']
-                distance = math.sqrt((center_x1 - center_x2)**2 + (center_y1 - center_y2)**2)
-                edge_weight = max(distance, 0.1) # Use distance as weight, ensure non-zero
-
-                # Add edge if it doesn't already exist
-                if not graph.has_edge(node_id1, node_id2):
-                    graph.add_edge(node_id1, node_id2, weight=edge_weight)
-                    edge_count += 1
-
-    print(f"    Added {edge_count} same-floor edges for Floor {floor_letter}.")
+    logger.debug("Checking adjacency for Floor %s...", floor_letter)
+    is_obstacle = ['obstacle' in rect_data.get('type', '').lower() for _, rect_data in rects_list]
+    for i, j in find_adjacent_pairs(rects_list):
+        # Don't connect two obstacle nodes
+        if is_obstacle[i] and is_obstacle[j]:
+            continue
+
+        node_id1, rect1_data = rects_list[i]
+        node_id2, rect2_data = rects_list[j]
+        center_x1, center_y1 = rect1_data['center_x'], rect1_data['center_y']
+        center_x2, center_y2 = rect2_data['center_x'], rect2_data['center_y']
+        distance = math.sqrt((center_x1 - center_x2)**2 + (center_y1 - center_y2)**2)
+        edge_weight = max(distance, 0.1) # Use distance as weight, ensure non-zero
+
+        # Add edge if it doesn't already exist
+        if not graph.has_edge(node_id1, node_id2):
+            graph.add_edge(node_id1, node_id2, weight=edge_weight)
+            edge_count += 1
+
+    logger.debug("Added %d same-floor edges for Floor %s.", edge_count, floor_letter)
     return graph
 
-def are_adjacent(rect1, rect2, tolerance=1.5):
+def iter_svg_rects(svg_map_path):
+    """
+    Streams the rect geometry out of an SVG file using incremental XML parsing,
+    without building the full svgelements DOM. Finished elements are discarded
+    as soon as they are read, so memory stays flat for large floor plans.
+
+    Raises ValueError for content only the full svgelements parse handles
+    correctly (<use> references, hidden rects, non-numeric lengths, viewport
+    scaling or a root transform svgelements would bake into the coordinates).
+
+    :param svg_map_path: Path to the SVG file.
+    :return: generator: (svg_id, x, y, width, height, transform) per rendered rect, where
+             svg_id is None for rects without an ID and transform is the combined transform
+             attribute of the rect and its parent groups (None if there isn't one).
+    """
+
+    element_stack = [] # Open elements (root first)
+    transform_stack = [] # Transform attributes of open elements below the root
+    hidden_depth = 0 # Number of open non-rendered containers
+
+    for event, element in ElementTree.iterparse(svg_map_path, events=('start', 'end')):
+        tag = element.tag.rsplit('}', 1)[-1] # Drop the XML namespace
+
+        if event == 'start':
+            if not element_stack:
+                _check_root_viewport(element)
+            else:
+                transform_stack.append(element.get('transform'))
+            element_stack.append(element)
+
+            if tag in NON_RENDERED_CONTAINERS:
+                hidden_depth += 1
+            elif tag == 'use':
+                raise ValueError(f"<use> elements are not supported by the streaming extractor: {svg_map_path}")
+            elif tag == 'rect' and not hidden_depth:
+                if 'display' in element.get('style', '') or element.get('display') or element.get('visibility'):
+                    raise ValueError(f"Rect visibility styling is not supported by the streaming extractor: {svg_map_path}")
+
+                width = float(element.get('width', 0.0))
+                height = float(element.get('height', 0.0))
+                if width <= 0 or height <= 0:
+                    raise ValueError(f"Rect without a positive size is not supported by the streaming extractor: {svg_map_path}")
+
+                transforms = [transform for transform in transform_stack if transform]
+                yield (
+                    element.get('id'),
+                    float(element.get('x', 0.0)), float(element.get('y', 0.0)),
+                    width, height,
+                    ' '.join(transforms) if transforms else None
+                )
+            continue
+
+        # 'end' event: the element (and all of its children) has been read
+        if tag == 'style' and 'display' in (element.text or ''):
+            raise ValueError(f"CSS display rules are not supported by the streaming extractor: {svg_map_path}")
+        if tag in NON_RENDERED_CONTAINERS:
+            hidden_depth -= 1
+
+        element_stack.pop()
+        if element_stack:
+            transform_stack.pop()
+            element_stack[-1].remove(element) # Free the finished element
+        element.clear()
+
+def _check_root_viewport(root_element):
+    """
+    Makes sure the root <svg> element does not move or scale its rects.
+    svgelements applies root scaling/translation to rect coordinates but leaves
+    rotations (e.g. rotate(-90)) untouched, so only rotations are accepted here.
+
+    :param root_element: The root <svg> XML element.
+    """
+
+    if root_element.get('width') or root_element.get('height'):
+        raise ValueError("Root viewport scaling is not supported by the streaming extractor.")
+
+    root_transform = root_element.get('transform')
+    if root_transform:
+        matrix = svgelements.Matrix(root_transform)
+        is_rotation = matrix.value_skew_x() != 0 or matrix.value_skew_y() != 0
+        if not matrix.is_identity() and not is_rotation:
+            raise ValueError(f"Root transform '{root_transform}' is not supported by the streaming extractor.")
+
+def _svgelements_rects(svg_map_path):
+    """
+    Reads the rect geometry with a full svgelements parse (transforms realised).
+
+    :param svg_map_path: Path to the SVG file.
+    :return: generator: Same tuples as iter_svg_rects, with transform always None.
+    """
+
+    svg = svgelements.SVG.parse(svg_map_path)
+    for element in svg.elements():
+        # Process only rectangle elements
+        if isinstance(element, svgelements.Rect):
+            yield (
+                getattr(element, 'id', None),
+                float(getattr(element, 'x', 0.0)), float(getattr(element, 'y', 0.0)),
+                float(getattr(element, 'width', 0.0)), float(getattr(element, 'height', 0.0)),
+                None
+            )
+
+def find_adjacent_pairs(rects_list, tolerance=DEFAULT_ADJACENCY_TOLERANCE):
+    """
+    Finds every pair of adjacent rectangles using a sort-and-sweep over the x-axis
+    instead of comparing all pairs. Candidates are only taken from rectangles whose
+    left edge falls inside the (tolerance-expanded) x-range of the current one, and
+    each candidate is confirmed with are_adjacent, so the result is the same as the
+    all-pairs loop.
+
+    :param rects_list: List of (node_id, node_data) tuples, in graph insertion order.
+    :param tolerance: How far apart two rectangles can be when checking for neighbours
+    :return: list: Sorted (i, j) index pairs into rects_list with i < j.
+    """
+
+    # Sort rectangle indices by their left edge
+    order = sorted(range(len(rects_list)), key=lambda idx: rects_list[idx][1]['x'])
+    sorted_lefts = [rects_list[idx][1]['x'] for idx in order]
+
+    pairs = []
+    for position, i in enumerate(order):
+        rect1 = rects_list[i][1]
+        # Every later rectangle starting before this one's right edge (+ tolerance) is a candidate
+        sweep_end = bisect_left(sorted_lefts, rect1['x'] + rect1['width'] + tolerance, lo=position + 1)
+        for j in order[position + 1:sweep_end]:
+            if are_adjacent(rect1, rects_list[j][1], tolerance):
+                pairs.append((i, j) if i < j else (j, i))
+
+    # Same order as the nested i < j loop, so edges are inserted identically
+    pairs.sort()
+    return pairs
+
+def are_adjacent(rect1, rect2, tolerance=DEFAULT_ADJACENCY_TOLERANCE):
     """
     Checking is two rectangles are touching, overlapping or very close to each other
 
@@ -132,13 +286,84 @@ def are_adjacent(rect1, rect2, tolerance=1.5):
     # If they are not separated in either direction, they are considered adjacent
     return not (x_separated or y_separated)
 
-def create_campus_graph(directory="static", inter_floor_weight=DEFAULT_INTER_FLOOR_WEIGHT):
+def find_connection_nodes(campus_graph):
+    """
+    :param campus_graph: The NetworkX graph representing the campus map.
+    :return: list: (node ID, node data) of the stairs and elevator nodes (IDs starting with CONNECTION_ID_PREFIXES), in graph order.
+    """
+
+    connection_nodes = []
+    for node_id, data in campus_graph.nodes(data=True):
+        node_type = data.get('type', '') # This is the SVG ID
+        if node_type and any(node_type.lower().startswith(prefix) for prefix in CONNECTION_ID_PREFIXES):
+             connection_nodes.append((node_id, data))
+    return connection_nodes
+
+def connect_floor_pair(campus_graph, connection_nodes, current_floor, next_floor, inter_floor_weight=DEFAULT_INTER_FLOOR_WEIGHT):
+    """
+    Connects the stairs and elevator nodes of two adjacent floors whose IDs match exactly.
+
+    :param campus_graph: The NetworkX graph representing the campus map (modified in place).
+    :param connection_nodes: Output of find_connection_nodes.
+    :param current_floor: Letter of the lower floor.
+    :param next_floor: Letter of the floor above it.
+    :param inter_floor_weight: Weight of the added edges.
+    :return: int: Number of edges added.
+    """
+
+    added = 0
+    logger.debug("Checking connections between Floor %s and Floor %s...", current_floor, next_floor)
+
+    current_floor_connections = [(nid, d) for nid, d in connection_nodes if d.get('floor') == current_floor]
+    next_floor_connections = [(nid, d) for nid, d in connection_nodes if d.get('floor') == next_floor]
+
+    # List the connection nodes per floor (only built when debug logging is on)
+    if logger.isEnabledFor(logging.DEBUG):
+        for floor, floor_connections in ((current_floor, current_floor_connections), (next_floor, next_floor_connections)):
+            logger.debug("Floor %s Connection Nodes (%d): %s", floor, len(floor_connections),
+                         [d.get('type') for nid, d in floor_connections])
+
+    # Compare nodes between the two floors
+    for node1_id, data1 in current_floor_connections:
+        for node2_id, data2 in next_floor_connections:
+            type1 = data1.get('type') # Specific ID like 'stairs_Main'
+            type2 = data2.get('type')
+
+            # Specific IDs must match EXACTLY (case-sensitive)
+            if type1 and type1 == type2:
+                # print(f"      Comparing: {node1_id} (ID: {type1}) <-> {node2_id} (ID: {type2}) - IDs Match") # DEBUG
+
+                cx1, cy1 = data1.get('center_x'), data1.get('center_y')
+                cx2, cy2 = data2.get('center_x'), data2.get('center_y')
+
+                # Check if coordinates exist
+                if all(isinstance(coord, (int, float)) for coord in [cx1, cy1, cx2, cy2]):
+                    # Original distance calculation
+                    dist = math.sqrt((cx1 - cx2) ** 2 + (cy1 - cy2) ** 2)
+
+                    logger.debug("CONNECTING: %s (Floor %s, ID: %s) <-> %s (Floor %s, ID: %s) | Dist: %.2f",
+                                 node1_id, current_floor, type1, node2_id, next_floor, type2, dist)
+
+                    if not campus_graph.has_edge(node1_id, node2_id):
+                        campus_graph.add_edge(node1_id, node2_id, weight=inter_floor_weight)
+                        added += 1
+                else:
+                    logger.warning("Missing coordinates for %s or %s. Cannot connect matching ID '%s' without coordinates.",
+                                   node1_id, node2_id, type1)
+
+    return added
+
+def create_campus_graph(directory="static", inter_floor_weight=DEFAULT_INTER_FLOOR_WEIGHT, streaming=True, workers=1,
+                        coarsen=False):
     """
     Creates a single combined graph for all floors, including inter-floor connections
     based on proximity and matching specific IDs of stairs/elevators.
 
     :param directory: All the SVG files
     :param inter_floor_weight: Default weight for floor connection edge
+    :param streaming: Use the streaming rect extractor when parsing each floor
+    :param workers: Number of processes parsing floors (1 parses in this process, None uses every CPU)
+    :param coarsen: Run coarsen_graph on the result (drops obstacles, collapses straight corridors)
     :return: campus_graph: NetworkX graph combined with all the maps
     """
 
@@ -146,99 +371,125 @@ def create_campus_graph(directory="static", inter_floor_weight=DEFAULT_INTER_FLO
     floor_graphs = {}
     floor_letters = []
 
-    floor_files_ordered = [
-        ('A', 'Floor_A.svg'), ('B', 'Floor_B.svg'), ('C', 'Floor_C.svg'),
-        ('D', 'Floor_D.svg'), ('E', 'Floor_E.svg'), ('F', 'Floor_F.svg'),
-        ('G', 'Floor_G.svg'), ('H', 'Floor_H.svg')
-    ]
-
-    print(f"\n--- Creating Combined Campus Graph from: {directory} ---")
-    #print(f"Using Inter-Floor Weight: {inter_floor_weight}")
+    logger.debug("Creating combined campus graph from %s (inter-floor weight %s).", directory, inter_floor_weight)
 
     # 1. Parse each floor and add to the main graph
-    for floor_letter, floor_filename in floor_files_ordered:
+    parsed_graphs = None
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers > 1:
+        logger.debug("Parsing %d floors in parallel (workers: %d)...", len(FLOOR_FILES), workers)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map() returns results in floor order, so the merged node/edge order is deterministic
+            parsed_graphs = list(executor.map(
+                svg_map_parse,
+                [os.path.join(directory, floor_filename) for _, floor_filename in FLOOR_FILES],
+                [floor_letter for floor_letter, _ in FLOOR_FILES],
+                [streaming] * len(FLOOR_FILES)
+            ))
+
+    for floor_index, (floor_letter, floor_filename) in enumerate(FLOOR_FILES):
         svg_file_path = os.path.join(directory, floor_filename)
-        print(f"  Parsing {svg_file_path}...")
-        graph = svg_map_parse(svg_file_path, floor_letter)
+        if parsed_graphs is None:
+            logger.debug("Parsing %s...", svg_file_path)
+            graph = svg_map_parse(svg_file_path, floor_letter, streaming=streaming)
+        else:
+            graph = parsed_graphs[floor_index]
         if graph is not None and isinstance(graph, nx.Graph):
             floor_graphs[floor_letter] = graph
             floor_letters.append(floor_letter)
-            print(f"    Parsed Floor {floor_letter} ({graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges)")
+            logger.debug("Parsed Floor %s (%d nodes, %d edges)", floor_letter, graph.number_of_nodes(), graph.number_of_edges())
             campus_graph.add_nodes_from(graph.nodes(data=True))
             campus_graph.add_edges_from(graph.edges(data=True))
         else:
-            print(f"    Failed to parse {floor_filename}.")
+            logger.warning("Failed to parse %s, leaving Floor %s out of the campus graph.", floor_filename, floor_letter)
 
     if not campus_graph:
-        print("ERROR: No floors parsed. Cannot create campus graph.")
+        logger.error("No floors parsed. Cannot create campus graph.")
         return None
 
-    print(f"\n  Combined graph: {campus_graph.number_of_nodes()} nodes, {campus_graph.number_of_edges()} edges (before inter-floor).")
+    logger.debug("Combined graph: %d nodes, %d edges (before inter-floor).", campus_graph.number_of_nodes(), campus_graph.number_of_edges())
 
     # 2. Add Inter-Floor Connections
-    print(f"\n  Adding inter-floor connections...")
-    # Identify potential vertical connection nodes by specific ID prefixes
-    connection_ids_prefixes = ['stairs', 'elevator'] # Case-insensitive check below
-
-    connection_nodes = []
-    for node_id, data in campus_graph.nodes(data=True):
-        node_type = data.get('type', '') # This is the SVG ID
-        if node_type and any(node_type.lower().startswith(prefix) for prefix in connection_ids_prefixes):
-             connection_nodes.append((node_id, data))
+    connection_nodes = find_connection_nodes(campus_graph)
 
-    print(f"    Found {len(connection_nodes)} potential connection nodes (stairs/elevators).")
+    logger.debug("Found %d potential connection nodes (stairs/elevators).", len(connection_nodes))
     if not connection_nodes:
-        print("    WARNING: No nodes identified as stairs/elevators based on ID prefixes.")
-        print(f"    Check SVG IDs match prefixes: {connection_ids_prefixes}")
+        logger.warning("No nodes identified as stairs/elevators based on ID prefixes. Check SVG IDs match prefixes: %s",
+                       CONNECTION_ID_PREFIXES)
 
     connection_count = 0
     # Iterate through adjacent floors
     for i in range(len(floor_letters) - 1):
-        current_floor = floor_letters[i]
-        next_floor = floor_letters[i+1]
-        print(f"    Checking connections between Floor {current_floor} and Floor {next_floor}...")
-
-        current_floor_connections = [(nid, d) for nid, d in connection_nodes if d.get('floor') == current_floor]
-        next_floor_connections = [(nid, d) for nid, d in connection_nodes if d.get('floor') == next_floor]
-
-        # DEBUG: List found connection nodes per floor
-        print(f"      Floor {current_floor} Connection Nodes ({len(current_floor_connections)}): {[d.get('type') for nid, d in current_floor_connections]}")
-        print(f"      Floor {next_floor} Connection Nodes ({len(next_floor_connections)}): {[d.get('type') for nid, d in next_floor_connections]}")
-
-        # Compare nodes between the two floors
-        for node1_id, data1 in current_floor_connections:
-            for node2_id, data2 in next_floor_connections:
-                type1 = data1.get('type') # Specific ID like 'stairs_Main'
-                type2 = data2.get('type')
+        connection_count += connect_floor_pair(campus_graph, connection_nodes, floor_letters[i], floor_letters[i + 1],
+                                               inter_floor_weight)
 
-                # Specific IDs must match EXACTLY (case-sensitive)
-                if type1 and type1 == type2:
-                    # print(f"      Comparing: {node1_id} (ID: {type1}) <-> {node2_id} (ID: {type2}) - IDs Match") # DEBUG
-
-                    cx1, cy1 = data1.get('center_x'), data1.get('center_y')
-                    cx2, cy2 = data2.get('center_x'), data2.get('center_y')
-
-                    # Check if coordinates exist
-                    if all(isinstance(coord, (int, float)) for coord in [cx1, cy1, cx2, cy2]):
-                        # Original distance calculation
-                        dist = math.sqrt((cx1 - cx2) ** 2 + (cy1 - cy2) ** 2)
-
-                        # DEBUG for successful connection
-                        print(f"        CONNECTING: {node1_id} (Floor {current_floor}, ID: {type1}) <-> {node2_id} (Floor {next_floor}, ID: {type2}) | Dist: {dist:.2f}")
-
-                        if not campus_graph.has_edge(node1_id, node2_id):
-                            campus_graph.add_edge(node1_id, node2_id, weight=inter_floor_weight)
-                            connection_count += 1
-                    else:
-                        print(f"Warning: Missing coordinates for {node1_id} or {node2_id}. Cannot connect matching ID '{type1}' without coordinates.")
-
-    print(f"  Added {connection_count} inter-floor connection edges.")
-    print(f"--- Finished Creating Campus Graph. Total nodes: {campus_graph.number_of_nodes()}, Total edges: {campus_graph.number_of_edges()} ---")
+    logger.info("Created campus graph from %s: %d floors, %d nodes, %d edges (%d inter-floor).", directory, len(floor_letters),
+                campus_graph.number_of_nodes(), campus_graph.number_of_edges(), connection_count)
 
     if campus_graph.number_of_nodes() == 0:
-        print("ERROR: Final campus graph has no nodes!")
+        logger.error("Final campus graph has no nodes!")
         return None
     if campus_graph.number_of_edges() == 0:
-        print("Warning: Final campus graph has no edges!")
+        logger.warning("Final campus graph has no edges!")
 
+    if coarsen:
+        campus_graph = coarsen_graph(campus_graph)
+
+    # Store node categories and cardinal edge flags for the searches
+    annotate_traversal_rules(campus_graph)
     return campus_graph
+
+def replace_floor(campus_graph, floor_letter, floor_graph, inter_floor_weight=DEFAULT_INTER_FLOOR_WEIGHT, floor_order=None):
+    """
+    Builds a new campus graph with one floor replaced by a freshly parsed floor graph.
+    The other floors are taken over from campus_graph (their parsing and adjacency are not redone),
+    and only the connections between the replaced floor and the floors below and above it are
+    recomputed. Nodes and edges are added in the order create_campus_graph adds them, so the
+    result is the graph a full rebuild would give. campus_graph itself is not modified.
+
+    :param campus_graph: Uncoarsened campus graph built by create_campus_graph.
+    :param floor_letter: Letter of the floor to replace.
+    :param floor_graph: Graph of the floor returned by svg_map_parse.
+    :param inter_floor_weight: Weight for floor connection edges.
+    :param floor_order: Letters of all floors of the complete graph, in order. Floors are only connected if they are
+                        next to each other in it, so a graph still missing floors (see floor_loader) gets no links that
+                        skip them. None connects the floors present, like create_campus_graph.
+    :return: networkx.Graph: The new campus graph (without graph attributes such as 'graph_key').
+    """
+
+    floor_nodes = {}
+    for node_id, node_data in campus_graph.nodes(data=True):
+        floor_nodes.setdefault(node_data.get('floor'), []).append(node_id)
+    floor_letters = [letter for letter, _ in FLOOR_FILES if letter == floor_letter or letter in floor_nodes]
+
+    new_graph = nx.Graph()
+    for letter in floor_letters:
+        if letter == floor_letter:
+            new_graph.add_nodes_from(floor_graph.nodes(data=True))
+            new_graph.add_edges_from(floor_graph.edges(data=True))
+            continue
+        # Runtime state kept on nodes (closures) is not taken over
+        new_graph.add_nodes_from((node_id, {key: value for key, value in campus_graph.nodes[node_id].items() if key != 'closed'})
+                                 for node_id in floor_nodes[letter])
+        new_graph.add_edges_from((node1_id, node2_id, dict(edge_data))
+                                 for node1_id, node2_id, edge_data in campus_graph.edges(floor_nodes[letter], data=True)
+                                 if campus_graph.nodes[node2_id].get('floor') == letter)
+
+    floor_pairs = list(zip(floor_letters, floor_letters[1:]))
+    if floor_order is not None:
+        floor_pairs = [(current_floor, next_floor) for current_floor, next_floor in zip(floor_order, floor_order[1:])
+                       if current_floor in floor_letters and next_floor in floor_letters]
+    connection_nodes = find_connection_nodes(new_graph)
+    for current_floor, next_floor in floor_pairs:
+        if floor_letter in (current_floor, next_floor):
+            connect_floor_pair(new_graph, connection_nodes, current_floor, next_floor, inter_floor_weight)
+            continue
+        # Unchanged pair: copy its edges, lower floor nodes first like connect_floor_pair adds them
+        for node1_id in floor_nodes[current_floor]:
+            for node2_id, edge_data in campus_graph.adj[node1_id].items():
+                if campus_graph.nodes[node2_id].get('floor') == next_floor:
+                    new_graph.add_edge(node1_id, node2_id, **edge_data)
+
+    annotate_traversal_rules(new_graph, node_ids=list(floor_graph.nodes()))
+    return new_graph
@@ -0,0 +1,451 @@
+import os
+import os.path
+import sys
+import copy
+import json
+import math
+import mmap
+import time
+import struct
+import argparse
+import logging
+from array import array
+from csr_graph import CSRGraph
+from room_index import RoomIndex
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAPPED_GRAPH_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiled", "campus_graph.map")
+MAPPED_GRAPH_FORMAT_VERSION = 1
+MAPPED_GRAPH_MAGIC = b'CAMPUSMP'
+# Sections start on 8-byte boundaries so every array can be viewed in place
+SECTION_ALIGNMENT = 8
+# Node attributes stored per node as floats (NaN when the node has none)
+RECT_ATTRIBUTES = ('x', 'y', 'width', 'height', 'center_x', 'center_y')
+
+class _StringTable:
+    """ Read-only sequence of strings stored as one UTF-8 blob and the offsets of each string in it. """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += len(self)
+        return str(self.blob[self.offsets[position]:self.offsets[position + 1]], 'utf-8')
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+    def encoded(self, position):
+        """ :return: bytes: The UTF-8 bytes of a string (compares like the string). """
+        return self.blob[self.offsets[position]:self.offsets[position + 1]].tobytes()
+
+    def bisect(self, text, order=None):
+        """
+        Binary search over the table, which must be sorted (in the given order).
+
+        :param text: String to look for.
+        :param order: Positions of the strings in sorted order (None if the table itself is sorted).
+        :return: int or None: Position of the string, None if it is not in the table.
+        """
+
+        key = text.encode('utf-8')
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self.encoded(order[middle] if order is not None else middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self):
+            position = order[low] if order is not None else low
+            if self.encoded(position) == key:
+                return position
+        return None
+
+class _CachedStringTable(_StringTable):
+    """
+    _StringTable keeping every string it decoded, so the node IDs and types a process hands out
+    (and keeps, e.g. in cached routes) exist once per process instead of once per route.
+    """
+
+    def __init__(self, blob, offsets):
+        super().__init__(blob, offsets)
+        self.decoded = [None] * len(self)
+
+    def __getitem__(self, position):
+        text = self.decoded[position]
+        if text is None:
+            text = self.decoded[position] = super().__getitem__(position)
+        return text
+
+def _aligned(position):
+    return -(-position // SECTION_ALIGNMENT) * SECTION_ALIGNMENT
+
+def _string_table(strings):
+    """ :return: tuple: (blob, offsets) arrays of a list of strings. """
+    blob = bytearray()
+    offsets = array('I', [0])
+    for text in strings:
+        blob += text.encode('utf-8')
+        offsets.append(len(blob))
+    return array('B', blob), offsets
+
+class _NodeIndex:
+    """ Node ID -> node index lookups (binary search over the node ID table), standing in for CSRGraph.node_index. """
+
+    def __init__(self, node_ids, id_order):
+        self.node_ids = node_ids
+        self.id_order = id_order
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def __contains__(self, node_id):
+        return self.get(node_id) is not None
+
+    def __getitem__(self, node_id):
+        index = self.get(node_id)
+        if index is None:
+            raise KeyError(node_id)
+        return index
+
+    def get(self, node_id, default=None):
+        if not isinstance(node_id, str):
+            return default
+        index = self.node_ids.bisect(node_id, self.id_order)
+        return default if index is None else index
+
+class _MappedNodes:
+    """ The parts of NetworkX's graph.nodes view the request handlers use: `in`, [node_id] and nodes(data=True). """
+
+    def __init__(self, mapped_graph):
+        self.mapped_graph = mapped_graph
+
+    def __len__(self):
+        return len(self.mapped_graph.node_ids)
+
+    def __contains__(self, node_id):
+        return node_id in self.mapped_graph.node_index
+
+    def __getitem__(self, node_id):
+        return self.mapped_graph.node_data(self.mapped_graph.node_index[node_id])
+
+    def __iter__(self):
+        return iter(self.mapped_graph.node_ids)
+
+    def __call__(self, data=False):
+        if not data:
+            return iter(self.mapped_graph.node_ids)
+        return ((node_id, self.mapped_graph.node_data(index)) for index, node_id in enumerate(self.mapped_graph.node_ids))
+
+class MappedRoomIndex(RoomIndex):
+    """
+    RoomIndex answered from the room table of a mapped graph: room names are found with a binary
+    search over the sorted name table, and their nodes read from the node lists stored with it.
+    """
+
+    def __init__(self, mapped_graph, room_names, room_offsets, room_nodes):
+        """
+        :param mapped_graph: MappedGraph the table belongs to.
+        :param room_names: Sorted _StringTable of normalized room names.
+        :param room_offsets: The nodes of name i are room_nodes[room_offsets[i]:room_offsets[i + 1]].
+        :param room_nodes: Node indices, in graph order per name.
+        """
+
+        self.mapped_graph = mapped_graph
+        self.room_names = room_names
+        self.room_offsets = room_offsets
+        self.room_nodes = room_nodes
+        self.graph_key = mapped_graph.graph.get('graph_key')
+
+    def __len__(self):
+        return len(self.room_names)
+
+    def __contains__(self, room_name):
+        return bool(room_name) and self.room_names.bisect(room_name.strip().upper()) is not None
+
+    def first(self, room_name):
+        node_ids = self.candidates(room_name)
+        return node_ids[0] if node_ids else None
+
+    def candidates(self, room_name):
+        if not room_name:
+            return ()
+        position = self.room_names.bisect(room_name.strip().upper())
+        if position is None:
+            return ()
+        node_ids = self.mapped_graph.node_ids
+        return tuple(node_ids[self.room_nodes[entry]]
+                     for entry in range(self.room_offsets[position], self.room_offsets[position + 1]))
+
+class MappedGraph:
+    """
+    Read-only campus graph served straight from a memory-mapped file (see save_mapped_graph).
+
+    Offers the CSRGraph attributes (so every CSR search runs on it unchanged), a RoomIndex
+    (room_index) and the NetworkX calls the request handlers make for segmenting and drawing
+    routes (graph.nodes[node_id], `node_id in graph.nodes`, graph.graph['graph_key']). The arrays
+    are views into the mapping: nothing is deserialized when the file is opened, and processes
+    mapping the same file share its pages through the page cache. The mapping is private
+    copy-on-write, so closing rooms (writes to edge_allowed) only copies the pages written.
+    Node attribute dictionaries are built on access and changes to them are not kept.
+    """
+
+    def __init__(self, file_mapping, header, data_start):
+        """
+        :param file_mapping: mmap of the file.
+        :param header: Header dictionary read from the file.
+        :param data_start: File position the section offsets are relative to.
+        """
+
+        self.file_mapping = file_mapping
+        buffer = memoryview(file_mapping)[data_start:]
+        sections = {name: buffer[offset:offset + length].cast(typecode)
+                    for name, (offset, length, typecode) in header['sections'].items()}
+
+        self.graph = {'graph_key': header['graph_key']}
+        self.offsets = sections['offsets']
+        self.neighbors = sections['neighbors']
+        self.weights = sections['weights']
+        self.edge_allowed = sections['edge_allowed']
+        self.center_x = sections['center_x']
+        self.center_y = sections['center_y']
+        self.floor_codes = sections['floor_codes']
+        self.floor_letters = header['floor_letters']
+        self.category_codes = sections['category_codes']
+        self.category_names = header['category_names']
+        self.id_rank = sections['id_rank']
+        self.node_ids = _CachedStringTable(sections['node_id_blob'], sections['node_id_offsets'])
+        self.node_index = _NodeIndex(self.node_ids, sections['id_order'])
+        self.node_types = _CachedStringTable(sections['type_blob'], sections['type_offsets'])
+        self.node_svg_ids = _CachedStringTable(sections['svg_id_blob'], sections['svg_id_offsets'])
+        self.rect_values = [(name, sections[name]) for name in RECT_ATTRIBUTES]
+        self.nodes = _MappedNodes(self)
+        self.room_index = MappedRoomIndex(self, _StringTable(sections['room_name_blob'], sections['room_name_offsets']),
+                                          sections['room_offsets'], sections['room_nodes'])
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def __contains__(self, node_id):
+        return node_id in self.node_index
+
+    def number_of_nodes(self):
+        return len(self.node_ids)
+
+    def number_of_edges(self):
+        """ :return: int: Number of undirected edges. """
+        return len(self.neighbors) // 2
+
+    def node_data(self, index):
+        """
+        :param index: Node index.
+        :return: dict: The node's attributes as the campus graph has them (rect, center, type, svg_id, floor, category).
+        """
+
+        node_data = {}
+        for name, values in self.rect_values:
+            value = values[index]
+            if not math.isnan(value):
+                node_data[name] = value
+        node_type = self.node_types[index]
+        if node_type:
+            node_data['type'] = node_type
+        svg_id = self.node_svg_ids[index]
+        if svg_id:
+            node_data['svg_id'] = svg_id
+        node_data['floor'] = self.floor_letters[self.floor_codes[index]]
+        node_data['category'] = self.category_names[self.category_codes[index]]
+        return node_data
+
+    def with_edge_costs(self, weights=None, edge_allowed=None):
+        """
+        View of the same nodes and edges with other edge weights and/or move flags (see CSRGraph.with_edge_costs).
+
+        :param weights: array('d') parallel to neighbors (None keeps this graph's weights).
+        :param edge_allowed: array('B') parallel to neighbors (None keeps this graph's flags).
+        :return: MappedGraph
+        """
+
+        view = copy.copy(self)
+        if weights is not None:
+            view.weights = weights
+        if edge_allowed is not None:
+            view.edge_allowed = edge_allowed
+        return view
+
+def save_mapped_graph(campus_graph, csr_graph=None, mapped_graph_path=DEFAULT_MAPPED_GRAPH_PATH):
+    """
+    Writes the campus graph in the memory-mappable format: a small JSON header followed by the
+    CSR arrays, the node coordinates, rects, floor and category codes, string tables of node IDs
+    (with their sorted order for lookups), types and SVG IDs, and the room name table.
+    The file is written to a temporary path first and then moved into place.
+
+    :param campus_graph: The NetworkX campus graph.
+    :param csr_graph: CSRGraph of campus_graph (built if not given).
+    :param mapped_graph_path: Where to write the file.
+    :return: str: The file path.
+    """
+
+    if csr_graph is None:
+        csr_graph = CSRGraph.from_networkx(campus_graph)
+    node_ids = list(csr_graph.node_ids)
+    node_count = len(node_ids)
+
+    id_order = array('i', [0] * node_count)
+    for index, rank in enumerate(csr_graph.id_rank):
+        id_order[rank] = index
+    rect_values = {name: array('d') for name in RECT_ATTRIBUTES}
+    node_types = []
+    node_svg_ids = []
+    for node_id in node_ids:
+        node_data = campus_graph.nodes[node_id]
+        for name in RECT_ATTRIBUTES:
+            value = node_data.get(name)
+            rect_values[name].append(value if value is not None else math.nan)
+        node_types.append(node_data.get('type') or '')
+        node_svg_ids.append(node_data.get('svg_id') or '')
+
+    node_index = csr_graph.node_index
+    room_candidates = dict(RoomIndex(campus_graph).items())
+    room_names = sorted(room_candidates)
+    room_offsets = array('i', [0])
+    room_nodes = array('i')
+    for room_name in room_names:
+        room_nodes.extend(node_index[node_id] for node_id in room_candidates[room_name])
+        room_offsets.append(len(room_nodes))
+
+    sections = {
+        'offsets': array('i', csr_graph.offsets),
+        'neighbors': array('i', csr_graph.neighbors),
+        'weights': array('d', csr_graph.weights),
+        'edge_allowed': array('B', csr_graph.edge_allowed),
+        'floor_codes': array('B', csr_graph.floor_codes),
+        'category_codes': array('B', csr_graph.category_codes),
+        'id_rank': array('i', csr_graph.id_rank),
+        'id_order': id_order,
+        'room_offsets': room_offsets,
+        'room_nodes': room_nodes,
+    }
+    sections.update(rect_values)
+    for name, strings in (('node_id', node_ids), ('type', node_types), ('svg_id', node_svg_ids), ('room_name', room_names)):
+        sections[f'{name}_blob'], sections[f'{name}_offsets'] = _string_table(strings)
+
+    # Section offsets are relative to the first aligned byte after the header
+    layout = {}
+    position = 0
+    for name, values in sections.items():
+        layout[name] = [position, len(values) * values.itemsize, values.typecode]
+        position = _aligned(position + layout[name][1])
+    header = {
+        'format_version': MAPPED_GRAPH_FORMAT_VERSION,
+        'byteorder': sys.byteorder,
+        'graph_key': campus_graph.graph.get('graph_key'),
+        'floor_letters': list(csr_graph.floor_letters),
+        'category_names': list(csr_graph.category_names),
+        'sections': layout,
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = _aligned(len(MAPPED_GRAPH_MAGIC) + 4 + len(header_bytes))
+
+    os.makedirs(os.path.dirname(os.path.abspath(mapped_graph_path)), exist_ok=True)
+    temporary_path = f"{mapped_graph_path}.tmp{os.getpid()}"
+    with open(temporary_path, 'wb') as mapped_file:
+        mapped_file.write(MAPPED_GRAPH_MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes)
+        for name, values in sections.items():
+            mapped_file.write(b'\0' * (data_start + layout[name][0] - mapped_file.tell()))
+            values.tofile(mapped_file)
+    os.replace(temporary_path, mapped_graph_path)
+    return mapped_graph_path
+
+def load_mapped_graph(mapped_graph_path=DEFAULT_MAPPED_GRAPH_PATH, graph_key=None):
+    """
+    Maps a file written by save_mapped_graph if it was written for the graph with the given key.
+
+    :param mapped_graph_path: Path of the file.
+    :param graph_key: Key of the current campus graph (graph.graph['graph_key']).
+    :return: MappedGraph or None if missing, unreadable, in another format or written for another graph.
+    """
+
+    if graph_key is None or not os.path.exists(mapped_graph_path):
+        return None
+    try:
+        with open(mapped_graph_path, 'rb') as mapped_file:
+            # The mapping stays valid after the file is closed (or replaced by a newer one)
+            file_mapping = mmap.mmap(mapped_file.fileno(), 0, access=mmap.ACCESS_COPY)
+        prefix_length = len(MAPPED_GRAPH_MAGIC) + 4
+        if file_mapping[:len(MAPPED_GRAPH_MAGIC)] != MAPPED_GRAPH_MAGIC:
+            logger.warning("Mapped graph %s is not a mapped campus graph, ignoring it.", mapped_graph_path)
+            return None
+        header_length, = struct.unpack('<I', file_mapping[len(MAPPED_GRAPH_MAGIC):prefix_length])
+        header = json.loads(file_mapping[prefix_length:prefix_length + header_length].decode('utf-8'))
+    except Exception:
+        logger.warning("Could not read mapped graph %s, ignoring it.", mapped_graph_path, exc_info=True)
+        return None
+
+    if header.get('format_version') != MAPPED_GRAPH_FORMAT_VERSION or header.get('byteorder') != sys.byteorder:
+        logger.info("Mapped graph %s has an old format, ignoring it.", mapped_graph_path)
+        return None
+    if header.get('graph_key') != graph_key:
+        logger.info("Mapped graph %s was written for another campus graph, ignoring it.", mapped_graph_path)
+        return None
+    return MappedGraph(file_mapping, header, _aligned(prefix_length + header_length))
+
+def load_or_build_mapped_graph(campus_graph, csr_graph=None, mapped_graph_path=DEFAULT_MAPPED_GRAPH_PATH):
+    """
+    Maps the file of this graph, writing it first if it is missing or stale.
+
+    :param campus_graph: The NetworkX campus graph (needs a 'graph_key').
+    :param csr_graph: CSRGraph of campus_graph (built if the file has to be written).
+    :param mapped_graph_path: Where the file is kept.
+    :return: MappedGraph or None if the graph has no key or the file cannot be written.
+    """
+
+    graph_key = campus_graph.graph.get('graph_key')
+    if graph_key is None:
+        return None
+    mapped_graph = load_mapped_graph(mapped_graph_path, graph_key)
+    if mapped_graph is not None:
+        return mapped_graph
+
+    build_start = time.perf_counter()
+    try:
+        save_mapped_graph(campus_graph, csr_graph, mapped_graph_path)
+    except OSError:
+        logger.warning("Could not save mapped graph to %s.", mapped_graph_path, exc_info=True)
+        return None
+    logger.info("Wrote mapped graph %s in %.2f s.", mapped_graph_path, time.perf_counter() - build_start)
+    return load_mapped_graph(mapped_graph_path, graph_key)
+
+def main(argv=None):
+    """ Batch job: python -m mapped_graph """
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    from graph_artifact import load_or_build_campus_graph, DEFAULT_ARTIFACT_PATH
+
+    parser = argparse.ArgumentParser(description="Write the memory-mapped campus graph served by the backend workers.")
+    parser.add_argument('--directory', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"),
+                        help="Directory containing the floor SVG files.")
+    parser.add_argument('--artifact', default=DEFAULT_ARTIFACT_PATH, help="Compiled campus graph to use.")
+    parser.add_argument('--output', default=DEFAULT_MAPPED_GRAPH_PATH, help="Where to write the mapped graph.")
+    args = parser.parse_args(argv)
+
+    campus_graph = load_or_build_campus_graph(directory=args.directory, artifact_path=args.artifact)
+    if campus_graph is None:
+        print("ERROR: Campus graph could not be loaded.")
+        return 1
+
+    build_start = time.perf_counter()
+    save_mapped_graph(campus_graph, mapped_graph_path=args.output)
+    print(f"Mapped graph written to {args.output} "
+          f"({os.path.getsize(args.output) / 1024:.0f} KiB, {time.perf_counter() - build_start:.1f} s).")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -15,4 +15,105 @@ def create_navigation(from_room, to_room):
         f"The route between rooms {from_name} - {from_floor} and {to_name} - {to_floor} was found. "
         f"Please follow directions on the map to reach your destination. "
         f"Have a great day!"
-    )
\ No newline at end of file
+    )
+
+
+def segment_path(path_node_ids, campus_graph):
+    """
+    Splits a path into one segment per floor for the frontend map.
+
+    :param path_node_ids: List of node IDs from start to goal.
+    :param campus_graph: The NetworkX graph representing the campus map.
+    :return: list: Segment dictionaries with 'floor', 'coords', 'node_ids', 'end_node_type' and 'end_node_id'.
+    :raises KeyError: If a node of the path is not in the graph.
+    """
+
+    path_segments = [] # Empty list to store path segments
+
+    # Handle the edge case where the path contains only one node (start is the same as goal)
+    if len(path_node_ids) == 1:
+         node_id = path_node_ids[0]
+         # Ensure the node exists in the graph before accessing its data
+         if node_id not in campus_graph.nodes: raise KeyError(f"Node '{node_id}' not found")
+         node_data = campus_graph.nodes[node_id]
+         # Create a single segment containing just the start/goal node
+         path_segments.append({
+            "floor": node_data.get('floor', 'Unknown'),
+            "coords": [[node_data.get('center_x', 0.0), node_data.get('center_y', 0.0)]],
+            "node_ids": [node_id], "end_node_type": node_data.get('type', 'Unknown'), "end_node_id": node_id
+         })
+    # Handle paths with multiple nodes
+    else:
+        # Get data for the very first node in the path
+        first_node_id = path_node_ids[0]
+        if first_node_id not in campus_graph.nodes: raise KeyError(f"Node '{first_node_id}' not found")
+        first_node_data = campus_graph.nodes[first_node_id]
+        # Determine the starting floor and coordinates
+        start_floor = first_node_data.get('floor', 'Unknown')
+        start_coords = [first_node_data.get('center_x', 0.0), first_node_data.get('center_y', 0.0)]
+
+        # Initialize the first segment dictionary with the starting node's data
+        # 'end_node_type' and 'end_node_id' will be filled when the segment ends
+        current_segment = {
+            "floor": start_floor, "coords": [start_coords], "node_ids": [first_node_id],
+            "end_node_type": None, "end_node_id": None
+        }
+        # Keep track of the floor of the previous node to detect changes
+        last_floor = start_floor
+
+        # Iterate through the path nodes, starting from the second node (index 1)
+        for i in range(1, len(path_node_ids)):
+            node_id = path_node_ids[i]
+            # Ensure the current node exists in the graph
+            if node_id not in campus_graph.nodes: raise KeyError(f"Node '{node_id}' not found")
+            node_data = campus_graph.nodes[node_id]
+            # Get the floor and coordinates of the current node
+            current_floor = node_data.get('floor', last_floor)
+            coords = [node_data.get('center_x', 0.0), node_data.get('center_y', 0.0)]
+
+            # --- Core Segmentation Logic: Check if the floor has changed ---
+            if current_floor != last_floor:
+                # Floor has changed, so the previous segment is complete
+                if current_segment["coords"]: # Make sure the segment isn't empty
+                    # The node *before* the current one (i-1) is the last node of the previous segment
+                    # This node represents the transition point (e.g., stairs/elevator)
+                    last_node_id_in_segment = path_node_ids[i - 1]
+                    if last_node_id_in_segment not in campus_graph.nodes: raise KeyError(f"Node '{last_node_id_in_segment}' not found")
+                    last_node_data_in_segment = campus_graph.nodes[last_node_id_in_segment]
+                    transition_node_type = last_node_data_in_segment.get('type', 'Unknown')
+
+                    # Store the transition node's type and ID in the completed segment
+                    current_segment["end_node_type"] = transition_node_type
+                    current_segment["end_node_id"] = last_node_id_in_segment
+
+                    # Add the completed segment to the list of segments
+                    path_segments.append(current_segment)
+
+                # Start a new segment for the new floor, beginning with the current node
+                current_segment = {
+                    "floor": current_floor, "coords": [coords], "node_ids": [node_id],
+                    "end_node_type": None, "end_node_id": None
+                }
+            else:
+                # Floor has not changed, add the current node's data to the ongoing segment
+                current_segment["coords"].append(coords)
+                current_segment["node_ids"].append(node_id)
+
+            # Update last_floor for the next iteration
+            last_floor = current_floor
+
+        # After the loop finishes, the 'current_segment' holds the last segment of the path
+        if current_segment["coords"]:
+            # The very last node in the original path list is the end of this final segment
+            last_node_id_in_path = path_node_ids[-1]
+            if last_node_id_in_path not in campus_graph.nodes: raise KeyError(f"Node '{last_node_id_in_path}' not found")
+            last_node_data_in_path = campus_graph.nodes[last_node_id_in_path]
+            # Get the type of the final destination node
+            final_node_type = last_node_data_in_path.get('type', 'Unknown')
+            # Set the end node details for the final segment
+            current_segment["end_node_type"] = final_node_type
+            current_segment["end_node_id"] = last_node_id_in_path
+
+            # Add the final segment to the list
+            path_segments.append(current_segment)
+    return path_segments
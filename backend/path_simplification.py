@@ -0,0 +1,281 @@
+import math
+
+COORDS_FORMATS = ('list', 'delta', 'polyline')
+# Decimal places kept in response coordinates
+COORD_PRECISION = 2
+# A point closer than this (SVG units) to the line through its neighbours is dropped as collinear
+COLLINEAR_TOLERANCE = 0.5
+# Size of the grid cells used to look up rects near a point or line (SVG units)
+GRID_CELL_SIZE = 10.0
+# Spacing of the points checked along a shortcut, must stay below the smallest gap between walkable rects
+LINE_OF_SIGHT_STEP = 1.0
+# Slack for rects that only touch a shortcut, or walkable rects separated by rounding gaps
+RECT_EPSILON = 0.05
+
+def _rect_bounds(node_data):
+    """ :return: tuple or None: (left, top, right, bottom) of a node's rect, None if it has no geometry. """
+    if node_data.get('width') is None or node_data.get('x') is None:
+        return None
+    return node_data['x'], node_data['y'], node_data['x'] + node_data['width'], node_data['y'] + node_data['height']
+
+class _RectGrid:
+    """ Uniform grid over rects, for finding the rects near a point or a line segment. """
+
+    def __init__(self):
+        self.cells = {}
+
+    def add(self, bounds):
+        left, top, right, bottom = bounds
+        for cell_x in range(int(left // GRID_CELL_SIZE), int(right // GRID_CELL_SIZE) + 1):
+            for cell_y in range(int(top // GRID_CELL_SIZE), int(bottom // GRID_CELL_SIZE) + 1):
+                self.cells.setdefault((cell_x, cell_y), []).append(bounds)
+
+    def at(self, x, y):
+        return self.cells.get((int(x // GRID_CELL_SIZE), int(y // GRID_CELL_SIZE)), ())
+
+    def near(self, left, top, right, bottom):
+        found = set()
+        for cell_x in range(int(left // GRID_CELL_SIZE), int(right // GRID_CELL_SIZE) + 1):
+            for cell_y in range(int(top // GRID_CELL_SIZE), int(bottom // GRID_CELL_SIZE) + 1):
+                found.update(self.cells.get((cell_x, cell_y), ()))
+        return found
+
+def _segment_crosses_rect(x1, y1, x2, y2, bounds):
+    """ Liang-Barsky clipping: True if the segment passes through the inside of the rect (shrunk by RECT_EPSILON). """
+    left, top, right, bottom = bounds[0] + RECT_EPSILON, bounds[1] + RECT_EPSILON, bounds[2] - RECT_EPSILON, bounds[3] - RECT_EPSILON
+    if left >= right or top >= bottom:
+        return False
+    dx, dy = x2 - x1, y2 - y1
+    t_enter, t_exit = 0.0, 1.0
+    for p, q in ((-dx, x1 - left), (dx, right - x1), (-dy, y1 - top), (dy, bottom - y1)):
+        if p == 0:
+            if q < 0:
+                return False
+        else:
+            t = q / p
+            if p < 0:
+                t_enter = max(t_enter, t)
+            else:
+                t_exit = min(t_exit, t)
+            if t_enter > t_exit:
+                return False
+    return True
+
+def _point_in_rects(x, y, rects):
+    for left, top, right, bottom in rects:
+        if left - RECT_EPSILON <= x <= right + RECT_EPSILON and top - RECT_EPSILON <= y <= bottom + RECT_EPSILON:
+            return True
+    return False
+
+def remove_collinear(coords, tolerance=COLLINEAR_TOLERANCE):
+    """
+    Drops the points lying on the straight line between their neighbours, keeping both ends.
+
+    :param coords: List of [x, y] points.
+    :param tolerance: Largest distance from the line for a point to count as collinear.
+    :return: list: The remaining points.
+    """
+
+    if len(coords) < 3:
+        return list(coords)
+    kept = [coords[0]]
+    for index in range(1, len(coords) - 1):
+        ax, ay = kept[-1]
+        bx, by = coords[index]
+        cx, cy = coords[index + 1]
+        length = math.hypot(cx - ax, cy - ay)
+        # Distance of b from the line a-c; b must also lie between a and c (no U-turns)
+        if length > 0 and abs((cx - ax) * (by - ay) - (cy - ay) * (bx - ax)) / length <= tolerance \
+                and (bx - ax) * (cx - bx) + (by - ay) * (cy - by) > 0:
+            continue
+        kept.append(coords[index])
+    kept.append(coords[-1])
+    return kept
+
+class PathSimplifier:
+    """
+    Shortens the drawn route of a path segment. Routes move in cardinal steps between the centres
+    of small walkable tiles; after dropping collinear points, string pulling replaces runs of
+    steps by straight lines wherever there is line of sight. A straight line has line of sight
+    when it crosses no obstacle rect of the floor and stays on walkable tiles (or the rects of the
+    path's own nodes, e.g. the start room), so it never cuts through walls, unmapped space or rooms.
+    """
+
+    def __init__(self, campus_graph):
+        """
+        :param campus_graph: The NetworkX graph representing the campus map (rects are read from 'x', 'y', 'width', 'height').
+        """
+
+        self.campus_graph = campus_graph
+        self.obstacles = {}
+        self.walkable = {}
+        for node_id, node_data in campus_graph.nodes(data=True):
+            bounds = _rect_bounds(node_data)
+            if bounds is None:
+                continue
+            category = node_data.get('category')
+            if category == 'obstacle':
+                self.obstacles.setdefault(node_data.get('floor'), _RectGrid()).add(bounds)
+            elif category == 'walkable':
+                self.walkable.setdefault(node_data.get('floor'), _RectGrid()).add(bounds)
+
+    def has_line_of_sight(self, floor, start, end, path_rects=()):
+        """
+        :param floor: Floor letter of both points.
+        :param start: [x, y] of one end.
+        :param end: [x, y] of the other end.
+        :param path_rects: Extra rects the line may cross (the rects of the path's own nodes).
+        :return: bool: True if the straight line between the points can be walked.
+        """
+
+        x1, y1 = start
+        x2, y2 = end
+        # Walk the line first: lines leaving the corridors fail within a few steps
+        walkable = self.walkable.get(floor)
+        steps = max(1, int(math.ceil(math.hypot(x2 - x1, y2 - y1) / LINE_OF_SIGHT_STEP)))
+        for step in range(steps + 1):
+            x = x1 + (x2 - x1) * step / steps
+            y = y1 + (y2 - y1) * step / steps
+            if not ((walkable is not None and _point_in_rects(x, y, walkable.at(x, y))) or _point_in_rects(x, y, path_rects)):
+                return False
+
+        obstacles = self.obstacles.get(floor)
+        if obstacles is not None:
+            for bounds in obstacles.near(min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)):
+                if _segment_crosses_rect(x1, y1, x2, y2, bounds):
+                    return False
+        return True
+
+    def simplify(self, coords, floor, node_ids=()):
+        """
+        :param coords: List of [x, y] points of one floor.
+        :param floor: Floor letter of the points.
+        :param node_ids: Node IDs of the points (their rects may be crossed).
+        :return: list: Simplified points, starting and ending at the same points.
+        """
+
+        points = remove_collinear(coords)
+        if len(points) < 3:
+            return points
+        nodes = self.campus_graph.nodes
+        path_rects = [bounds for bounds in (_rect_bounds(nodes[node_id]) for node_id in node_ids
+                                            if node_id in nodes and nodes[node_id].get('category') != 'walkable')
+                      if bounds is not None]
+
+        # Greedy string pulling: from each kept point, jump to the furthest point still in sight
+        pulled = [points[0]]
+        anchor = 0
+        while anchor < len(points) - 1:
+            furthest = anchor + 1
+            for candidate in range(len(points) - 1, anchor + 1, -1):
+                if self.has_line_of_sight(floor, points[anchor], points[candidate], path_rects):
+                    furthest = candidate
+                    break
+            pulled.append(points[furthest])
+            anchor = furthest
+        return pulled
+
+def delta_encode(coords, precision=COORD_PRECISION):
+    """
+    :param coords: List of [x, y] points.
+    :param precision: Decimal places kept.
+    :return: list: The first point, then the [dx, dy] step to every following point.
+    """
+
+    scale = 10 ** precision
+    encoded = []
+    previous_x = previous_y = 0
+    for x, y in coords:
+        scaled_x, scaled_y = int(round(x * scale)), int(round(y * scale))
+        encoded.append([(scaled_x - previous_x) / scale, (scaled_y - previous_y) / scale])
+        previous_x, previous_y = scaled_x, scaled_y
+    return encoded
+
+def _encode_polyline_value(value):
+    value = ~(value << 1) if value < 0 else value << 1
+    chunks = []
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+    return ''.join(chunks)
+
+def encode_polyline(coords, precision=COORD_PRECISION):
+    """
+    Encodes points with the Google encoded polyline algorithm (x before y, 10^precision scale).
+
+    :param coords: List of [x, y] points.
+    :param precision: Decimal places kept.
+    :return: str: The encoded polyline.
+    """
+
+    scale = 10 ** precision
+    encoded = []
+    previous_x = previous_y = 0
+    for x, y in coords:
+        scaled_x, scaled_y = int(round(x * scale)), int(round(y * scale))
+        encoded.append(_encode_polyline_value(scaled_x - previous_x))
+        encoded.append(_encode_polyline_value(scaled_y - previous_y))
+        previous_x, previous_y = scaled_x, scaled_y
+    return ''.join(encoded)
+
+def decode_polyline(encoded, precision=COORD_PRECISION):
+    """
+    :param encoded: Output of encode_polyline.
+    :param precision: Decimal places it was encoded with.
+    :return: list: [x, y] points.
+    """
+
+    scale = 10 ** precision
+    values = []
+    value = shift = 0
+    for character in encoded:
+        chunk = ord(character) - 63
+        value |= (chunk & 0x1f) << shift
+        shift += 5
+        if chunk < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    coords = []
+    x = y = 0
+    for dx, dy in zip(values[0::2], values[1::2]):
+        x += dx
+        y += dy
+        coords.append([x / scale, y / scale])
+    return coords
+
+def format_path_segments(path_segments, simplifier=None, coords_format='list', include_node_ids=False,
+                         precision=COORD_PRECISION):
+    """
+    Prepares the segments of segment_path for a response. The segments themselves are not modified.
+
+    :param path_segments: Output of segment_path.
+    :param simplifier: PathSimplifier of the graph the path was found on (None keeps every point).
+    :param coords_format: 'list' ([x, y] points), 'delta' (see delta_encode) or 'polyline' (see encode_polyline).
+                          Segments in another format than 'list' name it under 'coords_format'.
+    :param include_node_ids: Keep the 'node_ids' of every segment (they no longer match 'coords' once simplified).
+    :param precision: Decimal places kept in the coordinates.
+    :return: list: New segment dictionaries.
+    :raises ValueError: If coords_format is unknown.
+    """
+
+    if coords_format not in COORDS_FORMATS:
+        raise ValueError(f"Unknown coordinate format '{coords_format}', use one of {', '.join(COORDS_FORMATS)}.")
+
+    formatted_segments = []
+    for path_segment in path_segments:
+        coords = path_segment['coords']
+        if simplifier is not None:
+            coords = simplifier.simplify(coords, path_segment['floor'], path_segment.get('node_ids', ()))
+        formatted_segment = {key: value for key, value in path_segment.items()
+                             if key not in ('coords', 'node_ids') or (key == 'node_ids' and include_node_ids)}
+        if coords_format == 'delta':
+            formatted_segment['coords'] = delta_encode(coords, precision)
+        elif coords_format == 'polyline':
+            formatted_segment['coords'] = encode_polyline(coords, precision)
+        else:
+            formatted_segment['coords'] = [[round(x, precision), round(y, precision)] for x, y in coords]
+        if coords_format != 'list':
+            formatted_segment['coords_format'] = coords_format
+        formatted_segments.append(formatted_segment)
+    return formatted_segments
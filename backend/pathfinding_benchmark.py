@@ -0,0 +1,170 @@
+import os
+import os.path
+import sys
+import time
+import random
+import argparse
+import statistics
+from contextlib import redirect_stdout
+from a_star_pathfinding import pathfinding_algo
+from csr_graph import CSRGraph, csr_pathfinding_algo, csr_bidirectional_pathfinding_algo
+from route_table import room_name_index
+from landmarks import build_landmarks, DEFAULT_LANDMARK_COUNT
+from portal_graph import build_portal_graph, hierarchical_pathfinding_algo
+from contraction_hierarchy import build_contraction_hierarchy, ch_pathfinding_algo
+
+def _networkx_engine(start_node_id, goal_node_id, context, stats):
+    return pathfinding_algo(start_node_id, goal_node_id, context['campus_graph'], stats=stats)
+
+def _csr_engine(start_node_id, goal_node_id, context, stats):
+    return csr_pathfinding_algo(start_node_id, goal_node_id, context['csr_graph'], stats=stats)
+
+def _networkx_alt_engine(start_node_id, goal_node_id, context, stats):
+    return pathfinding_algo(start_node_id, goal_node_id, context['campus_graph'], stats=stats, landmarks=context['landmarks'])
+
+def _csr_alt_engine(start_node_id, goal_node_id, context, stats):
+    return csr_pathfinding_algo(start_node_id, goal_node_id, context['csr_graph'], stats=stats, landmarks=context['landmarks'])
+
+def _csr_bidirectional_alt_engine(start_node_id, goal_node_id, context, stats):
+    return csr_bidirectional_pathfinding_algo(start_node_id, goal_node_id, context['csr_graph'], stats=stats,
+                                              landmarks=context['landmarks'])
+
+def _hierarchical_engine(start_node_id, goal_node_id, context, stats):
+    return hierarchical_pathfinding_algo(start_node_id, goal_node_id, context['csr_graph'], context['portal_graph'],
+                                         stats=stats, landmarks=context['landmarks'])
+
+def _ch_engine(start_node_id, goal_node_id, context, stats):
+    return ch_pathfinding_algo(start_node_id, goal_node_id, context['contraction_hierarchy'], stats=stats)
+
+# Engine name -> function(start, goal, context, stats) returning a node ID path.
+# context holds 'campus_graph', 'csr_graph', 'landmarks', 'portal_graph' and 'contraction_hierarchy'.
+ENGINES = {
+    'networkx': _networkx_engine,
+    'csr': _csr_engine,
+    'networkx-alt': _networkx_alt_engine,
+    'csr-alt': _csr_alt_engine,
+    'csr-bidirectional-alt': _csr_bidirectional_alt_engine,
+    'hierarchical': _hierarchical_engine,
+    'ch': _ch_engine,
+}
+
+def sample_room_pairs(campus_graph, pairs_per_floor_pair=2, seed=7):
+    """
+    Picks random named rooms for every (start floor, goal floor) combination, same floor included.
+
+    :param campus_graph: The NetworkX graph representing the campus map.
+    :param pairs_per_floor_pair: Number of room pairs per floor combination.
+    :param seed: Random seed, so runs are comparable.
+    :return: list: (from room, to room, start node ID, goal node ID) tuples.
+    """
+
+    rooms_by_floor = {}
+    for room_name, node_id in room_name_index(campus_graph).items():
+        rooms_by_floor.setdefault(campus_graph.nodes[node_id].get('floor'), []).append((room_name, node_id))
+
+    rng = random.Random(seed)
+    floors = sorted(floor for floor in rooms_by_floor if floor is not None)
+    room_pairs = []
+    for start_floor in floors:
+        for goal_floor in floors:
+            for _ in range(pairs_per_floor_pair):
+                from_room, start_node_id = rng.choice(rooms_by_floor[start_floor])
+                to_room, goal_node_id = rng.choice(rooms_by_floor[goal_floor])
+                room_pairs.append((from_room, to_room, start_node_id, goal_node_id))
+    return room_pairs
+
+def path_cost(campus_graph, path_node_ids):
+    """ :return: float: Sum of the edge weights along a path (0 for a single node). """
+    return sum(campus_graph[u][v]['weight'] for u, v in zip(path_node_ids, path_node_ids[1:]))
+
+def run_benchmark(campus_graph, room_pairs, engines=None, csr_graph=None, repeat=1, landmarks=None):
+    """
+    Times every engine on the same room pairs.
+
+    :param campus_graph: The NetworkX graph representing the campus map.
+    :param room_pairs: Output of sample_room_pairs.
+    :param engines: Engine names to run (default: all of ENGINES).
+    :param csr_graph: CSRGraph of campus_graph (built if not given).
+    :param repeat: Runs per pair, the fastest one is kept.
+    :param landmarks: Landmarks used by the '-alt' engines (computed if not given) and for same-floor
+                      hierarchical queries.
+    :return: dict: Engine name -> summary dict (latencies in ms, expanded nodes, paths found, total path cost).
+    """
+
+    csr_graph = csr_graph or CSRGraph.from_networkx(campus_graph)
+    engines = engines or list(ENGINES)
+    if landmarks is None and any(engine_name.endswith('-alt') for engine_name in engines):
+        landmarks = build_landmarks(campus_graph, csr_graph)
+    portal_graph = build_portal_graph(campus_graph, csr_graph) if 'hierarchical' in engines else None
+    contraction_hierarchy = build_contraction_hierarchy(campus_graph, csr_graph) if 'ch' in engines else None
+    context = {'campus_graph': campus_graph, 'csr_graph': csr_graph, 'landmarks': landmarks, 'portal_graph': portal_graph,
+               'contraction_hierarchy': contraction_hierarchy}
+    results = {}
+    null_output = open(os.devnull, 'w')
+    for engine_name in engines:
+        engine = ENGINES[engine_name]
+        latencies = []
+        expanded = []
+        found = 0
+        total_cost = 0.0
+        for _, _, start_node_id, goal_node_id in room_pairs:
+            best_latency = None
+            for _ in range(repeat):
+                stats = {}
+                # Engines report failures on stdout, keep the benchmark output readable
+                with redirect_stdout(null_output):
+                    search_start = time.perf_counter()
+                    path_node_ids = engine(start_node_id, goal_node_id, context, stats)
+                    latency = (time.perf_counter() - search_start) * 1000
+                best_latency = latency if best_latency is None else min(best_latency, latency)
+            latencies.append(best_latency)
+            expanded.append(stats.get('expanded', 0))
+            if path_node_ids:
+                found += 1
+                total_cost += path_cost(campus_graph, path_node_ids)
+
+        results[engine_name] = {
+            'pairs': len(room_pairs),
+            'found': found,
+            'total_cost': total_cost,
+            'mean_ms': statistics.fmean(latencies) if latencies else 0.0,
+            'median_ms': statistics.median(latencies) if latencies else 0.0,
+            'max_ms': max(latencies, default=0.0),
+            'mean_expanded': statistics.fmean(expanded) if expanded else 0.0,
+        }
+    null_output.close()
+    return results
+
+def main(argv=None):
+    """ Benchmark: python -m pathfinding_benchmark [--pairs N] [--engines networkx csr] """
+    from graph_artifact import load_or_build_campus_graph, DEFAULT_ARTIFACT_PATH
+
+    parser = argparse.ArgumentParser(description="Compare pathfinding engines on real room pairs.")
+    parser.add_argument('--directory', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"),
+                        help="Directory containing the floor SVG files.")
+    parser.add_argument('--artifact', default=DEFAULT_ARTIFACT_PATH, help="Compiled campus graph to use.")
+    parser.add_argument('--pairs', type=int, default=2, help="Room pairs per (start floor, goal floor) combination.")
+    parser.add_argument('--seed', type=int, default=7, help="Random seed for picking rooms.")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per pair (fastest is kept).")
+    parser.add_argument('--engines', nargs='+', default=list(ENGINES), choices=list(ENGINES), help="Engines to compare.")
+    parser.add_argument('--landmarks', type=int, default=DEFAULT_LANDMARK_COUNT, help="Landmarks used by the '-alt' engines.")
+    args = parser.parse_args(argv)
+
+    campus_graph = load_or_build_campus_graph(directory=args.directory, artifact_path=args.artifact)
+    if campus_graph is None:
+        print("ERROR: Campus graph could not be loaded.")
+        return 1
+
+    room_pairs = sample_room_pairs(campus_graph, args.pairs, args.seed)
+    csr_graph = CSRGraph.from_networkx(campus_graph)
+    landmarks = build_landmarks(campus_graph, csr_graph, args.landmarks)
+    results = run_benchmark(campus_graph, room_pairs, args.engines, csr_graph, args.repeat, landmarks)
+    print(f"{len(room_pairs)} room pairs, best of {args.repeat} runs each, {len(landmarks)} landmarks")
+    print(f"{'engine':<23}{'found':>7}{'mean ms':>10}{'median ms':>11}{'max ms':>9}{'expanded':>10}{'total cost':>13}")
+    for engine_name, summary in results.items():
+        print(f"{engine_name:<23}{summary['found']:>7}{summary['mean_ms']:>10.2f}{summary['median_ms']:>11.2f}"
+              f"{summary['max_ms']:>9.2f}{summary['mean_expanded']:>10.0f}{summary['total_cost']:>13.1f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
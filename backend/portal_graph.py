@@ -0,0 +1,293 @@
+import os
+import os.path
+import sys
+import math
+import heapq
+import logging
+from array import array
+from csr_graph import CSRGraph, csr_astar, csr_dijkstra
+from a_star_pathfinding import MAX_EXPANSIONS
+from graph_artifact import save_precomputed, load_precomputed, load_or_build_precomputed, precompute_main
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTAL_GRAPH_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiled", "portal_graph.bin")
+PORTAL_GRAPH_FORMAT_VERSION = 1
+
+class PortalGraph:
+    """
+    Two-level view of the campus graph for cross-floor routing.
+
+    Portals are the nodes with an edge to another floor (stairs and elevators). For every portal,
+    one Dijkstra restricted to its own floor gives the exact same-floor distance and parent of
+    every node of that floor. The abstract graph links the portals of a floor with those
+    distances, and portals of different floors with their inter-floor edges.
+    Moves between non-obstacle nodes go both ways with the same weight, so a portal's table also
+    gives the distance from any room of its floor to the portal.
+    """
+
+    def __init__(self, graph_key, node_ids, floor_codes, local_index, floor_portals, portal_distances, portal_parents,
+                 floor_links):
+        """
+        :param graph_key: Key of the campus graph the portal graph was built from.
+        :param node_ids: Node IDs in graph order.
+        :param floor_codes: Floor code of every node (CSRGraph.floor_codes).
+        :param local_index: Position of every node among the nodes of its floor.
+        :param floor_portals: Floor code -> list of portal node indices on that floor.
+        :param portal_distances: Portal -> array('d') of same-floor distances, indexed by local_index.
+        :param portal_parents: Portal -> array of parent node indices (-1 for the portal and unreached nodes).
+        :param floor_links: Portal -> list of (portal on another floor, edge weight).
+        """
+
+        self.graph_key = graph_key
+        self.node_ids = node_ids
+        self.floor_codes = floor_codes
+        self.local_index = local_index
+        self.floor_portals = floor_portals
+        self.portal_distances = portal_distances
+        self.portal_parents = portal_parents
+        self.floor_links = floor_links
+
+    def portal_count(self):
+        """ :return: int: Number of portal nodes. """
+        return len(self.portal_distances)
+
+    def floor_distance(self, portal, node):
+        """ :return: float: Same-floor distance between a portal and a node of its floor (math.inf if none). """
+        return self.portal_distances[portal][self.local_index[node]]
+
+    def floor_path(self, portal, node):
+        """
+        Walks the portal's shortest-path tree from a node of its floor back to the portal.
+
+        :return: list: Node indices from node to portal.
+        """
+
+        parents = self.portal_parents[portal]
+        local_index = self.local_index
+        path = [node]
+        while node != portal:
+            node = parents[local_index[node]]
+            path.append(node)
+        return path
+
+def build_portal_graph(campus_graph, csr_graph=None):
+    """
+    Finds the portals and runs one same-floor Dijkstra per portal.
+
+    :param campus_graph: The NetworkX campus graph (its graph.graph['graph_key'] is stored).
+    :param csr_graph: CSRGraph of campus_graph (built if not given).
+    :return: PortalGraph
+    """
+
+    csr_graph = csr_graph or CSRGraph.from_networkx(campus_graph)
+    floor_codes = csr_graph.floor_codes
+    offsets, neighbors, weights, edge_allowed = csr_graph.offsets, csr_graph.neighbors, csr_graph.weights, csr_graph.edge_allowed
+
+    local_index = array('i', [0]) * len(csr_graph)
+    floor_sizes = {}
+    for node in range(len(csr_graph)):
+        local_index[node] = floor_sizes.get(floor_codes[node], 0)
+        floor_sizes[floor_codes[node]] = local_index[node] + 1
+
+    # Portals: non-obstacle nodes with an allowed move to another floor. Such moves always go
+    # both ways, so the node at the other end is a portal too.
+    obstacle_code = csr_graph.category_names.index('obstacle') if 'obstacle' in csr_graph.category_names else None
+    floor_portals = {}
+    floor_links = {}
+    for node in range(len(csr_graph)):
+        if csr_graph.category_codes[node] == obstacle_code:
+            continue
+        links = [(neighbors[edge], weights[edge]) for edge in range(offsets[node], offsets[node + 1])
+                 if edge_allowed[edge] and floor_codes[neighbors[edge]] != floor_codes[node]]
+        if links:
+            floor_portals.setdefault(floor_codes[node], []).append(node)
+            floor_links[node] = links
+
+    portal_distances = {}
+    portal_parents = {}
+    index_typecode = 'h' if len(csr_graph) < 32768 else 'i'
+    for floor_code, portals in floor_portals.items():
+        for portal in portals:
+            distances, came_from = csr_dijkstra(csr_graph, [portal], floor_code=floor_code)
+            floor_distances = array('d', [math.inf]) * floor_sizes[floor_code]
+            floor_parents = array(index_typecode, [-1]) * floor_sizes[floor_code]
+            for node, distance in distances.items():
+                floor_distances[local_index[node]] = distance
+            for node, parent in came_from.items():
+                floor_parents[local_index[node]] = parent
+            portal_distances[portal] = floor_distances
+            portal_parents[portal] = floor_parents
+
+    return PortalGraph(campus_graph.graph.get('graph_key'), list(csr_graph.node_ids), floor_codes, local_index,
+                       floor_portals, portal_distances, portal_parents, floor_links)
+
+def hierarchical_astar(start, goal, csr_graph, portal_graph, max_expansions=MAX_EXPANSIONS, landmarks=None):
+    """
+    Cross-floor search over the portal graph: the source floor to its portals and the target
+    floor from its portals come from the precomputed tables, so only the portals are searched.
+    Same-floor queries (and starts inside an obstacle) use csr_astar on the full graph.
+
+    :param start: Index of the start node.
+    :param goal: Index of the goal node.
+    :param csr_graph: CSRGraph the portal graph was built from.
+    :param portal_graph: PortalGraph of csr_graph.
+    :param max_expansions: Passed on to csr_astar for same-floor queries.
+    :param landmarks: Optional Landmarks, passed on to csr_astar for same-floor queries.
+    :return: tuple: (list of node indices or None, number of expanded nodes or portals)
+    """
+
+    floor_codes = csr_graph.floor_codes
+    category_names, category_codes = csr_graph.category_names, csr_graph.category_codes
+    start_floor, goal_floor = floor_codes[start], floor_codes[goal]
+    if start_floor == goal_floor or category_names[category_codes[start]] == 'obstacle':
+        return csr_astar(start, goal, csr_graph, max_expansions, landmarks)
+    if category_names[category_codes[goal]] == 'obstacle':
+        return None, 0 # Obstacles can never be entered
+
+    # Abstract Dijkstra over the portals, seeded with the distances from the start to its floor's portals
+    distances = {}
+    came_from = {}
+    open_set = []
+    for portal in portal_graph.floor_portals.get(start_floor, ()):
+        distance = portal_graph.floor_distance(portal, start)
+        if distance != math.inf:
+            distances[portal] = distance
+            open_set.append((distance, portal))
+    heapq.heapify(open_set)
+    goal_portals = set(portal_graph.floor_portals.get(goal_floor, ()))
+
+    settled = set()
+    best_distance = math.inf
+    best_portal = None
+    while open_set:
+        current_distance, current = heapq.heappop(open_set)
+        if current in settled:
+            continue
+        if current_distance >= best_distance:
+            break
+        settled.add(current)
+
+        if current in goal_portals:
+            total_distance = current_distance + portal_graph.floor_distance(current, goal)
+            if total_distance < best_distance:
+                best_distance = total_distance
+                best_portal = current
+
+        # Same-floor links to the other portals of this floor, then the inter-floor edges
+        links = [(portal, portal_graph.floor_distance(current, portal))
+                 for portal in portal_graph.floor_portals[floor_codes[current]] if portal != current]
+        links.extend(portal_graph.floor_links.get(current, ()))
+        for portal, weight in links:
+            tentative_distance = current_distance + weight
+            if tentative_distance < distances.get(portal, math.inf):
+                distances[portal] = tentative_distance
+                came_from[portal] = current
+                heapq.heappush(open_set, (tentative_distance, portal))
+
+    if best_portal is None:
+        return None, len(settled)
+
+    # Unpack: portal chain -> start floor path, same-floor portal paths, goal floor path
+    portal_chain = [best_portal]
+    while portal_chain[-1] in came_from:
+        portal_chain.append(came_from[portal_chain[-1]])
+    portal_chain.reverse()
+
+    path = portal_graph.floor_path(portal_chain[0], start)
+    for previous_portal, portal in zip(portal_chain, portal_chain[1:]):
+        if floor_codes[previous_portal] == floor_codes[portal]:
+            path.extend(reversed(portal_graph.floor_path(previous_portal, portal)[:-1]))
+        else:
+            path.append(portal)
+    path.extend(reversed(portal_graph.floor_path(best_portal, goal)[:-1]))
+    return path, len(settled)
+
+def hierarchical_pathfinding_algo(start_node_id, goal_node_id, csr_graph, portal_graph, stats=None, landmarks=None):
+    """
+    Drop-in replacement for pathfinding_algo using the portal graph for cross-floor routes.
+
+    :param start_node_id: The unique ID of the starting node.
+    :param goal_node_id: The unique ID of the goal node.
+    :param csr_graph: CSRGraph built from the campus graph.
+    :param portal_graph: PortalGraph built from csr_graph.
+    :param stats: Optional dictionary, receives the number of expanded nodes under 'expanded'.
+    :param landmarks: Optional Landmarks used for same-floor queries.
+    :return: list or None: A list of node IDs representing the path from start to goal,
+                      or None if no path is found.
+    """
+
+    start = csr_graph.node_index.get(start_node_id)
+    goal = csr_graph.node_index.get(goal_node_id)
+    if start is None:
+        logger.error("Start node '%s' not found in the graph.", start_node_id)
+        return None
+    if goal is None:
+        logger.error("Goal node '%s' not found in the graph.", goal_node_id)
+        return None
+
+    path, expanded = hierarchical_astar(start, goal, csr_graph, portal_graph, landmarks=landmarks)
+    if stats is not None:
+        stats['expanded'] = expanded
+    if path is None:
+        return None
+    return [csr_graph.node_ids[index] for index in path]
+
+def save_portal_graph(portal_graph, portal_graph_path=DEFAULT_PORTAL_GRAPH_PATH):
+    """
+    Writes the portal graph next to the compiled graph.
+
+    :param portal_graph: PortalGraph to save.
+    :param portal_graph_path: Where to write it.
+    :return: str: The portal graph path.
+    """
+
+    return save_precomputed({
+        'node_ids': portal_graph.node_ids,
+        'floor_codes': portal_graph.floor_codes,
+        'local_index': portal_graph.local_index,
+        'floor_portals': portal_graph.floor_portals,
+        'portal_distances': portal_graph.portal_distances,
+        'portal_parents': portal_graph.portal_parents,
+        'floor_links': portal_graph.floor_links,
+    }, portal_graph_path, PORTAL_GRAPH_FORMAT_VERSION, portal_graph.graph_key)
+
+def load_portal_graph(portal_graph_path=DEFAULT_PORTAL_GRAPH_PATH, graph_key=None):
+    """
+    Loads a saved portal graph if it was built from the graph with the given key.
+
+    :param portal_graph_path: Path of the saved portal graph.
+    :param graph_key: Key of the current campus graph (graph.graph['graph_key']).
+    :return: PortalGraph or None if missing, unreadable or built from another graph.
+    """
+
+    data = load_precomputed(portal_graph_path, PORTAL_GRAPH_FORMAT_VERSION, graph_key, "portal graph")
+    if data is None:
+        return None
+    return PortalGraph(data['graph_key'], data['node_ids'], data['floor_codes'], data['local_index'], data['floor_portals'],
+                       data['portal_distances'], data['portal_parents'], data['floor_links'])
+
+def _summary(portal_graph):
+    """ :return: str: Short description of the portal graph for the log. """
+    return f"portal graph with {portal_graph.portal_count()} portals"
+
+def load_or_build_portal_graph(campus_graph, csr_graph=None, portal_graph_path=DEFAULT_PORTAL_GRAPH_PATH):
+    """
+    Returns the saved portal graph of this campus graph, building and saving it if needed.
+
+    :param campus_graph: The NetworkX campus graph.
+    :param csr_graph: CSRGraph of campus_graph (built if not given).
+    :param portal_graph_path: Where the portal graph is kept (None never reads or writes a file).
+    :return: PortalGraph
+    """
+
+    return load_or_build_precomputed(campus_graph, portal_graph_path, load_portal_graph,
+                                     lambda: build_portal_graph(campus_graph, csr_graph), save_portal_graph, _summary)
+
+def main(argv=None):
+    """ Batch job: python -m portal_graph """
+    return precompute_main(argv, "Precompute same-floor distances between stairs/elevator portals.", DEFAULT_PORTAL_GRAPH_PATH,
+                           lambda campus_graph, args: build_portal_graph(campus_graph), save_portal_graph, _summary)
+
+if __name__ == '__main__':
+    sys.exit(main())
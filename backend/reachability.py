@@ -0,0 +1,102 @@
+import math
+from csr_graph import csr_dijkstra
+
+# Rects in the same row closer than this (in SVG units) are merged into one area
+AREA_MERGE_TOLERANCE = 0.05
+
+def reachable_nodes(csr_graph, start_node_ids, max_distance):
+    """
+    Bounded Dijkstra from one or more start nodes (e.g. all rects of a room).
+    Nodes are expanded in distance order, so the search stops at the first node beyond the cutoff.
+
+    :param csr_graph: CSRGraph of the campus graph.
+    :param start_node_ids: Node IDs the search starts from (all at distance 0).
+    :param max_distance: Cost cutoff, in edge weight units.
+    :return: dict: Node ID -> distance, for every node reached within max_distance.
+    """
+
+    node_index, node_ids = csr_graph.node_index, csr_graph.node_ids
+    distances, _ = csr_dijkstra(csr_graph, [node_index[node_id] for node_id in start_node_ids], max_distance)
+    return {node_ids[node]: distance for node, distance in distances.items()}
+
+def reachable_rooms(campus_graph, distances, exclude=()):
+    """
+    Named rooms among the reached nodes; rooms drawn as several rects keep their closest one.
+
+    :param campus_graph: The NetworkX graph representing the campus map.
+    :param distances: Output of reachable_nodes.
+    :param exclude: Room names to leave out (e.g. the start room).
+    :return: list: {'room', 'floor', 'distance'} dictionaries, closest first.
+    """
+
+    excluded = {room_name.upper() for room_name in exclude}
+    rooms = {}
+    for node_id, distance in distances.items():
+        node_data = campus_graph.nodes[node_id]
+        if node_data.get('category') != 'room':
+            continue
+        room_name = node_data.get('type')
+        if room_name.upper() in excluded:
+            continue
+        if room_name not in rooms or distance < rooms[room_name]['distance']:
+            rooms[room_name] = {'room': room_name, 'floor': node_data.get('floor'), 'distance': distance}
+    return sorted(rooms.values(), key=lambda room: (room['distance'], room['room']))
+
+def reachable_areas(campus_graph, distances):
+    """
+    Covers the reached area of every floor with as few rects as the map allows, for drawing
+    an overlay: reached rects lying next to each other in the same row are merged.
+
+    :param campus_graph: The NetworkX graph representing the campus map.
+    :param distances: Output of reachable_nodes.
+    :return: dict: Floor letter -> list of [x, y, width, height] rects (SVG coordinates).
+    """
+
+    rows = {}
+    for node_id in distances:
+        node_data = campus_graph.nodes[node_id]
+        if node_data.get('category') == 'obstacle' or node_data.get('width') is None:
+            continue
+        row_key = (node_data.get('floor'), round(node_data['y'], 2), round(node_data['height'], 2))
+        rows.setdefault(row_key, []).append((node_data['x'], node_data['width']))
+
+    areas = {}
+    for (floor, y, height), row_rects in sorted(rows.items(), key=lambda item: (str(item[0][0]), item[0][1:])):
+        row_rects.sort()
+        merged = [list(row_rects[0])]
+        for x, width in row_rects[1:]:
+            last = merged[-1]
+            if x <= last[0] + last[1] + AREA_MERGE_TOLERANCE:
+                last[1] = max(last[1], x + width - last[0])
+            else:
+                merged.append([x, width])
+        areas.setdefault(floor, []).extend([round(x, 2), y, round(width, 2), height] for x, width in merged)
+    return areas
+
+def distance_cutoff(max_distance=None, metres=None, seconds=None, map_units_per_metre=None, walking_speed=None):
+    """
+    Converts the cutoff of a reachability query to edge weight units.
+
+    :param max_distance: Cutoff in edge weight (SVG) units.
+    :param metres: Cutoff in metres (needs map_units_per_metre).
+    :param seconds: Cutoff in walking seconds (needs map_units_per_metre and walking_speed in metres per second).
+    :return: float: The cutoff.
+    :raises ValueError: If no usable cutoff is given or the map scale is unknown.
+    """
+
+    if max_distance is None and metres is None and seconds is None:
+        raise ValueError("Missing cutoff, give one of 'max_distance', 'metres' or 'seconds'.")
+    if max_distance is None and not map_units_per_metre:
+        raise ValueError("The map scale is not configured, give the cutoff as 'max_distance' in map units.")
+    try:
+        if max_distance is not None:
+            cutoff = float(max_distance)
+        elif metres is not None:
+            cutoff = float(metres) * map_units_per_metre
+        else:
+            cutoff = float(seconds) * walking_speed * map_units_per_metre
+    except (TypeError, ValueError):
+        cutoff = math.nan
+    if math.isnan(cutoff) or cutoff < 0:
+        raise ValueError("The cutoff must be a non-negative number.")
+    return cutoff
@@ -0,0 +1,84 @@
+class RoomIndex:
+    """
+    Normalized room name -> node lookup built once per campus graph.
+
+    Every node is indexed under its upper-cased, stripped 'type' and 'svg_id', keeping graph
+    order, so the first candidate of a name is exactly the node find_node's linear scan returns.
+    Rooms drawn with several rects keep all of their nodes as candidates.
+    """
+
+    def __init__(self, campus_graph):
+        """
+        :param campus_graph: The NetworkX graph representing the campus map.
+        """
+
+        candidates = {}
+        for node_id, node_data in campus_graph.nodes(data=True):
+            node_type = (node_data.get('type') or '').strip().upper()
+            svg_id = (node_data.get('svg_id') or '').strip().upper()
+            if node_type:
+                candidates.setdefault(node_type, []).append(node_id)
+            if svg_id and svg_id != node_type:
+                candidates.setdefault(svg_id, []).append(node_id)
+        self._candidates = {name: tuple(node_ids) for name, node_ids in candidates.items()}
+        self.graph_key = campus_graph.graph.get('graph_key')
+
+    def __len__(self):
+        return len(self._candidates)
+
+    def __contains__(self, room_name):
+        return bool(room_name) and room_name.strip().upper() in self._candidates
+
+    def items(self):
+        """ :return: iterator: (normalized room name, tuple of node IDs) pairs. """
+        return iter(self._candidates.items())
+
+    def first(self, room_name):
+        """
+        Compatibility lookup matching find_node's linear scan.
+
+        :param room_name: Room ID or name (case-insensitive).
+        :return: str or None: The first node in graph order whose type or svg_id matches.
+        """
+
+        node_ids = self._candidates.get(room_name.strip().upper()) if room_name else None
+        return node_ids[0] if node_ids else None
+
+    def candidates(self, room_name):
+        """
+        :param room_name: Room ID or name (case-insensitive).
+        :return: tuple: Every node whose type or svg_id matches, in graph order (empty if none).
+        """
+
+        if not room_name:
+            return ()
+        return self._candidates.get(room_name.strip().upper(), ())
+
+    def closest_candidates(self, from_room, to_room, campus_graph):
+        """
+        Picks the start and goal rects of two rooms that lie closest to each other
+        (straight-line distance between rect centers, ties keep graph order).
+
+        :param from_room: Start room ID or name (case-insensitive).
+        :param to_room: Goal room ID or name (case-insensitive).
+        :param campus_graph: The NetworkX graph the index was built from.
+        :return: tuple: (start node ID or None, goal node ID or None)
+        """
+
+        start_candidates = self.candidates(from_room)
+        goal_candidates = self.candidates(to_room)
+        if not start_candidates or not goal_candidates:
+            return self.first(from_room), self.first(to_room)
+
+        best_pair = (start_candidates[0], goal_candidates[0])
+        best_distance = None
+        for start_node in start_candidates:
+            start_data = campus_graph.nodes[start_node]
+            for goal_node in goal_candidates:
+                goal_data = campus_graph.nodes[goal_node]
+                distance = ((start_data.get('center_x', 0.0) - goal_data.get('center_x', 0.0)) ** 2
+                            + (start_data.get('center_y', 0.0) - goal_data.get('center_y', 0.0)) ** 2)
+                if best_distance is None or distance < best_distance:
+                    best_pair = (start_node, goal_node)
+                    best_distance = distance
+        return best_pair
@@ -0,0 +1,219 @@
+import os
+import os.path
+import pickle
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from navigation_utils import segment_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROUTE_CACHE_SIZE = 1024
+
+class RouteCache:
+    """
+    Bounded least-recently-used cache of navigation results, safe to share between request threads.
+
+    Entries are keyed on (graph version, normalized from room, normalized to room), so a new
+    campus graph never serves routes computed on the old one. The campus graph is undirected:
+    a miss for A -> B is answered from a cached B -> A route by reversing it and segmenting again.
+    With a disk_path, evicted and new routes are also kept in a small SQLite file that survives restarts.
+    Versions of the form '<graph version>/<variant>' (e.g. routing profiles) belong to that graph version.
+    """
+
+    def __init__(self, max_entries=DEFAULT_ROUTE_CACHE_SIZE, disk_path=None):
+        """
+        :param max_entries: Number of routes kept in memory before the least recently used one is dropped.
+        :param disk_path: Optional SQLite file used as a second, persistent cache tier.
+        """
+
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.reverse_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._disk = None
+        if disk_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+                self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+                self._disk.execute("CREATE TABLE IF NOT EXISTS routes (graph_version TEXT, from_room TEXT, to_room TEXT, "
+                                   "path BLOB, PRIMARY KEY (graph_version, from_room, to_room))")
+                self._disk.commit()
+            except sqlite3.Error:
+                logger.warning("Could not open route cache file %s, using the memory cache only.", disk_path, exc_info=True)
+                self._disk = None
+
+    @staticmethod
+    def make_key(from_room, to_room, graph_version):
+        """ :return: tuple: Cache key with case and surrounding spaces of the room names ignored. """
+        return (graph_version, from_room.strip().upper(), to_room.strip().upper())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, from_room, to_room, graph_version, campus_graph):
+        """
+        Looks up a route, trying the memory tier, the reversed route, then the disk tier.
+
+        :param from_room: Start room name as sent by the client.
+        :param to_room: Goal room name as sent by the client.
+        :param graph_version: Version (graph_key) of the campus graph the route must come from.
+        :param campus_graph: The NetworkX campus graph, used to segment reused routes.
+        :return: dict or None: {'path_node_ids': [...], 'path_segments': [...]} or None on a miss.
+        """
+
+        key = self.make_key(from_room, to_room, graph_version)
+        reverse_key = (key[0], key[2], key[1])
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            reverse_entry = self._entries.get(reverse_key)
+            if reverse_entry is not None:
+                self._entries.move_to_end(reverse_key)
+                path_node_ids = list(reversed(reverse_entry['path_node_ids']))
+                self.reverse_hits += 1
+            else:
+                path_node_ids = self._disk_get(key)
+                if path_node_ids is None:
+                    reverse_path = self._disk_get(reverse_key)
+                    path_node_ids = list(reversed(reverse_path)) if reverse_path is not None else None
+                if path_node_ids is None:
+                    self.misses += 1
+                    return None
+                self.disk_hits += 1
+
+        try:
+            entry = {'path_node_ids': path_node_ids, 'path_segments': segment_path(path_node_ids, campus_graph)}
+        except KeyError:
+            # The stored route does not fit the graph (should not happen with matching versions)
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self._store(key, entry)
+        return entry
+
+    def put(self, from_room, to_room, graph_version, path_node_ids, path_segments):
+        """
+        Stores a computed route in the memory tier (and the disk tier if enabled).
+
+        :param from_room: Start room name as sent by the client.
+        :param to_room: Goal room name as sent by the client.
+        :param graph_version: Version (graph_key) of the campus graph the route was computed on.
+        :param path_node_ids: Node IDs from start to goal.
+        :param path_segments: Segments returned by segment_path for this route.
+        """
+
+        key = self.make_key(from_room, to_room, graph_version)
+        entry = {'path_node_ids': list(path_node_ids), 'path_segments': path_segments}
+        with self._lock:
+            self._store(key, entry)
+            if self._disk is not None:
+                try:
+                    self._disk.execute("INSERT OR REPLACE INTO routes VALUES (?, ?, ?, ?)",
+                                       (str(key[0]), key[1], key[2], pickle.dumps(entry['path_node_ids'])))
+                    self._disk.commit()
+                except sqlite3.Error:
+                    logger.warning("Could not write route %s -> %s to the route cache file.", key[1], key[2])
+
+    def retain_version(self, graph_version):
+        """
+        Drops every cached route that was not computed on the given graph version (or a variant of it).
+
+        :param graph_version: Version (graph_key) of the current campus graph.
+        :return: int: Number of memory entries removed.
+        """
+
+        with self._lock:
+            variant_prefix = f"{graph_version}/"
+            stale_keys = [key for key in self._entries
+                          if key[0] != graph_version and not str(key[0]).startswith(variant_prefix)]
+            for key in stale_keys:
+                del self._entries[key]
+            if self._disk is not None:
+                try:
+                    self._disk.execute("DELETE FROM routes WHERE graph_version != ? AND substr(graph_version, 1, ?) != ?",
+                                       (str(graph_version), len(variant_prefix), variant_prefix))
+                    self._disk.commit()
+                except sqlite3.Error:
+                    logger.warning("Could not prune the route cache file.")
+        return len(stale_keys)
+
+    def drop_routes_through(self, node_ids):
+        """
+        Drops every cached route passing through one of the given nodes (e.g. nodes that were just closed),
+        from both tiers. Other routes are kept.
+
+        :param node_ids: Node IDs.
+        :return: int: Number of memory entries removed.
+        """
+
+        node_ids = set(node_ids)
+        if not node_ids:
+            return 0
+        with self._lock:
+            stale_keys = [key for key, entry in self._entries.items() if not node_ids.isdisjoint(entry['path_node_ids'])]
+            for key in stale_keys:
+                del self._entries[key]
+            if self._disk is not None:
+                try:
+                    stale_rows = [(row[0],) for row in self._disk.execute("SELECT rowid, path FROM routes")
+                                  if not node_ids.isdisjoint(pickle.loads(row[1]))]
+                    self._disk.executemany("DELETE FROM routes WHERE rowid = ?", stale_rows)
+                    self._disk.commit()
+                except sqlite3.Error:
+                    logger.warning("Could not prune the route cache file.")
+        return len(stale_keys)
+
+    def clear(self):
+        """ Empties both tiers and resets the counters. """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.reverse_hits = self.disk_hits = self.misses = self.evictions = 0
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM routes")
+                self._disk.commit()
+
+    def stats(self):
+        """ :return: dict: Entry count, capacity and hit/miss counters. """
+        with self._lock:
+            lookups = self.hits + self.reverse_hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'reverse_hits': self.reverse_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (lookups - self.misses) / lookups if lookups else 0.0,
+                'disk_tier': self._disk is not None,
+            }
+
+    def _store(self, key, entry):
+        """ Inserts an entry and evicts the least recently used ones (caller holds the lock). """
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_get(self, key):
+        """ :return: list or None: Node IDs stored on disk for this key (caller holds the lock). """
+        if self._disk is None:
+            return None
+        try:
+            row = self._disk.execute("SELECT path FROM routes WHERE graph_version = ? AND from_room = ? AND to_room = ?",
+                                     (str(key[0]), key[1], key[2])).fetchone()
+        except sqlite3.Error:
+            return None
+        return pickle.loads(row[0]) if row else None
@@ -0,0 +1,203 @@
+import os
+import os.path
+import sys
+import math
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from csr_graph import CSRGraph, csr_dijkstra
+from graph_artifact import save_precomputed, load_precomputed, precompute_main
+from a_star_pathfinding import get_node_category
+
+DEFAULT_ROUTE_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiled", "route_table.bin")
+ROUTE_TABLE_FORMAT_VERSION = 1
+
+# CSR graph shared with the worker processes (set by _init_worker)
+_WORKER_CSR = None
+
+class RouteTable:
+    """
+    Precomputed shortest routes between every pair of named rooms.
+
+    Holds a room x room distance matrix and, per source room, a pruned shortest-path tree:
+    only the nodes lying on a route to another room are kept, as a sorted node index array
+    and a matching parent array. A route is read by walking parents from the target back
+    to the source, so answering a query costs O(path length) lookups and no search.
+    """
+
+    def __init__(self, graph_key, node_ids, room_names, room_nodes, distances, tree_nodes, tree_parents):
+        self.graph_key = graph_key
+        self.node_ids = node_ids
+        self.room_names = room_names
+        self.room_nodes = room_nodes
+        self.room_position = {room_name: position for position, room_name in enumerate(room_names)}
+        self.distances = distances
+        self.tree_nodes = tree_nodes
+        self.tree_parents = tree_parents
+
+    def has_room(self, room_name):
+        """ :return: bool: True if routes from/to this room name are in the table. """
+        return room_name.strip().upper() in self.room_position
+
+    def room_node_id(self, room_name):
+        """ :return: str or None: Node the routes from/to this room name start/end at, None if the room is not in the table. """
+        position = self.room_position.get(room_name.strip().upper())
+        return None if position is None else self.node_ids[self.room_nodes[position]]
+
+    def distance(self, from_room, to_room):
+        """
+        :param from_room: Start room name (case-insensitive).
+        :param to_room: Goal room name (case-insensitive).
+        :return: float: Route length, math.inf if the rooms are not connected.
+        """
+        source = self.room_position[from_room.strip().upper()]
+        target = self.room_position[to_room.strip().upper()]
+        return self.distances[source * len(self.room_names) + target]
+
+    def route(self, from_room, to_room):
+        """
+        Reads a precomputed route.
+
+        :param from_room: Start room name (case-insensitive).
+        :param to_room: Goal room name (case-insensitive).
+        :return: list or None: Node IDs from start to goal, or None if the rooms are not connected.
+        """
+
+        source = self.room_position[from_room.strip().upper()]
+        target = self.room_position[to_room.strip().upper()]
+        if self.distances[source * len(self.room_names) + target] == math.inf:
+            return None
+
+        source_node = self.room_nodes[source]
+        tree_nodes = self.tree_nodes[source]
+        tree_parents = self.tree_parents[source]
+        current = self.room_nodes[target]
+        path = [current]
+        while current != source_node:
+            current = tree_parents[bisect_left(tree_nodes, current)]
+            path.append(current)
+        path.reverse()
+        return [self.node_ids[index] for index in path]
+
+def room_name_index(campus_graph):
+    """
+    Maps each normalized room name to its node, keeping the first node in graph order
+    (the node find_node returns for that name).
+
+    :param campus_graph: The NetworkX graph representing the campus map.
+    :return: dict: Upper-case room name -> node ID, in graph order.
+    """
+
+    room_nodes = {}
+    for node_id, node_data in campus_graph.nodes(data=True):
+        if get_node_category(node_data) in ('walkable', 'obstacle', 'unknown'):
+            continue
+        room_name = node_data.get('type', '').strip().upper()
+        if room_name and room_name not in room_nodes:
+            room_nodes[room_name] = node_id
+    return room_nodes
+
+def _init_worker(csr_graph):
+    global _WORKER_CSR
+    _WORKER_CSR = csr_graph
+
+def _source_tree(source, room_nodes, csr_graph=None):
+    """
+    Runs one Dijkstra from a room and keeps the part of its tree leading to other rooms.
+
+    :return: tuple: (distances to every room as array('d'), sorted tree node array, parent array)
+    """
+
+    csr_graph = csr_graph or _WORKER_CSR
+    distances, came_from = csr_dijkstra(csr_graph, [source])
+
+    tree = {}
+    for room_node in room_nodes:
+        current = room_node
+        while current in came_from and current not in tree:
+            tree[current] = came_from[current]
+            current = came_from[current]
+
+    # 16-bit node indices are enough for graphs below 65,536 nodes
+    index_typecode = 'H' if len(csr_graph) < 65536 else 'i'
+    tree_nodes = array(index_typecode, sorted(tree))
+    tree_parents = array(index_typecode, (tree[node] for node in tree_nodes))
+    room_distances = array('d', (distances.get(room_node, math.inf) for room_node in room_nodes))
+    return room_distances, tree_nodes, tree_parents
+
+def build_route_table(campus_graph, csr_graph=None, workers=1):
+    """
+    Computes the routes between every pair of named rooms with one Dijkstra per room.
+
+    :param campus_graph: The NetworkX campus graph (its graph.graph['graph_key'] is stored).
+    :param csr_graph: CSRGraph of campus_graph (built if not given).
+    :param workers: Number of processes running the searches (None uses every CPU).
+    :return: RouteTable
+    """
+
+    csr_graph = csr_graph or CSRGraph.from_networkx(campus_graph)
+    room_index = room_name_index(campus_graph)
+    room_names = list(room_index)
+    room_nodes = array('i', (csr_graph.node_index[node_id] for node_id in room_index.values()))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(csr_graph,)) as executor:
+            results = list(executor.map(_source_tree, room_nodes, [room_nodes] * len(room_nodes),
+                                        chunksize=max(1, len(room_nodes) // (workers * 4))))
+    else:
+        results = [_source_tree(source, room_nodes, csr_graph) for source in room_nodes]
+
+    distances = array('d')
+    tree_nodes = []
+    tree_parents = []
+    for room_distances, source_tree_nodes, source_tree_parents in results:
+        distances.extend(room_distances)
+        tree_nodes.append(source_tree_nodes)
+        tree_parents.append(source_tree_parents)
+
+    return RouteTable(campus_graph.graph.get('graph_key'), list(csr_graph.node_ids), room_names, room_nodes,
+                      distances, tree_nodes, tree_parents)
+
+def save_route_table(route_table, table_path=DEFAULT_ROUTE_TABLE_PATH):
+    """
+    Writes the route table next to the compiled graph.
+
+    :param route_table: RouteTable to save.
+    :param table_path: Where to write it.
+    :return: str: The table path.
+    """
+
+    return save_precomputed({
+        'node_ids': route_table.node_ids,
+        'room_names': route_table.room_names,
+        'room_nodes': route_table.room_nodes,
+        'distances': route_table.distances,
+        'tree_nodes': route_table.tree_nodes,
+        'tree_parents': route_table.tree_parents,
+    }, table_path, ROUTE_TABLE_FORMAT_VERSION, route_table.graph_key)
+
+def load_route_table(table_path=DEFAULT_ROUTE_TABLE_PATH, graph_key=None):
+    """
+    Loads a route table if it was built from the graph with the given key.
+
+    :param table_path: Path of the saved table.
+    :param graph_key: Key of the current campus graph (graph.graph['graph_key']).
+    :return: RouteTable or None if the table is missing, unreadable or built from another graph.
+    """
+
+    table = load_precomputed(table_path, ROUTE_TABLE_FORMAT_VERSION, graph_key, "route table")
+    if table is None:
+        return None
+    return RouteTable(table['graph_key'], table['node_ids'], table['room_names'], table['room_nodes'],
+                      table['distances'], table['tree_nodes'], table['tree_parents'])
+
+def main(argv=None):
+    """ Batch job: python -m route_table [--coarsen] [--workers N] """
+    return precompute_main(argv, "Precompute routes between every pair of named rooms.", DEFAULT_ROUTE_TABLE_PATH,
+                           lambda campus_graph, args: build_route_table(campus_graph, workers=args.workers),
+                           save_route_table, lambda route_table: f"route table for {len(route_table.room_names)} rooms")
+
+if __name__ == '__main__':
+    sys.exit(main())
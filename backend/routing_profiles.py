@@ -0,0 +1,122 @@
+from array import array
+
+DEFAULT_PROFILE = 'default'
+# Node types starting with these (case-insensitive) link floors, see create_campus_graph
+CONNECTION_KINDS = ('stairs', 'elevator')
+# Extra cost of every floor climbed by stairs when avoiding them (SVG units, a floor change itself costs 2.0)
+AVOID_STAIRS_COST = 200.0
+# Extra cost of an elevator ride (waiting for the car), so short trips take the stairs
+ELEVATOR_WAIT_COST = 60.0
+
+# Profile rules: 'stairs' / 'elevator' -> extra cost per floor changed that way, or None to never enter
+# nodes of that kind; 'elevator_ride' -> extra cost per elevator ride (half on stepping in, half on stepping out).
+# Extra costs are never negative, so the landmark bounds of the default graph stay admissible for every profile.
+ROUTING_PROFILES = {
+    DEFAULT_PROFILE: {},
+    'step_free': {'stairs': None},
+    'avoid_stairs': {'stairs': AVOID_STAIRS_COST},
+    'fastest': {'elevator_ride': ELEVATOR_WAIT_COST},
+}
+
+def connection_kind(node_data):
+    """ :return: str or None: 'stairs' or 'elevator' for floor connection nodes, None for all other nodes. """
+    node_type = (node_data.get('type') or '').lower()
+    for kind in CONNECTION_KINDS:
+        if node_type.startswith(kind):
+            return kind
+    return None
+
+def build_profile_costs(campus_graph, csr_graph, rules):
+    """
+    Computes the edge weights and move flags of one routing profile over the CSR edges.
+    Arrays the profile does not change are not copied.
+
+    :param campus_graph: The NetworkX graph the CSRGraph was built from (node types are read from it).
+    :param csr_graph: CSRGraph of the campus graph.
+    :param rules: Profile rules, see ROUTING_PROFILES.
+    :return: tuple: (weights or None, edge_allowed or None), None where the graph's own array is kept.
+    :raises ValueError: If a rule is unknown or an extra cost is negative or not a number.
+    """
+
+    for name, cost in rules.items():
+        if name not in CONNECTION_KINDS and name != 'elevator_ride':
+            raise ValueError(f"Unknown routing profile rule '{name}'.")
+        if cost is not None and not cost >= 0:
+            raise ValueError(f"Routing profile rule '{name}' needs a non-negative cost or None, got {cost!r}.")
+    if not rules:
+        return None, None
+
+    node_kinds = [connection_kind(campus_graph.nodes[node_id]) for node_id in csr_graph.node_ids]
+    forbidden = {kind for kind in CONNECTION_KINDS if kind in rules and rules[kind] is None}
+    floor_costs = {kind: rules[kind] for kind in CONNECTION_KINDS if rules.get(kind)}
+    half_ride_cost = rules.get('elevator_ride', 0.0) / 2.0
+
+    offsets, neighbors, floor_codes = csr_graph.offsets, csr_graph.neighbors, csr_graph.floor_codes
+    weights = array('d', csr_graph.weights) if floor_costs or half_ride_cost else None
+    edge_allowed = array('B', csr_graph.edge_allowed) if forbidden else None
+    for current in range(len(node_kinds)):
+        current_kind = node_kinds[current]
+        for edge in range(offsets[current], offsets[current + 1]):
+            neighbor = neighbors[edge]
+            neighbor_kind = node_kinds[neighbor]
+            if neighbor_kind in forbidden:
+                edge_allowed[edge] = 0
+            if weights is None:
+                continue
+            if floor_codes[current] != floor_codes[neighbor]:
+                if current_kind == neighbor_kind and current_kind in floor_costs:
+                    weights[edge] += floor_costs[current_kind]
+            elif half_ride_cost and current_kind != neighbor_kind and 'elevator' in (current_kind, neighbor_kind):
+                weights[edge] += half_ride_cost
+    return weights, edge_allowed
+
+class RoutingProfiles:
+    """
+    Named routing profiles over one CSRGraph. Every profile is a view of the same topology
+    (see CSRGraph.with_edge_costs) with its own weight vector and/or move mask, so all profiles
+    are searched at full speed without a copy of the graph per profile.
+    """
+
+    def __init__(self, campus_graph, csr_graph, profiles=None):
+        """
+        :param campus_graph: The NetworkX graph the CSRGraph was built from.
+        :param csr_graph: CSRGraph of the campus graph (the default profile).
+        :param profiles: Profile name -> rules, defaults to ROUTING_PROFILES.
+        :raises ValueError: If a profile has invalid rules.
+        """
+
+        self.graphs = {}
+        for name, rules in (ROUTING_PROFILES if profiles is None else profiles).items():
+            weights, edge_allowed = build_profile_costs(campus_graph, csr_graph, rules)
+            self.graphs[name] = csr_graph if weights is None and edge_allowed is None \
+                else csr_graph.with_edge_costs(weights, edge_allowed)
+
+    def names(self):
+        """ :return: list: Profile names. """
+        return list(self.graphs)
+
+    def __contains__(self, name):
+        return name in self.graphs
+
+    def edge_masks(self):
+        """ :return: list: The distinct edge_allowed arrays of all profiles. """
+        edge_masks = []
+        for csr_graph in self.graphs.values():
+            if all(csr_graph.edge_allowed is not edge_mask for edge_mask in edge_masks):
+                edge_masks.append(csr_graph.edge_allowed)
+        return edge_masks
+
+    def graph(self, name):
+        """
+        :param name: Profile name.
+        :return: CSRGraph: The graph to search for this profile.
+        :raises ValueError: If there is no such profile.
+        """
+
+        if name not in self.graphs:
+            raise ValueError(f"Unknown routing profile '{name}', use one of {', '.join(self.graphs)}.")
+        return self.graphs[name]
+
+def profile_version(graph_version, profile):
+    """ :return: Route cache version of routes found with a profile on a graph version ('<graph version>/<profile>'). """
+    return graph_version if profile == DEFAULT_PROFILE else f"{graph_version}/{profile}"
@@ -0,0 +1,110 @@
+import os
+import os.path
+import json
+import logging
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARED_CHANGES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiled", "shared_changes.db")
+
+class SharedChanges:
+    """
+    Log of the runtime changes (closures, floor reloads) made in the worker processes of one server,
+    kept in a SQLite file every worker opens.
+
+    A worker records a change while holding the file's write lock, after replaying the changes the
+    other workers recorded since it last looked, so every worker applies the same changes in the same
+    order and ends up with the same closures (and closure IDs) and floors. Workers call has_pending before
+    answering a request to pick up the changes made elsewhere; that costs one indexed query.
+    The server master calls compact once at startup, so the file only holds the changes of the running server.
+    """
+
+    def __init__(self, path=DEFAULT_SHARED_CHANGES_PATH):
+        """
+        Changes already in the file (recorded by an earlier server) are not applied. Workers forked
+        after the server master opened the file start from the same point, so a restarted worker
+        replays every change made since the server started.
+
+        :param path: SQLite file shared by the workers.
+        :raises sqlite3.Error: If the file cannot be opened.
+        """
+
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Transactions are started explicitly, 'BEGIN IMMEDIATE' takes the write lock up front
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                         "kind TEXT NOT NULL, data TEXT NOT NULL)")
+        self._lock = threading.Lock()
+        self.opened_seq = self.applied_seq = self.latest_seq()
+
+    def reopen(self):
+        """ Opens a new connection to the file, SQLite connections must not be used across a fork. """
+        self._db = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+
+    def compact(self):
+        """
+        Deletes the changes recorded before this file was opened. No worker applies them, call it once
+        per server start before any worker records a change (sequence numbers keep counting up).
+
+        :return: int: Number of changes deleted.
+        """
+
+        with self._lock:
+            return self._db.execute("DELETE FROM changes WHERE seq <= ?", (self.opened_seq,)).rowcount
+
+    def latest_seq(self):
+        """ :return: int: Sequence number of the last change recorded by any worker (0 if none). """
+        return self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    def has_pending(self):
+        """ :return: bool: True if another worker recorded a change this one has not applied yet. """
+        return self.latest_seq() > self.applied_seq
+
+    def apply_pending(self, apply_change):
+        """
+        Applies the changes recorded by other workers since the last call.
+
+        :param apply_change: Function (kind, data) applying one change in this worker.
+        :return: int: Number of changes applied.
+        """
+
+        with self._lock:
+            return self._apply_pending(apply_change)
+
+    def _apply_pending(self, apply_change):
+        rows = self._db.execute("SELECT seq, kind, data FROM changes WHERE seq > ? ORDER BY seq", (self.applied_seq,)).fetchall()
+        for seq, kind, data in rows:
+            try:
+                apply_change(kind, json.loads(data))
+            except Exception:
+                logger.exception("Could not apply shared change %d (%s), skipping it.", seq, kind)
+            self.applied_seq = seq
+        return len(rows)
+
+    def record(self, kind, make_change, apply_change):
+        """
+        Makes a change in this worker and records it for the others.
+
+        :param kind: Kind of change (e.g. 'close'), passed back to apply_change in the other workers.
+        :param make_change: Function () -> (result, data) making the change here; data (JSON-serializable) is recorded,
+                            nothing is recorded when it is None. Exceptions abort the change and are raised again.
+        :param apply_change: Function (kind, data) applying a change recorded by another worker.
+        :return: The result of make_change.
+        """
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._apply_pending(apply_change)
+                result, data = make_change()
+                if data is not None:
+                    cursor = self._db.execute("INSERT INTO changes (kind, data) VALUES (?, ?)", (kind, json.dumps(data)))
+                    self.applied_seq = cursor.lastrowid
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        return result
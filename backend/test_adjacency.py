@@ -0,0 +1,52 @@
+import unittest
+import os
+from map_parser import FLOOR_FILES, svg_map_parse, are_adjacent, find_adjacent_pairs
+from campus_fixtures import MAP_DIRECTORY
+
+def all_pairs_adjacency(rects_list, tolerance=1.5):
+    """ Reference implementation: the original quadratic are_adjacent loop """
+    pairs = []
+    for i in range(len(rects_list)):
+        for j in range(i + 1, len(rects_list)):
+            if are_adjacent(rects_list[i][1], rects_list[j][1], tolerance):
+                pairs.append((i, j))
+    return pairs
+
+class TestAdjacencySweep(unittest.TestCase):
+
+    """ TEST #1 """
+    def test_small_layout(self):
+        """ Touching, overlapping, nearly touching and separated rects."""
+        print("\n--- Testing Sweep on Small Layout ---")
+        rects = [
+            ('R1', {'x': 0.0, 'y': 0.0, 'width': 10.0, 'height': 10.0}),
+            ('R2', {'x': 10.0, 'y': 0.0, 'width': 10.0, 'height': 10.0}),   # touches R1
+            ('R3', {'x': 21.0, 'y': 0.0, 'width': 5.0, 'height': 5.0}),     # 1px gap to R2
+            ('R4', {'x': 40.0, 'y': 0.0, 'width': 5.0, 'height': 5.0}),     # far away
+            ('R5', {'x': 0.0, 'y': 11.4, 'width': 50.0, 'height': 2.0}),    # under R1-R4
+            ('R6', {'x': 0.0, 'y': 0.0, 'width': 10.0, 'height': 10.0}),    # same left edge as R1
+        ]
+        self.assertEqual(find_adjacent_pairs(rects), all_pairs_adjacency(rects))
+        self.assertEqual(find_adjacent_pairs(rects, tolerance=0.5), all_pairs_adjacency(rects, tolerance=0.5))
+
+    """ TEST #2 """
+    def test_matches_all_pairs_on_floor_maps(self):
+        """ Sweep must give exactly the same edge set as the all-pairs loop on every floor."""
+        print("\n--- Testing Sweep Against All-Pairs on Floor Maps ---")
+        for floor_letter, floor_filename in FLOOR_FILES:
+            with self.subTest(floor=floor_letter):
+                graph = svg_map_parse(os.path.join(MAP_DIRECTORY, floor_filename), floor_letter)
+                self.assertIsNotNone(graph)
+                rects_list = list(graph.nodes(data=True))
+
+                expected_edges = set()
+                for i, j in all_pairs_adjacency(rects_list):
+                    type1 = rects_list[i][1]['type'].lower()
+                    type2 = rects_list[j][1]['type'].lower()
+                    if 'obstacle' in type1 and 'obstacle' in type2:
+                        continue
+                    expected_edges.add(frozenset((rects_list[i][0], rects_list[j][0])))
+
+                actual_edges = {frozenset(edge) for edge in graph.edges()}
+                self.assertEqual(actual_edges, expected_edges)
+                print(f"  Floor {floor_letter}: {len(actual_edges)} edges match")
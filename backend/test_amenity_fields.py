@@ -0,0 +1,61 @@
+import unittest
+import math
+import networkx as nx
+from csr_graph import csr_dijkstra
+from amenity_fields import amenity_category, build_amenity_fields, save_amenity_fields, load_amenity_fields
+from campus_fixtures import CampusRouteChecks, SavedDataChecks, add_corridor, random_room_pairs
+
+class TestAmenityFields(CampusRouteChecks, SavedDataChecks, unittest.TestCase):
+    def setUp(self):
+        """ Corridor of 6 tiles with stairs at the west end, a toilet at the east end and a wall tile above tile 1"""
+        self.graph = nx.Graph(graph_key='key-1')
+        add_corridor(self.graph, 'c', 6)
+        self.graph.add_node('stairs', center_x=-10.0, center_y=0.0, type='stairsFRONT', floor='A')
+        self.graph.add_node('wc', center_x=60.0, center_y=0.0, type='FemaleWC', floor='A')
+        self.graph.add_node('wall', center_x=10.0, center_y=-10.0, type='obstacle', floor='A')
+        self.graph.add_edge('stairs', 'c0', weight=10.0)
+        self.graph.add_edge('wc', 'c5', weight=10.0)
+        self.graph.add_edge('wall', 'c1', weight=10.0)
+
+    """ TEST #1 """
+    def test_nearest_amenity_route(self):
+        """ Every node walks its next hops to the closest amenity of each category."""
+        print("\n--- Testing Nearest Amenity Fields ---")
+        self.assertEqual(amenity_category(self.graph.nodes['wc']), 'toilet')
+        self.assertEqual(amenity_category(self.graph.nodes['stairs']), 'stairs')
+        self.assertIsNone(amenity_category(self.graph.nodes['c0']))
+        amenity_fields = build_amenity_fields(self.graph)
+        self.assertEqual(sorted(amenity_fields.categories()), ['stairs', 'toilet'])
+        self.assertEqual(amenity_fields.nearest('stairs', 'c2'), (['c2', 'c1', 'c0', 'stairs'], 30.0))
+        self.assertEqual(amenity_fields.nearest('toilet', 'c2'), (['c2', 'c3', 'c4', 'c5', 'wc'], 40.0))
+        self.assertEqual(amenity_fields.nearest('toilet', 'wc'), (['wc'], 0.0))
+        # An obstacle start may be left, but no route passes through it
+        self.assertEqual(amenity_fields.nearest('stairs', 'wall'), (['wall', 'c1', 'c0', 'stairs'], 30.0))
+        self.assertIsNone(amenity_fields.nearest('elevator', 'c2'))
+
+    """ TEST #2 """
+    def test_campus_distances_are_shortest(self):
+        """ On the campus graph the fields hold the shortest distance to the closest stairs."""
+        print("\n--- Testing Nearest Amenity Fields on the Campus Graph ---")
+        campus_graph, csr_graph = self.campus_graph, self.csr_graph
+        amenity_fields = build_amenity_fields(campus_graph, csr_graph)
+        stairs = {node_id for node_id, node_data in campus_graph.nodes(data=True) if amenity_category(node_data) == 'stairs'}
+        self.assertTrue(stairs)
+        for start_node_id, _ in random_room_pairs(10, seed=17):
+            distances, _ = csr_dijkstra(csr_graph, [csr_graph.node_index[start_node_id]])
+            shortest = min((distances.get(csr_graph.node_index[node_id], math.inf) for node_id in stairs), default=math.inf)
+            nearest = amenity_fields.nearest('stairs', start_node_id)
+            if shortest == math.inf:
+                self.assertIsNone(nearest)
+                continue
+            path, distance = nearest
+            self.assertAlmostEqual(distance, shortest, places=6)
+            self.assertIn(path[-1], stairs)
+            self.assertAlmostEqual(sum(campus_graph[u][v]['weight'] for u, v in zip(path, path[1:])), shortest, places=6)
+
+    """ TEST #3 """
+    def test_saved_fields_follow_graph_key(self):
+        """ Saved fields only load for the graph they were computed on."""
+        print("\n--- Testing Amenity Field Invalidation ---")
+        self.assert_saved_follows_graph_key(build_amenity_fields(self.graph), save_amenity_fields, load_amenity_fields,
+                                            lambda amenity_fields: amenity_fields.nearest('toilet', 'c0'))
@@ -0,0 +1,47 @@
+import unittest
+import networkx as nx
+from csr_graph import CSRGraph
+from batch_routes import group_by_source, batch_shortest_paths
+from campus_fixtures import CampusRouteChecks, add_corridor, random_room_pairs
+
+class TestBatchRoutes(CampusRouteChecks, unittest.TestCase):
+    def setUp(self):
+        """ Corridor of 5 tiles with a wall tile above tile 2"""
+        self.graph = nx.Graph()
+        add_corridor(self.graph, 'c', 5)
+        self.graph.add_node('wall', center_x=20.0, center_y=-10.0, type='obstacle', floor='A')
+        self.graph.add_edge('wall', 'c2', weight=10.0)
+
+    """ TEST #1 """
+    def test_pairs_grouped_by_source(self):
+        """ Pairs sharing a start are answered from one search, in request order within the start."""
+        print("\n--- Testing Batch Routes ---")
+        node_pairs = [('c0', 'c4'), ('c4', 'c0'), ('c0', 'c2'), ('c0', 'wall'), ('c0', 'c0'), ('wall', 'c4')]
+        self.assertEqual(group_by_source(node_pairs), {
+            'c0': [(0, 'c4'), (2, 'c2'), (3, 'wall'), (4, 'c0')],
+            'c4': [(1, 'c0')],
+            'wall': [(5, 'c4')],
+        })
+        csr_graph = CSRGraph.from_networkx(self.graph)
+        results = list(batch_shortest_paths(csr_graph, node_pairs))
+        self.assertEqual([position for position, _ in results], [0, 2, 3, 4, 1, 5])
+        paths = dict(results)
+        self.assertEqual(paths[0], ['c0', 'c1', 'c2', 'c3', 'c4'])
+        self.assertEqual(paths[1], ['c4', 'c3', 'c2', 'c1', 'c0'])
+        self.assertEqual(paths[2], ['c0', 'c1', 'c2'])
+        self.assertIsNone(paths[3], "Obstacles can never be entered.")
+        self.assertEqual(paths[4], ['c0'])
+        self.assertEqual(paths[5], ['wall', 'c2', 'c3', 'c4'])
+
+    """ TEST #2 """
+    def test_campus_routes_are_shortest(self):
+        """ Batch routes on the campus graph are shortest paths made of allowed moves."""
+        print("\n--- Testing Batch Routes on the Campus Graph ---")
+        # 3 starts with 5 goals each, so the batch shares searches
+        starts = [start_node_id for start_node_id, _ in random_room_pairs(3, seed=19)]
+        goals = [goal_node_id for _, goal_node_id in random_room_pairs(5, seed=23)]
+        node_pairs = [(start_node_id, goal_node_id) for start_node_id in starts for goal_node_id in goals]
+        results = list(batch_shortest_paths(self.csr_graph, node_pairs))
+        self.assertEqual(sorted(position for position, _ in results), list(range(len(node_pairs))))
+        routes = {node_pairs[position]: path for position, path in results}
+        self.assert_shortest_routes(lambda start_node_id, goal_node_id: routes[start_node_id, goal_node_id], node_pairs)
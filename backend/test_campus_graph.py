@@ -0,0 +1,84 @@
+import unittest
+import os
+import logging
+import shutil
+import tempfile
+from map_parser import create_campus_graph
+from graph_artifact import (compute_graph_key, save_graph_artifact, load_graph_artifact,
+                            load_or_build_campus_graph)
+from campus_fixtures import MAP_DIRECTORY, campus_graph
+
+class TestCampusGraph(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.campus_graph = campus_graph()
+
+    """ TEST #1 """
+    def test_parallel_build_matches_serial(self):
+        """ Parsing floors in worker processes must give the same graph, in the same order."""
+        print("\n--- Testing Parallel Campus Graph Build ---")
+        parallel_graph = create_campus_graph(directory=MAP_DIRECTORY, workers=3)
+        self.assertIsNotNone(parallel_graph)
+        self.assertEqual(list(parallel_graph.nodes(data=True)), list(self.campus_graph.nodes(data=True)))
+        self.assertEqual(list(parallel_graph.edges(data=True)), list(self.campus_graph.edges(data=True)))
+
+    """ TEST #2 """
+    def test_artifact_round_trip(self):
+        """ A saved and reloaded artifact must give back the same graph, including neighbour order."""
+        print("\n--- Testing Graph Artifact Round Trip ---")
+        graph_key, floor_hashes = compute_graph_key(MAP_DIRECTORY)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            artifact_path = os.path.join(tmpdir, "campus_graph.bin")
+            save_graph_artifact(self.campus_graph, artifact_path, graph_key, floor_hashes)
+
+            loaded_graph = load_graph_artifact(artifact_path, graph_key)
+            self.assertIsNotNone(loaded_graph)
+            self.assertEqual(list(loaded_graph.nodes(data=True)), list(self.campus_graph.nodes(data=True)))
+            for node_id in self.campus_graph:
+                self.assertEqual(list(loaded_graph.adj[node_id].items()), list(self.campus_graph.adj[node_id].items()))
+
+            # Different parser parameters give a different key, so the artifact is stale
+            other_key, _ = compute_graph_key(MAP_DIRECTORY, inter_floor_weight=5.0)
+            self.assertNotEqual(other_key, graph_key)
+            self.assertIsNone(load_graph_artifact(artifact_path, other_key))
+
+    """ TEST #3 """
+    def test_rebuild_when_floor_changes(self):
+        """ The artifact is reused while the SVGs are unchanged and rebuilt when a floor file changes."""
+        print("\n--- Testing Artifact Rebuild on Floor Change ---")
+        svg_content = '<svg><rect id="walkable" x="0" y="0" width="10" height="10"/>{}</svg>'
+        with tempfile.TemporaryDirectory() as tmpdir:
+            shutil.copy(os.path.join(MAP_DIRECTORY, "Floor_H.svg"), tmpdir)
+            floor_a_path = os.path.join(tmpdir, "Floor_A.svg")
+            with open(floor_a_path, 'w', encoding='utf-8') as f:
+                f.write(svg_content.format(''))
+            artifact_path = os.path.join(tmpdir, "compiled", "campus_graph.bin")
+
+            first_graph = load_or_build_campus_graph(directory=tmpdir, artifact_path=artifact_path)
+            self.assertTrue(os.path.exists(artifact_path))
+            artifact_mtime = os.path.getmtime(artifact_path)
+
+            cached_graph = load_or_build_campus_graph(directory=tmpdir, artifact_path=artifact_path)
+            self.assertEqual(list(cached_graph.edges(data=True)), list(first_graph.edges(data=True)))
+            self.assertEqual(os.path.getmtime(artifact_path), artifact_mtime)
+
+            with open(floor_a_path, 'w', encoding='utf-8') as f:
+                f.write(svg_content.format('<rect id="walkable" x="10" y="0" width="10" height="10"/>'))
+            rebuilt_graph = load_or_build_campus_graph(directory=tmpdir, artifact_path=artifact_path)
+            self.assertEqual(rebuilt_graph.number_of_nodes(), first_graph.number_of_nodes() + 1)
+
+    """ TEST #4 """
+    def test_build_logs_one_summary_line(self):
+        """ Floor and connector details are only logged at DEBUG, INFO gets a single summary line."""
+        print("\n--- Testing Campus Graph Build Logging ---")
+        with self.assertLogs('map_parser', level=logging.INFO) as logs:
+            campus_graph = create_campus_graph(directory=MAP_DIRECTORY)
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn(f"{campus_graph.number_of_nodes()} nodes", logs.output[0])
+
+        with self.assertLogs('map_parser', level=logging.DEBUG) as logs:
+            create_campus_graph(directory=MAP_DIRECTORY)
+        messages = [record.getMessage() for record in logs.records]
+        self.assertTrue(any(message.startswith("CONNECTING: ") for message in messages))
+        self.assertTrue(any(message.startswith("Parsed Floor H ") for message in messages))
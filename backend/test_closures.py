@@ -0,0 +1,103 @@
+import unittest
+import threading
+import networkx as nx
+from a_star_pathfinding import annotate_traversal_rules, pathfinding_algo
+from csr_graph import CSRGraph, csr_pathfinding_algo
+from route_cache import RouteCache
+from routing_profiles import RoutingProfiles
+from closures import GraphClosures, nodes_in_area
+from campus_fixtures import add_corridor
+
+class TestClosures(unittest.TestCase):
+    def setUp(self):
+        """ Two parallel corridors of 5 tiles (10 x 10) on floor A joined at both ends, room A1 below the south corridor"""
+        self.graph = nx.Graph()
+        add_corridor(self.graph, 'n', 5, rects=True)
+        add_corridor(self.graph, 's', 5, y=20.0, rects=True)
+        for column in (0, 4):
+            self.graph.add_node(f"link{column}", x=column * 10.0, y=10.0, width=10.0, height=10.0,
+                                center_x=column * 10.0 + 5, center_y=15.0, type='walkable', floor='A')
+            self.graph.add_edge(f"n{column}", f"link{column}", weight=10.0)
+            self.graph.add_edge(f"link{column}", f"s{column}", weight=10.0)
+        self.graph.add_node('A1', x=20.0, y=30.0, width=10.0, height=10.0, center_x=25.0, center_y=35.0, type='A1', floor='A')
+        self.graph.add_edge('A1', 's2', weight=10.0)
+        annotate_traversal_rules(self.graph)
+        self.csr = CSRGraph.from_networkx(self.graph)
+
+    """ TEST #1 """
+    def test_close_and_reopen(self):
+        """ Closed nodes are avoided by every search and profile, overlapping closures reopen only when both are gone."""
+        print("\n--- Testing Closures ---")
+        profiles = RoutingProfiles(self.graph, self.csr)
+        closures = GraphClosures(self.graph, self.csr, profiles.edge_masks())
+        original_flags = bytes(profiles.graph('step_free').edge_allowed), bytes(self.csr.edge_allowed)
+        self.assertEqual(csr_pathfinding_algo('n0', 'A1', self.csr), ['n0', 'link0', 's0', 's1', 's2', 'A1'])
+
+        self.assertEqual(nodes_in_area(self.graph, 'A', 12.0, 22.0, 5.0, 5.0), ['s1'])
+        first, newly_closed = closures.close(nodes_in_area(self.graph, 'A', 12.0, 22.0, 5.0, 5.0), 'Wet floor')
+        second, _ = closures.close(['s1', 'link0'])
+        self.assertEqual(newly_closed, ['s1'])
+        for csr_graph in (self.csr, profiles.graph('step_free')):
+            self.assertEqual(csr_pathfinding_algo('n0', 'A1', csr_graph), ['n0', 'n1', 'n2', 'n3', 'n4', 'link4', 's4', 's3', 's2', 'A1'])
+        self.assertEqual(pathfinding_algo('n0', 'A1', self.graph), ['n0', 'n1', 'n2', 'n3', 'n4', 'link4', 's4', 's3', 's2', 'A1'])
+        self.assertEqual(csr_pathfinding_algo('s1', 's2', self.csr), ['s1', 's2'], "A closed start can still be left.")
+        self.assertTrue(closures.blocks(['n0', 'link0', 's0']))
+        self.assertFalse(closures.blocks(['s1', 's2']))
+        self.assertEqual(closures.closure_of('s1')['reason'], 'Wet floor')
+
+        self.assertEqual(closures.reopen(first['id']), [])
+        self.assertTrue(closures.is_closed('s1'))
+        self.assertEqual(closures.version, 0)
+        self.assertEqual(sorted(closures.reopen(second['id'])), ['link0', 's1'])
+        self.assertIsNone(closures.reopen(second['id']))
+        self.assertEqual((bytes(profiles.graph('step_free').edge_allowed), bytes(self.csr.edge_allowed)), original_flags)
+        self.assertNotIn('closed', self.graph.nodes['s1'])
+        self.assertEqual(closures.route_version('v1'), 'v1#1')
+
+    """ TEST #2 """
+    def test_room_status_and_cached_routes(self):
+        """ Room status closures follow the listed rooms, only cached routes through closed nodes are dropped."""
+        print("\n--- Testing Room Status Closures ---")
+        closures = GraphClosures(self.graph, self.csr)
+        closed, reopened = closures.sync_rooms('room_status', {'A1': ['A1']}, {'A1': 'Repairing'})
+        self.assertEqual((closed, reopened), (['A1'], []))
+        self.assertIsNone(csr_pathfinding_algo('n0', 'A1', self.csr))
+        self.assertEqual(closures.sync_rooms('room_status', {'A1': ['A1']}), ([], []))
+        closures.close(['n2'])
+        self.assertEqual(closures.sync_rooms('room_status', {}), ([], ['A1']))
+        self.assertEqual([closure['rooms'] for closure in closures.list()], [[]])
+        self.assertIsNotNone(csr_pathfinding_algo('n0', 'A1', self.csr))
+
+        route_cache = RouteCache(8)
+        route_cache.put('N0', 'A1', 'v1', ['n0', 'link0', 's0', 's1', 's2', 'A1'], [])
+        route_cache.put('N0', 'N4', 'v1', ['n0', 'n1', 'n2', 'n3', 'n4'], [])
+        self.assertEqual(route_cache.drop_routes_through(['s1']), 1)
+        self.assertIsNone(route_cache.get('N0', 'A1', 'v1', self.graph))
+        self.assertIsNotNone(route_cache.get('N0', 'N4', 'v1', self.graph))
+
+    """ TEST #3 """
+    def test_reapplied_closure_ids(self):
+        """ Re-applied closures keep their IDs without handing out an ID twice, also with closures made on other threads."""
+        print("\n--- Testing Re-applied Closure IDs ---")
+        closures = GraphClosures(self.graph, self.csr)
+        reapplied, _ = closures.reapply({'id': 7, 'reason': '', 'source': 'manual', 'rooms': [], 'areas': [],
+                                         'node_ids': ['n2'], 'closed_at': 1.0}, lambda room_name: [])
+        self.assertEqual((reapplied['id'], reapplied['closed_at']), (7, 1.0))
+        closures.reapply({'id': 3, 'reason': '', 'source': 'manual', 'rooms': ['A1'], 'areas': [],
+                          'node_ids': ['A1'], 'closed_at': 2.0}, lambda room_name: [room_name])
+        self.assertEqual(closures.close(['s2'])[0]['id'], 8)
+
+        def close_and_reopen(closure_ids):
+            for _ in range(200):
+                closure, _ = closures.close(['n1'])
+                closure_ids.append(closure['id'])
+                closures.reapply(dict(closure, id=1), lambda room_name: [])
+                closures.reopen(1)
+        closure_ids = [[] for _ in range(4)]
+        threads = [threading.Thread(target=close_and_reopen, args=(ids,)) for ids in closure_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        all_ids = [closure_id for ids in closure_ids for closure_id in ids]
+        self.assertEqual(len(set(all_ids)), len(all_ids))
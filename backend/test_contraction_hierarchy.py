@@ -0,0 +1,57 @@
+import unittest
+import os
+import tempfile
+import networkx as nx
+from graph_artifact import save_graph_artifact, read_artifact_attachment
+from contraction_hierarchy import (ATTACHMENT_NAME, build_contraction_hierarchy, ch_pathfinding_algo,
+                                   load_or_build_contraction_hierarchy)
+from campus_fixtures import CampusRouteChecks, add_corridor, random_room_pairs
+
+class TestContractionHierarchy(CampusRouteChecks, unittest.TestCase):
+    def setUp(self):
+        """ Corridor of 6 tiles on floor A with a wall tile above tile 2 and rooms at both ends"""
+        self.graph = nx.Graph(graph_key='key-1')
+        add_corridor(self.graph, 'c', 6)
+        self.graph.add_node('wall', center_x=20.0, center_y=-10.0, type='obstacle', floor='A')
+        self.graph.add_edge('wall', 'c2', weight=10.0)
+        self.graph.add_node('A1', center_x=-10.0, center_y=0.0, type='A1', floor='A')
+        self.graph.add_node('A2', center_x=60.0, center_y=0.0, type='A2', floor='A')
+        self.graph.add_edge('A1', 'c0', weight=10.0)
+        self.graph.add_edge('A2', 'c5', weight=10.0)
+
+    """ TEST #1 """
+    def test_routes_unpack_to_original_nodes(self):
+        """ Shortcuts unpack back to the corridor tiles, obstacles can be left but not entered."""
+        print("\n--- Testing Contraction Hierarchy Routes ---")
+        hierarchy = build_contraction_hierarchy(self.graph)
+        corridor = ['A1', 'c0', 'c1', 'c2', 'c3', 'c4', 'c5', 'A2']
+        self.assertEqual(ch_pathfinding_algo('A1', 'A2', hierarchy), corridor)
+        self.assertEqual(ch_pathfinding_algo('A2', 'A1', hierarchy), corridor[::-1])
+        self.assertEqual(ch_pathfinding_algo('A1', 'A1', hierarchy), ['A1'])
+        self.assertEqual(ch_pathfinding_algo('wall', 'A2', hierarchy), ['wall', 'c2', 'c3', 'c4', 'c5', 'A2'])
+        self.assertIsNone(ch_pathfinding_algo('A1', 'wall', hierarchy))
+        self.assertIsNone(ch_pathfinding_algo('A1', 'missing', hierarchy))
+
+    """ TEST #2 """
+    def test_campus_routes_are_shortest(self):
+        """ Routes on the campus graph are shortest paths made of allowed moves."""
+        print("\n--- Testing Contraction Hierarchy Routes on the Campus Graph ---")
+        hierarchy = build_contraction_hierarchy(self.campus_graph, self.csr_graph)
+        self.assert_shortest_routes(lambda start_node_id, goal_node_id: ch_pathfinding_algo(start_node_id, goal_node_id, hierarchy),
+                                    random_room_pairs(25, seed=11))
+
+    """ TEST #3 """
+    def test_hierarchy_is_stored_with_the_artifact(self):
+        """ The hierarchy is saved into the graph artifact and read back instead of being rebuilt."""
+        print("\n--- Testing Contraction Hierarchy Storage ---")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            artifact_path = os.path.join(tmpdir, "campus_graph.bin")
+            save_graph_artifact(self.graph, artifact_path, 'key-1')
+            built = load_or_build_contraction_hierarchy(self.graph, artifact_path=artifact_path)
+            loaded = load_or_build_contraction_hierarchy(self.graph, artifact_path=artifact_path)
+            self.assertIsNot(loaded, built)
+            self.assertEqual(list(loaded.up_targets), list(built.up_targets))
+            self.assertEqual(ch_pathfinding_algo('A1', 'A2', loaded), ch_pathfinding_algo('A1', 'A2', built))
+            # A new graph artifact drops the hierarchy of the old graph
+            save_graph_artifact(self.graph, artifact_path, 'key-2')
+            self.assertIsNone(read_artifact_attachment(artifact_path, 'key-2', ATTACHMENT_NAME))
@@ -0,0 +1,72 @@
+import unittest
+import networkx as nx
+from csr_graph import CSRGraph, csr_astar, csr_pathfinding_algo
+
+class TestCSRGraph(unittest.TestCase):
+    def setUp(self):
+        """ 3x3 walkable grid (10px apart) on floor A, plus a stairs node on floor B"""
+        self.graph = nx.Graph()
+        for row in range(3):
+            for column in range(3):
+                self.graph.add_node(f"{row}{column}", center_x=column * 10.0, center_y=row * 10.0,
+                                    type='walkable', floor='A')
+        for row in range(3):
+            for column in range(3):
+                if column < 2: self.graph.add_edge(f"{row}{column}", f"{row}{column + 1}", weight=10.0)
+                if row < 2: self.graph.add_edge(f"{row}{column}", f"{row + 1}{column}", weight=10.0)
+        self.graph.add_node('stairs', center_x=500.0, center_y=500.0, type='stairsFRONT', floor='B')
+        self.graph.add_edge('22', 'stairs', weight=2.0)
+
+    """ TEST #1 """
+    def test_csr_layout(self):
+        """ Offsets, neighbours and weights must follow the NetworkX adjacency."""
+        print("\n--- Testing CSR Layout ---")
+        csr = CSRGraph.from_networkx(self.graph)
+        self.assertEqual(len(csr), self.graph.number_of_nodes())
+        self.assertEqual(csr.number_of_edges(), self.graph.number_of_edges())
+        for node_id in self.graph:
+            index = csr.node_index[node_id]
+            start, end = csr.offsets[index], csr.offsets[index + 1]
+            self.assertEqual([csr.node_ids[n] for n in csr.neighbors[start:end]], list(self.graph.adj[node_id]))
+            self.assertEqual(list(csr.weights[start:end]), [d['weight'] for d in self.graph.adj[node_id].values()])
+        self.assertEqual(csr.floor_letters[csr.floor_codes[csr.node_index['stairs']]], 'B')
+
+    """ TEST #2 """
+    def test_path_and_floor_change(self):
+        """ Cardinal path across the grid and up the stairs."""
+        print("\n--- Testing CSR Path Across Floors ---")
+        csr = CSRGraph.from_networkx(self.graph)
+        path = csr_pathfinding_algo('00', 'stairs', csr)
+        self.assertIsNotNone(path)
+        self.assertEqual(len(path), 6)
+        self.assertEqual(path[-2:], ['22', 'stairs'])
+        self.assertEqual(csr_pathfinding_algo('11', '11', csr), ['11'])
+        self.assertIsNone(csr_pathfinding_algo('00', 'missing', csr))
+
+    """ TEST #3 """
+    def test_obstacle_and_diagonal_moves(self):
+        """ Obstacles are never entered and diagonal same-floor edges are never used."""
+        print("\n--- Testing CSR Traversal Rules ---")
+        self.graph.nodes['11']['type'] = 'obstacle'
+        self.graph.add_edge('00', '22', weight=1.0) # Diagonal shortcut
+        csr = CSRGraph.from_networkx(self.graph)
+        path = csr_pathfinding_algo('01', '21', csr)
+        self.assertNotIn('11', path)
+        self.assertEqual(len(path), 5)
+        path = csr_pathfinding_algo('00', '22', csr)
+        self.assertEqual(len(path), 5)
+
+    """ TEST #4 """
+    def test_better_path_to_queued_node(self):
+        """ A cheaper path found to a node already in the queue must replace the first one."""
+        print("\n--- Testing CSR Decrease-Key ---")
+        graph = nx.Graph()
+        for node_id, x in [('S', 0.0), ('A', 10.0), ('B', 10.0), ('G', 20.0)]:
+            graph.add_node(node_id, center_x=x, center_y=0.0 if node_id != 'B' else 0.5, type='walkable', floor='A')
+        graph.add_edge('S', 'A', weight=10.0)
+        graph.add_edge('A', 'G', weight=50.0)
+        graph.add_edge('S', 'B', weight=10.0)
+        graph.add_edge('B', 'G', weight=10.0)
+        csr = CSRGraph.from_networkx(graph)
+        path, _ = csr_astar(csr.node_index['S'], csr.node_index['G'], csr)
+        self.assertEqual([csr.node_ids[i] for i in path], ['S', 'B', 'G'])
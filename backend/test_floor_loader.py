@@ -0,0 +1,118 @@
+import unittest
+import os
+import tempfile
+import importlib.util
+from unittest import mock
+from map_parser import create_campus_graph
+from graph_artifact import compute_graph_key, load_graph_artifact
+from floor_loader import LazyFloorLoader, scan_floor_ids, warm_up
+from a_star_pathfinding import find_nodes
+from csr_graph import CSRGraph
+from landmarks import build_landmarks, load_landmarks
+from amenity_fields import build_amenity_fields, load_amenity_fields
+
+# Corridor of two tiles with stairs at its west end, room {floor}1 east of it
+FLOOR_SVG = ('<svg><rect id="stairsWEST" x="0" y="0" width="10" height="10"/>'
+             '<rect id="walkable" x="10" y="0" width="10" height="10"/>'
+             '<rect id="walkable" x="20" y="0" width="10" height="10"/>'
+             '<rect id="{floor}1" x="30" y="0" width="10" height="10"/></svg>')
+
+class TestFloorLoader(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = self.tmpdir.name
+        self.artifact_path = os.path.join(self.directory, "compiled", "campus_graph.bin")
+        for floor_letter in 'ABCD':
+            with open(os.path.join(self.directory, f"Floor_{floor_letter}.svg"), 'w', encoding='utf-8') as f:
+                f.write(FLOOR_SVG.format(floor=floor_letter))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    """ TEST #1 """
+    def test_floor_by_floor_matches_full_build(self):
+        """ Partial graphs never link floors that are not adjacent, the last floor gives the full graph."""
+        print("\n--- Testing Lazy Floor Loading ---")
+        loader = LazyFloorLoader(self.directory, self.artifact_path).scan()
+        self.assertEqual(loader.floor_order, ['A', 'B', 'C', 'D'])
+        self.assertEqual(loader.floors_for_rooms(['a1', 'C1', 'nowhere']), ['A', 'B', 'C'])
+        self.assertEqual(loader.floors_for_rooms(['nowhere']), [])
+
+        campus_graph, loaded_floors = loader.load_floors(None, ['C', 'A'])
+        self.assertEqual(loaded_floors, ['A', 'C'])
+        self.assertFalse(any(campus_graph.nodes[node1]['floor'] != campus_graph.nodes[node2]['floor']
+                             for node1, node2 in campus_graph.edges()), "A and C are not adjacent floors.")
+        self.assertEqual(campus_graph.graph['pending_floors'], ['B', 'D'])
+        self.assertNotEqual(campus_graph.graph['graph_key'], loader.graph_key)
+        self.assertEqual(loader.load_floors(campus_graph, ['A', 'Z']), (campus_graph, []))
+
+        for floor_letter in ['D', 'B']:
+            campus_graph, _ = loader.load_floors(campus_graph, [floor_letter])
+        full_graph = create_campus_graph(directory=self.directory)
+        self.assertEqual(list(campus_graph.nodes(data=True)), list(full_graph.nodes(data=True)))
+        for node_id in full_graph:
+            self.assertEqual(list(campus_graph.adj[node_id].items()), list(full_graph.adj[node_id].items()))
+        self.assertNotIn('pending_floors', campus_graph.graph)
+        self.assertEqual(campus_graph.graph['graph_key'], compute_graph_key(self.directory)[0])
+        self.assertIsNotNone(load_graph_artifact(self.artifact_path, campus_graph.graph['graph_key']))
+
+    """ TEST #2 """
+    def test_warm_up_and_progress(self):
+        """ Warm floors load first, progress follows the graph being served, missing floor files are left out."""
+        print("\n--- Testing Floor Warm-Up ---")
+        os.remove(os.path.join(self.directory, "Floor_B.svg"))
+        self.assertIsNone(scan_floor_ids(os.path.join(self.directory, "Floor_B.svg")))
+        self.assertEqual(scan_floor_ids(os.path.join(self.directory, "Floor_A.svg")), ['stairsWEST', 'walkable', 'walkable', 'A1'])
+
+        loader = LazyFloorLoader(self.directory, None, warm_floors=('C', 'Z')).scan()
+        self.assertEqual(loader.connection_floors, {'stairsWEST': ['A', 'C', 'D']})
+        self.assertEqual(loader.warm_up_order(), ['C', 'A', 'D'])
+        self.assertEqual(loader.progress(None)['pending_floors'], ['A', 'C', 'D'])
+
+        served_graphs = []
+        def load_floors(floors):
+            campus_graph, loaded_floors = loader.load_floors(served_graphs[-1] if served_graphs else None, floors)
+            served_graphs.append(campus_graph)
+            return loaded_floors
+        warm_up(loader, load_floors)
+        self.assertEqual([campus_graph.graph['loaded_floors'] for campus_graph in served_graphs], [['C'], ['A', 'C'], ['A', 'C', 'D']])
+
+        progress = loader.progress(served_graphs[0])
+        self.assertEqual((progress['complete'], progress['warm'], progress['pending_floors']), (False, True, ['A', 'D']))
+        self.assertTrue(loader.progress(served_graphs[-1])['complete'])
+        # Without B, floors A and C are next to each other like in create_campus_graph
+        self.assertEqual(sorted(served_graphs[-1].edges()), sorted(create_campus_graph(directory=self.directory).edges()))
+
+    """ TEST #3 """
+    @unittest.skipUnless(importlib.util.find_spec('flask_mysqldb'), "app.py needs flask_mysqldb")
+    def test_closure_while_loading_keeps_precomputed_structures_open(self):
+        """ Landmarks and amenity fields of the full graph match a build without closures when a room was closed during loading."""
+        print("\n--- Testing Lazy Floor Loading With An Open Closure ---")
+        import app
+        compiled = os.path.join(self.directory, "compiled")
+        with mock.patch.multiple(app, MAP_DIRECTORY=self.directory, GRAPH_ARTIFACT_PATH=self.artifact_path,
+                                 MAPPED_GRAPH_PATH=os.path.join(compiled, "campus_graph.map"),
+                                 LANDMARKS_PATH=os.path.join(compiled, "landmarks.bin"),
+                                 AMENITY_FIELDS_PATH=os.path.join(compiled, "amenity_fields.bin"),
+                                 ROUTE_TABLE_PATH=os.path.join(compiled, "route_table.bin"), LANDMARK_COUNT=2,
+                                 FLOOR_LOADER=LazyFloorLoader(self.directory, self.artifact_path).scan(),
+                                 GRAPH_STATE=app.GraphState(), ROUTE_CACHE=None):
+            self.assertEqual(app.load_floors(['A', 'B']), ['A', 'B'])
+            partial_graph = app.GRAPH_STATE.campus_graph
+            closure, _ = app.GRAPH_STATE.closures.close(find_nodes('B1', partial_graph), rooms=['B1'])
+
+            self.assertEqual(app.load_floors(['C', 'D']), ['C', 'D'])
+            state = app.GRAPH_STATE
+            campus_graph = state.campus_graph
+            self.assertNotIn('pending_floors', campus_graph.graph)
+            self.assertEqual(state.closures.reopen(closure['id']), find_nodes('B1', campus_graph))
+
+            graph_key = campus_graph.graph['graph_key']
+            fresh_landmarks = build_landmarks(campus_graph, CSRGraph.from_networkx(campus_graph), 2)
+            fresh_fields = build_amenity_fields(campus_graph, CSRGraph.from_networkx(campus_graph))
+            for landmarks in (state.landmarks, load_landmarks(app.LANDMARKS_PATH, graph_key)):
+                self.assertEqual((landmarks.landmark_nodes, landmarks.distances),
+                                 (fresh_landmarks.landmark_nodes, fresh_landmarks.distances))
+            for amenity_fields in (state.amenity_fields, load_amenity_fields(app.AMENITY_FIELDS_PATH, graph_key)):
+                self.assertEqual((amenity_fields.distances, amenity_fields.next_hops),
+                                 (fresh_fields.distances, fresh_fields.next_hops))
@@ -0,0 +1,122 @@
+import unittest
+import os
+import tempfile
+import importlib.util
+from unittest import mock
+from map_parser import create_campus_graph
+from graph_artifact import compute_graph_key, load_or_build_campus_graph, reload_changed_floors
+from a_star_pathfinding import find_nodes
+from csr_graph import CSRGraph, csr_pathfinding_algo
+from closures import GraphClosures
+from landmarks import build_landmarks, load_landmarks
+from amenity_fields import build_amenity_fields, load_amenity_fields
+
+# Corridor of two tiles with stairs at its west end, room {room} east of it
+FLOOR_SVG = ('<svg><rect id="stairsWEST" x="0" y="0" width="10" height="10"/>'
+             '<rect id="walkable" x="10" y="0" width="10" height="10"/>'
+             '<rect id="walkable" x="20" y="0" width="10" height="10"/>{rooms}</svg>')
+ROOM_RECT = '<rect id="{room}" x="{x}" y="0" width="10" height="10"/>'
+
+class TestFloorReload(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = self.tmpdir.name
+        self.artifact_path = os.path.join(self.directory, "compiled", "campus_graph.bin")
+        for floor_letter in 'ABC':
+            self.write_floor(floor_letter, ROOM_RECT.format(room=f"{floor_letter}1", x=30))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_floor(self, floor_letter, rooms):
+        with open(os.path.join(self.directory, f"Floor_{floor_letter}.svg"), 'w', encoding='utf-8') as f:
+            f.write(FLOOR_SVG.format(rooms=rooms))
+
+    """ TEST #1 """
+    def test_reload_matches_full_build(self):
+        """ Reloading an edited floor gives the graph a full build would give, in the same order."""
+        print("\n--- Testing Floor Reload ---")
+        campus_graph = load_or_build_campus_graph(directory=self.directory, artifact_path=self.artifact_path)
+        self.assertEqual(reload_changed_floors(campus_graph, self.directory, artifact_path=self.artifact_path),
+                         (campus_graph, []))
+
+        self.write_floor('B', ROOM_RECT.format(room='B1', x=30) + ROOM_RECT.format(room='B2', x=40))
+        new_graph, reloaded_floors = reload_changed_floors(campus_graph, self.directory, artifact_path=self.artifact_path)
+        self.assertEqual(reloaded_floors, ['B'])
+        self.assertNotIn('B2', [node_data['type'] for _, node_data in campus_graph.nodes(data=True)])
+
+        full_graph = create_campus_graph(directory=self.directory)
+        self.assertEqual(list(new_graph.nodes(data=True)), list(full_graph.nodes(data=True)))
+        for node_id in full_graph:
+            self.assertEqual(list(new_graph.adj[node_id].items()), list(full_graph.adj[node_id].items()))
+        self.assertEqual(new_graph.graph['graph_key'], compute_graph_key(self.directory)[0])
+        # The saved artifact is current, the next start loads the reloaded graph
+        loaded_graph = load_or_build_campus_graph(directory=self.directory, artifact_path=self.artifact_path)
+        self.assertEqual(list(loaded_graph.nodes(data=True)), list(full_graph.nodes(data=True)))
+
+        forced_graph, reloaded_floors = reload_changed_floors(new_graph, self.directory, floors=['A'], artifact_path=None)
+        self.assertEqual(reloaded_floors, ['A'])
+        self.assertEqual(list(forced_graph.edges(data=True)), list(new_graph.edges(data=True)))
+        with self.assertRaises(ValueError):
+            reload_changed_floors(new_graph, self.directory, floors=['Z'], artifact_path=None)
+
+    """ TEST #2 """
+    def test_closures_carry_over(self):
+        """ Closures follow their rooms to the reloaded graph, closures of removed rooms are dropped."""
+        print("\n--- Testing Closure Carry Over ---")
+        campus_graph = load_or_build_campus_graph(directory=self.directory, artifact_path=None)
+        closures = GraphClosures(campus_graph, CSRGraph.from_networkx(campus_graph))
+        closures.close(find_nodes('B1', campus_graph), 'Repairs', rooms=['B1'])
+        closures.close(find_nodes('C1', campus_graph), rooms=['C1'])
+        area_closure, _ = closures.close(find_nodes('A1', campus_graph), areas=[{'floor': 'A', 'x': 30.0, 'y': 0.0,
+                                                                                    'width': 10.0, 'height': 10.0}])
+
+        # B1 moves one tile east behind a new corridor tile, C1 is removed
+        self.write_floor('B', '<rect id="walkable" x="30" y="0" width="10" height="10"/>' + ROOM_RECT.format(room='B1', x=40))
+        self.write_floor('C', '')
+        new_graph, reloaded_floors = reload_changed_floors(campus_graph, self.directory, artifact_path=None)
+        self.assertEqual(reloaded_floors, ['B', 'C'])
+
+        new_csr = CSRGraph.from_networkx(new_graph)
+        new_closures = GraphClosures(new_graph, new_csr)
+        self.assertEqual(new_closures.carry_over(closures, lambda room_name: find_nodes(room_name, new_graph)), 2)
+        self.assertEqual([closure['id'] for closure in new_closures.list()], [1, 3])
+        self.assertEqual(new_closures.list()[0]['reason'], 'Repairs')
+        self.assertTrue(all(new_closures.is_closed(node_id) for node_id in find_nodes('B1', new_graph)))
+        self.assertEqual(new_closures.closure_of(find_nodes('A1', new_graph)[0])['id'], area_closure['id'])
+        self.assertIsNone(csr_pathfinding_algo(find_nodes('A1', new_graph)[0], find_nodes('B1', new_graph)[0], new_csr))
+        self.assertEqual(new_closures.close(find_nodes('B1', new_graph))[0]['id'], 4)
+
+    """ TEST #3 """
+    @unittest.skipUnless(importlib.util.find_spec('flask_mysqldb'), "app.py needs flask_mysqldb")
+    def test_reload_with_closure_keeps_precomputed_structures_open(self):
+        """ Landmarks and amenity fields built by a reload with a closure open match a build without closures."""
+        print("\n--- Testing Floor Reload With An Open Closure ---")
+        import app
+        compiled = os.path.join(self.directory, "compiled")
+        with mock.patch.multiple(app, MAP_DIRECTORY=self.directory, GRAPH_ARTIFACT_PATH=self.artifact_path,
+                                 MAPPED_GRAPH_PATH=os.path.join(compiled, "campus_graph.map"),
+                                 LANDMARKS_PATH=os.path.join(compiled, "landmarks.bin"),
+                                 AMENITY_FIELDS_PATH=os.path.join(compiled, "amenity_fields.bin"),
+                                 ROUTE_TABLE_PATH=os.path.join(compiled, "route_table.bin"), LANDMARK_COUNT=2,
+                                 FLOOR_LOADER=None, GRAPH_STATE=app.GraphState(), ROUTE_CACHE=None):
+            campus_graph = load_or_build_campus_graph(directory=self.directory, artifact_path=self.artifact_path)
+            app.publish_graph_state(app.build_graph_state(campus_graph))
+            closure, _ = app.GRAPH_STATE.closures.close(find_nodes('B1', campus_graph), rooms=['B1'])
+
+            self.write_floor('B', ROOM_RECT.format(room='B1', x=30) + ROOM_RECT.format(room='B2', x=40))
+            self.assertEqual(app.reload_floors(), ['B'])
+            state = app.GRAPH_STATE
+            new_graph = state.campus_graph
+            self.assertTrue(state.closures.is_closed(find_nodes('B1', new_graph)[0]))
+            self.assertEqual(state.closures.reopen(closure['id']), find_nodes('B1', new_graph))
+
+            graph_key = new_graph.graph['graph_key']
+            fresh_landmarks = build_landmarks(new_graph, CSRGraph.from_networkx(new_graph), 2)
+            fresh_fields = build_amenity_fields(new_graph, CSRGraph.from_networkx(new_graph))
+            for landmarks in (state.landmarks, load_landmarks(app.LANDMARKS_PATH, graph_key)):
+                self.assertEqual((landmarks.landmark_nodes, landmarks.distances),
+                                 (fresh_landmarks.landmark_nodes, fresh_landmarks.distances))
+            for amenity_fields in (state.amenity_fields, load_amenity_fields(app.AMENITY_FIELDS_PATH, graph_key)):
+                self.assertEqual((amenity_fields.distances, amenity_fields.next_hops),
+                                 (fresh_fields.distances, fresh_fields.next_hops))
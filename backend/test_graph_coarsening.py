@@ -0,0 +1,71 @@
+import unittest
+import math
+import heapq
+import random
+import networkx as nx
+from graph_coarsening import coarsen_graph
+from csr_graph import CSRGraph
+from a_star_pathfinding import get_node_category
+from campus_fixtures import campus_graph as shared_campus_graph, campus_csr_graph
+
+def traversable_distances(csr_graph, start_node_id):
+    """ Dijkstra over the moves pathfinding allows, keyed by node ID."""
+    start = csr_graph.node_index[start_node_id]
+    distances = {start: 0.0}
+    open_set = [(0.0, start)]
+    while open_set:
+        distance, current = heapq.heappop(open_set)
+        if distance > distances[current]:
+            continue
+        for edge in range(csr_graph.offsets[current], csr_graph.offsets[current + 1]):
+            if not csr_graph.edge_allowed[edge]:
+                continue
+            neighbor = csr_graph.neighbors[edge]
+            if distance + csr_graph.weights[edge] < distances.get(neighbor, math.inf):
+                distances[neighbor] = distance + csr_graph.weights[edge]
+                heapq.heappush(open_set, (distances[neighbor], neighbor))
+    return {csr_graph.node_ids[index]: distance for index, distance in distances.items()}
+
+class TestGraphCoarsening(unittest.TestCase):
+
+    """ TEST #1 """
+    def test_corridor_collapse(self):
+        """ Straight corridor tiles collapse, corners and rooms stay, obstacles go."""
+        print("\n--- Testing Corridor Collapse ---")
+        graph = nx.Graph()
+        # R1 - w1 - w2 - w3 (corner) - w4 - R2, with an obstacle next to w2
+        layout = [('R1', 0, 0, 'A1'), ('w1', 10, 0, 'walkable'), ('w2', 20, 0, 'walkable'),
+                  ('w3', 30, 0, 'walkable'), ('w4', 30, 10, 'walkable'), ('R2', 30, 20, 'A2'),
+                  ('o1', 20, 10, 'obstacle')]
+        for node_id, x, y, node_type in layout:
+            graph.add_node(node_id, center_x=float(x), center_y=float(y), type=node_type, floor='A')
+        for u, v in [('R1', 'w1'), ('w1', 'w2'), ('w2', 'w3'), ('w3', 'w4'), ('w4', 'R2'), ('w2', 'o1')]:
+            graph.add_edge(u, v, weight=10.0)
+
+        coarse_graph = coarsen_graph(graph)
+        self.assertEqual(set(coarse_graph.nodes()), {'R1', 'w3', 'R2'})
+        self.assertAlmostEqual(coarse_graph['R1']['w3']['weight'], 30.0)
+        self.assertAlmostEqual(coarse_graph['w3']['R2']['weight'], 20.0)
+        self.assertEqual(coarse_graph.graph['coarsening']['obstacles_removed'], 1)
+        self.assertEqual(graph.number_of_nodes(), 7, "Input graph must be left unchanged.")
+
+    """ TEST #2 """
+    def test_room_distances_preserved(self):
+        """ Room-to-room shortest path lengths on the campus graph must not change."""
+        print("\n--- Testing Room Distances After Coarsening ---")
+        campus_graph = shared_campus_graph()
+        coarse_graph = coarsen_graph(campus_graph)
+        report = coarse_graph.graph['coarsening']
+        self.assertLess(report['nodes_after'], report['nodes_before'])
+        self.assertLess(report['edges_after'], report['edges_before'])
+
+        full_csr = campus_csr_graph()
+        coarse_csr = CSRGraph.from_networkx(coarse_graph)
+        rooms = [node_id for node_id, node_data in campus_graph.nodes(data=True)
+                 if get_node_category(node_data) not in ('walkable', 'obstacle')]
+        random.seed(7)
+        for start_room in random.sample(rooms, 10):
+            full_distances = traversable_distances(full_csr, start_room)
+            coarse_distances = traversable_distances(coarse_csr, start_room)
+            for room in rooms:
+                self.assertAlmostEqual(coarse_distances.get(room, math.inf), full_distances.get(room, math.inf), places=6)
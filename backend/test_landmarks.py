@@ -0,0 +1,57 @@
+import unittest
+import networkx as nx
+from csr_graph import CSRGraph, csr_dijkstra, csr_pathfinding_algo
+from a_star_pathfinding import pathfinding_algo
+from landmarks import build_landmarks, save_landmarks, load_landmarks
+from campus_fixtures import CampusRouteChecks, SavedDataChecks, random_room_pairs
+
+class TestLandmarks(CampusRouteChecks, SavedDataChecks, unittest.TestCase):
+    def setUp(self):
+        """ Corridor on floor A leading to stairs, stairs to a corridor on floor B"""
+        self.graph = nx.Graph(graph_key='key-1')
+        layout = [('A1', 0, 0, 'A', 'A1'), ('a1', 10, 0, 'A', 'walkable'), ('a2', 20, 0, 'A', 'walkable'),
+                  ('sA', 30, 0, 'A', 'stairsFRONT'), ('sB', 500, 500, 'B', 'stairsFRONT'),
+                  ('b1', 500, 510, 'B', 'walkable'), ('B1', 500, 520, 'B', 'B1')]
+        for node_id, x, y, floor, node_type in layout:
+            self.graph.add_node(node_id, center_x=float(x), center_y=float(y), type=node_type, floor=floor)
+        for u, v in [('A1', 'a1'), ('a1', 'a2'), ('a2', 'sA'), ('sB', 'b1'), ('b1', 'B1')]:
+            self.graph.add_edge(u, v, weight=10.0)
+        self.graph.add_edge('sA', 'sB', weight=2.0)
+
+    """ TEST #1 """
+    def test_bounds_are_admissible(self):
+        """ The landmark bound never exceeds the real distance, and is exact at the goal."""
+        print("\n--- Testing Landmark Bounds ---")
+        csr_graph = CSRGraph.from_networkx(self.graph)
+        landmarks = build_landmarks(self.graph, csr_graph, landmark_count=2)
+        self.assertEqual(len(landmarks), 2)
+        goal = csr_graph.node_index['B1']
+        lower_bound = landmarks.goal_heuristic(goal)
+        distances, _ = csr_dijkstra(csr_graph, [goal])
+        for node, distance in distances.items():
+            self.assertLessEqual(lower_bound(node), distance + 1e-9)
+        self.assertEqual(lower_bound(goal), 0.0)
+        # The Manhattan heuristic overestimates across the stairs, the landmark bound does not
+        self.assertAlmostEqual(lower_bound(csr_graph.node_index['A1']), 52.0)
+        self.assertEqual(pathfinding_algo('A1', 'B1', self.graph, landmarks=landmarks),
+                         ['A1', 'a1', 'a2', 'sA', 'sB', 'b1', 'B1'])
+
+    """ TEST #2 """
+    def test_campus_routes_are_shortest(self):
+        """ With landmarks both engines return shortest paths on the campus graph."""
+        print("\n--- Testing ALT Routes on the Campus Graph ---")
+        landmarks = build_landmarks(self.campus_graph, self.csr_graph, landmark_count=4)
+        def find_route(start_node_id, goal_node_id):
+            path = csr_pathfinding_algo(start_node_id, goal_node_id, self.csr_graph, landmarks=landmarks)
+            self.assertEqual(pathfinding_algo(start_node_id, goal_node_id, self.campus_graph, landmarks=landmarks), path)
+            return path
+        self.assert_shortest_routes(find_route, random_room_pairs(15, seed=3))
+
+    """ TEST #3 """
+    def test_saved_landmarks_follow_graph_key(self):
+        """ Saved landmarks only load for the graph (and landmark count) they were computed for."""
+        print("\n--- Testing Landmark Invalidation ---")
+        landmarks = build_landmarks(self.graph, landmark_count=2)
+        landmarks_path = self.assert_saved_follows_graph_key(landmarks, save_landmarks, load_landmarks,
+                                                             lambda landmarks: landmarks.landmark_nodes)
+        self.assertIsNone(load_landmarks(landmarks_path, 'key-1', landmark_count=3))
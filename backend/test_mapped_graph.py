@@ -0,0 +1,87 @@
+import unittest
+import os
+import random
+import tempfile
+import networkx as nx
+from csr_graph import CSRGraph, csr_pathfinding_algo, csr_bidirectional_pathfinding_algo
+from room_index import RoomIndex
+from a_star_pathfinding import find_node
+from navigation_utils import segment_path
+from landmarks import build_landmarks
+from mapped_graph import save_mapped_graph, load_mapped_graph, load_or_build_mapped_graph
+from campus_fixtures import campus_graph as shared_campus_graph
+
+class TestMappedGraph(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.mapped_graph_path = os.path.join(self.tmpdir.name, "compiled", "campus_graph.map")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    """ TEST #1 """
+    def test_matches_campus_graph(self):
+        """ Room lookups, searches and route segments on the mapped file match the in-memory graphs."""
+        print("\n--- Testing Mapped Graph Against The Campus Graph ---")
+        campus_graph = shared_campus_graph().copy()
+        campus_graph.graph['graph_key'] = 'key-1'
+        csr = CSRGraph.from_networkx(campus_graph)
+        mapped = load_or_build_mapped_graph(campus_graph, csr, self.mapped_graph_path)
+        self.assertIsNotNone(mapped)
+        self.assertEqual((len(mapped), mapped.number_of_edges()), (len(csr), csr.number_of_edges()))
+        self.assertEqual(list(mapped.node_ids), list(csr.node_ids))
+        self.assertEqual(list(mapped.id_rank), list(csr.id_rank))
+        for node_id, node_data in campus_graph.nodes(data=True):
+            self.assertEqual(mapped.node_index[node_id], csr.node_index[node_id])
+            self.assertEqual(mapped.nodes[node_id], {key: value for key, value in node_data.items() if key != 'cost'})
+        self.assertNotIn('NO-SUCH-NODE', mapped.nodes)
+        self.assertIsNone(mapped.node_index.get('NO-SUCH-NODE'))
+
+        room_index = RoomIndex(campus_graph)
+        for room_name, node_ids in room_index.items():
+            self.assertEqual(mapped.room_index.candidates(room_name.lower()), node_ids)
+            self.assertEqual(find_node(f" {room_name} ", mapped, mapped.room_index), find_node(room_name, campus_graph, room_index))
+        self.assertIsNone(find_node('NO-SUCH-ROOM', mapped, mapped.room_index))
+
+        landmarks = build_landmarks(campus_graph, csr, landmark_count=2)
+        rooms = sorted(node_id for node_id, node_data in campus_graph.nodes(data=True) if node_data['category'] == 'room')
+        random.seed(7)
+        for _ in range(20):
+            start, goal = random.choice(rooms), random.choice(rooms)
+            path = csr_pathfinding_algo(start, goal, csr)
+            self.assertEqual(csr_pathfinding_algo(start, goal, mapped), path)
+            self.assertEqual(csr_bidirectional_pathfinding_algo(start, goal, mapped, landmarks=landmarks),
+                             csr_bidirectional_pathfinding_algo(start, goal, csr, landmarks=landmarks))
+            if path:
+                self.assertEqual(segment_path(path, mapped), segment_path(path, campus_graph))
+
+    """ TEST #2 """
+    def test_file_checks_and_private_writes(self):
+        """ Files of other graphs are ignored, and move flags changed in one mapping never reach the file."""
+        print("\n--- Testing Mapped Graph File Handling ---")
+        graph = nx.Graph(graph_key='key-1')
+        graph.add_node('n1', center_x=0.0, center_y=0.0, type='A1', svg_id='A1', floor='A')
+        graph.add_node('n2', center_x=10.0, center_y=0.0, type='walkable', svg_id='walkable', floor='A')
+        graph.add_node('n3', center_x=20.0, center_y=0.0, type='A2', svg_id='A2', floor='A')
+        graph.add_edge('n1', 'n2', weight=10.0)
+        graph.add_edge('n2', 'n3', weight=10.0)
+
+        self.assertIsNone(load_mapped_graph(self.mapped_graph_path, 'key-1'))
+        save_mapped_graph(graph, mapped_graph_path=self.mapped_graph_path)
+        self.assertIsNone(load_mapped_graph(self.mapped_graph_path, 'key-2'))
+        self.assertIsNone(load_mapped_graph(self.mapped_graph_path, None))
+
+        mapped = load_mapped_graph(self.mapped_graph_path, 'key-1')
+        self.assertEqual(mapped.graph['graph_key'], 'key-1')
+        self.assertEqual(csr_pathfinding_algo('n1', 'n3', mapped), ['n1', 'n2', 'n3'])
+        self.assertEqual(mapped.room_index.closest_candidates('a1', 'A2', mapped), ('n1', 'n3'))
+        for edge in range(len(mapped.edge_allowed)):
+            mapped.edge_allowed[edge] = 0
+        self.assertIsNone(csr_pathfinding_algo('n1', 'n3', mapped))
+        self.assertEqual(csr_pathfinding_algo('n1', 'n3', load_mapped_graph(self.mapped_graph_path, 'key-1')), ['n1', 'n2', 'n3'])
+
+        with open(self.mapped_graph_path, 'wb') as mapped_file:
+            mapped_file.write(b'not a mapped graph')
+        self.assertIsNone(load_mapped_graph(self.mapped_graph_path, 'key-1'))
+        # A stale or broken file is rewritten
+        self.assertEqual(list(load_or_build_mapped_graph(graph, mapped_graph_path=self.mapped_graph_path).node_ids), ['n1', 'n2', 'n3'])
@@ -0,0 +1,59 @@
+import unittest
+import networkx as nx
+from path_simplification import (PathSimplifier, remove_collinear, delta_encode, encode_polyline, decode_polyline,
+                                 format_path_segments)
+
+class TestPathSimplification(unittest.TestCase):
+    def setUp(self):
+        """ 3 x 3 walkable tiles (10 x 10) on floor A, the top right tile is an obstacle"""
+        self.graph = nx.Graph()
+        for row in range(3):
+            for column in range(3):
+                node_type = 'obstacle' if (row, column) == (0, 2) else 'walkable'
+                self.graph.add_node(f"t{row}{column}", x=column * 10.0, y=row * 10.0, width=10.0, height=10.0,
+                                    center_x=column * 10.0 + 5, center_y=row * 10.0 + 5, type=node_type,
+                                    category=node_type, floor='A')
+
+    def centres(self, node_ids):
+        return [[self.graph.nodes[node_id]['center_x'], self.graph.nodes[node_id]['center_y']] for node_id in node_ids]
+
+    """ TEST #1 """
+    def test_string_pulling(self):
+        """ Staircase routes become straight lines where there is line of sight, never across the obstacle."""
+        print("\n--- Testing Path Simplification ---")
+        simplifier = PathSimplifier(self.graph)
+        self.assertEqual(remove_collinear([[0, 0], [5, 0], [10, 0], [10, 5], [10, 10]]), [[0, 0], [10, 0], [10, 10]])
+        self.assertEqual(remove_collinear([[0, 0], [10, 0], [5, 0]]), [[0, 0], [10, 0], [5, 0]], "U-turns are kept.")
+
+        diagonal = ['t20', 't21', 't11', 't12']
+        self.assertEqual(simplifier.simplify(self.centres(diagonal), 'A', diagonal), [[5.0, 25.0], [25.0, 15.0]])
+        # Shortcuts may pass next to the obstacle in the top right corner, never through it
+        around = ['t00', 't01', 't11', 't12', 't22']
+        simplified = simplifier.simplify(self.centres(around), 'A', around)
+        self.assertEqual((simplified[0], simplified[-1]), ([5.0, 5.0], [25.0, 25.0]))
+        for start, end in zip(simplified, simplified[1:]):
+            self.assertTrue(simplifier.has_line_of_sight('A', start, end))
+        self.assertTrue(simplifier.has_line_of_sight('A', [5.0, 5.0], [25.0, 15.0]))
+        self.assertFalse(simplifier.has_line_of_sight('A', [15.0, 5.0], [25.0, 12.0]))
+        # Lines leaving the mapped tiles have no line of sight either
+        self.assertFalse(simplifier.has_line_of_sight('A', [5.0, 5.0], [45.0, 5.0]))
+
+    """ TEST #2 """
+    def test_encodings(self):
+        """ Delta and polyline encodings round trip, node IDs are only kept on request."""
+        print("\n--- Testing Route Encodings ---")
+        self.assertEqual(encode_polyline([[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]], precision=5),
+                         "_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+        coords = [[871.85, 372.32000000000005], [871.85, 377.02], [655.65, 377.02]]
+        self.assertEqual(decode_polyline(encode_polyline(coords)), [[871.85, 372.32], [871.85, 377.02], [655.65, 377.02]])
+        self.assertEqual(delta_encode(coords), [[871.85, 372.32], [0.0, 4.7], [-216.2, 0.0]])
+
+        path_segments = [{"floor": 'A', "coords": coords, "node_ids": ['a', 'b', 'c'], "end_node_type": 'A1', "end_node_id": 'c'}]
+        formatted = format_path_segments(path_segments, coords_format='polyline')
+        self.assertEqual(formatted[0]['coords_format'], 'polyline')
+        self.assertNotIn('node_ids', formatted[0])
+        self.assertEqual(formatted[0]['end_node_id'], 'c')
+        self.assertEqual(format_path_segments(path_segments, include_node_ids=True)[0]['node_ids'], ['a', 'b', 'c'])
+        self.assertEqual(path_segments[0]['coords'], coords, "Segments given in are not modified.")
+        with self.assertRaises(ValueError):
+            format_path_segments(path_segments, coords_format='svg')
@@ -0,0 +1,74 @@
+import unittest
+import networkx as nx
+from a_star_pathfinding import pathfinding_algo, annotate_traversal_rules
+from csr_graph import CSRGraph, csr_pathfinding_algo, csr_bidirectional_pathfinding_algo
+from pathfinding_benchmark import sample_room_pairs
+from landmarks import build_landmarks
+from campus_fixtures import CampusRouteChecks
+
+class TestPathfinding(CampusRouteChecks, unittest.TestCase):
+    def setUp(self):
+        """ S(0,0) - A(10,0) and S - B(0,10) both lead to X(10,10), X - G(20,10); A - X is expensive"""
+        self.graph = nx.Graph()
+        for node_id, x, y in [('S', 0, 0), ('A', 10, 0), ('B', 0, 10), ('X', 10, 10), ('G', 20, 10)]:
+            self.graph.add_node(node_id, center_x=float(x), center_y=float(y), type='walkable', floor='A')
+        self.graph.add_node('O', center_x=20.0, center_y=0.0, type='obstacle', floor='A')
+        for u, v, weight in [('S', 'A', 1.0), ('S', 'B', 1.0), ('A', 'X', 100.0), ('B', 'X', 1.0), ('X', 'G', 1.0),
+                             ('A', 'O', 1.0), ('O', 'G', 1.0), ('S', 'X', 1.0)]:
+            self.graph.add_edge(u, v, weight=weight)
+
+    """ TEST #1 """
+    def test_better_path_to_queued_node(self):
+        """ X is queued through A first, the cheaper path through B must still be found."""
+        print("\n--- Testing A* Decrease-Key ---")
+        stats = {}
+        self.assertEqual(pathfinding_algo('S', 'G', self.graph, stats=stats), ['S', 'B', 'X', 'G'])
+        self.assertGreater(stats['expanded'], 0)
+
+    """ TEST #2 """
+    def test_precomputed_rules(self):
+        """ Annotated categories and cardinal flags give the same result as computing them on the fly."""
+        print("\n--- Testing Precomputed Traversal Rules ---")
+        annotated_graph = annotate_traversal_rules(self.graph.copy())
+        self.assertEqual(annotated_graph.nodes['O']['category'], 'obstacle')
+        self.assertFalse(annotated_graph['S']['X']['cardinal'], "Diagonal same-floor edge must not be cardinal.")
+        self.assertTrue(annotated_graph['S']['A']['cardinal'])
+        self.assertEqual(pathfinding_algo('S', 'G', annotated_graph), pathfinding_algo('S', 'G', self.graph))
+
+    """ TEST #3 """
+    def test_matches_csr_engine(self):
+        """ On the campus graph both engines return the same paths after the same number of expansions."""
+        print("\n--- Testing A* Against the CSR Engine ---")
+        for _, _, start_node_id, goal_node_id in sample_room_pairs(self.campus_graph, pairs_per_floor_pair=1, seed=11):
+            networkx_stats = {}
+            csr_stats = {}
+            self.assertEqual(pathfinding_algo(start_node_id, goal_node_id, self.campus_graph, stats=networkx_stats),
+                             csr_pathfinding_algo(start_node_id, goal_node_id, self.csr_graph, stats=csr_stats))
+            self.assertEqual(networkx_stats, csr_stats)
+
+    """ TEST #4 """
+    def test_bidirectional_rules(self):
+        """ Bidirectional A* finds the cheap path, may leave an obstacle start but never enters an obstacle, and needs landmarks."""
+        print("\n--- Testing Bidirectional A* ---")
+        csr_graph = CSRGraph.from_networkx(self.graph)
+        landmarks = build_landmarks(self.graph, csr_graph, landmark_count=2)
+        stats = {}
+        self.assertEqual(csr_bidirectional_pathfinding_algo('S', 'G', csr_graph, stats=stats, landmarks=landmarks), ['S', 'B', 'X', 'G'])
+        self.assertGreater(stats['expanded'], 0)
+        self.assertEqual(csr_bidirectional_pathfinding_algo('G', 'S', csr_graph, landmarks=landmarks), ['G', 'X', 'B', 'S'])
+        self.assertEqual(csr_bidirectional_pathfinding_algo('O', 'S', csr_graph, landmarks=landmarks), ['O', 'A', 'S'])
+        self.assertIsNone(csr_bidirectional_pathfinding_algo('S', 'O', csr_graph, landmarks=landmarks))
+
+        # The Manhattan estimates are not consistent across floors, the stopping rule needs the landmark bounds
+        with self.assertRaises(ValueError):
+            csr_bidirectional_pathfinding_algo('S', 'G', csr_graph)
+
+    """ TEST #5 """
+    def test_bidirectional_campus_routes_are_shortest(self):
+        """ With landmark potentials bidirectional A* returns shortest paths on the campus graph."""
+        print("\n--- Testing Bidirectional A* on the Campus Graph ---")
+        landmarks = build_landmarks(self.campus_graph, self.csr_graph, landmark_count=4)
+        node_pairs = [(start_node_id, goal_node_id) for _, _, start_node_id, goal_node_id
+                      in sample_room_pairs(self.campus_graph, pairs_per_floor_pair=1, seed=13)]
+        self.assert_shortest_routes(lambda start_node_id, goal_node_id: csr_bidirectional_pathfinding_algo(
+            start_node_id, goal_node_id, self.csr_graph, landmarks=landmarks), node_pairs)
@@ -0,0 +1,56 @@
+import unittest
+import networkx as nx
+from csr_graph import CSRGraph
+from portal_graph import build_portal_graph, hierarchical_pathfinding_algo, save_portal_graph, load_portal_graph
+from campus_fixtures import CampusRouteChecks, SavedDataChecks, add_corridor, random_room_pairs
+
+class TestPortalGraph(CampusRouteChecks, SavedDataChecks, unittest.TestCase):
+    def setUp(self):
+        """ Floors A and B, each a corridor of 5 tiles with stairs at both ends; rooms hang off tiles 1 (A) and 3 (B)"""
+        self.graph = nx.Graph(graph_key='key-1')
+        for floor in ('A', 'B'):
+            add_corridor(self.graph, floor, 5, floor=floor)
+            self.graph.add_node(f"{floor}west", center_x=-10.0, center_y=0.0, type='stairsFRONT', floor=floor)
+            self.graph.add_node(f"{floor}east", center_x=50.0, center_y=0.0, type='stairsJKCC', floor=floor)
+            self.graph.add_edge(f"{floor}west", f"{floor}0", weight=10.0)
+            self.graph.add_edge(f"{floor}east", f"{floor}4", weight=10.0)
+        self.graph.add_edge('Awest', 'Bwest', weight=2.0)
+        self.graph.add_edge('Aeast', 'Beast', weight=2.0)
+        self.graph.add_node('A10', center_x=10.0, center_y=10.0, type='A10', floor='A')
+        self.graph.add_node('B30', center_x=30.0, center_y=10.0, type='B30', floor='B')
+        self.graph.add_edge('A10', 'A1', weight=10.0)
+        self.graph.add_edge('B30', 'B3', weight=10.0)
+
+    """ TEST #1 """
+    def test_cross_floor_route(self):
+        """ Both stair sets are portals and the cross-floor route has the shortest length (82 either way)."""
+        print("\n--- Testing Portal Graph Route ---")
+        csr_graph = CSRGraph.from_networkx(self.graph)
+        portal_graph = build_portal_graph(self.graph, csr_graph)
+        self.assertEqual(portal_graph.portal_count(), 4)
+        stats = {}
+        path = hierarchical_pathfinding_algo('A10', 'B30', csr_graph, portal_graph, stats=stats)
+        self.assertEqual(path[0], 'A10')
+        self.assertEqual(path[-1], 'B30')
+        self.assertAlmostEqual(sum(self.graph[u][v]['weight'] for u, v in zip(path, path[1:])), 82.0)
+        self.assertLessEqual(stats['expanded'], portal_graph.portal_count())
+        self.assertEqual(hierarchical_pathfinding_algo('A10', 'A4', csr_graph, portal_graph), ['A10', 'A1', 'A2', 'A3', 'A4'])
+
+    """ TEST #2 """
+    def test_campus_routes_are_shortest(self):
+        """ Cross-floor routes on the campus graph are shortest paths made of allowed moves."""
+        print("\n--- Testing Portal Graph Routes on the Campus Graph ---")
+        portal_graph = build_portal_graph(self.campus_graph, self.csr_graph)
+        floors = self.campus_graph.nodes
+        # Same-floor routes use plain A*
+        node_pairs = [(start_node_id, goal_node_id) for start_node_id, goal_node_id in random_room_pairs(20, seed=5)
+                      if floors[start_node_id]['floor'] != floors[goal_node_id]['floor']]
+        self.assert_shortest_routes(lambda start_node_id, goal_node_id: hierarchical_pathfinding_algo(
+            start_node_id, goal_node_id, self.csr_graph, portal_graph), node_pairs)
+
+    """ TEST #3 """
+    def test_saved_portal_graph_follows_graph_key(self):
+        """ A saved portal graph only loads for the graph it was built from."""
+        print("\n--- Testing Portal Graph Invalidation ---")
+        self.assert_saved_follows_graph_key(build_portal_graph(self.graph), save_portal_graph, load_portal_graph,
+                                            lambda portal_graph: portal_graph.floor_portals)
@@ -0,0 +1,40 @@
+import unittest
+import networkx as nx
+from a_star_pathfinding import annotate_traversal_rules
+from csr_graph import CSRGraph
+from reachability import reachable_nodes, reachable_rooms, reachable_areas, distance_cutoff
+from campus_fixtures import add_corridor
+
+class TestReachability(unittest.TestCase):
+    def setUp(self):
+        """ Corridor of 5 tiles (10 x 10) with room A1 at the west end, A2 above tile 2 and A3 at the east end"""
+        self.graph = nx.Graph()
+        add_corridor(self.graph, 'c', 5, rects=True)
+        for node_id, x, y, neighbor in [('A1', -10.0, 0.0, 'c0'), ('A2', 20.0, -10.0, 'c2'), ('A3', 50.0, 0.0, 'c4')]:
+            self.graph.add_node(node_id, x=x, y=y, width=10.0, height=10.0, center_x=x + 5, center_y=y + 5, type=node_id, floor='A')
+            self.graph.add_edge(node_id, neighbor, weight=10.0)
+        annotate_traversal_rules(self.graph)
+
+    """ TEST #1 """
+    def test_rooms_within_cutoff(self):
+        """ Only rooms within the cutoff are listed, closest first, and the reached tiles merge into one row."""
+        print("\n--- Testing Reachable Rooms ---")
+        csr_graph = CSRGraph.from_networkx(self.graph)
+        distances = reachable_nodes(csr_graph, ['A1'], 40.0)
+        self.assertEqual(set(distances), {'A1', 'c0', 'c1', 'c2', 'c3', 'A2'})
+        self.assertEqual(reachable_rooms(self.graph, distances, exclude=['a1']),
+                         [{'room': 'A2', 'floor': 'A', 'distance': 40.0}])
+        self.assertEqual(reachable_areas(self.graph, distances), {'A': [[20.0, -10.0, 10.0, 10.0], [-10.0, 0.0, 50.0, 10.0]]})
+        everything = reachable_nodes(csr_graph, ['A1'], 1000.0)
+        self.assertEqual([room['room'] for room in reachable_rooms(self.graph, everything)], ['A1', 'A2', 'A3'])
+
+    """ TEST #2 """
+    def test_distance_cutoff(self):
+        """ Metre and second cutoffs need the map scale, bad values are rejected."""
+        print("\n--- Testing Reachability Cutoffs ---")
+        self.assertEqual(distance_cutoff(max_distance='120'), 120.0)
+        self.assertEqual(distance_cutoff(metres='10', map_units_per_metre=5.0), 50.0)
+        self.assertEqual(distance_cutoff(seconds='10', map_units_per_metre=5.0, walking_speed=1.5), 75.0)
+        for arguments in [{}, {'metres': '10'}, {'max_distance': 'far'}, {'max_distance': '-1'}]:
+            with self.assertRaises(ValueError):
+                distance_cutoff(**arguments)
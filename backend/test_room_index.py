@@ -0,0 +1,40 @@
+import unittest
+import networkx as nx
+from a_star_pathfinding import find_node, find_nodes
+from room_index import RoomIndex
+from campus_fixtures import campus_graph as shared_campus_graph
+
+class TestRoomIndex(unittest.TestCase):
+
+    """ TEST #1 """
+    def test_matches_linear_scan(self):
+        """ Indexed lookups return the same node as the linear find_node for every name on campus."""
+        print("\n--- Testing Room Index Against Linear Scan ---")
+        campus_graph = shared_campus_graph()
+        room_index = RoomIndex(campus_graph)
+        names = {data.get('type', '') for _, data in campus_graph.nodes(data=True)}
+        names |= {data.get('svg_id', '') for _, data in campus_graph.nodes(data=True)}
+        names = sorted(name for name in names if name and name not in ('walkable', 'obstacle'))
+        self.assertGreater(len(names), 100)
+        for name in names:
+            for query in (name, name.lower(), f" {name} "):
+                self.assertEqual(find_node(query, campus_graph, room_index), find_node(query, campus_graph))
+        self.assertIsNone(find_node('NO-SUCH-ROOM', campus_graph, room_index))
+
+    """ TEST #2 """
+    def test_multi_rect_rooms(self):
+        """ Rooms drawn with several rects keep every rect as a candidate."""
+        print("\n--- Testing Multi-Rect Room Candidates ---")
+        graph = nx.Graph()
+        graph.add_node('n1', type='A1', svg_id='A1', center_x=0.0, center_y=0.0, floor='A')
+        graph.add_node('n2', type='walkable', svg_id='walkable', center_x=50.0, center_y=0.0, floor='A')
+        graph.add_node('n3', type='A1', svg_id='A1', center_x=90.0, center_y=0.0, floor='A')
+        graph.add_node('n4', type='A2', svg_id='A2', center_x=100.0, center_y=0.0, floor='A')
+        room_index = RoomIndex(graph)
+
+        self.assertEqual(room_index.candidates('a1'), ('n1', 'n3'))
+        self.assertEqual(find_nodes('A1', graph, room_index), find_nodes('A1', graph))
+        self.assertEqual(room_index.first('A1'), 'n1')
+        self.assertEqual(room_index.closest_candidates('A1', 'A2', graph), ('n3', 'n4'))
+        self.assertIn(' a2', room_index)
+        self.assertEqual(room_index.candidates('B9'), ())
@@ -0,0 +1,92 @@
+import unittest
+import os
+import tempfile
+import threading
+import networkx as nx
+from route_cache import RouteCache
+from navigation_utils import segment_path
+
+class TestRouteCache(unittest.TestCase):
+    def setUp(self):
+        """ Two rooms on floor A joined through stairs to a room on floor B"""
+        self.graph = nx.Graph()
+        layout = [('A1', 0, 0, 'A', 'A1'), ('wA', 10, 0, 'A', 'walkable'), ('sA', 20, 0, 'A', 'StairsA'),
+                  ('sB', 20, 0, 'B', 'StairsB'), ('B1', 20, 10, 'B', 'B1'), ('A2', 10, 10, 'A', 'A2')]
+        for node_id, x, y, floor, node_type in layout:
+            self.graph.add_node(node_id, center_x=float(x), center_y=float(y), type=node_type, floor=floor)
+        for u, v in [('A1', 'wA'), ('wA', 'sA'), ('sA', 'sB'), ('sB', 'B1'), ('wA', 'A2')]:
+            self.graph.add_edge(u, v, weight=10.0)
+        self.path = ['A1', 'wA', 'sA', 'sB', 'B1']
+
+    """ TEST #1 """
+    def test_hits_and_reverse_reuse(self):
+        """ Repeated queries hit regardless of case, reversed queries reuse the stored route."""
+        print("\n--- Testing Route Cache Hits ---")
+        cache = RouteCache(max_entries=4)
+        self.assertIsNone(cache.get('A1', 'B1', 'v1', self.graph))
+        cache.put('A1', 'B1', 'v1', self.path, segment_path(self.path, self.graph))
+
+        self.assertEqual(cache.get(' a1', 'b1 ', 'v1', self.graph)['path_node_ids'], self.path)
+        reverse_route = cache.get('B1', 'A1', 'v1', self.graph)
+        self.assertEqual(reverse_route['path_node_ids'], list(reversed(self.path)))
+        self.assertEqual(reverse_route['path_segments'], segment_path(list(reversed(self.path)), self.graph))
+        self.assertIsNone(cache.get('A1', 'B1', 'v2', self.graph), "Routes of another graph version must not be served.")
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['reverse_hits'], stats['misses']), (1, 1, 2))
+        self.assertEqual(stats['entries'], 2)
+
+    """ TEST #2 """
+    def test_lru_eviction(self):
+        """ The least recently used route is evicted first."""
+        print("\n--- Testing Route Cache Eviction ---")
+        cache = RouteCache(max_entries=2)
+        cache.put('A1', 'A2', 'v1', ['A1', 'wA', 'A2'], [])
+        cache.put('A1', 'B1', 'v1', self.path, [])
+        cache.get('A1', 'A2', 'v1', self.graph)
+        cache.put('A2', 'B1', 'v1', ['A2', 'wA', 'sA', 'sB', 'B1'], [])
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertIsNotNone(cache.get('A1', 'A2', 'v1', self.graph))
+        self.assertIsNone(cache.get('A1', 'B1', 'v1', self.graph))
+
+        cache.retain_version('v2')
+        self.assertEqual(len(cache), 0)
+
+    """ TEST #3 """
+    def test_disk_tier(self):
+        """ Routes written to the disk tier are served by a new cache, stale versions are pruned."""
+        print("\n--- Testing Route Cache Disk Tier ---")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache_path = os.path.join(tmpdir, "route_cache.sqlite")
+            RouteCache(disk_path=cache_path).put('A1', 'B1', 'v1', self.path, segment_path(self.path, self.graph))
+
+            reopened_cache = RouteCache(disk_path=cache_path)
+            route = reopened_cache.get('B1', 'A1', 'v1', self.graph)
+            self.assertEqual(route['path_node_ids'], list(reversed(self.path)))
+            self.assertEqual(len(route['path_segments']), 2)
+            self.assertEqual(reopened_cache.stats()['disk_hits'], 1)
+
+            reopened_cache.retain_version('v2')
+            self.assertIsNone(RouteCache(disk_path=cache_path).get('A1', 'B1', 'v1', self.graph))
+
+    """ TEST #4 """
+    def test_concurrent_access(self):
+        """ Many threads reading and writing keep the cache within its bound."""
+        print("\n--- Testing Route Cache Thread Safety ---")
+        cache = RouteCache(max_entries=8)
+
+        def worker(offset):
+            for i in range(200):
+                cache.put(f"R{(i + offset) % 20}", 'B1', 'v1', self.path, [])
+                cache.get(f"R{i % 20}", 'B1', 'v1', self.graph)
+
+        threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = cache.stats()
+        self.assertLessEqual(stats['entries'], 8)
+        self.assertEqual(stats['hits'] + stats['misses'], 800)
@@ -0,0 +1,45 @@
+import unittest
+import math
+import networkx as nx
+from route_table import build_route_table, save_route_table, load_route_table, room_name_index
+from campus_fixtures import SavedDataChecks
+
+class TestRouteTable(SavedDataChecks, unittest.TestCase):
+    def setUp(self):
+        """ Corridor of walkable tiles with rooms A1, A2, A3 along it and a disconnected room A9"""
+        self.graph = nx.Graph(graph_key='key-1')
+        layout = [('A1', 0, 0, 'A1'), ('w1', 10, 0, 'walkable'), ('w2', 20, 0, 'walkable'),
+                  ('A2', 20, 10, 'A2'), ('w3', 30, 0, 'walkable'), ('A3', 40, 0, 'A3'),
+                  ('A2b', 20, 20, 'A2'), ('A9', 100, 100, 'A9')]
+        for node_id, x, y, node_type in layout:
+            self.graph.add_node(node_id, center_x=float(x), center_y=float(y), type=node_type, floor='A')
+        for u, v in [('A1', 'w1'), ('w1', 'w2'), ('w2', 'A2'), ('w2', 'w3'), ('w3', 'A3'), ('A2', 'A2b')]:
+            self.graph.add_edge(u, v, weight=10.0)
+
+    """ TEST #1 """
+    def test_room_index(self):
+        """ Each room name maps to its first node, walkable tiles are not rooms."""
+        print("\n--- Testing Room Name Index ---")
+        self.assertEqual(room_name_index(self.graph), {'A1': 'A1', 'A2': 'A2', 'A3': 'A3', 'A9': 'A9'})
+
+    """ TEST #2 """
+    def test_routes_and_distances(self):
+        """ Routes come back in order with their lengths, disconnected rooms give None."""
+        print("\n--- Testing Route Table Lookups ---")
+        route_table = build_route_table(self.graph)
+        self.assertEqual(route_table.route('a1', 'A3'), ['A1', 'w1', 'w2', 'w3', 'A3'])
+        self.assertEqual(route_table.route('A3', 'A2'), ['A3', 'w3', 'w2', 'A2'])
+        self.assertEqual(route_table.route('A2', 'A2'), ['A2'])
+        self.assertAlmostEqual(route_table.distance('A1', 'A3'), 40.0)
+        self.assertIsNone(route_table.route('A1', 'A9'))
+        self.assertEqual(route_table.distance('A1', 'A9'), math.inf)
+        self.assertFalse(route_table.has_room('w1'))
+        self.assertEqual(route_table.room_node_id(' a3 '), 'A3')
+        self.assertIsNone(route_table.room_node_id('w1'))
+
+    """ TEST #3 """
+    def test_table_invalidated_by_graph_key(self):
+        """ A saved table only loads for the graph it was built from."""
+        print("\n--- Testing Route Table Invalidation ---")
+        self.assert_saved_follows_graph_key(build_route_table(self.graph), save_route_table, load_route_table,
+                                            lambda route_table: route_table.route('A1', 'A2'))
@@ -0,0 +1,74 @@
+import unittest
+import math
+import networkx as nx
+from a_star_pathfinding import annotate_traversal_rules
+from csr_graph import CSRGraph, csr_pathfinding_algo, csr_dijkstra
+from route_cache import RouteCache
+from routing_profiles import RoutingProfiles, build_profile_costs, profile_version
+from campus_fixtures import add_corridor
+
+class TestRoutingProfiles(unittest.TestCase):
+    def setUp(self):
+        """ Corridor of 11 tiles (10 x 10) on floors A and B, stairs at the west end and an elevator at the east end"""
+        self.graph = nx.Graph()
+        for floor in 'AB':
+            add_corridor(self.graph, floor, 11, floor=floor, rects=True)
+            for node_type, x, neighbor in [('stairsWEST', -10.0, f"{floor}0"), ('elevatorEAST', 110.0, f"{floor}10")]:
+                node_id = f"{floor}_{node_type}"
+                self.graph.add_node(node_id, x=x, y=0.0, width=10.0, height=10.0, center_x=x + 5, center_y=5.0,
+                                    type=node_type, floor=floor)
+                self.graph.add_edge(node_id, neighbor, weight=10.0)
+        self.graph.add_edge('A_stairsWEST', 'B_stairsWEST', weight=2.0)
+        self.graph.add_edge('A_elevatorEAST', 'B_elevatorEAST', weight=2.0)
+        annotate_traversal_rules(self.graph)
+        self.csr = CSRGraph.from_networkx(self.graph)
+
+    def route_cost(self, csr_graph, start_node_id, goal_node_id):
+        distances, _ = csr_dijkstra(csr_graph, [csr_graph.node_index[start_node_id]])
+        return distances.get(csr_graph.node_index[goal_node_id], math.inf)
+
+    """ TEST #1 """
+    def test_profiles_change_floor_connections(self):
+        """ Step-free routes never use stairs, the other profiles make stairs or elevators more expensive."""
+        print("\n--- Testing Routing Profiles ---")
+        profiles = RoutingProfiles(self.graph, self.csr)
+        self.assertIs(profiles.graph('default'), self.csr)
+
+        default_path = csr_pathfinding_algo('A2', 'B2', profiles.graph('default'))
+        self.assertIn('A_stairsWEST', default_path)
+        step_free_path = csr_pathfinding_algo('A2', 'B2', profiles.graph('step_free'))
+        self.assertIn('A_elevatorEAST', step_free_path)
+        self.assertFalse(any('stairs' in node_id for node_id in step_free_path))
+        self.assertIsNone(csr_pathfinding_algo('A2', 'A_stairsWEST', profiles.graph('step_free')))
+
+        self.assertEqual(self.route_cost(profiles.graph('avoid_stairs'), 'A0', 'B0'), 10.0 + 202.0 + 10.0)
+        self.assertIn('A_elevatorEAST', csr_pathfinding_algo('A2', 'B2', profiles.graph('avoid_stairs')))
+        # Waiting for the elevator costs 60, split over stepping in and out
+        self.assertEqual(self.route_cost(profiles.graph('fastest'), 'A10', 'B10'), 10.0 + 30.0 + 2.0 + 30.0 + 10.0)
+        self.assertEqual(self.route_cost(profiles.graph('fastest'), 'A_elevatorEAST', 'A10'), 40.0)
+        self.assertIn('A_elevatorEAST', csr_pathfinding_algo('A6', 'B6', profiles.graph('default')))
+        self.assertIn('A_stairsWEST', csr_pathfinding_algo('A6', 'B6', profiles.graph('fastest')))
+        with self.assertRaises(ValueError):
+            profiles.graph('scenic')
+
+    """ TEST #2 """
+    def test_profiles_share_the_topology(self):
+        """ Profile graphs only own the arrays they change, invalid rules are rejected."""
+        print("\n--- Testing Routing Profile Storage ---")
+        profiles = RoutingProfiles(self.graph, self.csr)
+        step_free, fastest = profiles.graph('step_free'), profiles.graph('fastest')
+        self.assertIs(step_free.neighbors, self.csr.neighbors)
+        self.assertIs(step_free.weights, self.csr.weights)
+        self.assertIsNot(step_free.edge_allowed, self.csr.edge_allowed)
+        self.assertIs(fastest.edge_allowed, self.csr.edge_allowed)
+        self.assertIsNot(fastest.weights, self.csr.weights)
+        for rules in [{'stairs': -1.0}, {'escalator': None}, {'elevator_ride': math.nan}]:
+            with self.assertRaises(ValueError):
+                build_profile_costs(self.graph, self.csr, rules)
+
+        # Routes of every profile are cached apart and survive as long as their graph version
+        route_cache = RouteCache(8)
+        route_cache.put('A1', 'B1', profile_version('v1', 'step_free'), ['A1', 'B1'], [])
+        self.assertIsNone(route_cache.get('A1', 'B1', profile_version('v1', 'default'), self.graph))
+        self.assertEqual(route_cache.retain_version('v1'), 0)
+        self.assertEqual(route_cache.retain_version('v2'), 1)
@@ -0,0 +1,105 @@
+import unittest
+import os
+import tempfile
+import networkx as nx
+from a_star_pathfinding import annotate_traversal_rules, find_nodes
+from csr_graph import CSRGraph, csr_pathfinding_algo
+from closures import GraphClosures
+from shared_changes import SharedChanges
+from campus_fixtures import add_corridor
+
+class Worker:
+    """ Closures of one worker process, kept in step with the others through a SharedChanges file. """
+
+    def __init__(self, graph, changes_path):
+        self.graph = graph.copy()
+        self.csr = CSRGraph.from_networkx(self.graph)
+        self.closures = GraphClosures(self.graph, self.csr)
+        self.changes = SharedChanges(changes_path)
+
+    def apply_change(self, kind, data):
+        if kind == 'close':
+            self.closures.reapply(data, lambda room_name: find_nodes(room_name, self.graph))
+        elif kind == 'reopen':
+            self.closures.reopen(data['id'])
+
+    def close(self, room_name):
+        def make_change():
+            closure, _ = self.closures.close(find_nodes(room_name, self.graph), rooms=[room_name])
+            return closure, closure
+        return self.changes.record('close', make_change, self.apply_change)
+
+    def reopen(self, closure_id):
+        def make_change():
+            reopened = self.closures.reopen(closure_id)
+            return reopened, {'id': closure_id} if reopened is not None else None
+        return self.changes.record('reopen', make_change, self.apply_change)
+
+    def catch_up(self):
+        return self.changes.apply_pending(self.apply_change) if self.changes.has_pending() else 0
+
+class TestSharedChanges(unittest.TestCase):
+    def setUp(self):
+        """ Corridor of 5 tiles (10 x 10) on floor A with rooms A1 and A2 below its ends"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.changes_path = os.path.join(self.tmpdir.name, "compiled", "shared_changes.db")
+        self.graph = nx.Graph()
+        add_corridor(self.graph, 'n', 5, rects=True)
+        for room_name, column in [('A1', 0), ('A2', 4)]:
+            self.graph.add_node(room_name, x=column * 10.0, y=10.0, width=10.0, height=10.0,
+                                center_x=column * 10.0 + 5, center_y=15.0, type=room_name, floor='A')
+            self.graph.add_edge(room_name, f"n{column}", weight=10.0)
+        annotate_traversal_rules(self.graph)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    """ TEST #1 """
+    def test_workers_apply_the_same_closures(self):
+        """ Closures made in one worker reach the others in order, with the same IDs, also when two workers change them in turn."""
+        print("\n--- Testing Closures Shared Between Workers ---")
+        first, second = Worker(self.graph, self.changes_path), Worker(self.graph, self.changes_path)
+        closure = first.close('A2')
+        self.assertEqual(csr_pathfinding_algo('A1', 'A2', second.csr), ['A1', 'n0', 'n1', 'n2', 'n3', 'n4', 'A2'])
+        self.assertEqual(second.catch_up(), 1)
+        self.assertIsNone(csr_pathfinding_algo('A1', 'A2', second.csr))
+        self.assertEqual(second.closures.list(), first.closures.list())
+        self.assertEqual(second.catch_up(), 0)
+
+        # The second worker has not looked since the first one closed A1, recording its change replays that one first
+        other_closure = first.close('A1')
+        self.assertEqual(second.reopen(closure['id']), ['A2'])
+        self.assertTrue(second.closures.is_closed('A1'))
+        self.assertEqual(first.catch_up(), 1)
+        self.assertEqual([closure['id'] for closure in first.closures.list()], [other_closure['id']])
+        self.assertEqual(first.closures.list(), second.closures.list())
+        self.assertEqual(first.closures.version, second.closures.version)
+        self.assertEqual(second.close('A2')['id'], first.close('A2')['id'] - 1, "Closure IDs are handed out in turn.")
+
+    """ TEST #2 """
+    def test_failed_changes_and_restarts(self):
+        """ Failed or empty changes are not recorded, a new server starts after the changes already in the file and deletes them."""
+        print("\n--- Testing Shared Change Log ---")
+        first = Worker(self.graph, self.changes_path)
+        with self.assertRaises(ValueError):
+            first.changes.record('close', lambda: first.closures.close([]), first.apply_change)
+        self.assertIsNone(first.reopen(99))
+        self.assertEqual(first.changes.latest_seq(), 0)
+
+        first.close('A1')
+        restarted = Worker(self.graph, self.changes_path)
+        self.assertFalse(restarted.changes.has_pending())
+        self.assertEqual(restarted.closures.list(), [])
+        # A connection opened again (in a forked worker) goes on from where it was
+        first.changes.reopen()
+        first.close('A2')
+        self.assertEqual(restarted.catch_up(), 1)
+        self.assertEqual([closure['rooms'] for closure in restarted.closures.list()], [['A2']])
+
+        # The next server deletes the changes of this one, the sequence numbers keep counting up
+        latest_seq = first.changes.latest_seq()
+        next_server = Worker(self.graph, self.changes_path)
+        self.assertEqual(next_server.changes.compact(), 2)
+        next_server.close('A1')
+        self.assertEqual(next_server.changes.latest_seq(), latest_seq + 1)
+        self.assertEqual(restarted.catch_up(), 1)
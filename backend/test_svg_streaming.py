@@ -0,0 +1,69 @@
+import unittest
+import os
+import tempfile
+from map_parser import FLOOR_FILES, svg_map_parse, iter_svg_rects, _svgelements_rects
+from campus_fixtures import MAP_DIRECTORY
+
+class TestStreamingRectExtractor(unittest.TestCase):
+
+    def write_svg(self, svg_content):
+        """ Writes SVG content to a temporary file that is removed after the test."""
+        with tempfile.NamedTemporaryFile(mode='w', suffix=".svg", delete=False) as tmp_file:
+            tmp_file.write(svg_content)
+        self.addCleanup(os.remove, tmp_file.name)
+        return tmp_file.name
+
+    """ TEST #1 """
+    def test_matches_svgelements_on_floor_maps(self):
+        """ Streaming extractor must read the same rects as svgelements on every floor."""
+        print("\n--- Testing Streaming Extractor Against svgelements ---")
+        for _, floor_filename in FLOOR_FILES:
+            with self.subTest(floor=floor_filename):
+                svg_path = os.path.join(MAP_DIRECTORY, floor_filename)
+                streamed = list(iter_svg_rects(svg_path))
+                self.assertTrue(all(rect[5] is None for rect in streamed), "Floor maps have no nested transforms.")
+                self.assertEqual(streamed, list(_svgelements_rects(svg_path)))
+
+    """ TEST #2 """
+    def test_streaming_graph_matches_full_parse(self):
+        """ The floor graph must not depend on which extractor was used."""
+        print("\n--- Testing Streaming Graph Against Full Parse ---")
+        svg_path = os.path.join(MAP_DIRECTORY, 'Floor_D.svg')
+        streamed_graph = svg_map_parse(svg_path, 'D', streaming=True)
+        full_graph = svg_map_parse(svg_path, 'D', streaming=False)
+        self.assertEqual(list(streamed_graph.nodes(data=True)), list(full_graph.nodes(data=True)))
+        self.assertEqual(list(streamed_graph.edges(data=True)), list(full_graph.edges(data=True)))
+
+    """ TEST #3 """
+    def test_nested_transform_falls_back(self):
+        """ Rects inside transformed groups are read through svgelements."""
+        print("\n--- Testing Nested Transform Fallback ---")
+        svg_path = self.write_svg("""<svg xmlns="http://www.w3.org/2000/svg">
+            <rect id="R1" x="0" y="0" width="10" height="10"/>
+            <g transform="translate(10 0)"><rect id="R2" x="0" y="0" width="10" height="10"/></g>
+            <defs><rect id="hidden" x="0" y="0" width="10" height="10"/></defs></svg>""")
+
+        streamed = list(iter_svg_rects(svg_path))
+        self.assertEqual(streamed, [('R1', 0.0, 0.0, 10.0, 10.0, None),
+                                    ('R2', 0.0, 0.0, 10.0, 10.0, 'translate(10 0)')])
+
+        graph = svg_map_parse(svg_path, 'A')
+        self.assertEqual(sorted(data['x'] for _, data in graph.nodes(data=True)), [0.0, 10.0])
+        self.assertEqual(graph.number_of_edges(), 1)
+
+    """ TEST #4 """
+    def test_unsupported_content_raises(self):
+        """ Content only svgelements handles correctly is reported with ValueError."""
+        print("\n--- Testing Unsupported Content ---")
+        svg_path = self.write_svg("""<svg xmlns="http://www.w3.org/2000/svg">
+            <rect id="R1" x="1em" y="0" width="10" height="10"/></svg>""")
+        with self.assertRaises(ValueError):
+            list(iter_svg_rects(svg_path))
+        self.assertIsNotNone(svg_map_parse(svg_path, 'A'))
+
+    """ TEST #5 """
+    def test_invalid_svg_content(self):
+        """ Malformed XML still makes svg_map_parse return None."""
+        print("\n--- Testing Invalid SVG Content ---")
+        svg_path = self.write_svg("<svg><rect id='valid' x='0' y='0' width='10' height='10'><malformed></svg>")
+        self.assertIsNone(svg_map_parse(svg_path, 'A'))
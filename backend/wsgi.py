@@ -0,0 +1,21 @@
+"""
+Production entry point of the backend (run from the backend directory).
+
+Several worker processes sharing one copy of the campus graph (Linux/macOS):
+    gunicorn -c gunicorn.conf.py wsgi:app
+gunicorn.conf.py imports this module in the master process (preload_app), so the graph is loaded
+or built once before the workers are forked, and each worker runs app.after_fork.
+Set CAMPUS_NAV_WORKERS / CAMPUS_NAV_BIND to change the number of workers / the address.
+Runtime changes (POST /api/closures, /api/admin/reload_floors, ...) are recorded in app.SHARED_CHANGES_PATH
+and applied by every worker before its next request.
+
+One process with several threads (also on Windows):
+    waitress-serve --port=5000 --threads=8 --call app:create_app
+"""
+
+from app import create_app
+
+# Imported with preload_app in the gunicorn master; a server importing this module in every worker
+# (gunicorn without --preload) still works, every worker then holds its own copy of the graph and
+# a restarted worker only sees the runtime changes made after it started
+app = create_app(prefork=True)